@@ -0,0 +1,156 @@
+import sys
+import json
+import time
+import asyncio
+import metrics
+from prompts import get_prompt, count_message_tokens, count_tokens
+from firmware_composer import plan, syntax_problems, TARGET_NAMES
+
+# Tokens and latency of composed firmware (library drivers + LLM glue) against
+# full LLM generation of the same program.
+# Offline, completion size is counted from the program each path has to emit
+# and latency is modelled as first-token time plus decode time per token.
+# With --live both paths call the configured models (needs OPENAI_API_KEY).
+# Usage: python bench_codegen.py [--live]
+
+FIRST_TOKEN_MS = 400
+MS_PER_OUTPUT_TOKEN = 12  # ~80 tokens/s decode
+RUNS = 1000
+
+
+def _node(node_id, label, pins, type_="Module"):
+    return {"id": node_id, "label": label, "type": type_, "pins": pins}
+
+
+def _wire(i, a, a_pin, b, b_pin):
+    return {"id": f"c{i}", "from": a, "fromPin": a_pin, "to": b, "toPin": b_pin}
+
+
+CASES = {
+    "obstacle robot (uno)": (
+        "obstacle avoiding robot with HC-SR04, L298N and a scanning servo",
+        {
+            "nodes": [
+                _node("mcu", "Arduino UNO", ["5V", "GND", "D3", "D4", "D5", "D6", "D7", "D8", "D9", "D10", "D11"], "Microcontroller"),
+                _node("s1", "HC-SR04", ["VCC", "TRIG", "ECHO", "GND"]),
+                _node("drv", "L298N Motor Driver", ["IN1", "IN2", "IN3", "IN4", "ENA", "ENB", "12V", "GND"]),
+                _node("srv", "SG90 Servo", ["SIG", "VCC", "GND"]),
+            ],
+            "connections": [
+                _wire(1, "mcu", "D9", "s1", "TRIG"), _wire(2, "mcu", "D10", "s1", "ECHO"),
+                _wire(3, "mcu", "D7", "drv", "IN1"), _wire(4, "mcu", "D8", "drv", "IN2"),
+                _wire(5, "mcu", "D11", "drv", "IN3"), _wire(6, "mcu", "D3", "drv", "IN4"),
+                _wire(7, "mcu", "D5", "drv", "ENA"), _wire(8, "mcu", "D6", "drv", "ENB"),
+                _wire(9, "mcu", "D4", "srv", "SIG"), _wire(10, "mcu", "5V", "s1", "VCC"),
+            ],
+        },
+        {
+            "globals": "const float STOP_CM = 20.0;",
+            "loop": "float d = s1_distance_cm();\nif (d > 0 && d < STOP_CM) {\n  drv_drive(0, 0);\n  srv_servo.write(0);\n"
+                    "  delay(300);\n  float left = s1_distance_cm();\n  srv_servo.write(180);\n  delay(300);\n"
+                    "  float right = s1_distance_cm();\n  srv_servo.write(90);\n  drv_drive(left > right ? -180 : 180, left > right ? 180 : -180);\n"
+                    "  delay(400);\n} else {\n  drv_drive(200, 200);\n}\ndelay(50);",
+            "explanation": "Drives forward and turns toward the clearer side when blocked.",
+        },
+    ),
+    "weather station (esp32)": (
+        "temperature monitor with DHT11 that beeps above 30C",
+        {
+            "nodes": [
+                _node("mcu", "ESP32 DevKit", ["3V3", "GND", "GPIO4", "GPIO5"], "Microcontroller"),
+                _node("t1", "DHT11", ["VCC", "DATA", "GND"]),
+                _node("bz", "Piezo Buzzer", ["+", "-"]),
+            ],
+            "connections": [_wire(1, "mcu", "GPIO4", "t1", "DATA"), _wire(2, "mcu", "GPIO5", "bz", "+")],
+        },
+        {
+            "loop": "float t = t1_dht.readTemperature();\nif (!isnan(t)) {\n  Serial.println(t);\n"
+                    "  if (t > 30) tone(BZ_PIN, 2000, 200);\n}\ndelay(2000);",
+            "explanation": "Logs temperature and beeps above 30C.",
+        },
+    ),
+    "motion alarm (raspberry pi)": (
+        "motion alarm with PIR, buzzer, LED and a disarm button",
+        {
+            "nodes": [
+                _node("pi", "Raspberry Pi 4", ["5V", "GND", "GPIO17", "GPIO27", "GPIO22", "GPIO23"], "Microcontroller"),
+                _node("pir", "PIR Motion Sensor", ["VCC", "OUT", "GND"]),
+                _node("bz", "Buzzer", ["+", "-"]),
+                _node("led", "LED", ["+", "-"]),
+                _node("btn", "Push Button", ["SIG", "GND"]),
+            ],
+            "connections": [
+                _wire(1, "pi", "GPIO17", "pir", "OUT"), _wire(2, "pi", "GPIO27", "bz", "+"),
+                _wire(3, "pi", "GPIO22", "led", "+"), _wire(4, "pi", "GPIO23", "btn", "SIG"),
+            ],
+        },
+        {
+            "globals": "armed = True",
+            "loop": "if btn.is_pressed:\n    armed = not armed\n    led.off()\n    sleep(0.5)\n"
+                    "if armed and pir.motion_detected:\n    led.on()\n    bz.beep(0.2, 0.2, n=5)\nsleep(0.1)",
+            "explanation": "Beeps and lights the LED on motion while armed.",
+        },
+    ),
+}
+
+
+def _latency_ms(completion_tokens):
+    return FIRST_TOKEN_MS + completion_tokens * MS_PER_OUTPUT_TOKEN
+
+
+def offline():
+    print(f"{'case':30} {'path':9} {'prompt':>7} {'output':>7} {'model ms':>9} {'syntax':>7}")
+    for name, (query, diagram, glue) in CASES.items():
+        composition = plan(diagram)
+        started = time.perf_counter()
+        for _ in range(RUNS):
+            code = plan(diagram).code(glue)
+        compose_us = (time.perf_counter() - started) / RUNS * 1e6
+        problems = syntax_problems(code, composition.target)
+
+        full_messages = get_prompt("code").messages(query=query)
+        full_output = json.dumps({"code": code, "explanation": glue["explanation"]})
+        glue_messages = get_prompt("code_glue").messages(
+            query=query, target=TARGET_NAMES[composition.target],
+            api="\n".join(composition.api), other="\n".join(composition.others) or "(none)",
+        )
+        rows = (
+            ("full", count_message_tokens(full_messages), count_tokens(full_output)),
+            ("composed", count_message_tokens(glue_messages), count_tokens(json.dumps(glue))),
+        )
+        for path, prompt_tokens, output_tokens in rows:
+            print(
+                f"{name:30} {path:9} {prompt_tokens:7} {output_tokens:7} "
+                f"{_latency_ms(output_tokens):9} {'ok' if not problems else 'FAIL':>7}"
+            )
+        print(f"{'':30} composition {compose_us:.0f} us per program")
+        for problem in problems:
+            print(f"  {problem}")
+
+
+async def live():
+    from model_router import complete_json
+    from firmware_composer import compose
+
+    print(f"{'case':30} {'path':9} {'prompt':>7} {'output':>7} {'ms':>9}")
+    for name, (query, diagram, _) in CASES.items():
+        for path, route, run in (
+            ("full", "code", lambda: complete_json("code", get_prompt("code").messages(query=query))),
+            ("composed", "code_glue", lambda: compose(query, diagram)),
+        ):
+            prompt_before = metrics.counter(f"llm.{route}.prompt_tokens")
+            output_before = metrics.counter(f"llm.{route}.completion_tokens")
+            started = time.perf_counter()
+            await run()
+            elapsed = (time.perf_counter() - started) * 1000
+            print(
+                f"{name:30} {path:9} {int(metrics.counter(f'llm.{route}.prompt_tokens') - prompt_before):7} "
+                f"{int(metrics.counter(f'llm.{route}.completion_tokens') - output_before):7} {elapsed:9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    if "--live" in sys.argv[1:]:
+        asyncio.run(live())
+    else:
+        offline()
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import httpx
+import sqlalchemy
+import websockets
+
+# Load test for collaborative editing (collab.py) against a real server.
+# --editors clients join one circuit; each drags its own part (a position op
+# every 1/--rate seconds) and now and then renames it. Every op carries a
+# unique x, so the time from one editor's send to another editor's receive is
+# the merge latency. Bandwidth is compared with sending the whole diagram_data
+# to the other editors on every change. At the end every editor's view, and
+# the snapshot saved when they leave, must agree.
+#
+# Usage: python bench_collab.py [--editors 50] [--rate 10] [--seconds 10] [--parts 60]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(HERE, 'bench-collab.db')}")
+
+from bench_workers import start, stop, wait_until_up
+from bench_simulation import synthetic
+
+PORT = 8300
+LATENCY_BUDGET_MS = 250
+RENAME_EVERY = 20
+
+
+class Editor:
+    def __init__(self, index, node_id, sent_at, latencies):
+        self.index = index
+        self.node_id = node_id
+        self.sent_at = sent_at  # x -> perf_counter at send
+        self.latencies = latencies
+        self.view = {}  # (kind, id, field) -> value
+        self.pending = {}  # (kind, id, field) -> seq of the last unacked write
+        self.seq = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def send(self, ws, ops):
+        self.seq += 1
+        for op in ops:
+            key = (op["kind"], op["id"], op["field"])
+            self.view[key] = op["value"]
+            self.pending[key] = self.seq
+        text = json.dumps({"type": "ops", "seq": self.seq, "ops": ops})
+        self.bytes_out += len(text)
+        await ws.send(text)
+
+    def receive(self, text):
+        now = time.perf_counter()
+        self.bytes_in += len(text)
+        message = json.loads(text)
+        if "ack" in message:
+            self.pending = {k: s for k, s in self.pending.items() if s > message["ack"]}
+        for op in message.get("ops") or []:
+            key = (op["kind"], op["id"], op["field"])
+            if key in self.pending:
+                continue  # our own newer write wins once the server sees it
+            self.view[key] = op["value"]
+            if op["field"] == "position" and op["value"]["x"] in self.sent_at:
+                self.latencies.append((now - self.sent_at[op["value"]["x"]]) * 1000)
+
+    async def run(self, url, rate, seconds, ready, go):
+        async with websockets.connect(url, max_size=None) as ws:
+            state = json.loads(await ws.recv())
+            for node in state["diagram"]["nodes"]:
+                self.view[("node", node["id"], "position")] = node.get("position")
+            ready.set()
+            await go.wait()
+            reader = asyncio.create_task(self.read(ws))
+            deadline = time.monotonic() + seconds
+            count = 0
+            while time.monotonic() < deadline:
+                count += 1
+                x = self.index * 1_000_000 + count
+                ops = [{"kind": "node", "id": self.node_id, "field": "position", "value": {"x": x, "y": count % 600}}]
+                if count % RENAME_EVERY == 0:
+                    ops.append({"kind": "node", "id": self.node_id, "field": "data", "value": {"label": f"part {self.index}.{count}"}})
+                self.sent_at[x] = time.perf_counter()
+                await self.send(ws, ops)
+                await asyncio.sleep(1 / rate)
+            # Let the last batches and acks arrive
+            await asyncio.sleep(1.0)
+            reader.cancel()
+
+    async def read(self, ws):
+        async for text in ws:
+            self.receive(text)
+
+
+async def run(args):
+    diagram = synthetic(args.parts)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=30) as client:
+        circuit_id = (await client.post("/api/save", json={"query": "bench", "diagram_data": diagram, "code": "", "bom": []})).json()["id"]
+        url = f"ws://127.0.0.1:{PORT}/api/ws/circuit/{circuit_id}"
+        node_ids = [n["id"] for n in diagram["nodes"]]
+        sent_at, latencies = {}, []
+        editors = [Editor(i, node_ids[i % len(node_ids)], sent_at, latencies) for i in range(args.editors)]
+        ready = [asyncio.Event() for _ in editors]
+        go = asyncio.Event()
+        tasks = [asyncio.create_task(e.run(url, args.rate, args.seconds, r, go)) for e, r in zip(editors, ready)]
+        await asyncio.gather(*[r.wait() for r in ready])
+        go.set()
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        # The last editor out saves the document
+        saved = None
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            saved = (await client.get(f"/api/circuit/{circuit_id}")).json()["diagram_data"]
+            if all(n.get("position") for n in saved["nodes"] if n["id"] in {e.node_id for e in editors}):
+                break
+
+    positions = {n["id"]: n.get("position") for n in saved["nodes"]}
+    views = [{k[1]: v for k, v in e.view.items() if k[2] == "position" and k[1] in positions} for e in editors]
+    converged = all(view == {k: v for k, v in positions.items() if k in view} for view in views)
+
+    ops_sent = len(sent_at)
+    diagram_bytes = len(json.dumps(saved))
+    down = sum(e.bytes_in for e in editors) / len(editors) / elapsed
+    up = sum(e.bytes_out for e in editors) / len(editors) / elapsed
+    full = diagram_bytes * ops_sent * (len(editors) - 1) / len(editors) / elapsed
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+
+    print(f"{args.editors} editors on one {args.parts}-part circuit ({diagram_bytes / 1000:.1f} kB), "
+          f"{ops_sent / elapsed:.0f} writes/s for {elapsed:.1f} s")
+    print(f"bandwidth per editor: {down / 1000:.1f} kB/s down, {up / 1000:.1f} kB/s up "
+          f"(whole-diagram sync: {full / 1000:.0f} kB/s down, {full / max(down, 1):.0f}x more)")
+    print(f"merge latency, send to other editors: p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {latencies[-1] if latencies else 0:.1f} ms "
+          f"({len(latencies)} deliveries)")
+    print(f"views converged with the saved snapshot: {converged}")
+    failures = []
+    if p99 > LATENCY_BUDGET_MS:
+        failures.append(f"p99 merge latency {p99:.1f} ms over {LATENCY_BUDGET_MS} ms")
+    if not converged:
+        failures.append("editor views differ from the saved circuit")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--editors", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=10)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--parts", type=int, default=60)
+    args = parser.parse_args(sys.argv[1:])
+
+    from database import metadata
+    metadata.create_all(sqlalchemy.create_engine(os.environ["DATABASE_URL"]))
+    server = start([sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"], dict(os.environ))
+    try:
+        asyncio.run(wait_until_up(f"http://127.0.0.1:{PORT}/api/health"))
+        return asyncio.run(run(args))
+    finally:
+        stop(server)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
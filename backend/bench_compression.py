@@ -0,0 +1,89 @@
+import time
+from compression import compress, supported_encodings, DYNAMIC_LEVELS, STATIC_LEVELS
+from response_cache import CachedBody
+from responses import dumps
+from bench_serialization import component_rows, course_rows
+
+# Bytes-on-wire and CPU per request for representative responses:
+# uncompressed, compressed on the fly by CompressionMiddleware, and served from
+# a precompressed response_cache entry.
+# Usage: python bench_compression.py
+
+RUNS = 20
+
+FIRMWARE = """
+#include <Servo.h>
+#define TRIG_PIN 9
+#define ECHO_PIN 10
+#define SERVO_PIN 6
+Servo scanner;
+long readDistanceCm() {
+  digitalWrite(TRIG_PIN, LOW);
+  delayMicroseconds(2);
+  digitalWrite(TRIG_PIN, HIGH);
+  delayMicroseconds(10);
+  digitalWrite(TRIG_PIN, LOW);
+  return pulseIn(ECHO_PIN, HIGH) * 0.034 / 2;
+}
+void setup() {
+  Serial.begin(9600);
+  pinMode(TRIG_PIN, OUTPUT);
+  pinMode(ECHO_PIN, INPUT);
+  scanner.attach(SERVO_PIN);
+}
+void loop() {
+  for (int angle = 0; angle <= 180; angle += 15) {
+    scanner.write(angle);
+    delay(200);
+    Serial.print(angle);
+    Serial.print(",");
+    Serial.println(readDistanceCm());
+  }
+}
+""" * 4
+
+PAYLOADS = {
+    "components (200)": component_rows(200),
+    "ai-courses (10)": course_rows(10),
+    "generate-code": {"code": FIRMWARE, "explanation": "Sweeps the servo and reports distance."},
+    "saved circuit": {
+        "id": "a1b2c3d4",
+        "query": "obstacle avoiding robot",
+        "diagram_data": {
+            "nodes": [{"id": f"n{i}", "label": "HC-SR04", "type": "Sensor", "pins": ["VCC", "TRIG", "ECHO", "GND"]} for i in range(12)],
+            "connections": [{"id": f"c{i}", "from": "mcu", "fromPin": "5V", "to": f"n{i}", "toPin": "VCC", "color": "red"} for i in range(40)],
+        },
+        "code": FIRMWARE,
+        "bom": [{"component": "HC-SR04", "quantity": 1, "estimated_price": "$3.50"}] * 12,
+    },
+}
+
+
+def cpu_ms(fn):
+    started = time.process_time()
+    for _ in range(RUNS):
+        fn()
+    return (time.process_time() - started) / RUNS * 1000
+
+
+def main():
+    print(f"{'payload':18} {'raw':>9} | {'encoding':8} {'on the fly':>22} | {'precompressed':>22}")
+    for name, content in PAYLOADS.items():
+        body = dumps(content)
+        for encoding in supported_encodings():
+            dynamic = compress(body, encoding, DYNAMIC_LEVELS[encoding])
+            dynamic_ms = cpu_ms(lambda: compress(body, encoding, DYNAMIC_LEVELS[encoding]))
+            entry = CachedBody(body)
+            entry.encode(encoding)  # paid once, at the first read after a write
+            static_ms = cpu_ms(lambda: entry.encode(encoding))
+            static = entry.encode(encoding)
+            print(
+                f"{name:18} {len(body):8}B | {encoding:8} "
+                f"{len(dynamic):8}B {dynamic_ms:8.3f}ms/req | "
+                f"{len(static):8}B {static_ms:8.3f}ms/req"
+            )
+    print(f"(levels: on the fly {DYNAMIC_LEVELS}, precompressed {STATIC_LEVELS})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import sys
+import time
+import random
+from diagram_geometry import layout
+from diagram_export import export, render_svg, render_pdf, export_cache, content_hash
+
+# Layout and SVG/PDF export time for large diagrams.
+# Builds a synthetic diagram (one controller, many modules, N wires), times
+# layout, SVG and PDF rendering and a cached export, and fails when a
+# 1000-wire export takes longer than the budget.
+#
+# Usage: python bench_export.py [wires ...]
+
+BUDGET_MS = 100
+RUNS = 5
+COLORS = ["red", "black", "blue", "green", "yellow", "orange", "purple", "white", None]
+
+
+def synthetic(wires, seed=0):
+    rng = random.Random(seed)
+    controller = {"id": "mcu", "label": "Arduino Mega 2560", "type": "Microcontroller",
+                  "pins": ["5V", "3V3", "GND"] + [f"D{i}" for i in range(54)] + [f"A{i}" for i in range(16)]}
+    modules = [
+        {"id": f"m{i}", "label": f"Module {i}", "type": "Module", "pins": ["VCC", "GND"] + [f"IO{j}" for j in range(rng.randint(2, 6))]}
+        for i in range(max(1, wires // 4))
+    ]
+    nodes = [controller] + modules
+    connections = []
+    for i in range(wires):
+        a, b = rng.sample(nodes, 2)
+        connections.append({
+            "id": f"c{i}", "from": a["id"], "fromPin": rng.choice(a["pins"]),
+            "to": b["id"], "toPin": rng.choice(b["pins"]), "color": rng.choice(COLORS),
+        })
+    return {"nodes": nodes, "connections": connections, "explanation": ""}
+
+
+def best_ms(function, *args):
+    times = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = function(*args)
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times), result
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 100, 1000, 3000]
+    print(f"{'wires':>6} {'nodes':>6} {'layout':>8} {'svg':>8} {'pdf':>8} {'cached':>8} {'svg KB':>7} {'pdf KB':>7} {'overlaps':>9}")
+    failures = []
+    for wires in sizes:
+        diagram = synthetic(wires)
+        layout_ms, geometry = best_ms(layout, diagram)
+        svg_ms, svg = best_ms(render_svg, geometry)
+        pdf_ms, pdf = best_ms(render_pdf, geometry)
+        export_cache.entries.clear()
+        export_cache.size = 0
+        export(diagram, "svg")
+        cached_ms, _ = best_ms(export, diagram, "svg")
+        stats = geometry.stats()
+        print(
+            f"{wires:6} {stats['nodes']:6} {layout_ms:8.1f} {svg_ms:8.1f} {pdf_ms:8.1f} {cached_ms:8.2f} "
+            f"{len(svg) / 1024:7.0f} {len(pdf) / 1024:7.0f} {stats['node_overlaps']:4}/{stats['label_overlaps']:<4}"
+        )
+        worst = layout_ms + max(svg_ms, pdf_ms)
+        if wires <= 1000 and worst > BUDGET_MS:
+            failures.append(f"{wires} wires took {worst:.1f} ms, over the {BUDGET_MS} ms budget")
+    print(f"cached = hash + lookup ({len(content_hash(synthetic(1000), 'svg'))}-char sha256 key); overlaps = nodes/labels")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+import httpx
+import sqlalchemy
+
+# Read throughput of the community gallery (gallery.py) on one uvicorn worker.
+# The DB is seeded with --circuits saved circuits and no gallery rows, so
+# startup also runs the backfill. Then --connections keep-alive clients read
+# gallery pages back to back for --seconds: mostly the first trending and new
+# pages, some tag pages and some deeper pages by cursor. A liker adds --likes
+# per second, so trending keeps changing. The server's counters give the
+# pages rendered and the DB queries made during the run.
+#
+# Usage: python bench_gallery.py [--circuits 5000] [--connections 32] [--seconds 10] [--likes 20]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(HERE, 'bench-gallery.db')}")
+os.environ.setdefault("ADMIN_PASSWORD", "bench")
+
+from bench_workers import start, stop, wait_until_up
+from bench_simulation import synthetic
+
+PORT = 8400
+MIN_READS_PER_SECOND = 1000
+
+
+def seed(count):
+    from database import metadata, circuits, gallery
+
+    engine = sqlalchemy.create_engine(os.environ["DATABASE_URL"])
+    metadata.drop_all(engine, tables=[gallery])
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(circuits.delete())
+        now = datetime.utcnow()
+        rows = [
+            {"id": f"g{i:07d}", "query": f"circuit {i}", "diagram_data": synthetic(3 + i % 25, seed=i),
+             "created_at": now - timedelta(minutes=i)}
+            for i in range(count)
+        ]
+        conn.execute(circuits.insert(), rows)
+    return [r["id"] for r in rows]
+
+
+async def read(paths, deadline, latencies, errors):
+    # One keep-alive connection; a bare HTTP/1.1 client so the load generator
+    # leaves most of the CPU to the server
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    try:
+        while time.monotonic() < deadline:
+            path = random.choice(paths)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nAccept-Encoding: gzip\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors.append(head.split(b"\r\n")[0])
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        writer.close()
+
+
+async def like(client, ids, rate, deadline):
+    while time.monotonic() < deadline:
+        await client.post(f"/api/gallery/{random.choice(ids[:200])}/like")
+        await asyncio.sleep(1 / rate)
+
+
+async def run(args, ids):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=30, headers={"X-Admin-Password": os.environ["ADMIN_PASSWORD"]}) as client:
+        paths = ["/api/gallery", "/api/gallery?sort=trending", "/api/gallery?sort=new", "/api/gallery?sort=new",
+                 "/api/gallery?tag=sensor", "/api/gallery?sort=new&tag=arduino%20mega%202560"]
+        for sort in ("trending", "new"):
+            # Pages 2 to 5 by cursor
+            cursor = None
+            for _ in range(5):
+                page = (await client.get("/api/gallery", params={"sort": sort, **({"cursor": cursor} if cursor else {})})).json()
+                cursor = page["next"]
+                paths.append(f"/api/gallery?sort={sort}&cursor={cursor}")
+        before = (await client.get("/api/metrics")).json()["counters"]
+
+        latencies, errors = [], []
+        deadline = time.monotonic() + args.seconds
+        started = time.perf_counter()
+        await asyncio.gather(
+            like(client, ids, args.likes, deadline),
+            *[read(paths, deadline, latencies, errors) for _ in range(args.connections)],
+        )
+        elapsed = time.perf_counter() - started
+        after = (await client.get("/api/metrics")).json()["counters"]
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    latencies.sort()
+    throughput = len(latencies) / elapsed
+    print(f"{len(ids)} circuits, {args.connections} connections, {args.likes} likes/s for {elapsed:.1f} s on {len(os.sched_getaffinity(0))} CPU(s)")
+    print(f"{throughput:.0f} reads/s, p50 {latencies[len(latencies) // 2]:.1f} ms, p99 {latencies[int(len(latencies) * 0.99)]:.1f} ms, {len(errors)} errors")
+    print(f"pages rendered {delta('gallery.page_renders'):.0f} (reranks {delta('gallery.reranks'):.0f}), "
+          f"DB page queries {delta('gallery.db_pages'):.0f}, of {len(latencies)} reads")
+    failures = []
+    if throughput < MIN_READS_PER_SECOND:
+        failures.append(f"{throughput:.0f} reads/s is under {MIN_READS_PER_SECOND}")
+    if errors:
+        failures.append(f"errors: {errors[:3]}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--circuits", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--likes", type=float, default=20)
+    args = parser.parse_args(sys.argv[1:])
+
+    ids = seed(args.circuits)
+    server = start([sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"], dict(os.environ))
+    try:
+        started = time.perf_counter()
+        asyncio.run(wait_until_up(f"http://127.0.0.1:{PORT}/api/health", seconds=300))
+        print(f"startup with backfill: {time.perf_counter() - started:.1f} s")
+        return asyncio.run(run(args, ids))
+    finally:
+        stop(server)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
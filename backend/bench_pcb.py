@@ -0,0 +1,91 @@
+import sys
+import time
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pcb_export
+from bench_simulation import synthetic
+
+# Throughput of batch PCB exports (pcb_export.build) and what they cost the
+# event loop. A batch of synthetic circuits (Megas with LEDs, buttons,
+# sensors, servos, relays and drivers; sizes cycle through --sizes) is exported
+# serially, on a thread pool (what run_in_threadpool would do) and on process
+# pools of 1..N processes (what pcb_jobs does). While each batch runs, a ticker
+# on the event loop measures how late it wakes up: the lag a request handled
+# by the same worker would see. Fails when the process pool lets the loop lag
+# more than LAG_BUDGET_MS.
+#
+# Usage: python bench_pcb.py [--batch 40] [--sizes 20,50,100] [--format gerber] [--max-processes N]
+
+LAG_BUDGET_MS = 50
+TICK_SECONDS = 0.005
+
+
+def batch(count, sizes):
+    return [synthetic(sizes[i % len(sizes)], seed=i) for i in range(count)]
+
+
+async def ticker(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def run(executor, diagrams, fmt):
+    # (seconds for the batch, p99 loop lag ms, max loop lag ms, output bytes)
+    loop = asyncio.get_running_loop()
+    lags, stop = [], asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    started = time.perf_counter()
+    if executor is None:
+        # Serial, on the loop itself: the worst case for the ticker
+        bodies = []
+        for diagram in diagrams:
+            bodies.append(pcb_export.build(diagram, fmt))
+            await asyncio.sleep(0)
+    else:
+        bodies = await asyncio.gather(*[loop.run_in_executor(executor, pcb_export.build, d, fmt) for d in diagrams])
+    seconds = time.perf_counter() - started
+    stop.set()
+    await tick
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    return seconds, p99, (lags[-1] if lags else 0.0), sum(len(b) for b in bodies)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=40)
+    parser.add_argument("--sizes", default="20,50,100")
+    parser.add_argument("--format", default="gerber", choices=sorted(pcb_export.FORMATS))
+    parser.add_argument("--max-processes", type=int, default=max(2, multiprocessing.cpu_count()))
+    args = parser.parse_args()
+    diagrams = batch(args.batch, [int(s) for s in args.sizes.split(",")])
+
+    print(f"{args.batch} exports ({args.format}), circuit sizes {args.sizes}")
+    print(f"{'mode':>12} {'seconds':>8} {'exports/s':>10} {'lag p99':>8} {'lag max':>8} {'MB':>6}")
+    failures = []
+    context = multiprocessing.get_context("spawn")
+    modes = [("serial", None), ("threads", ThreadPoolExecutor(max_workers=args.max_processes))]
+    modes += [(f"processes {n}", ProcessPoolExecutor(max_workers=n, mp_context=context)) for n in range(1, args.max_processes + 1)]
+    for name, executor in modes:
+        if isinstance(executor, ProcessPoolExecutor):
+            # Start the processes before timing, as a running server would have
+            await asyncio.gather(*[asyncio.get_running_loop().run_in_executor(executor, pcb_export.build, {}, "kicad")
+                                   for _ in range(executor._max_workers)])
+        seconds, p99, worst, size = await run(executor, diagrams, args.format)
+        print(f"{name:>12} {seconds:8.2f} {args.batch / seconds:10.1f} {p99:8.1f} {worst:8.1f} {size / 1e6:6.2f}")
+        if isinstance(executor, ProcessPoolExecutor) and p99 > LAG_BUDGET_MS:
+            failures.append(f"{name}: event loop lagged {p99:.1f} ms (p99), over {LAG_BUDGET_MS} ms")
+        if executor is not None:
+            executor.shutdown()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
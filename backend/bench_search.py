@@ -0,0 +1,78 @@
+import sys
+import time
+import asyncio
+import statistics
+import sqlalchemy
+from database import database, metadata, upgrade_schema, DATABASE_URL
+from search_index import search
+
+# Seeds synthetic circuits and times /api/search queries against them.
+# Usage: python bench_search.py [rows=1000000] [--keep]
+# Seeded rows use the "bench-" id prefix and are removed afterwards unless --keep.
+
+WORDS = [
+    "arduino", "esp32", "raspberry", "ultrasonic", "servo", "stepper", "motor", "led",
+    "buzzer", "dht11", "temperature", "humidity", "line", "follower", "robot", "car",
+    "obstacle", "avoiding", "bluetooth", "wifi", "relay", "lcd", "oled", "keypad",
+    "joystick", "rgb", "strip", "soil", "moisture", "plant", "watering", "alarm",
+]
+TERMS = ["ultrasonic robot", "servo arm", "temperature lcd", "ardiuno", "line folower", "rgb led strip"]
+SEED_BATCH = 100_000
+RUNS = 20
+
+
+async def seed(rows):
+    for start in range(0, rows, SEED_BATCH):
+        count = min(SEED_BATCH, rows - start)
+        await database.execute(
+            query="""
+                INSERT INTO circuits (id, query, diagram_data, created_at)
+                SELECT 'bench-' || g,
+                       'Build a ' || w[1 + floor(random() * array_length(w, 1))::int]
+                       || ' ' || w[1 + floor(random() * array_length(w, 1))::int]
+                       || ' with ' || w[1 + floor(random() * array_length(w, 1))::int]
+                       || ' and ' || w[1 + floor(random() * array_length(w, 1))::int],
+                       '{}', now() - g * interval '1 second'
+                FROM generate_series(:start, :stop) g, (SELECT CAST(:words AS text[]) AS w) words
+                ON CONFLICT (id) DO NOTHING
+            """,
+            values={"start": start + 1, "stop": start + count, "words": WORDS},
+        )
+        print(f"Seeded {start + count}/{rows}")
+    await database.execute("ANALYZE circuits")
+
+
+async def bench():
+    for term in TERMS:
+        timings = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            results = await search(term, ("circuits",), limit=20)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{term!r:24} hits={len(results):3} p50={statistics.median(timings):7.2f}ms p95={p95:7.2f}ms")
+
+
+async def main():
+    rows = int(next((a for a in sys.argv[1:] if a.isdigit()), 1_000_000))
+    keep = "--keep" in sys.argv
+
+    engine = sqlalchemy.create_engine(DATABASE_URL)
+    metadata.create_all(engine)
+    upgrade_schema(engine)
+
+    await database.connect()
+    try:
+        started = time.perf_counter()
+        await seed(rows)
+        print(f"Seeding took {time.perf_counter() - started:.1f}s")
+        await bench()
+    finally:
+        if not keep:
+            await database.execute("DELETE FROM circuits WHERE id LIKE 'bench-%'")
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+import gc
+import json
+import time
+import asyncio
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from responses import ORJSONResponse, _encode_rows
+from schemas import ComponentResponse, AICourseResponse
+
+# Microbenchmark for the catalog list endpoints.
+# Compares FastAPI's default path (response_model validation + jsonable_encoder
+# + stdlib json) with the orjson fast path and the streamed encoder.
+# Usage: python bench_serialization.py
+
+SIZES = (1_000, 10_000)
+RUNS = 5
+
+MARKDOWN = "# 🤖 What is it?\n\nA fun **sensor** that measures distance.\n\n" + "- Feature line\n" * 40
+HTML = "<h1 id=\"what-is-it\">🤖 What is it?</h1>\n<p>A fun <strong>sensor</strong></p>\n" + "<li>Feature line</li>\n" * 40
+
+
+def component_rows(n):
+    return [
+        {
+            "id": i,
+            "name": f"Component {i}",
+            "description": MARKDOWN,
+            "category": "Sensor",
+            "wiring_guide": "VCC -> 5V\nGND -> GND\nTRIG -> D9\nECHO -> D10",
+            "image_url": [f"https://example.com/{i}.jpg"],
+            "created_at": datetime(2024, 1, 1),
+            "description_html": HTML,
+            "description_toc": [{"level": 1, "id": "what-is-it", "title": "What is it?"}],
+            "wiring_guide_html": "<p>VCC -&gt; 5V</p>",
+            "content_hash": "0" * 64,
+        }
+        for i in range(n)
+    ]
+
+
+def course_rows(n):
+    return [
+        {
+            "id": i,
+            "title": f"Week {i}",
+            "description": "Module summary",
+            "week": i,
+            "content": MARKDOWN,
+            "image_url": None,
+            "course_type": "python_master",
+            "created_at": datetime(2024, 1, 1),
+            "content_html": HTML,
+            "content_toc": [],
+            "content_hash": "0" * 64,
+        }
+        for i in range(n)
+    ]
+
+
+def default_path(model, rows):
+    validated = TypeAdapter(list[model]).validate_python(rows)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def orjson_path(rows):
+    return ORJSONResponse(rows).body
+
+
+_loop = asyncio.new_event_loop()
+
+
+def streamed_path(rows):
+    async def collect():
+        return b"".join([chunk async for chunk in _encode_rows(rows)])
+
+    return _loop.run_until_complete(collect())
+
+
+def best_of(fn):
+    # Like timeit: GC is paused so collector runs over the fixture rows don't skew results
+    timings = []
+    gc.disable()
+    try:
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            body = fn()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return min(timings) * 1000, len(body)
+
+
+def main():
+    for label, model, factory in (
+        ("components", ComponentResponse, component_rows),
+        ("ai-courses", AICourseResponse, course_rows),
+    ):
+        for size in SIZES:
+            rows = factory(size)
+            default_ms, size_bytes = best_of(lambda: default_path(model, rows))
+            orjson_ms, _ = best_of(lambda: orjson_path(rows))
+            streamed_ms, _ = best_of(lambda: streamed_path(rows))
+            print(
+                f"{label:10} {size:6} rows {size_bytes / 1e6:6.1f} MB | "
+                f"default {default_ms:8.1f} ms | orjson {orjson_ms:7.1f} ms "
+                f"({default_ms / orjson_ms:4.1f}x) | streamed {streamed_ms:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import sys
+import json
+import time
+import random
+from simulation import Circuit, changes
+
+# Frame rate of the DC simulation on large circuits.
+# Builds a synthetic circuit of N components (Arduino Megas on a 9V battery,
+# each driving LEDs behind resistors, buttons, sensors, servos, relays and
+# L298N drivers with two motors), then solves one frame per change of the
+# inputs, the way the simulation socket does while a user clicks pins: one
+# pin per frame ("click") and every input at once ("all", the worst case).
+# Fails when the 95th percentile frame of a 500-component circuit is slower
+# than an interactive frame (60 fps).
+#
+# Usage: python bench_simulation.py [components ...]
+
+FRAME_BUDGET_MS = 1000 / 60
+FRAMES = 200
+MEGA_PINS = [f"D{i}" for i in range(2, 54)]
+
+
+def synthetic(components, seed=0):
+    rng = random.Random(seed)
+    nodes = [{"id": "bat", "type": "Power", "label": "9V Battery", "pins": ["+", "-"]}]
+    connections = []
+
+    def wire(a, a_pin, b, b_pin):
+        connections.append({"id": f"c{len(connections)}", "from": a, "fromPin": a_pin, "to": b, "toPin": b_pin})
+
+    board, free = None, []
+    while len(nodes) < components:
+        if len(free) < 6:
+            board = f"mega{len(nodes)}"
+            nodes.append({"id": board, "type": "Microcontroller", "label": "Arduino Mega 2560", "pins": ["5V", "3V3", "GND"] + MEGA_PINS})
+            free = list(MEGA_PINS)
+        i = len(nodes)
+        kind = rng.choice(["led", "led", "button", "sensor", "servo", "relay", "driver"])
+        if kind == "led":
+            nodes.append({"id": f"r{i}", "type": "Module", "label": "220Ω Resistor", "pins": ["1", "2"]})
+            nodes.append({"id": f"l{i}", "type": "Module", "label": rng.choice(["Red LED", "Green LED", "Blue LED"]), "pins": ["+", "-"]})
+            wire(board, free.pop(), f"r{i}", "1")
+            wire(f"r{i}", "2", f"l{i}", "+")
+            wire(f"l{i}", "-", board, "GND")
+        elif kind == "button":
+            nodes.append({"id": f"b{i}", "type": "Module", "label": "Push Button", "pins": ["SIG", "GND"]})
+            wire(board, free.pop(), f"b{i}", "SIG")
+        elif kind == "sensor":
+            nodes.append({"id": f"s{i}", "type": "Module", "label": "PIR Motion Sensor", "pins": ["VCC", "OUT", "GND"]})
+            wire(board, "5V", f"s{i}", "VCC")
+            wire(board, free.pop(), f"s{i}", "OUT")
+        elif kind == "servo":
+            nodes.append({"id": f"v{i}", "type": "Module", "label": "SG90 Servo", "pins": ["SIG", "VCC", "GND"]})
+            wire(board, "5V", f"v{i}", "VCC")
+            wire(board, free.pop(), f"v{i}", "SIG")
+        elif kind == "relay":
+            nodes.append({"id": f"k{i}", "type": "Module", "label": "5V Relay Module", "pins": ["IN", "VCC", "GND", "COM", "NO", "NC"]})
+            nodes.append({"id": f"kl{i}", "type": "Module", "label": "Yellow LED", "pins": ["+", "-"]})
+            wire(board, "5V", f"k{i}", "VCC")
+            wire(board, free.pop(), f"k{i}", "IN")
+            wire("bat", "+", f"k{i}", "COM")
+            wire(f"k{i}", "NO", f"kl{i}", "+")
+        else:
+            nodes.append({"id": f"d{i}", "type": "Module", "label": "L298N Motor Driver",
+                          "pins": ["IN1", "IN2", "IN3", "IN4", "ENA", "ENB", "OUT1", "OUT2", "OUT3", "OUT4", "12V", "GND"]})
+            wire("bat", "+", f"d{i}", "12V")
+            for n in "1234":
+                wire(board, free.pop(), f"d{i}", f"IN{n}")
+            for motor, (a, b) in (("a", ("OUT1", "OUT2")), ("b", ("OUT3", "OUT4"))):
+                nodes.append({"id": f"m{motor}{i}", "type": "Module", "label": "DC Motor", "pins": ["+", "-"]})
+                wire(f"d{i}", a, f"m{motor}{i}", "+")
+                wire(f"d{i}", b, f"m{motor}{i}", "-")
+    return {"nodes": nodes[:components], "connections": connections}
+
+
+def random_inputs(circuit, rng):
+    pins = {}
+    for node_id, pin, net, volts in circuit.gpio:
+        pins.setdefault(node_id, {})[pin] = rng.choice([0, 1, 1, "pullup"])
+    switches = {node_id: rng.random() < 0.5 for node_id, _, _ in circuit.buttons}
+    sensors = {node_id: rng.random() < 0.5 for node_id, _, _ in circuit.sensors}
+    return {"pins": pins, "switches": switches, "sensors": sensors}
+
+
+def toggle_one(circuit, inputs, rng):
+    # A click: one controller pin flips
+    node_id, pin, _, _ = rng.choice(circuit.gpio)
+    inputs["pins"][node_id][pin] = 0 if inputs["pins"][node_id][pin] == 1 else 1
+    return inputs
+
+
+def run_frames(circuit, next_inputs, rng):
+    frames, iterations, diff_bytes, previous = [], 0, 0, None
+    inputs = random_inputs(circuit, rng)
+    for _ in range(FRAMES):
+        inputs = next_inputs(circuit, inputs, rng)
+        started = time.perf_counter()
+        state = circuit.solve(inputs)
+        frames.append((time.perf_counter() - started) * 1000)
+        iterations += state["iterations"]
+        diff_bytes += len(json.dumps(changes(previous, state)))
+        previous = state
+    frames.sort()
+    return frames[len(frames) // 2], frames[int(len(frames) * 0.95)], iterations / FRAMES, diff_bytes / FRAMES / 1024
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [50, 500, 2000]
+    rng = random.Random(1)
+    print(f"{'parts':>6} {'nets':>6} {'compile':>8} {'change':>7} {'p50 ms':>7} {'p95 ms':>7} {'fps':>6} {'iters':>6} {'diff KB':>8}")
+    failures = []
+    for components in sizes:
+        diagram = synthetic(components)
+        started = time.perf_counter()
+        circuit = Circuit(diagram)
+        compile_ms = (time.perf_counter() - started) * 1000
+        for change, next_inputs in (("click", toggle_one), ("all", lambda c, _, r: random_inputs(c, r))):
+            p50, p95, iterations, diff_kb = run_frames(circuit, next_inputs, rng)
+            print(f"{components:6} {circuit.size + 1:6} {compile_ms:8.1f} {change:>7} {p50:7.2f} {p95:7.2f} {1000 / p50:6.0f} "
+                  f"{iterations:6.1f} {diff_kb:8.1f}")
+            if components == 500 and p95 > FRAME_BUDGET_MS:
+                failures.append(f"500 components, {change}: p95 frame {p95:.1f} ms over {FRAME_BUDGET_MS:.1f} ms")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
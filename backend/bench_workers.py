@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import httpx
+import sqlalchemy
+
+# Throughput of the production server profile (gunicorn.conf.py) from 1 to N
+# workers against the fake LLM (fake_llm.py).
+# Each simulated user runs the generator flow back to back: POST /api/generate,
+# then /api/generate-code and /api/generate-bom with the generation id. The
+# LLM answers after a fixed delay, so the curve shows how much backend CPU per
+# flow (validation, netlist checks, composition, JSON, compression) a worker
+# count can absorb. Load is generated on the same machine, so leave it a core.
+#
+# Usage: python bench_workers.py [--max-workers N] [--users 64] [--seconds 15]
+# DATABASE_URL defaults to a throwaway SQLite file; point it at Postgres to
+# include the shared LLM budget and pubsub in the measurement.
+
+BACKEND_PORT = 8200
+FAKE_LLM_PORT = 8100
+HERE = os.path.dirname(os.path.abspath(__file__))
+QUERY = "obstacle avoiding robot with HC-SR04, L298N and a scanning servo"
+
+
+def start(args, env):
+    return subprocess.Popen(args, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def wait_until_up(url, seconds=60):
+    deadline = time.monotonic() + seconds
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"{url} did not come up")
+
+
+async def flow(client):
+    response = await client.post("/api/generate", json={"query": QUERY})
+    response.raise_for_status()
+    diagram = response.json()
+    follow_up = {
+        "query": QUERY,
+        "generation_id": diagram["generation_id"],
+        "nodes": diagram["nodes"],
+        "connections": diagram["connections"],
+    }
+    for path in ("/api/generate-code", "/api/generate-bom"):
+        (await client.post(path, json=follow_up)).raise_for_status()
+
+
+async def load(users, seconds):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+
+    async def user(client):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                await flow(client)
+                latencies.append((time.perf_counter() - started) * 1000)
+            except httpx.HTTPError:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{BACKEND_PORT}", limits=limits, timeout=60) as client:
+        await flow(client)  # warm up: price catalog, first connections
+        await asyncio.gather(*[user(client) for _ in range(users)])
+    latencies.sort()
+    return latencies, errors
+
+
+def run(args):
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{FAKE_LLM_PORT}/v1",
+        "PORT": str(BACKEND_PORT),
+    }
+    # Create the tables once, so workers booting together don't race on SQLite
+    from database import metadata
+    metadata.create_all(sqlalchemy.create_engine(env["DATABASE_URL"]))
+
+    fake_llm = start([sys.executable, "fake_llm.py", "--port", str(FAKE_LLM_PORT), "--latency-ms", str(args.latency_ms)], env)
+    asyncio.run(wait_until_up(f"http://127.0.0.1:{FAKE_LLM_PORT}/docs"))
+    print(f"{args.users} users, {args.seconds:.0f} s per run, LLM latency {args.latency_ms:.0f} ms, "
+          f"{len(os.sched_getaffinity(0))} CPUs")
+    print(f"{'workers':>7} {'flows/s':>8} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    baseline = None
+    try:
+        for workers in range(1, args.max_workers + 1):
+            server = start([sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py",
+                            "--workers", str(workers), "--access-logfile", "/dev/null"], env)
+            try:
+                asyncio.run(wait_until_up(f"http://127.0.0.1:{BACKEND_PORT}/api/health"))
+                latencies, errors = asyncio.run(load(args.users, args.seconds))
+            finally:
+                stop(server)
+            throughput = len(latencies) / args.seconds
+            baseline = baseline or throughput
+            p50 = latencies[len(latencies) // 2] if latencies else 0
+            p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+            print(f"{workers:7} {throughput:8.1f} {throughput / baseline:7.2f}x {p50:8.0f} {p95:8.0f} {errors:7}")
+    finally:
+        stop(fake_llm)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-workers", type=int, default=max(2, len(os.sched_getaffinity(0))))
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    args = parser.parse_args(sys.argv[1:])
+
+    if os.getenv("DATABASE_URL"):
+        run(args)
+        return
+    # Throwaway SQLite file, removed with its directory after the run
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench-workers.db"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
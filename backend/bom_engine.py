@@ -0,0 +1,271 @@
+import re
+import time
+from collections import Counter
+from decimal import Decimal
+import pubsub
+import metrics
+from database import database, parts_prices
+from netlist import part_key
+from prompts import get_prompt
+from model_router import complete_json
+
+# Deterministic BOM pricing.
+# Quantities come from the diagram nodes, and parts found in the parts_prices
+# catalog (by name or alias) are priced with Decimal arithmetic, so the same
+# diagram always yields the same BOM and total. Only parts missing from the
+# catalog go to the LLM; their estimates are remembered for the life of the
+# worker so they stay stable too. With a user's inventory (inventory.py),
+# parts they own are priced at $0 and the rest get owned substitutes suggested.
+#
+# Catalog import:  python bulk_io.py import prices prices.csv
+#   name,aliases,unit_price,source
+#   HC-SR04,HC-SR04 Ultrasonic Sensor|SR04,3.50,Adafruit
+
+CHANNEL = "parts_prices"
+CENTS = Decimal("0.01")
+OWNED = {"unit_price": Decimal(0), "source": "Owned"}
+MAX_ESTIMATES = 5000
+
+
+def parse_price(value):
+    # Decimal from 3.5, "$3.50" or "$3-5" (first figure); None when there is no figure
+    if isinstance(value, (int, Decimal)):
+        return Decimal(value)
+    if isinstance(value, float):
+        return Decimal(str(value))
+    match = re.search(r"\d+(?:,\d{3})*(?:\.\d+)?", str(value or ""))
+    if not match:
+        return None
+    return Decimal(match.group().replace(",", ""))
+
+
+def money(amount):
+    return f"${amount.quantize(CENTS)}"
+
+
+class PriceCatalog:
+    def __init__(self):
+        self.parts = None  # part_key -> {"name", "unit_price", "source"}
+        self.estimates = {}
+
+    async def load(self):
+        parts = {}
+        for r in await database.fetch_all(parts_prices.select().order_by(parts_prices.c.name)):
+            entry = {"name": r["name"], "unit_price": Decimal(r["unit_price"]), "source": r["source"] or "Catalog"}
+            for label in [r["name"], *(r["aliases"] or [])]:
+                parts.setdefault(part_key(label), entry)
+        self.parts = parts
+
+    async def ensure_loaded(self):
+        if self.parts is None:
+            await self.load()
+
+    def lookup(self, label):
+        # Catalog name or alias, then an earlier estimate for the same label.
+        # Only exact names: a label that merely contains a catalog name
+        # ("Arduino Mega 2560", "Raspberry Pi Pico") is a different part and
+        # goes to the LLM instead.
+        key = part_key(label)
+        if key in self.parts:
+            return self.parts[key]
+        return self.estimates.get(key)
+
+    def remember(self, label, unit_price):
+        if len(self.estimates) >= MAX_ESTIMATES:
+            self.estimates.clear()
+        self.estimates[part_key(label)] = {"name": label, "unit_price": unit_price, "source": "Estimated"}
+
+    def drop(self):
+        self.parts = None
+
+    async def invalidate(self):
+        # After a catalog import: reload here and in every other worker
+        self.drop()
+        await pubsub.publish(CHANNEL, {})
+
+    def on_notify(self, data):
+        self.drop()
+
+
+price_catalog = PriceCatalog()
+pubsub.subscribe(CHANNEL, price_catalog.on_notify)
+
+
+def quantities(nodes):
+    # Nodes with the same label are the same part: two "DC Motor" nodes -> 2
+    counts = Counter()
+    labels = {}
+    for node in nodes or []:
+        label = str(node.get("label") or node.get("id") or "").strip()
+        if label:
+            counts[part_key(label)] += 1
+            labels.setdefault(part_key(label), label)
+    return [(labels[key], count) for key, count in counts.items()]
+
+
+def _item(entry, quantity):
+    return {
+        "component": entry["name"],
+        "quantity": quantity,
+        "estimated_price": money(entry["unit_price"]),
+        "unit_price": str(entry["unit_price"].quantize(CENTS)),
+        "line_total": str((entry["unit_price"] * quantity).quantize(CENTS)),
+        "source": entry["source"],
+    }
+
+
+def bom_total(items):
+    # (total, number of items without a usable price)
+    total = Decimal(0)
+    missing = 0
+    for item in items:
+        price = parse_price(item.get("unit_price") or item.get("estimated_price"))
+        quantity = parse_price(item.get("quantity") or 1)
+        if price is None or quantity is None:
+            missing += 1
+            continue
+        total += price * quantity
+    return total.quantize(CENTS), missing
+
+
+async def estimate(query, unknown):
+    # One LLM call for every part missing from the catalog; returns {label: unit price or None}
+    parts = "; ".join(f"{quantity} x {label}" for label, quantity in unknown)
+    messages = get_prompt("bom").messages(
+        query=f"{query}\nOnly price these parts, keeping their names exactly: {parts}"
+    )
+    prices = {label: None for label, _ in unknown}
+    try:
+        data = await complete_json("bom", messages)
+    except Exception as e:
+        print(f"BOM estimate failed: {e}")
+        return prices
+    items = data.get("items") or []
+    by_key = {part_key(item.get("component", "")): item for item in items}
+    for index, (label, _) in enumerate(unknown):
+        item = by_key.get(part_key(label))
+        if item is None and len(items) == len(unknown):
+            item = items[index]  # renamed, but the order still lines up
+        if item is not None:
+            prices[label] = parse_price(item.get("estimated_price"))
+    return prices
+
+
+def take_owned(owned, label, quantity, used, owned_lines):
+    # Moves the owned units of a part onto a $0 line; returns how many are still to buy
+    part = owned.lookup(label, price_catalog.parts)
+    if part is None:
+        return quantity
+    taken = min(quantity, part["quantity"] - used[part["name"]])
+    if taken <= 0:
+        return quantity
+    used[part["name"]] += taken
+    name = part["name"]
+    total = taken + (owned_lines[name]["quantity"] if name in owned_lines else 0)
+    owned_lines[name] = _item({**OWNED, "name": name}, total)
+    return quantity - taken
+
+
+def substitutions(owned, missing, used):
+    # Owned parts of the same category, or near matches by name, for parts
+    # still to buy, from the stock the diagram's own parts left over
+    spare = lambda part: part["quantity"] - used[part["name"]]
+    suggested = []
+    for label, quantity in missing:
+        other = owned.substitute(label, spare)
+        if other is not None and other is not owned.lookup(label, price_catalog.parts):
+            available = min(quantity, spare(other))
+            used[other["name"]] += available
+            suggested.append({"component": label, "owned": other["name"], "category": other["category"], "quantity": available})
+    return suggested
+
+
+async def build_bom(query, nodes, owned=None):
+    started = time.perf_counter()
+    await price_catalog.ensure_loaded()
+    lines = {}
+    unknown = []
+    owned_lines = {}
+    used = Counter()
+    missing = []
+    for label, quantity in quantities(nodes):
+        if owned:
+            quantity = take_owned(owned, label, quantity, used, owned_lines)
+            if not quantity:
+                metrics.incr("bom.owned_hits")
+                continue
+            missing.append((label, quantity))
+        entry = price_catalog.lookup(label)
+        if entry is None:
+            unknown.append((label, quantity))
+        elif entry["name"] in lines:
+            # Two labels for one catalog part
+            lines[entry["name"]] = _item(entry, lines[entry["name"]]["quantity"] + quantity)
+        else:
+            lines[entry["name"]] = _item(entry, quantity)
+    metrics.incr("bom.catalog_hits", len(lines))
+
+    unpriced = []
+    if unknown:
+        metrics.incr("bom.llm_lookups", len(unknown))
+        for (label, quantity), price in zip(unknown, (await estimate(query, unknown)).values()):
+            if price is None:
+                unpriced.append(label)
+                lines[label] = {"component": label, "quantity": quantity, "estimated_price": "Unknown", "source": "Unpriced"}
+            else:
+                price_catalog.remember(label, price)
+                lines[label] = _item(price_catalog.lookup(label), quantity)
+
+    swaps = substitutions(owned, missing, used) if missing else []
+    items = list(owned_lines.values()) + list(lines.values())
+    total, _ = bom_total(items)
+    notes = "Catalog prices; parts marked Estimated are approximate."
+    if owned_lines:
+        notes += " Parts you own are priced at $0."
+    if swaps:
+        notes += " You could use parts you own instead: " + ", ".join(f"{s['owned']} for {s['component']}" for s in swaps) + "."
+    if unpriced:
+        notes += f" No price found for: {', '.join(unpriced)}."
+    metrics.observe("bom.latency_ms", (time.perf_counter() - started) * 1000)
+    return {
+        "items": items, "total_estimated_cost": money(total), "total_cost": str(total), "notes": notes,
+        "substitutions": swaps,
+    }
+
+
+def _quantity(item):
+    quantity = parse_price(item.get("quantity", 1))
+    return int(quantity) if quantity is not None else 1
+
+
+def _set_quantity(item, quantity):
+    item["quantity"] = quantity
+    price = parse_price(item.get("unit_price"))
+    if price is not None:
+        item["line_total"] = str((price * quantity).quantize(CENTS))
+
+
+def merge(items, removed, added):
+    # Takes one unit off the row of each removed part and adds the newly priced
+    # ones. Rows are matched on the exact part name (or the catalog part the
+    # label is an alias of) and dropped only when nothing is left.
+    rows = [dict(item) for item in items]
+
+    def row_for(*labels):
+        keys = {part_key(label) for label in labels if label}
+        return next((row for row in rows if part_key(row.get("component", "")) in keys), None)
+
+    for label in removed:
+        entry = price_catalog.lookup(label)
+        row = row_for(label, entry and entry["name"])
+        if row is not None:
+            _set_quantity(row, _quantity(row) - 1)
+    rows = [row for row in rows if _quantity(row) > 0]
+    for item in added:
+        row = row_for(item.get("component"))
+        if row is not None and row.get("unit_price") == item.get("unit_price"):
+            _set_quantity(row, _quantity(row) + _quantity(item))
+        else:
+            rows.append(dict(item))
+    total, _ = bom_total(rows)
+    return rows, money(total)
\ No newline at end of file
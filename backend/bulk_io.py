@@ -0,0 +1,373 @@
+import io
+import csv
+import sys
+import json
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from database import database, components, ai_courses, parts_prices, SCHEMA_UPGRADES
+from markdown_render import render_component, render_course
+from response_cache import response_cache
+from bom_engine import price_catalog, parse_price
+from electrical_profiles import electrical_profiles
+from inventory import user_inventory
+
+# Bulk import/export for catalog tables.
+# Records stream in from NDJSON, CSV or YAML, are upserted on their natural key
+# in multi-row INSERT ... ON CONFLICT batches, and stream back out in the same
+# formats. A dry run reports what an import would change without writing.
+#
+# CLI:
+#   python bulk_io.py import components parts.ndjson [--dry-run]
+#   python bulk_io.py export courses courses.csv
+#   python bulk_io.py import prices prices.csv
+#   python bulk_io.py dedupe courses [--apply]
+
+BATCH_SIZE = 1000
+FORMATS = ("ndjson", "csv", "yaml")
+MAX_REPORTED_CHANGES = 100
+
+
+async def components_changed():
+    # Power profiles and inventory categories both come from the components
+    await electrical_profiles.invalidate()
+    await user_inventory.invalidate()
+
+
+KINDS = {
+    "components": {
+        "table": components,
+        "key": ("name",),
+        "fields": ("name", "description", "category", "wiring_guide", "image_url",
+                   "supply_voltage", "typical_ma", "max_ma", "rail_limits"),
+        "required": ("name", "description", "category"),
+        "render": lambda row: render_component(row["description"], row["wiring_guide"]),
+        "cache_prefix": "components",
+        "on_change": components_changed,
+    },
+    "courses": {
+        "table": ai_courses,
+        "key": ("course_type", "week"),
+        "fields": ("course_type", "week", "title", "description", "content", "image_url"),
+        "required": ("week", "title"),
+        "render": lambda row: render_course(row["content"]),
+        "cache_prefix": "ai_courses",
+    },
+    "prices": {
+        "table": parts_prices,
+        "key": ("name",),
+        "fields": ("name", "aliases", "unit_price", "source"),
+        "required": ("name", "unit_price"),
+        "render": lambda row: {},
+        # Not served from the response cache; the BOM engine keeps its own copy
+        "cache_prefix": None,
+        "on_change": price_catalog.invalidate,
+    },
+}
+
+# components.name is already unique; course modules need one for the upsert key.
+# Databases seeded by the old insert-only scripts can hold the same week twice
+# (often two different courses under the default course_type), so startup only
+# builds the index once the data is clean and never deletes anything; see
+# `python bulk_io.py dedupe courses`.
+COURSE_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS ai_courses_course_type_week_key ON ai_courses (course_type, week)"
+SCHEMA_UPGRADES.append(f"""
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'ai_courses_course_type_week_key') THEN
+        IF EXISTS (SELECT 1 FROM ai_courses GROUP BY course_type, week HAVING count(*) > 1) THEN
+            RAISE WARNING 'ai_courses repeats weeks; run python bulk_io.py dedupe courses';
+        ELSE
+            {COURSE_INDEX};
+        END IF;
+    END IF;
+END $$
+""")
+
+
+def format_for(filename, default="ndjson"):
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    return {"jsonl": "ndjson", "ndjson": "ndjson", "csv": "csv", "yaml": "yaml", "yml": "yaml"}.get(extension, default)
+
+
+def _load_yaml():
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("YAML support requires PyYAML (pip install pyyaml)")
+    return yaml
+
+
+# --- READING ---
+
+def read_records(stream, fmt):
+    # stream is a text stream; records are yielded one at a time
+    if fmt == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    elif fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "yaml":
+        yaml = _load_yaml()
+        for document in yaml.safe_load_all(stream):
+            if isinstance(document, list):
+                yield from document
+            elif document:
+                yield document
+    else:
+        raise ValueError(f"Unsupported format '{fmt}'")
+
+
+def normalize(kind, record):
+    spec = KINDS[kind]
+    row = {}
+    for field in spec["fields"]:
+        value = record.get(field)
+        if value == "" and field not in spec["required"]:
+            value = None
+        row[field] = value
+    if kind == "courses":
+        row["course_type"] = row["course_type"] or "python_master"
+        row["week"] = int(row["week"]) if row["week"] not in (None, "") else None
+    if kind == "components":
+        for field in ("supply_voltage", "typical_ma", "max_ma"):
+            if row[field] is not None:
+                try:
+                    row[field] = float(row[field])
+                except ValueError:
+                    raise ValueError(f"{field} is not a number")
+    if kind == "prices":
+        # CSV cells list aliases as "HC-SR04P|SR04" (or JSON, like image_url)
+        aliases = row["aliases"]
+        if isinstance(aliases, str) and not aliases.startswith("["):
+            row["aliases"] = [a.strip() for a in aliases.split("|") if a.strip()]
+        if row["unit_price"] not in (None, ""):
+            row["unit_price"] = parse_price(row["unit_price"])
+            if row["unit_price"] is None:
+                raise ValueError("unit_price is not a number")
+    for field in ("image_url", "aliases", "rail_limits"):
+        value = row.get(field)
+        if isinstance(value, str) and value.startswith(("[", "{")):
+            # CSV cells carry lists and objects as JSON
+            row[field] = json.loads(value)
+    missing = [f for f in spec["required"] if row.get(f) in (None, "")]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    return row
+
+
+def _key(kind, row):
+    return tuple(row[k] for k in KINDS[kind]["key"])
+
+
+# --- WRITING ---
+
+def _upsert_statement(kind, batch):
+    spec = KINDS[kind]
+    table = spec["table"]
+    now = datetime.utcnow()
+    stmt = pg_insert(table).values([{**row, **spec["render"](row), "created_at": now} for row in batch])
+    updated = [f for f in spec["fields"] if f not in spec["key"]]
+    # Unchanged rows are skipped entirely (no dead tuples, not counted as updates).
+    # JSON has no equality operator, so compare its text form.
+    changed = [
+        sqlalchemy.cast(table.c[f], sqlalchemy.Text).is_distinct_from(sqlalchemy.cast(stmt.excluded[f], sqlalchemy.Text))
+        for f in updated
+    ]
+    if "content_hash" in table.c:
+        changed.append(table.c.content_hash.is_distinct_from(stmt.excluded.content_hash))
+    rendered = list(spec["render"](batch[0]))
+    return stmt.on_conflict_do_update(
+        index_elements=list(spec["key"]),
+        set_={f: stmt.excluded[f] for f in updated + rendered},
+        where=sqlalchemy.or_(*changed),
+    ).returning(sqlalchemy.literal_column("(xmax = 0)").label("inserted"))
+
+
+async def _existing_rows(kind, batch):
+    spec = KINDS[kind]
+    table = spec["table"]
+    if len(spec["key"]) == 1:
+        condition = table.c[spec["key"][0]].in_([row[spec["key"][0]] for row in batch])
+    else:
+        condition = sqlalchemy.tuple_(*[table.c[k] for k in spec["key"]]).in_([_key(kind, row) for row in batch])
+    rows = await database.fetch_all(table.select().where(condition))
+    return {tuple(r[k] for k in spec["key"]): r for r in rows}
+
+
+async def _diff_batch(kind, batch, summary):
+    existing = await _existing_rows(kind, batch)
+    for row in batch:
+        current = existing.get(_key(kind, row))
+        if current is None:
+            summary["inserted"] += 1
+            change = {"action": "insert", "key": list(_key(kind, row))}
+        else:
+            fields = [f for f in KINDS[kind]["fields"] if current[f] != row[f]]
+            if not fields:
+                summary["unchanged"] += 1
+                continue
+            summary["updated"] += 1
+            change = {"action": "update", "key": list(_key(kind, row)), "fields": fields}
+        if len(summary["changes"]) < MAX_REPORTED_CHANGES:
+            summary["changes"].append(change)
+
+
+async def _write_batch(kind, batch, summary):
+    results = await database.fetch_all(_upsert_statement(kind, batch))
+    inserted = sum(1 for r in results if r["inserted"])
+    summary["inserted"] += inserted
+    summary["updated"] += len(results) - inserted
+    summary["unchanged"] += len(batch) - len(results)
+
+
+async def import_records(kind, records, dry_run=False):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind '{kind}'")
+    summary = {"kind": kind, "dry_run": dry_run, "inserted": 0, "updated": 0, "unchanged": 0, "errors": []}
+    if dry_run:
+        summary["changes"] = []
+    handle = _diff_batch if dry_run else _write_batch
+
+    # Keyed by natural key so a repeated key inside one batch keeps the last
+    # record (Postgres rejects an upsert that touches the same row twice).
+    batch = {}
+    for line_number, record in enumerate(records, 1):
+        try:
+            row = normalize(kind, record)
+        except (ValueError, TypeError, AttributeError) as e:
+            summary["errors"].append({"record": line_number, "error": str(e)})
+            continue
+        batch[_key(kind, row)] = row
+        if len(batch) >= BATCH_SIZE:
+            await handle(kind, list(batch.values()), summary)
+            batch = {}
+    if batch:
+        await handle(kind, list(batch.values()), summary)
+    if not dry_run and (summary["inserted"] or summary["updated"]):
+        spec = KINDS[kind]
+        if spec["cache_prefix"]:
+            await response_cache.invalidate(spec["cache_prefix"])
+        if spec.get("on_change"):
+            await spec["on_change"]()
+    return summary
+
+
+# --- DEDUPLICATION ---
+
+async def course_conflicts():
+    # Weeks that more than one module of a course claims; the newest row is kept
+    rows = await database.fetch_all(
+        sqlalchemy.select(ai_courses.c.id, ai_courses.c.course_type, ai_courses.c.week, ai_courses.c.title)
+        .order_by(ai_courses.c.course_type, ai_courses.c.week, sqlalchemy.desc(ai_courses.c.id))
+    )
+    groups = {}
+    for r in rows:
+        if r["course_type"] is not None and r["week"] is not None:
+            groups.setdefault((r["course_type"], r["week"]), []).append({"id": r["id"], "title": r["title"]})
+    return [
+        {"course_type": course_type, "week": week, "keep": modules[0], "drop": modules[1:]}
+        for (course_type, week), modules in groups.items() if len(modules) > 1
+    ]
+
+
+async def dedupe_courses(apply=False):
+    # Reports the conflicts; with apply, deletes the older rows and adds the
+    # unique index the course upsert needs. Modules that belong to another
+    # course should get their course_type fixed (admin dashboard) first.
+    conflicts = await course_conflicts()
+    summary = {"dry_run": not apply, "conflicts": conflicts, "deleted": 0}
+    if not apply:
+        return summary
+    ids = [module["id"] for conflict in conflicts for module in conflict["drop"]]
+    async with database.transaction():
+        if ids:
+            await database.execute(ai_courses.delete().where(ai_courses.c.id.in_(ids)))
+        await database.execute(COURSE_INDEX)
+    summary["deleted"] = len(ids)
+    if ids:
+        await response_cache.invalidate(KINDS["courses"]["cache_prefix"])
+    return summary
+
+
+# --- EXPORT ---
+
+def _order(kind):
+    table = KINDS[kind]["table"]
+    return [table.c[k] for k in KINDS[kind]["key"]]
+
+
+async def export_records(kind, fmt):
+    # Async generator of encoded chunks, suitable for StreamingResponse
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind '{kind}'")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'")
+    fields = KINDS[kind]["fields"]
+    query = KINDS[kind]["table"].select().order_by(*_order(kind))
+    yaml = _load_yaml() if fmt == "yaml" else None
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        yield buffer.getvalue()
+
+    async for r in database.iterate(query):
+        # Decimals (prices) export as exact strings
+        record = {f: str(r[f]) if isinstance(r[f], Decimal) else r[f] for f in fields}
+        if fmt == "ndjson":
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+        elif fmt == "csv":
+            for field in ("image_url", "aliases", "rail_limits"):
+                if isinstance(record.get(field), (list, dict)):
+                    record[field] = json.dumps(record[field])
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(record)
+            yield buffer.getvalue()
+        else:
+            yield yaml.safe_dump(record, explicit_start=True, allow_unicode=True, sort_keys=False)
+
+
+# --- CLI ---
+
+async def _main(argv):
+    if argv[:2] == ["dedupe", "courses"]:
+        await database.connect()
+        try:
+            summary = await dedupe_courses(apply="--apply" in argv)
+        finally:
+            await database.disconnect()
+        print(json.dumps(summary, indent=2))
+        if summary["dry_run"] and summary["conflicts"]:
+            print("Dry run; pass --apply to delete the rows under \"drop\" and add the unique index")
+        return 0
+    if len(argv) < 3 or argv[0] not in ("import", "export"):
+        print("Usage: python bulk_io.py import|export <components|courses|prices> <file> [--dry-run]")
+        print("       python bulk_io.py dedupe courses [--apply]")
+        return 1
+    action, kind, path = argv[:3]
+    fmt = format_for(path)
+    await database.connect()
+    try:
+        if action == "import":
+            with open(path, encoding="utf-8", newline="") as f:
+                summary = await import_records(kind, read_records(f, fmt), dry_run="--dry-run" in argv)
+            print(json.dumps(summary, indent=2))
+        else:
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                async for chunk in export_records(kind, fmt):
+                    f.write(chunk)
+            print(f"Exported {kind} to {path}")
+    finally:
+        await database.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
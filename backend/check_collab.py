@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+# Checks for collaborative editing (collab.py, /api/ws/circuit/{id}).
+# The document must converge whatever order stamped ops arrive in. Over the
+# socket, an editor gets other editors' changes as batched field-level ops,
+# never its own, and an ack for its own; concurrent writes to one field settle
+# on the same value for everyone; bad ops are refused; and leaving the room
+# snapshots the document into the circuit, visible to a cached GET.
+#
+# Usage: python check_collab.py
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check.db")
+
+from starlette.testclient import TestClient
+from collab import Document
+from check_simulation import BENCH
+from main import create_app
+
+failures = []
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def check_convergence():
+    rng = random.Random(7)
+    ids = [n["id"] for n in BENCH["nodes"]]
+    ops = []
+    for i in range(300):
+        field = rng.choice(["position", "position", "data", "deleted"])
+        value = {"position": {"x": rng.randint(0, 900), "y": rng.randint(0, 600)}, "data": {"label": f"part {i}"}, "deleted": rng.random() < 0.3}[field]
+        ops.append({"kind": "node", "id": rng.choice(ids + ["new1"]), "field": field, "value": value, "stamp": (rng.randint(1, 40), rng.choice("abc"))})
+    results = set()
+    for seed in range(5):
+        shuffled = ops[:]
+        random.Random(seed).shuffle(shuffled)
+        document = Document(BENCH, "check")
+        for op in shuffled + shuffled[:50]:  # duplicates are harmless too
+            document.merge(op)
+        results.add(json.dumps(document.diagram(), sort_keys=True))
+    check(len(results) == 1, "stamped ops merge to the same diagram in any order")
+
+
+def ops_until(ws, predicate):
+    # Ops messages up to the first one that satisfies predicate
+    received = []
+    while True:
+        message = json.loads(ws.receive_text())
+        received.append(message)
+        if predicate(message):
+            return received
+
+
+def check_sockets():
+    with TestClient(create_app()) as client:
+        circuit_id = client.post("/api/save", json={"query": "bench", "diagram_data": BENCH, "code": "", "bom": []}).json()["id"]
+        cached = client.get(f"/api/circuit/{circuit_id}")
+        with client.websocket_connect(f"/api/ws/circuit/{circuit_id}") as a, client.websocket_connect(f"/api/ws/circuit/{circuit_id}") as b:
+            state_a, state_b = json.loads(a.receive_text()), json.loads(b.receive_text())
+            check(state_a["type"] == "state" and len(state_a["diagram"]["nodes"]) == len(BENCH["nodes"]) and state_b["editors"] == 2,
+                  "editors start from the saved diagram")
+            node = BENCH["nodes"][0]["id"]
+
+            a.send_text(json.dumps({"type": "ops", "seq": 1, "ops": [
+                {"kind": "node", "id": node, "field": "position", "value": {"x": 1, "y": 1}},
+                {"kind": "node", "id": node, "field": "position", "value": {"x": 2, "y": 2}},
+            ]}))
+            got_b = ops_until(b, lambda m: m.get("ops"))
+            got_a = ops_until(a, lambda m: "ack" in m)
+            check(got_b[-1]["ops"] == [{"kind": "node", "id": node, "field": "position", "value": {"x": 2, "y": 2}}],
+                  f"other editors get only the latest write per field: {got_b[-1]}")
+            check(got_a[-1]["ack"] == 1 and got_a[-1]["ops"] == [], "the writer gets an ack, not its own ops back")
+
+            a.send_text(json.dumps({"type": "ops", "seq": 2, "ops": [{"kind": "node", "id": node, "field": "data", "value": {"label": "from a"}}]}))
+            b.send_text(json.dumps({"type": "ops", "seq": 1, "ops": [{"kind": "node", "id": node, "field": "data", "value": {"label": "from b"}}]}))
+            views = []
+            for ws in (a, b):
+                label = None
+                for message in ops_until(ws, lambda m: "ack" in m):
+                    for op in message["ops"]:
+                        if op["field"] == "data":
+                            label = op["value"]["label"]
+                views.append(label)
+            # b wrote last: a is told, b already shows it
+            check(views == ["from b", None], f"concurrent writes settle on the last one for everyone: {views}")
+
+            b.send_text(json.dumps({"type": "ops", "seq": 2, "ops": [
+                {"kind": "connection", "id": "wnew", "field": "data", "value": {"from": node, "fromPin": "5V", "to": node, "toPin": "GND"}},
+                {"kind": "node", "id": BENCH["nodes"][-1]["id"], "field": "deleted", "value": True},
+            ]}))
+            ops_until(a, lambda m: len(m.get("ops") or []) == 2)
+            b.send_text(json.dumps({"type": "ops", "seq": 3, "ops": [{"kind": "node", "id": node, "field": "position", "value": "left"}]}))
+            error = ops_until(b, lambda m: m["type"] == "error")[-1]
+            check(error["seq"] == 3 and "position" in error["detail"], f"malformed ops are refused: {error}")
+
+        # The last editor's handler saves after its socket has closed
+        deadline = time.monotonic() + 5
+        saved = client.get(f"/api/circuit/{circuit_id}", headers={"If-None-Match": cached.headers["etag"]})
+        while saved.status_code == 304 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            saved = client.get(f"/api/circuit/{circuit_id}", headers={"If-None-Match": cached.headers["etag"]})
+        diagram = saved.json()["diagram_data"] if saved.status_code == 200 else {}
+        nodes = {n["id"]: n for n in diagram.get("nodes", [])}
+        check(saved.status_code == 200 and nodes.get(node, {}).get("label") == "from b" and nodes[node]["position"] == {"x": 2, "y": 2},
+              "leaving the room snapshots the edits into the circuit")
+        check(BENCH["nodes"][-1]["id"] not in nodes and any(c["id"] == "wnew" for c in diagram.get("connections", [])),
+              "deleted nodes and new connections are in the snapshot")
+
+        with client.websocket_connect("/api/ws/circuit/missing") as ws:
+            check(json.loads(ws.receive_text())["type"] == "error", "unknown circuits are refused")
+
+
+def main():
+    check_convergence()
+    check_sockets()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
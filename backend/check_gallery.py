@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+# Checks for the community gallery (gallery.py, /api/gallery).
+# Summaries must match the saved diagrams (and follow collaborative edits);
+# keyset pages must list every circuit exactly once in order, also past the
+# in-memory window where the DB answers; likes and views must move a circuit
+# up trending once flushed, with a rank order that does not change as time
+# passes; repeated reads must come from rendered pages without touching the
+# DB; and circuits saved before the gallery existed must be backfilled.
+#
+# Usage: python check_gallery.py
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check.db")
+
+import sqlalchemy
+from starlette.testclient import TestClient
+import gallery
+import metrics
+from gallery import gallery_feed, bump, DECAY, EPOCH
+from database import DATABASE_URL, circuits
+from bench_simulation import synthetic
+from main import create_app
+
+CIRCUITS = 45
+WEATHER = {
+    "nodes": [
+        {"id": "mcu", "type": "Microcontroller", "label": "ESP32 DevKit", "pins": ["3V3", "GND", "GPIO4"]},
+        {"id": "s1", "type": "Sensor", "label": "DHT22", "pins": ["VCC", "GND", "DATA"]},
+    ],
+    "connections": [
+        {"id": "c1", "from": "mcu", "fromPin": "3V3", "to": "s1", "toPin": "VCC"},
+        {"id": "c2", "from": "mcu", "fromPin": "GPIO4", "to": "s1", "toPin": "DATA"},
+    ],
+}
+WINDOW = 15
+READS = 2000
+failures = []
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def check_rank_math():
+    # Decayed score at time t: sum of weight * 2^-(t - event) / half-life
+    rng = random.Random(3)
+    start = datetime(2026, 6, 1)
+    histories = [[(rng.choice([1, 10]), start + timedelta(hours=rng.uniform(0, 96))) for _ in range(rng.randint(1, 30))] for _ in range(40)]
+    ranks = []
+    for history in histories:
+        rank = None
+        for weight, at in sorted(history, key=lambda e: e[1]):
+            rank = bump(rank, weight, at)
+        ranks.append(rank)
+    orders, close = [], True
+    for hours in (100, 200, 1000):
+        now = start + timedelta(hours=hours)
+        scores = [sum(w * 2 ** (-(now - at).total_seconds() / 3600 / gallery.HALF_LIFE_HOURS) for w, at in h) for h in histories]
+        orders.append(sorted(range(len(scores)), key=lambda i: -scores[i]))
+        # rank - DECAY * t is the log of the score at t
+        close = close and all(abs(ranks[i] - DECAY * (now - EPOCH).total_seconds() - math.log(scores[i])) < 1e-6 for i in range(len(scores)))
+    check(orders[0] == orders[1] == orders[2] == sorted(range(len(ranks)), key=lambda i: -ranks[i]) and close,
+          "the stored rank orders circuits like their decayed scores, at any later time")
+
+
+def save(client, parts, query):
+    body = {"query": query, "diagram_data": synthetic(parts, seed=parts), "code": "", "bom": []}
+    return client.post("/api/save", json=body).json()["id"]
+
+
+def walk(client, sort, limit, tag=None):
+    # Every item of a sort, page by page
+    items, cursor = [], None
+    for _ in range(100):
+        params = {"sort": sort, "limit": limit, **({"cursor": cursor} if cursor else {}), **({"tag": tag} if tag else {})}
+        page = client.get("/api/gallery", params=params).json()
+        items += page["items"]
+        cursor = page["next"]
+        if not cursor:
+            break
+    return items
+
+
+def check_feed():
+    gallery_feed.size = WINDOW
+    gallery.FLUSH_SECONDS = 0.2
+    gallery.RERANK_SECONDS = 0
+
+    engine = sqlalchemy.create_engine(DATABASE_URL)
+    from database import metadata
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        # Saved before the gallery existed
+        conn.execute(circuits.insert().values(id="old00001", query="old blinker", diagram_data=synthetic(4), created_at=datetime(2025, 1, 1)))
+
+    with TestClient(create_app()) as client:
+        weather = client.post("/api/save", json={"query": "weather station", "diagram_data": WEATHER, "code": "", "bom": []}).json()["id"]
+        saved = [weather] + [save(client, 3 + i % 20, f"circuit {i}") for i in range(CIRCUITS)]
+        newest = client.get("/api/gallery", params={"sort": "new", "limit": 1}).json()["items"][0]
+        check(newest["id"] == saved[-1] and newest["parts"] == 3 + (CIRCUITS - 1) % 20 and newest["title"] == f"circuit {CIRCUITS - 1}",
+              f"the newest save leads the new feed with its summary: {newest}")
+        check("microcontroller" in newest["tags"], f"tags come from the diagram: {newest['tags']}")
+        svg = client.get(newest["thumbnail"])
+        check(svg.headers["content-type"].startswith("image/svg+xml") and svg.text.count("<rect") == newest["parts"] + 1,
+              "thumbnails draw every part")
+
+        expected_new = saved[::-1] + ["old00001"]
+        db_before = metrics.counter("gallery.db_pages")
+        listed = walk(client, "new", 7)
+        check([item["id"] for item in listed] == expected_new, "keyset pages of the new feed list every circuit once, newest first")
+        check(metrics.counter("gallery.db_pages") > db_before, "pages past the in-memory window come from the DB")
+        trending = [item["id"] for item in walk(client, "trending", 7)]
+        check(sorted(trending) == sorted(expected_new) and len(trending) == len(set(trending)), "keyset pages of the trending feed list every circuit once")
+        rarest = min({tag for item in listed for tag in item["tags"]}, key=lambda tag: sum(tag in item["tags"] for item in listed))
+        tagged = [item["id"] for item in walk(client, "new", 5, tag=rarest.upper())]
+        check(tagged == [item["id"] for item in listed if rarest in item["tags"]] and len(tagged) < len(listed),
+              f"tags filter the feed: {len(tagged)} of {len(listed)} tagged {rarest!r}")
+        check(client.get("/api/gallery", params={"cursor": "nonsense"}).status_code == 400, "bad cursors are a 400")
+        check(client.post("/api/gallery/missing/like").status_code == 404, "liking an unknown circuit is a 404")
+
+        star = saved[5]
+        for _ in range(3):
+            client.post(f"/api/gallery/{star}/like")
+        client.get(f"/api/circuit/{star}")
+        time.sleep(0.5)
+        top = client.get("/api/gallery", params={"limit": 1}).json()["items"][0]
+        check(top["id"] == star and top["likes"] == 3 and top["views"] == 1, f"likes and views lift a circuit up trending after a flush: {top}")
+
+        # Old circuits rising into trending leave a gap in the new order, which
+        # the DB has to fill
+        for circuit_id in saved[1:9]:
+            client.post(f"/api/gallery/{circuit_id}/like")
+        time.sleep(0.5)
+        check([item["id"] for item in walk(client, "new", 3)] == expected_new, "keyset pages across a gap in the window list every circuit once")
+        trending = [item["id"] for item in walk(client, "trending", 3)]
+        check(sorted(trending) == sorted(expected_new) and len(trending) == len(set(trending)) and trending[0] == star,
+              "trending pages after the rise list every circuit once")
+
+        for sort in ("trending", "new"):
+            client.get("/api/gallery", params={"sort": sort, "limit": 20})
+        renders, db_pages = metrics.counter("gallery.page_renders"), metrics.counter("gallery.db_pages")
+        started = time.perf_counter()
+        for i in range(READS):
+            client.get("/api/gallery", params={"sort": ("trending", "new")[i % 2], "limit": 20})
+        elapsed = time.perf_counter() - started
+        check(metrics.counter("gallery.page_renders") == renders and metrics.counter("gallery.db_pages") == db_pages,
+              f"{READS} reads of the first pages render nothing and never query the DB")
+        timings = metrics.timing("gallery.page_ms")
+        check(timings["p50_ms"] < 0.5, f"a cached page takes {timings['p50_ms']} ms in the handler ({READS / elapsed:.0f} reads/s through the test client)")
+
+        with client.websocket_connect(f"/api/ws/circuit/{star}") as ws:
+            diagram = json.loads(ws.receive_text())["diagram"]
+            ws.send_text(json.dumps({"type": "ops", "seq": 1, "ops": [{"kind": "node", "id": diagram["nodes"][-1]["id"], "field": "deleted", "value": True}]}))
+            while "ack" not in json.loads(ws.receive_text()):
+                pass
+        deadline = time.monotonic() + 5
+        parts = None
+        while time.monotonic() < deadline:
+            parts = next(i["parts"] for i in client.get("/api/gallery", params={"limit": 1}).json()["items"] if i["id"] == star)
+            if parts == len(diagram["nodes"]) - 1:
+                break
+            time.sleep(0.05)
+        check(parts == len(diagram["nodes"]) - 1, "collaborative edits update the summary")
+
+
+def main():
+    check_rank_math()
+    check_feed()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+# Checks for the WebSocket generation channel (/api/ws/generate).
+# A fake model streams its answer a chunk at a time; the checks confirm that
+# diagram, code and BOM arrive as separate messages, that a cancel message, a
+# new query and a disconnect each close the upstream streams early, and that
+# the tokens those streams never produced show up in the metrics.
+#
+# Usage: python check_generation_socket.py
+
+# The app creates its tables at startup, which needs a file for SQLite
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check.db")
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+from starlette.testclient import TestClient
+import services
+import metrics
+import model_router
+from bench_codegen import CASES
+from main import create_app
+
+CHUNK_SECONDS = 0.002
+failures = []
+
+_, DIAGRAM, GLUE = CASES["obstacle robot (uno)"]
+ANSWER = json.dumps({
+    **DIAGRAM,
+    **GLUE,
+    "code": "void setup() {}\nvoid loop() {}",
+    "items": [{"component": "Arduino UNO", "quantity": 1, "estimated_price": "$24.95"}],
+    "total_estimated_cost": "$24.95",
+})
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+class Stream:
+    # Streams ANSWER in 4-character chunks, like tokens
+    def __init__(self, calls):
+        self.calls = calls
+        self.closed = False
+        self.sent = 0
+
+    async def close(self):
+        self.closed = True
+        self.calls["closed"] += 1
+
+    def __aiter__(self):
+        return self.chunks()
+
+    async def chunks(self):
+        for i in range(0, len(ANSWER), 4):
+            await asyncio.sleep(CHUNK_SECONDS)
+            self.sent += 1
+            delta = SimpleNamespace(content=ANSWER[i:i + 4])
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta, finish_reason=None)])
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=self.sent, total_tokens=100 + self.sent)
+        yield SimpleNamespace(usage=usage, choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")])
+        self.calls["finished"] += 1
+
+
+class Completions:
+    def __init__(self):
+        self.calls = {"started": 0, "closed": 0, "finished": 0, "streamed": 0}
+
+    async def create(self, model, messages, stream=False, **options):
+        self.calls["started"] += 1
+        if stream:
+            self.calls["streamed"] += 1
+            return Stream(self.calls)
+        raise AssertionError("socket generation must stream")
+
+
+def receive_until(ws, request_id, kinds):
+    # Messages for request_id up to the first one whose type is in kinds
+    received = []
+    while True:
+        message = json.loads(ws.receive_text())
+        if message.get("id") == request_id:
+            received.append(message)
+            if message["type"] in kinds:
+                return received
+
+
+def main():
+    completions = Completions()
+    services._llm_clients["openai"] = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with TestClient(create_app()) as client:
+        with client.websocket_connect("/api/ws/generate") as ws:
+            ws.send_text(json.dumps({"type": "generate", "id": "a", "query": "obstacle robot"}))
+            received = receive_until(ws, "a", ("done", "error"))
+            kinds = [m["type"] for m in received]
+            check(kinds[0] == "diagram" and sorted(kinds[1:3]) == ["bom", "code"] and kinds[-1] == "done",
+                  f"diagram first, then code and BOM, then done: {kinds}")
+            check(completions.calls["streamed"] == completions.calls["started"], "every call streamed")
+            check(completions.calls["closed"] == 0, "finished streams are not cut")
+
+            started = completions.calls["started"]
+            ws.send_text(json.dumps({"type": "generate", "id": "b", "query": "obstacle robot"}))
+            time.sleep(0.05)
+            ws.send_text(json.dumps({"type": "cancel", "id": "b"}))
+            received = receive_until(ws, "b", ("cancelled", "done"))
+            check(received[-1]["type"] == "cancelled", "cancel message acknowledged")
+            time.sleep(0.05)
+            check(completions.calls["started"] > started and completions.calls["closed"] == completions.calls["started"] - started,
+                  f"cancel closed the upstream stream ({completions.calls['closed']} closed)")
+
+            ws.send_text(json.dumps({"type": "generate", "id": "c", "query": "first query"}))
+            time.sleep(0.05)
+            ws.send_text(json.dumps({"type": "generate", "id": "d", "query": "second query"}))
+            check(receive_until(ws, "c", ("cancelled", "done"))[-1]["type"] == "cancelled", "a new query cancels the running one")
+            check(receive_until(ws, "d", ("done", "error"))[-1]["type"] == "done", "the new query completes")
+
+            ws.send_text("not json")
+            check(json.loads(ws.receive_text())["type"] == "error", "malformed messages get an error, not a closed socket")
+
+            closed = completions.calls["closed"]
+            ws.send_text(json.dumps({"type": "generate", "id": "e", "query": "obstacle robot"}))
+            time.sleep(0.05)
+        time.sleep(0.1)
+        check(completions.calls["closed"] > closed, "disconnecting closed the upstream stream")
+
+    saved = model_router.report()["diagram"]["tokens_saved_by_cancel"]
+    cancelled = metrics.counter("generation_socket.cancelled")
+    check(saved > 0, f"tokens saved by cancellation are reported ({saved} diagram tokens, {int(cancelled)} cancellations)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import asyncio
+from types import SimpleNamespace
+
+# Concurrency checks for idempotency.py.
+# Fires concurrent and retried requests with the same Idempotency-Key and
+# checks the work runs once, every caller gets the same content, failures are
+# not stored, a client disconnecting mid-request does not lose the work, and a
+# request waiting on another worker is woken by its pubsub notification.
+# Runs against the in-memory store, or Postgres when DATABASE_URL points at one.
+#
+# Usage: python check_idempotency.py
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import httpx
+from fastapi import HTTPException
+import services
+import idempotency
+from idempotency import idempotent, get_store, on_notify
+from database import database, metadata, idempotency_keys
+from responses import ORJSONResponse
+
+failures = []
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def content_of(result):
+    return json.loads(result.body) if isinstance(result, ORJSONResponse) else result
+
+
+class Work:
+    # Counts runs; each run takes `seconds` and may fail
+    def __init__(self, seconds=0.2, fail=False):
+        self.runs = 0
+        self.seconds = seconds
+        self.fail = fail
+
+    async def __call__(self):
+        self.runs += 1
+        await asyncio.sleep(self.seconds)
+        if self.fail:
+            raise HTTPException(status_code=500, detail="boom")
+        return {"run": self.runs, "value": "diagram"}
+
+
+async def concurrent_same_key():
+    work = Work()
+    results = await asyncio.gather(*[idempotent("k1", "check", {"q": 1}, work) for _ in range(50)])
+    replayed = [r for r in results if isinstance(r, ORJSONResponse)]
+    check(work.runs == 1, f"50 concurrent requests, one key: ran {work.runs} time(s)")
+    check(len(replayed) == 49, f"49 requests attached to the first ({len(replayed)})")
+    check(all(content_of(r) == {"run": 1, "value": "diagram"} for r in results), "all 50 got the same content")
+
+    again = await idempotent("k1", "check", {"q": 1}, work)
+    check(work.runs == 1 and isinstance(again, ORJSONResponse), "retry after completion is replayed")
+    check(again.headers.get("idempotent-replayed") == "true", "replay carries Idempotent-Replayed")
+
+
+async def mismatched_body():
+    work = Work()
+    first = asyncio.create_task(idempotent("k2", "check", {"q": 1}, work))
+    await asyncio.sleep(0.01)
+    for label in ("in flight", "after completion"):
+        try:
+            await idempotent("k2", "check", {"q": 2}, work)
+            check(False, f"same key, different body ({label}) is rejected")
+        except HTTPException as e:
+            check(e.status_code == 422, f"same key, different body ({label}) -> {e.status_code}")
+        await first
+
+
+async def failures_are_not_stored():
+    work = Work(fail=True)
+    results = await asyncio.gather(*[idempotent("k3", "check", {}, work) for _ in range(10)], return_exceptions=True)
+    check(work.runs == 1, f"failing work with 10 concurrent callers ran {work.runs} time(s)")
+    check(all(isinstance(r, HTTPException) and r.status_code == 500 for r in results), "every caller got the 500")
+    work.fail = False
+    retry = await idempotent("k3", "check", {}, work)
+    check(work.runs == 2 and content_of(retry)["run"] == 2, "retry after a failure runs again")
+
+
+async def disconnect_keeps_work():
+    work = Work(seconds=0.3)
+    first = asyncio.create_task(idempotent("k4", "check", {}, work))
+    await asyncio.sleep(0.05)
+    first.cancel()  # the client went away
+    await asyncio.sleep(0.05)
+    retry = await idempotent("k4", "check", {}, work)
+    check(work.runs == 1 and content_of(retry)["run"] == 1, "retry after a disconnect attaches to the running work")
+
+
+async def many_keys():
+    work = Work(seconds=0.1)
+    started = time.perf_counter()
+    await asyncio.gather(*[idempotent(f"m{i % 20}", "check", {}, work) for i in range(100)])
+    elapsed = time.perf_counter() - started
+    check(work.runs == 20, f"100 requests over 20 keys ran {work.runs} times")
+    check(elapsed < 0.5, f"distinct keys run concurrently ({elapsed * 1000:.0f} ms)")
+
+
+async def waits_for_other_worker():
+    # A claim made by another worker: no task here, only the stored row
+    store = get_store()
+    await store.claim("check:k5", idempotency.fingerprint({}))
+    work = Work()
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.1)
+        await store.complete("check:k5", {"run": "other worker"})
+        on_notify({"key": "check:k5"})
+
+    started = time.perf_counter()
+    result, _ = await asyncio.gather(idempotent("k5", "check", {}, work), other_worker_finishes())
+    elapsed = time.perf_counter() - started
+    check(work.runs == 0 and content_of(result) == {"run": "other worker"}, "request in flight elsewhere is replayed, not rerun")
+    check(elapsed < idempotency.POLL_SECONDS, f"woken by the notification ({elapsed * 1000:.0f} ms)")
+
+
+async def generate_endpoint():
+    # Same key over HTTP: one diagram call however many retries race
+    from main import app
+
+    calls = []
+
+    class Completions:
+        async def create(self, model, messages, **options):
+            calls.append(messages[0]["content"])
+            await asyncio.sleep(0.2)
+            content = {"nodes": [{"id": "mcu", "label": "Arduino UNO", "pins": []}], "connections": [], "explanation": "x"}
+            message = SimpleNamespace(content=json.dumps(content))
+            return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+    services._llm_clients["openai"] = SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        responses = await asyncio.gather(*[
+            client.post("/api/generate", json={"query": "blink"}, headers={"Idempotency-Key": "http-1"})
+            for _ in range(10)
+        ])
+    diagram_calls = sum("WIRING" in c for c in calls)
+    check(all(r.status_code == 200 for r in responses), "10 concurrent POST /api/generate succeeded")
+    check(diagram_calls == 1, f"one diagram LLM call for 10 retries ({diagram_calls})")
+    check(len({r.json()["generation_id"] for r in responses}) == 1, "every retry got the same generation_id")
+
+
+async def main():
+    if database.url.dialect == "postgresql":
+        import sqlalchemy
+
+        metadata.create_all(sqlalchemy.create_engine(str(database.url)), tables=[idempotency_keys])
+        await database.connect()
+        await database.execute(idempotency_keys.delete().where(idempotency_keys.c.key.like("check:%")))
+    print(f"store: {type(get_store()).__name__}")
+    try:
+        for scenario in (
+            concurrent_same_key, mismatched_body, failures_are_not_stored,
+            disconnect_keeps_work, many_keys, waits_for_other_worker, generate_endpoint,
+        ):
+            await scenario()
+    finally:
+        if database.is_connected:
+            await database.disconnect()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
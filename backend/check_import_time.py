@@ -0,0 +1,84 @@
+import os
+import sys
+import subprocess
+
+# Import-time budget check for the API worker.
+# Runs `python -X importtime -c "import main"` in a clean interpreter and fails
+# when importing the app takes longer than the budget, or when it pulls in
+# modules that must stay lazy (SDKs, see services.py; NumPy, see the export
+# endpoints in routers/circuits.py; SciPy, see routers/simulation.py).
+# Most of `import main` is the web and database stack itself, whose cost
+# depends on the machine, so the budget is for what the app adds on top: the
+# median of several cold imports of main, minus the median cold import of
+# BASELINE_MODULES on its own (measured at 200-350 ms over a 620-770 ms
+# baseline).
+#
+# Usage: python check_import_time.py [budget_ms]
+
+DEFAULT_BUDGET_MS = 600
+BASELINE_MODULES = ("fastapi", "sqlalchemy", "databases", "asyncpg", "pydantic")
+LAZY_MODULES = ("openai", "cloudinary", "numpy", "scipy")
+RUNS = 5
+
+
+def measure(statement):
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.setdefault("DATABASE_URL", "postgresql://localhost/importtime")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f"{statement} failed")
+
+    # name -> cumulative microseconds; only top-level imports (one space of
+    # indent) count towards the total
+    modules, total_us = {}, 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative_us)
+        if name.strip() in statement and not name.startswith("  "):
+            total_us += int(cumulative_us)
+    return modules, total_us / 1000
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def main():
+    budget_ms = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    # Alternate the two so a slow stretch of the machine hits both alike
+    runs, baselines = [], []
+    for _ in range(RUNS):
+        runs.append(measure("import main"))
+        baselines.append(measure("import " + ", ".join(BASELINE_MODULES))[1])
+    modules, total_ms = sorted(runs, key=lambda run: run[1])[RUNS // 2]
+    baseline_ms = median(baselines)
+    overhead_ms = total_ms - baseline_ms
+
+    print("Slowest imports (cumulative):")
+    for name, us in sorted(modules.items(), key=lambda item: item[1], reverse=True)[1:11]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+    print(f"import main: {total_ms:.1f} ms, {' + '.join(BASELINE_MODULES)}: {baseline_ms:.1f} ms")
+    print(f"app overhead: {overhead_ms:.1f} ms (budget {budget_ms} ms)")
+
+    failures = []
+    if overhead_ms > budget_ms:
+        failures.append(f"import main took {overhead_ms:.1f} ms over its baseline, over the {budget_ms} ms budget")
+    for name in LAZY_MODULES:
+        if name in modules:
+            failures.append(f"'{name}' is imported at startup; it must be imported lazily")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import tempfile
+from types import SimpleNamespace
+
+# Checks for inventory-aware generation (inventory.py).
+# Owned parts must reach the diagram prompt, come out of the BOM at $0 (only
+# up to the owned quantity), and stand in as same-category substitutes for
+# parts the user lacks. Only exact names (or another name of the same catalog
+# part) count as owned; "RGB LED" is not an owned "LED", only a substitute.
+# Inventory edits must show up on the next request, and looking a label up must
+# cost the same against 50 owned parts as against 5000.
+#
+# Usage: python check_inventory.py
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check.db")
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+from starlette.testclient import TestClient
+import services
+from inventory import OwnedParts
+from bench_codegen import CASES
+from main import create_app
+
+LOOKUPS = 20000
+failures = []
+
+_, DIAGRAM, _ = CASES["obstacle robot (uno)"]
+ANSWER = json.dumps({
+    **DIAGRAM,
+    "explanation": "Obstacle robot.",
+    "items": [{"component": "L298N Motor Driver", "quantity": 1, "estimated_price": "$6.00"}],
+    "total_estimated_cost": "$6.00",
+})
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+class Completions:
+    def __init__(self):
+        self.prompts = []
+
+    async def create(self, model, messages, **options):
+        self.prompts.append(messages[-1]["content"])
+        message = SimpleNamespace(content=ANSWER, role="assistant")
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=100, total_tokens=200)
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+
+def per_lookup_us(size):
+    rows = [{"component": f"Part {i} Module", "quantity": 1, "category": None} for i in range(size)]
+    owned = OwnedParts(rows, {})
+    labels = [f"Part {i} Module" for i in range(0, size, max(1, size // 50))] + ["Unknown Widget Board"] * 10
+    started = time.perf_counter()
+    for i in range(LOOKUPS):
+        owned.lookup(labels[i % len(labels)])
+    return (time.perf_counter() - started) / LOOKUPS * 1e6
+
+
+def check_lookup_cost():
+    small, large = min(per_lookup_us(50) for _ in range(3)), min(per_lookup_us(5000) for _ in range(3))
+    check(large < small * 2, f"label lookups do not grow with the inventory: {small:.2f} us at 50 parts, {large:.2f} us at 5000")
+
+
+def check_exact_matches():
+    rows = [{"component": name, "quantity": 1, "category": None} for name in ("LED", "ESP32", "Servo", "SG90")]
+    owned = OwnedParts(rows, {})
+    near = ["RGB LED", "LED Strip WS2812B", "ESP32-CAM", "Servo MG996R"]
+    check(not any(owned.lookup(label) for label in near), f"owned parts only cover their exact names, not {near}")
+    sg90 = {"name": "Servo Motor (SG90)"}
+    catalog = {"servo motor sg90": sg90, "sg90": sg90}
+    check(owned.lookup("Servo Motor (SG90)", catalog)["name"] == "SG90", "another catalog name of an owned part counts as owned")
+
+
+def line(bom, name, source="Owned"):
+    return next((item for item in bom["items"] if item["component"] == name and item["source"] == source), None)
+
+
+def check_endpoints():
+    completions = Completions()
+    services._llm_clients["openai"] = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with TestClient(create_app()) as client:
+        for name, category in [("HC-SR04", "Sensor"), ("HC-SR501 PIR Sensor", "Sensor"), ("Arduino UNO", "Microcontroller")]:
+            client.post("/api/components", json={"name": name, "description": name, "category": category})
+        user_id = client.post("/api/users").json()["id"]
+        check(client.get("/api/users/999999/inventory").status_code == 404, "unknown users are a 404")
+
+        items = [
+            {"component": "Arduino UNO", "quantity": 1},
+            {"component": "SG90 Servo", "quantity": 1, "category": "Actuator"},
+            {"component": "HC-SR501 PIR Sensor", "quantity": 1},
+            {"component": "SG90 Servo", "quantity": 1},
+            {"component": "LED", "quantity": 0},
+        ]
+        saved = client.put(f"/api/users/{user_id}/inventory", json={"items": items}).json()["items"]
+        by_name = {item["component"]: item for item in saved}
+        check(sorted(by_name) == ["Arduino UNO", "HC-SR501 PIR Sensor", "SG90 Servo"] and by_name["SG90 Servo"]["quantity"] == 2,
+              f"repeated names add up and zero quantities are dropped: {saved}")
+        check(by_name["Arduino UNO"]["category"] == "Microcontroller", "categories default to the components catalog")
+
+        client.post("/api/generate", json={"query": "obstacle robot", "user_id": user_id})
+        check(any("Parts I own:" in p and "2 x SG90 Servo" in p for p in completions.prompts), "the diagram prompt lists the owned parts")
+        completions.prompts.clear()
+        client.post("/api/generate", json={"query": "obstacle robot"})
+        check(completions.prompts and not any("Parts I own" in p for p in completions.prompts), "requests without a user get the plain prompt")
+
+        nodes = DIAGRAM["nodes"] + [{"id": "mcu2", "label": "Arduino UNO", "pins": ["5V"]}]
+        bom = client.post("/api/generate-bom", json={"query": "obstacle robot", "nodes": nodes, "user_id": user_id}).json()
+        owned = line(bom, "Arduino UNO")
+        check(owned and owned["quantity"] == 1 and owned["line_total"] == "0.00",
+              f"the owned board is priced at $0: {owned}")
+        bought = [item for item in bom["items"] if item["source"] != "Owned" and "UNO" in item["component"].upper()]
+        check(len(bought) == 1 and bought[0]["quantity"] == 1, f"the second board, beyond the owned one, is bought: {bought}")
+        check(line(bom, "SG90 Servo") and line(bom, "SG90 Servo")["line_total"] == "0.00", "owned labels match diagram labels")
+        swaps = bom.get("substitutions") or []
+        check(any(s["component"] == "HC-SR04" and s["owned"] == "HC-SR501 PIR Sensor" for s in swaps),
+              f"a missing sensor is matched to an owned sensor: {swaps}")
+
+        plain = client.post("/api/generate-bom", json={"query": "obstacle robot", "nodes": nodes}).json()
+        check(not any(item["source"] == "Owned" for item in plain["items"]) and not plain["substitutions"], "without a user nothing is owned")
+
+        client.put(f"/api/users/{user_id}/inventory", json={"items": [{"component": "Arduino UNO", "quantity": 2}]})
+        bom = client.post("/api/generate-bom", json={"query": "obstacle robot", "nodes": nodes, "user_id": user_id}).json()
+        check(line(bom, "Arduino UNO")["quantity"] == 2 and not line(bom, "SG90 Servo"), "an inventory edit applies to the next request")
+
+        client.put(f"/api/users/{user_id}/inventory", json={"items": [{"component": "LED", "quantity": 2}]})
+        rgb = [{"id": "rgb", "label": "RGB LED", "pins": ["R", "G", "B", "GND"]}]
+        bom = client.post("/api/generate-bom", json={"query": "mood light", "nodes": rgb, "user_id": user_id}).json()
+        check(not any(item["source"] == "Owned" for item in bom["items"]), f"an owned LED does not cover an RGB LED: {bom['items']}")
+        check(any(s["component"] == "RGB LED" and s["owned"] == "LED" for s in bom["substitutions"]),
+              f"the owned LED is suggested for the RGB LED instead: {bom['substitutions']}")
+
+
+def main():
+    check_exact_matches()
+    check_lookup_cost()
+    check_endpoints()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
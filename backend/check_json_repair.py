@@ -0,0 +1,135 @@
+import sys
+import json
+import time
+import random
+from json_repair import repair
+from bench_codegen import CASES
+
+# Fuzz corpus for json_repair.py.
+# Every answer below is damaged the ways model output gets damaged: cut off at
+# every possible position, wrapped in fences or prose, given trailing commas,
+# and randomly corrupted. Checks that repair only ever raises ValueError, that
+# wrapped answers come back unchanged, and that truncated answers only contain
+# entries that are exactly in the original (a prefix of each list, no half
+# entries).
+#
+# Usage: python check_json_repair.py [seed]
+
+RANDOM_MUTATIONS = 2000
+
+
+def corpus():
+    answers = {}
+    for name, (_, diagram, glue) in CASES.items():
+        answers[f"diagram: {name}"] = {**diagram, "explanation": glue["explanation"]}
+    answers["code"] = {
+        "code": "void setup() {\n  Serial.begin(9600); // {\"not\": json}\n}\nvoid loop() { Serial.println(\"[x]\"); }",
+        "explanation": "Prints \"[x]\" forever, with a \\ backslash.",
+    }
+    answers["bom"] = {
+        "items": [
+            {"component": "Arduino Uno", "quantity": 1, "estimated_price": "$24.95"},
+            {"component": "HC-SR04 Ultrasonic Sensor", "quantity": 2, "estimated_price": "$3.50"},
+            {"component": "Jumper wires, 40 pcs", "quantity": 1, "estimated_price": "$2.99"},
+        ],
+        "total_estimated_cost": "$34.94",
+        "notes": None,
+    }
+    return answers
+
+
+def _is_prefix_salvage(original, salvaged):
+    # Lists may lose a tail of whole entries; everything else must match exactly
+    if isinstance(original, dict):
+        return isinstance(salvaged, dict) and all(
+            key in original and _is_prefix_salvage(original[key], value) for key, value in salvaged.items()
+        )
+    if isinstance(original, list):
+        return isinstance(salvaged, list) and len(salvaged) <= len(original) and all(
+            value == original[i] or (isinstance(value, list) and _is_prefix_salvage(original[i], value))
+            for i, value in enumerate(salvaged)
+        )
+    return original == salvaged
+
+
+def _wrappings(text):
+    yield "fenced", f"```json\n{text}\n```"
+    yield "prose", f"Here is the JSON you asked for:\n{text}\nLet me know if you need changes."
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if escaped:
+            escaped = False
+        elif in_string:
+            escaped = ch == "\\"
+            in_string = ch != '"'
+        elif ch == '"':
+            in_string = True
+        elif ch in "}]" and text[i - 1] not in "[{":
+            yield "trailing comma", text[:i] + "," + text[i:]
+
+
+def main():
+    rng = random.Random(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    failures = []
+    repairs = 0
+    started = time.perf_counter()
+
+    for name, answer in corpus().items():
+        for indent in (None, 2):
+            text = json.dumps(answer, indent=indent)
+
+            for kind, damaged in _wrappings(text):
+                repairs += 1
+                try:
+                    value, _ = repair(damaged)
+                except ValueError as e:
+                    failures.append(f"{name} ({kind}): {e}")
+                    continue
+                if value != answer:
+                    failures.append(f"{name} ({kind}): changed the answer")
+
+            salvaged = 0
+            recovered_entries = []
+            for cut in range(1, len(text)):
+                repairs += 1
+                try:
+                    value, _ = repair(text[:cut])
+                except ValueError:
+                    continue
+                salvaged += 1
+                if not _is_prefix_salvage(answer, value):
+                    failures.append(f"{name} (cut at {cut}): salvaged a partial or altered entry")
+                for key in ("nodes", "connections", "items"):
+                    if key in answer and answer[key]:
+                        recovered_entries.append(len(value.get(key) or []) / len(answer[key]))
+            if indent is None:
+                share = f"{sum(recovered_entries) / len(recovered_entries):6.1%}" if recovered_entries else "     -"
+                print(f"{name:40} truncations salvaged {salvaged / (len(text) - 1):6.1%}, list entries kept {share}")
+
+            for _ in range(RANDOM_MUTATIONS // 10):
+                chars = list(text)
+                for _ in range(rng.randint(1, 3)):
+                    position = rng.randrange(len(chars))
+                    if rng.random() < 0.5:
+                        del chars[position]
+                    else:
+                        chars.insert(position, rng.choice('{}[],:"\\ x1'))
+                repairs += 1
+                try:
+                    repair("".join(chars))
+                except ValueError:
+                    pass
+                except Exception as e:
+                    failures.append(f"{name} (random): {type(e).__name__}: {e}")
+
+    elapsed = time.perf_counter() - started
+    print(f"{repairs} repairs, {elapsed / repairs * 1e6:.0f} us each")
+    for failure in failures[:20]:
+        print(f"FAIL: {failure}")
+    if len(failures) > 20:
+        print(f"... {len(failures) - 20} more")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
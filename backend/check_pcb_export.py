@@ -0,0 +1,143 @@
+import io
+import os
+import re
+import sys
+import time
+import asyncio
+import zipfile
+import tempfile
+
+# Checks for the PCB export (pcb_export.py) and its jobs (pcb_jobs.py).
+# The KiCad netlist must parse as one s-expression and carry every wire of
+# the diagram; the Gerber zip must hold every layer, with one flashed pad and
+# one drill hit per pin, and no two footprints may overlap. The endpoints run
+# a real export process: the first request starts the job, status polls see it
+# finish, the download is the artifact, and a second request is a cache hit.
+# A job that outlived its claim must not overwrite the export claimed after it.
+#
+# Usage: python check_pcb_export.py
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check.db")
+
+from starlette.testclient import TestClient
+import pcb_export
+import pcb_jobs
+from check_simulation import BENCH
+from main import create_app
+
+failures = []
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def parse(text):
+    # Nested lists of atoms; raises on unbalanced parentheses
+    tokens = re.findall(r'\(|\)|"(?:\\.|[^"\\])*"|[^\s()]+', text)
+    stack = [[]]
+    for token in tokens:
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            done = stack.pop()
+            stack[-1].append(done)
+        else:
+            stack[-1].append(token.strip('"'))
+    if len(stack) != 1 or len(stack[0]) != 1:
+        raise ValueError("unbalanced s-expression")
+    return stack[0][0]
+
+
+def check_netlist():
+    board = pcb_export.board(BENCH)
+    tree = parse(pcb_export.kicad_netlist(board))
+    sections = {item[0]: item[1:] for item in tree[1:] if isinstance(item, list)}
+    check(tree[0] == "export" and len(sections["components"]) == len(BENCH["nodes"]), "the netlist parses and lists every part")
+
+    refs = {part.node_id: part.ref for part in board.parts}
+    pin_number = {(part.ref, pad.name): pad.number for part in board.parts for pad in part.pads}
+    net_of = {}
+    for net in sections["nets"]:
+        name = next(item[1] for item in net[1:] if item[0] == "name")
+        for node in (item for item in net[1:] if item[0] == "node"):
+            fields = {item[0]: item[1] for item in node[1:]}
+            net_of[(fields["ref"], fields["pin"])] = name
+    joined = all(
+        net_of[(refs[c["from"]], pin_number[(refs[c["from"]], c["fromPin"])])]
+        == net_of[(refs[c["to"]], pin_number[(refs[c["to"]], c["toPin"])])]
+        for c in BENCH["connections"]
+    )
+    check(joined, "both ends of every wire are on the same net")
+    check(net_of[(refs["uno"], pin_number[("U1", "5V")])] == "+5V" and net_of[(refs["led"], "2")] == "GND",
+          "rails and ground get KiCad power net names")
+    check(len(net_of) == sum(len(part.pads) for part in board.parts), "unconnected pads are listed too")
+
+
+def check_gerber():
+    board = pcb_export.board(BENCH)
+    archive = zipfile.ZipFile(io.BytesIO(pcb_export.gerber_zip(board)))
+    names = archive.namelist()
+    check(all(any(n.endswith(suffix) for n in names) for suffix in ("F_Cu.gbr", "B_Cu.gbr", "F_Mask.gbr", "Edge_Cuts.gbr", ".drl", "-pos.csv", ".net")),
+          f"the zip holds every layer: {names}")
+    pads = sum(len(part.pads) for part in board.parts)
+    copper = archive.read(next(n for n in names if n.endswith("F_Cu.gbr"))).decode()
+    drill = archive.read(next(n for n in names if n.endswith(".drl"))).decode()
+    check(copper.count("D03*") == pads and copper.strip().endswith("M02*"), f"one flashed pad per pin ({pads})")
+    check(len(re.findall(r"^X[\d.]+Y[\d.]+$", drill, re.M)) == pads, "one drill hit per pin, all on the board")
+    rects = [(p.x, p.y, p.x + p.width, p.y + p.height) for p in board.parts]
+    overlaps = sum(1 for i, a in enumerate(rects) for b in rects[i + 1:] if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3])
+    inside = all(0 < r[0] and 0 < r[1] and r[2] < board.width and r[3] < board.height for r in rects)
+    check(overlaps == 0 and inside, f"footprints are placed without overlaps inside a {board.width:.0f} x {board.height:.0f} mm board")
+    check(pcb_export.gerber_zip(board) == pcb_export.gerber_zip(pcb_export.board(BENCH)), "the same diagram zips to the same bytes")
+
+
+def check_jobs():
+    with TestClient(create_app()) as client:
+        circuit_id = client.post("/api/save", json={"query": "bench", "diagram_data": BENCH, "code": "", "bom": []}).json()["id"]
+        check(client.get(f"/api/circuit/{circuit_id}/pcb?format=kicad").status_code == 404, "no status before an export is requested")
+        started = client.post(f"/api/circuit/{circuit_id}/pcb?format=kicad")
+        check(started.status_code == 202 and started.json()["status"] == "running", f"the export starts in the background: {started.json()}")
+        early = client.get(f"/api/circuit/{circuit_id}/pcb/download?format=kicad")
+        check(early.status_code in (200, 409), "downloads wait for the job")
+
+        deadline = time.monotonic() + 60
+        status = started.json()
+        while status["status"] == "running" and time.monotonic() < deadline:
+            time.sleep(0.1)
+            status = client.get(f"/api/circuit/{circuit_id}/pcb?format=kicad").json()
+        check(status["status"] == "done" and status["url"], f"the job finishes: {status}")
+        download = client.get(status["url"])
+        check(download.status_code == 200 and download.text.startswith("(export") and "attachment" in download.headers["content-disposition"],
+              "the artifact downloads as a netlist file")
+        again = client.post(f"/api/circuit/{circuit_id}/pcb?format=kicad")
+        check(again.status_code == 200 and again.json()["status"] == "done", "a second request is served from the cached artifact")
+        check(client.post("/api/circuit/missing/pcb").status_code == 404, "unknown circuits are a 404")
+
+
+async def check_stale_finish():
+    store = pcb_jobs.MemoryStore()
+    old, _ = await store.claim("c1", "kicad")
+    await store.forget("c1")
+    await asyncio.sleep(0.001)
+    new, _ = await store.claim("c1", "kicad")
+    await store.finish("c1", "kicad", old, body=b"old diagram")
+    row = await store.get("c1", "kicad", body=True)
+    check(row["status"] == "running" and row["body"] is None, "a forgotten job does not finish the export claimed after it")
+    await store.finish("c1", "kicad", new, body=b"new diagram")
+    row = await store.get("c1", "kicad", body=True)
+    check(row["status"] == "done" and row["body"] == b"new diagram", "the current claim finishes its row")
+
+
+def main():
+    check_netlist()
+    check_gerber()
+    asyncio.run(check_stale_finish())
+    check_jobs()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
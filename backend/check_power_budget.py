@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import tempfile
+
+# Checks for the power budget (electrical_profiles.power_budget).
+# The beginner mistakes it exists for: servos and an L298N on the Arduino 5V
+# pin, a motor straight on a GPIO pin, a 5V module on a 3.3V board; and the
+# fixed versions of the same circuits, which must stay quiet. Then the time per
+# diagram, which has to stay under a millisecond for the check to be always-on.
+#
+# Usage: python check_power_budget.py
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check.db")
+
+from electrical_profiles import power_budget, electrical_profiles
+from bench_simulation import synthetic
+
+BUDGET_MS = 1.0
+RUNS = 200
+
+failures = []
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def wire(*ends):
+    return [{"id": f"w{i}", "from": a, "fromPin": a_pin, "to": b, "toPin": b_pin} for i, (a, a_pin, b, b_pin) in enumerate(ends)]
+
+
+def codes(result):
+    return sorted(w["code"] for w in result["warnings"])
+
+
+UNO = {"id": "uno", "type": "Microcontroller", "label": "Arduino UNO", "pins": ["5V", "3V3", "GND", "VIN", "D3", "D5", "D6", "D9"]}
+ESP32 = {"id": "esp", "type": "Microcontroller", "label": "ESP32 DevKit", "pins": ["3V3", "GND", "GPIO4", "GPIO5"]}
+
+
+def servo(node_id):
+    return {"id": node_id, "type": "Module", "label": "SG90 Servo", "pins": ["SIG", "VCC", "GND"]}
+
+
+def check_budget():
+    three_servos = {
+        "nodes": [UNO, servo("s1"), servo("s2"), servo("s3")],
+        "connections": wire(*[(s, "VCC", "uno", "5V") for s in ("s1", "s2", "s3")],
+                            ("uno", "D3", "s1", "SIG"), ("uno", "D5", "s2", "SIG"), ("uno", "D6", "s3", "SIG")),
+    }
+    result = power_budget(three_servos)
+    rail = next(r for r in result["rails"] if r["pin"] == "5V")
+    check(rail["typical_ma"] == 660 and rail["limit_ma"] == 450 and sorted(rail["loads"]) == ["s1", "s2", "s3"],
+          f"three servos add up on the 5V rail: {rail}")
+    check(codes(result) == ["rail_overload"] and result["warnings"][0]["severity"] == "error", f"and overload it: {codes(result)}")
+
+    one_servo = {"nodes": [UNO, servo("s1")], "connections": wire(("s1", "VCC", "uno", "5V"), ("uno", "D3", "s1", "SIG"))}
+    result = power_budget(one_servo)
+    check(codes(result) == ["rail_peak"] and result["warnings"][0]["severity"] == "warning",
+          f"one servo only stalls past the limit: {codes(result)}")
+
+    driver = {"id": "drv", "type": "Module", "label": "L298N Motor Driver",
+              "pins": ["IN1", "IN2", "IN3", "IN4", "OUT1", "OUT2", "OUT3", "OUT4", "12V", "5V", "GND"]}
+    motors = [{"id": m, "type": "Module", "label": "DC Motor", "pins": ["+", "-"]} for m in ("ma", "mb")]
+    motor_wires = [("drv", "OUT1", "ma", "+"), ("drv", "OUT2", "ma", "-"), ("drv", "OUT3", "mb", "+"), ("drv", "OUT4", "mb", "-")]
+    on_board = {"nodes": [UNO, driver, *motors], "connections": wire(("uno", "5V", "drv", "12V"), ("uno", "D3", "drv", "IN1"), *motor_wires)}
+    result = power_budget(on_board)
+    rail = next(r for r in result["rails"] if r["pin"] == "5V")
+    check(codes(result) == ["rail_overload"] and rail["typical_ma"] == 536 and sorted(rail["loads"]) == ["drv", "ma", "mb"],
+          f"motors behind an L298N on the 5V pin count against it: {codes(result)}, {rail['typical_ma']} mA")
+    psu = {"id": "psu", "type": "Power", "label": "12V Power Supply", "pins": ["+", "-"]}
+    separate = {"nodes": [UNO, driver, motors[0], psu], "connections": wire(("psu", "+", "drv", "12V"), ("uno", "D3", "drv", "IN1"), *motor_wires[:2])}
+    result = power_budget(separate)
+    check(not result["warnings"] and next(r for r in result["rails"] if r["node"] == "psu")["typical_ma"] == 286,
+          f"a separate supply for the motors is fine: {codes(result)}")
+    motor = motors[0]
+
+    on_pin = {"nodes": [UNO, motor], "connections": wire(("uno", "D9", "ma", "+"), ("ma", "-", "uno", "GND"))}
+    check(codes(power_budget(on_pin)) == ["gpio_overload"], f"a motor on a GPIO pin is reported: {codes(power_budget(on_pin))}")
+    led = {"nodes": [UNO, {"id": "l", "label": "Red LED", "pins": ["+", "-"]}], "connections": wire(("uno", "D9", "l", "+"))}
+    check(not power_budget(led)["warnings"], "an LED on a GPIO pin is not")
+
+    sonar = {"id": "hc", "type": "Module", "label": "HC-SR04 Ultrasonic Sensor", "pins": ["VCC", "TRIG", "ECHO", "GND"]}
+    low = {"nodes": [ESP32, sonar], "connections": wire(("esp", "3V3", "hc", "VCC"), ("esp", "GPIO4", "hc", "TRIG"))}
+    check(codes(power_budget(low)) == ["under_voltage"], f"a 5V sensor on 3.3V is reported: {codes(power_budget(low))}")
+    loose = {"nodes": [UNO, sonar], "connections": wire(("uno", "D3", "hc", "TRIG"))}
+    check(codes(power_budget(loose)) == ["unpowered"], "an unwired VCC is reported")
+
+    unknown = {"nodes": [UNO, {"id": "x", "label": "Flux Capacitor", "pins": ["VCC", "GND"]}], "connections": wire(("uno", "5V", "x", "VCC"))}
+    result = power_budget(unknown)
+    check(result["unprofiled"] == ["Flux Capacitor"] and not result["warnings"], "parts without a profile are listed, not guessed")
+
+    check(electrical_profiles.lookup("Tower Pro SG90 Servo Motor")["max_ma"] == 650, "labels resolve to the longest known part name")
+
+
+def check_speed():
+    # Generated diagrams are a few dozen parts
+    for components in (20, 50):
+        diagram = synthetic(components)
+        power_budget(diagram)
+        started = time.perf_counter()
+        for _ in range(RUNS):
+            power_budget(diagram)
+        per_diagram = (time.perf_counter() - started) * 1000 / RUNS
+        check(per_diagram < BUDGET_MS, f"{components} components: {per_diagram:.3f} ms per diagram")
+
+
+def main():
+    check_budget()
+    check_speed()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import tempfile
+
+# Checks for the DC simulation (simulation.py) and its socket (/api/ws/simulate).
+# Hand-computed circuits confirm the solver: an LED behind a resistor, a
+# driver turning a motor both ways from a battery, a relay switching a lamp,
+# rails tied together, and per-rail current. The socket checks confirm that
+# a load sends the full state, that inputs send only what changed, and that a
+# burst of inputs is solved as one frame.
+#
+# Usage: python check_simulation.py
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check.db")
+
+from starlette.testclient import TestClient
+from simulation import Circuit, GPIO_OHMS, LED_ON_OHMS
+from main import create_app
+
+failures = []
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def wire(*ends):
+    return [{"id": f"w{i}", "from": a, "fromPin": a_pin, "to": b, "toPin": b_pin} for i, (a, a_pin, b, b_pin) in enumerate(ends)]
+
+
+UNO = {"id": "uno", "type": "Microcontroller", "label": "Arduino UNO", "pins": ["5V", "3V3", "GND", "D2", "D3", "D4", "D5", "D7"]}
+BENCH = {
+    "nodes": [
+        UNO,
+        {"id": "bat", "type": "Power", "label": "9V Battery", "pins": ["+", "-"]},
+        {"id": "r1", "type": "Module", "label": "220Ω Resistor", "pins": ["1", "2"]},
+        {"id": "led", "type": "Module", "label": "Red LED", "pins": ["Anode", "Cathode"]},
+        {"id": "drv", "type": "Module", "label": "L298N Motor Driver", "pins": ["IN1", "IN2", "ENA", "OUT1", "OUT2", "12V", "GND"]},
+        {"id": "motor", "type": "Module", "label": "DC Motor", "pins": ["+", "-"]},
+        {"id": "relay", "type": "Module", "label": "5V Relay Module", "pins": ["IN", "VCC", "GND", "COM", "NO", "NC"]},
+        {"id": "lamp", "type": "Module", "label": "Blue LED", "pins": ["+", "-"]},
+        {"id": "r2", "type": "Module", "label": "1k resistor", "pins": ["a", "b"]},
+        {"id": "btn", "type": "Module", "label": "Push Button", "pins": ["SIG", "GND"]},
+    ],
+    "connections": wire(
+        ("uno", "D4", "r1", "1"), ("r1", "2", "led", "Anode"), ("led", "Cathode", "uno", "GND"),
+        ("bat", "+", "drv", "12V"), ("uno", "D2", "drv", "IN1"), ("uno", "D3", "drv", "IN2"),
+        ("drv", "OUT1", "motor", "+"), ("drv", "OUT2", "motor", "-"),
+        ("uno", "D5", "relay", "IN"), ("uno", "5V", "relay", "VCC"), ("uno", "5V", "relay", "COM"),
+        ("relay", "NO", "r2", "a"), ("r2", "b", "lamp", "+"),
+        ("uno", "D7", "btn", "SIG"),
+    ),
+}
+
+
+def check_solver():
+    circuit = Circuit(BENCH)
+    idle = circuit.solve()
+    check(not idle["elements"]["led"]["on"] and idle["elements"]["motor"]["running"] is False, "nothing runs with every pin low")
+    check(idle["pins"]["uno"]["D7"] == "FLOAT", f"an open button leaves its pin floating: {idle['pins']['uno']['D7']}")
+
+    state = circuit.solve({"pins": {"uno": {"D4": 1}}})
+    expected = (5.0 - 2.0) / (GPIO_OHMS + 220 + LED_ON_OHMS) * 1000
+    led = state["elements"]["led"]
+    check(led["on"] and abs(led["current_ma"] - expected) < 0.05, f"LED current {led['current_ma']} mA, expected {expected:.2f} mA")
+    check(abs(state["elements"]["uno"]["gpio_ma"] - expected) < 0.05, "GPIO current matches the LED branch")
+
+    forward = circuit.solve({"pins": {"uno": {"D2": 1, "D3": 0}}})["elements"]
+    reverse = circuit.solve({"pins": {"uno": {"D2": 0, "D3": 1}}})["elements"]
+    check(forward["motor"]["running"] and forward["motor"]["direction"] == "forward" and forward["drv"]["motors"]["A"] == "forward",
+          f"driver turns the motor forward: {forward['motor']}")
+    check(reverse["motor"]["direction"] == "reverse" and abs(reverse["motor"]["current_ma"] + forward["motor"]["current_ma"]) < 0.01,
+          "and in reverse with the same current")
+
+    state = circuit.solve({"pins": {"uno": {"D2": 1, "D3": 0}}})
+    battery = next(r for r in state["rails"] if r["node"] == "bat")
+    check(battery["current_ma"] > state["elements"]["motor"]["current_ma"] > 300, f"battery supplies the motor ({battery['current_ma']} mA)")
+
+    off = circuit.solve({"pins": {"uno": {"D5": 0}}})
+    on = circuit.solve({"pins": {"uno": {"D5": 1}}})
+    check(not off["elements"]["lamp"]["on"] and on["elements"]["lamp"]["on"] and on["elements"]["relay"]["closed"], "relay switches the lamp")
+    rail = lambda s: next(r for r in s["rails"] if r["node"] == "uno" and r["pin"] == "5V")["current_ma"]
+    check(rail(on) - rail(off) > 70, f"the energized coil and lamp show up on the 5V rail ({rail(off)} -> {rail(on)} mA)")
+
+    pressed = circuit.solve({"pins": {"uno": {"D7": "pullup"}}, "switches": {"btn": True}})
+    released = circuit.solve({"pins": {"uno": {"D7": "pullup"}}})
+    check(pressed["pins"]["uno"]["D7"] == "LOW" and released["pins"]["uno"]["D7"] == "HIGH", "a pulled-up pin reads the button")
+
+    tied = Circuit({"nodes": [UNO, {"id": "bat", "label": "9V Battery", "pins": ["+", "-"]}], "connections": wire(("uno", "5V", "bat", "+"))})
+    check(tied.solve()["problems"] == ["bat + is tied to uno 5V"], "two rails on one net are reported, not solved")
+
+    loose = Circuit({"nodes": [UNO, {"id": "led", "label": "LED", "pins": ["+", "-"]}], "connections": wire(("uno", "D2", "led", "+"))})
+    state = loose.solve({"pins": {"uno": {"D2": 1}}})
+    check(state["elements"]["led"]["on"] and state["assumptions"], "an unwired LED cathode is assumed grounded and said so")
+
+
+def receive(ws):
+    return json.loads(ws.receive_text())
+
+
+def check_socket():
+    with TestClient(create_app()) as client:
+        with client.websocket_connect("/api/ws/simulate") as ws:
+            ws.send_text(json.dumps({"type": "input", "pins": {"uno": {"D4": 1}}}))
+            check(receive(ws)["type"] == "error", "inputs before a load are rejected")
+
+            ws.send_text(json.dumps({"type": "load", "diagram": BENCH}))
+            state = receive(ws)
+            check(state["type"] == "state" and "led" in state["elements"] and state["rails"], "load sends the full state")
+
+            ws.send_text(json.dumps({"type": "input", "pins": {"uno": {"D4": 1}}}))
+            update = receive(ws)
+            check(update["type"] == "update" and set(update.get("elements", {})) == {"led", "r1", "uno"},
+                  f"an input sends only what changed: {sorted(update.get('elements', {}))}")
+            check(update["pins"] == {"uno": {"D4": "HIGH"}}, "and the pin that changed")
+
+            for level in (0, 1, 0, 1, 0, 1):
+                ws.send_text(json.dumps({"type": "input", "pins": {"uno": {"D2": level}}}))
+            time.sleep(0.2)
+            ws.send_text(json.dumps({"type": "input", "switches": {"btn": True}}))
+            frames = []
+            while True:
+                message = receive(ws)
+                frames.append(message)
+                if message.get("elements", {}).get("btn"):
+                    break
+            check(len(frames) < 7, f"a burst of inputs is coalesced into {len(frames)} frames")
+            check(frames[-2]["frame"] < frames[-1]["frame"], "frames are numbered")
+            motor = [f["elements"]["motor"] for f in frames if "motor" in f.get("elements", {})]
+            check(motor and motor[-1]["running"], "the last input wins")
+
+            ws.send_text(json.dumps({"type": "load", "circuit_id": "missing"}))
+            check(receive(ws) == {"type": "error", "detail": "Circuit not found"}, "unknown circuits are an error, not a closed socket")
+
+
+def main():
+    check_solver()
+    check_socket()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import tempfile
+
+# Checks for circuit version history (versions.py, /api/circuit/{id}/versions).
+# Every version must rebuild to exactly what editors saw at that point, from
+# the nearest snapshot plus fewer than SNAPSHOT_EVERY logged versions; log rows
+# must stay the size of one edit however big the diagram is; appends must not
+# slow down as the log grows; and restoring an old version (undo) and then the
+# newer one (redo) must reach open editors and the saved circuit.
+#
+# Usage: python check_versions.py
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check.db")
+
+import sqlalchemy
+from starlette.testclient import TestClient
+import collab
+import metrics
+import versions
+from collab import Document
+from database import DATABASE_URL, circuit_versions, circuit_snapshots
+from bench_simulation import synthetic
+from main import create_app
+
+EDITS = 130
+failures = []
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def check_document():
+    diagram = synthetic(20)
+    document = Document(diagram, "a")
+    node = diagram["nodes"][0]["id"]
+    document.local({"kind": "node", "id": node, "field": "position", "value": {"x": 5, "y": 5}})
+    document.local({"kind": "node", "id": diagram["nodes"][1]["id"], "field": "deleted", "value": True})
+    document.local({"kind": "connection", "id": "wnew", "field": "data", "value": {"from": node, "fromPin": "5V", "to": node, "toPin": "GND"}})
+    loaded = Document.load(json.loads(json.dumps(document.dump())), "b")
+    check(loaded.diagram() == document.diagram() and loaded.state() == document.state(), "documents survive a JSON round trip")
+
+    original = Document(diagram, "c")
+    changes = document.changes_to(original)
+    for op in changes:
+        document.local(op)
+    check(document.diagram() == original.diagram(), "changes_to brings a document back to an older one")
+    # The moved part's position, the new wire, and all of the deleted part
+    check(len(changes) == 4, f"changes_to only touches what differs: {changes}")
+
+
+def move(ws, seq, node, x):
+    ws.send_text(json.dumps({"type": "ops", "seq": seq, "ops": [
+        {"kind": "node", "id": node, "field": "position", "value": {"x": x, "y": 0}},
+    ]}))
+    while "ack" not in json.loads(ws.receive_text()):
+        pass
+
+
+def position(diagram, node):
+    return next(n.get("position") for n in diagram["nodes"] if n["id"] == node)
+
+
+def saved(client, circuit_id, node, expected):
+    # The last editor's handler saves after its socket has closed
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        diagram = client.get(f"/api/circuit/{circuit_id}").json()["diagram_data"]
+        if position(diagram, node) == expected:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def stored(circuit_id):
+    # (version, ops) rows of the log in order, and the snapshot versions
+    engine = sqlalchemy.create_engine(DATABASE_URL)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            sqlalchemy.select(circuit_versions.c.version, circuit_versions.c.ops)
+            .where(circuit_versions.c.circuit_id == circuit_id).order_by(circuit_versions.c.version)
+        ).all()
+        snapshots = conn.execute(sqlalchemy.select(circuit_snapshots.c.version).where(circuit_snapshots.c.circuit_id == circuit_id)).all()
+    return rows, sorted(r[0] for r in snapshots)
+
+
+def replayed(diagram, rows, version):
+    # A version the slow way: the saved diagram plus every logged version up to it
+    document = Document(diagram, "check")
+    for number, ops in rows:
+        if number <= version:
+            for op in ops:
+                document.merge(op)
+    return document.diagram()
+
+
+def edit(client, parts):
+    # Saves a circuit and moves its first part EDITS times, one version each
+    diagram = synthetic(parts)
+    circuit_id = client.post("/api/save", json={"query": "bench", "diagram_data": diagram, "code": "", "bom": []}).json()["id"]
+    node = diagram["nodes"][0]["id"]
+    with client.websocket_connect(f"/api/ws/circuit/{circuit_id}") as ws:
+        ws.receive_text()
+        for i in range(1, EDITS + 1):
+            move(ws, i, node, i)
+    saved(client, circuit_id, node, {"x": EDITS, "y": 0})
+    return circuit_id, diagram, node
+
+
+def check_history():
+    collab.VERSION_SECONDS = 0  # One version per flush
+    with TestClient(create_app()) as client:
+        small_id, _, _ = edit(client, 10)
+        circuit_id, diagram, node = edit(client, 300)
+
+        listed, before = [], None
+        while True:
+            page = client.get(f"/api/circuit/{circuit_id}/versions", params={"limit": 40, **({"before": before} if before else {})}).json()
+            listed += page["versions"]
+            if len(page["versions"]) < 40:
+                break
+            before = page["versions"][-1]["version"]
+        numbers = [v["version"] for v in listed]
+        head = page["head"]
+        # An edit that arrives while the previous flush is being versioned joins it
+        check(head > EDITS * 0.8 and numbers == list(range(head, -1, -1)),
+              f"edits become versions, paged newest first down to 0: head {head}, {len(numbers)} listed")
+
+        rows, snapshots = stored(circuit_id)
+        wrong, replays = [], []
+        for version in (0, 1, 49, 50, 51, 99, head):
+            before_count = metrics.counter("versions.replayed")
+            body = client.get(f"/api/circuit/{circuit_id}/versions/{version}").json()
+            replays.append(metrics.counter("versions.replayed") - before_count)
+            if body["diagram_data"] != replayed(diagram, rows, version):
+                wrong.append(version)
+        check(not wrong, f"snapshot plus replay rebuilds the same versions as the whole log: wrong at {wrong}")
+        check(position(body["diagram_data"], node) == {"x": EDITS, "y": 0}, "the newest version is what editors saw last")
+        check(max(replays) < versions.SNAPSHOT_EVERY, f"rebuilding replays fewer than {versions.SNAPSHOT_EVERY} versions: {replays}")
+        check(client.get(f"/api/circuit/{circuit_id}/versions/{head + 1}").status_code == 404, "future versions are a 404")
+
+        small = [len(json.dumps(ops)) for _, ops in stored(small_id)[0]]
+        large = [len(json.dumps(ops)) for _, ops in rows]
+        check(max(large) <= max(small) + 10 and max(large) < 200,
+              f"log rows are the size of the edit, not the diagram: {max(small)} bytes at 10 parts, {max(large)} at 300")
+        check(snapshots == list(range(0, head + 1, versions.SNAPSHOT_EVERY)), f"snapshots every {versions.SNAPSHOT_EVERY} versions: {snapshots}")
+
+        timings = metrics.timing("versions.append_ms")
+        check(timings["count"] >= head and timings["p95_ms"] < 50, f"appends stay cheap as the log grows: {timings}")
+
+        with client.websocket_connect(f"/api/ws/circuit/{circuit_id}") as ws:
+            ws.receive_text()
+            undo = client.post(f"/api/circuit/{circuit_id}/versions/10/restore").json()
+            message = json.loads(ws.receive_text())
+            check(message["ops"] == [{"kind": "node", "id": node, "field": "position", "value": position(replayed(diagram, rows, 10), node)}],
+                  f"undo reaches open editors as ops: {message}")
+            check(undo["head"] == head + 1, f"undo is a new version, history stays: {undo}")
+            redo = client.post(f"/api/circuit/{circuit_id}/versions/{head}/restore").json()
+            message = json.loads(ws.receive_text())
+            check(message["ops"][0]["value"] == {"x": EDITS, "y": 0} and redo["head"] == head + 2, f"redo restores the newer version: {redo}")
+        check(saved(client, circuit_id, node, {"x": EDITS, "y": 0}), "the saved circuit follows undo and redo")
+
+        small_rows, _ = stored(small_id)
+        client.post(f"/api/circuit/{small_id}/versions/3/restore")
+        check(position(client.get(f"/api/circuit/{small_id}").json()["diagram_data"], node) == position(replayed(synthetic(10), small_rows, 3), node),
+              "restoring a circuit nobody has open saves it")
+        check(client.post(f"/api/circuit/{circuit_id}/versions/999/restore").status_code == 404, "restoring a missing version is a 404")
+
+
+def main():
+    check_document()
+    check_history()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
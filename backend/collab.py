@@ -0,0 +1,389 @@
+import json
+import time
+import uuid
+import asyncio
+import pubsub
+import metrics
+import versions
+from gallery import gallery_feed
+from database import database, circuits
+from response_cache import response_cache
+
+# Real-time collaborative editing of saved circuits.
+# Each circuit being edited is a CRDT document: every node and connection is a
+# set of last-writer-wins registers (the node's data, its canvas position, a
+# deleted flag), stamped with a hybrid clock (max of wall-clock ms and one
+# past the highest stamp seen) and the writing site. Registers merge in any
+# order to the same state, so workers can exchange edits over pubsub without a
+# leader.
+#
+# Editors send field-level ops over a WebSocket, never whole diagrams. The
+# room applies them, and every FLUSH_SECONDS sends each editor one batch of
+# the ops that changed since the last flush, keeping only the latest write
+# per field (a drag is sixty moves a second) and leaving out the editor's own
+# writes. Editors mask incoming ops on fields with writes not yet acked.
+#
+# A room snapshots the document into circuits.diagram_data every
+# SNAPSHOT_SECONDS while it has unsaved edits from its own editors, and when
+# the last editor leaves; not on every op. Its editors' writes also go to the
+# circuit's version history (versions.py), one version per VERSION_SECONDS.
+
+CHANNEL = "collab"
+FLUSH_SECONDS = 0.05
+SNAPSHOT_SECONDS = 10
+VERSION_SECONDS = 1
+# Ops per message from an editor, and bytes per op value
+MAX_OPS = 500
+MAX_VALUE_BYTES = 4000
+FIELDS = {"node": ("data", "position", "deleted"), "connection": ("data", "deleted")}
+ORIGIN = (0, "")  # Stamp of everything loaded from the saved diagram
+
+
+def valid_op(op):
+    # None when the op is well formed, else the problem
+    if not isinstance(op, dict) or op.get("kind") not in FIELDS:
+        return "op kind must be node or connection"
+    if not isinstance(op.get("id"), str) or not op["id"]:
+        return "op needs an id"
+    field, value = op.get("field"), op.get("value")
+    if field not in FIELDS[op["kind"]]:
+        return f"{op['kind']} has no field {field!r}"
+    if field == "deleted" and not isinstance(value, bool):
+        return "deleted must be true or false"
+    if field == "position" and not (isinstance(value, dict) and all(isinstance(value.get(k), (int, float)) for k in ("x", "y"))):
+        return "position must be {x, y}"
+    if field == "data" and not isinstance(value, dict):
+        return "data must be an object"
+    if len(json.dumps(value)) > MAX_VALUE_BYTES:
+        return "op value too large"
+    return None
+
+
+class Document:
+    def __init__(self, diagram, site):
+        self.site = site
+        self.clock = 0
+        self.base = {k: v for k, v in diagram.items() if k not in ("nodes", "connections")}
+        # kind -> id -> field -> [value, stamp]
+        self.elements = {"node": {}, "connection": {}}
+        for node in diagram.get("nodes") or []:
+            if isinstance(node, dict) and node.get("id"):
+                data = {k: v for k, v in node.items() if k not in ("id", "position")}
+                registers = {"data": [data, ORIGIN], "deleted": [False, ORIGIN]}
+                if isinstance(node.get("position"), dict):
+                    registers["position"] = [node["position"], ORIGIN]
+                self.elements["node"][str(node["id"])] = registers
+        for connection in diagram.get("connections") or []:
+            if isinstance(connection, dict) and connection.get("id"):
+                data = {k: v for k, v in connection.items() if k != "id"}
+                self.elements["connection"][str(connection["id"])] = {"data": [data, ORIGIN], "deleted": [False, ORIGIN]}
+
+    def dump(self):
+        return {"base": self.base, "clock": self.clock, "elements": self.elements}
+
+    @classmethod
+    def load(cls, state, site):
+        # Inverse of dump(); JSON turned the stamps into lists
+        document = cls({}, site)
+        document.base = state["base"]
+        document.clock = state["clock"]
+        for kind, elements in state["elements"].items():
+            document.elements[kind] = {
+                element_id: {field: [value, tuple(stamp)] for field, (value, stamp) in registers.items()}
+                for element_id, registers in elements.items()
+            }
+        return document
+
+    def stamp(self):
+        self.clock = max(self.clock + 1, int(time.time() * 1000))
+        return (self.clock, self.site)
+
+    def merge(self, op):
+        # Applies a stamped op; True when it won its register
+        stamp = tuple(op["stamp"])
+        self.clock = max(self.clock, stamp[0])
+        registers = self.elements[op["kind"]].setdefault(op["id"], {})
+        current = registers.get(op["field"])
+        if current is not None and current[1] >= stamp:
+            return False
+        registers[op["field"]] = [op["value"], stamp]
+        if op["field"] != "deleted" and "deleted" not in registers:
+            # Writing to an unknown element creates it
+            registers["deleted"] = [False, ORIGIN]
+        return True
+
+    def local(self, op):
+        # Stamps and applies an editor's op; it always wins locally
+        stamped = {**op, "stamp": self.stamp()}
+        self.merge(stamped)
+        return stamped
+
+    def changes_to(self, target):
+        # Ops that give this document target's values (for restoring a version)
+        ops = []
+        for kind, elements in self.elements.items():
+            wanted = target.elements[kind]
+            for element_id in sorted(elements.keys() | wanted.keys()):
+                goal = wanted.get(element_id) or {"deleted": [True, ORIGIN]}
+                registers = elements.get(element_id, {})
+                # Editors dropped a deleted element; bringing it back resends all of it
+                revived = not goal.get("deleted", [False])[0] and registers.get("deleted", [True])[0]
+                for field, (value, _) in goal.items():
+                    if revived or field not in registers or registers[field][0] != value:
+                        ops.append({"kind": kind, "id": element_id, "field": field, "value": value})
+                if "position" in registers and "position" not in goal and registers["position"][0] is not None:
+                    # Back to the automatic layout
+                    ops.append({"kind": kind, "id": element_id, "field": "position", "value": None})
+        return ops
+
+    def state(self):
+        # Every register as a stamped op, for a worker joining the room
+        return [
+            {"kind": kind, "id": element_id, "field": field, "value": value, "stamp": stamp}
+            for kind, elements in self.elements.items()
+            for element_id, registers in elements.items()
+            for field, (value, stamp) in registers.items()
+        ]
+
+    def diagram(self):
+        nodes, connections = [], []
+        for node_id, registers in self.elements["node"].items():
+            if registers.get("deleted", [True])[0] or "data" not in registers:
+                continue
+            node = {"id": node_id, **registers["data"][0]}
+            if registers.get("position", [None])[0] is not None:
+                node["position"] = registers["position"][0]
+            nodes.append(node)
+        for connection_id, registers in self.elements["connection"].items():
+            if registers.get("deleted", [True])[0] or "data" not in registers:
+                continue
+            connections.append({"id": connection_id, **registers["data"][0]})
+        return {**self.base, "nodes": nodes, "connections": connections}
+
+
+def _delta(op):
+    # What editors get: the op without its stamp
+    return {"kind": op["kind"], "id": op["id"], "field": op["field"], "value": op["value"]}
+
+
+class Room:
+    def __init__(self, circuit_id, diagram):
+        self.circuit_id = circuit_id
+        self.document = Document(diagram, pubsub.WORKER_ID)
+        self.editors = {}  # editor id -> websocket
+        self.acks = {}  # editor id -> seq of its last applied message
+        self.pending = {}  # (kind, id, field) -> (op, editor id or None), since the last flush
+        self.dirty = False
+        self.history = {}  # (kind, id, field) -> latest stamped op of this worker's editors, not yet versioned
+        self.versioned = time.monotonic()
+        # Held while a version or snapshot is written: versions go in the order
+        # they were taken, and close() does not cancel a write halfway
+        self.saving = asyncio.Lock()
+        self.changed = asyncio.Event()
+        self.tasks = [asyncio.create_task(self.flusher()), asyncio.create_task(self.snapshotter())]
+
+    def apply(self, editor_id, ops, seq=None):
+        # Ops from one of this worker's editors
+        started = time.perf_counter()
+        stamped = [self.document.local(op) for op in ops]
+        for op in stamped:
+            self.pending[(op["kind"], op["id"], op["field"])] = (op, editor_id)
+            self.history[(op["kind"], op["id"], op["field"])] = op
+        if seq is not None:
+            self.acks[editor_id] = seq
+        self.dirty = True
+        self.changed.set()
+        metrics.incr("collab.ops", len(ops))
+        metrics.observe("collab.merge_ms", (time.perf_counter() - started) * 1000)
+        return stamped
+
+    def merge_remote(self, ops):
+        # Ops relayed from another worker; only the ones that win reach the editors
+        for op in ops:
+            if op.get("kind") in FIELDS and self.document.merge(op):
+                self.pending[(op["kind"], op["id"], op["field"])] = (op, None)
+                self.changed.set()
+
+    async def flusher(self):
+        while True:
+            await self.changed.wait()
+            await asyncio.sleep(FLUSH_SECONDS)
+            self.changed.clear()
+            await self.flush()
+            if self.history and time.monotonic() - self.versioned >= VERSION_SECONDS:
+                await self.record()
+
+    async def flush(self):
+        pending, self.pending = self.pending, {}
+        acks, self.acks = self.acks, {}
+        local = [op for op, editor_id in pending.values() if editor_id is not None]
+        for chunk in pubsub.chunks(local):
+            await pubsub.publish(CHANNEL, {"circuit": self.circuit_id, "ops": chunk})
+        # Editors without writes in this batch all get the same message
+        origins = {editor_id for _, editor_id in pending.values()}
+        shared = None
+        sends = []
+        for editor_id, websocket in list(self.editors.items()):
+            if websocket is None:
+                continue  # The server restoring a version
+            if editor_id in origins:
+                delta = [_delta(op) for op, origin in pending.values() if origin != editor_id]
+            else:
+                if shared is None:
+                    shared = [_delta(op) for op, _ in pending.values()]
+                delta = shared
+            message = {"type": "ops", "ops": delta}
+            if editor_id in acks:
+                # Editors apply the ack before the ops
+                message["ack"] = acks[editor_id]
+            if delta or "ack" in message:
+                sends.append(self.send(editor_id, websocket, message))
+        await asyncio.gather(*sends)
+
+    async def send(self, editor_id, websocket, message):
+        try:
+            text = json.dumps(message, separators=(",", ":"))
+            await websocket.send_text(text)
+            metrics.incr("collab.bytes_out", len(text))
+        except Exception:
+            # The socket is closing; its handler removes the editor
+            self.editors.pop(editor_id, None)
+
+    async def snapshotter(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_SECONDS)
+            if self.history:
+                await self.record()
+            if self.dirty:
+                await self.snapshot()
+
+    async def record(self):
+        # Appends the edits since the last version to the history; returns the version
+        async with self.saving:
+            if not self.history:
+                return None
+            history, self.history = self.history, {}
+            self.versioned = time.monotonic()
+            try:
+                return await versions.append(self.circuit_id, list(history.values()))
+            except Exception as e:
+                # Keep them for the next try, under anything written since
+                self.history = {**history, **self.history}
+                print(f"Collab version failed for {self.circuit_id}: {e}")
+                return None
+
+    async def snapshot(self):
+        async with self.saving:
+            self.dirty = False
+            started = time.perf_counter()
+            try:
+                await database.execute(
+                    circuits.update().where(circuits.c.id == self.circuit_id).values(diagram_data=self.document.diagram())
+                )
+            except Exception as e:
+                self.dirty = True
+                print(f"Collab snapshot failed for {self.circuit_id}: {e}")
+                return
+            await response_cache.invalidate(f"circuit:{self.circuit_id}")
+            await gallery_feed.changed(self.circuit_id, self.document.diagram())
+            import pcb_jobs  # Artifacts of the old diagram are stale
+
+            await pcb_jobs.forget(self.circuit_id)
+            metrics.incr("collab.snapshots")
+            metrics.observe("collab.snapshot_ms", (time.perf_counter() - started) * 1000)
+
+    async def close(self):
+        # Other workers still need the last ops, and the circuit the last edits
+        async with self.saving:
+            for task in self.tasks:
+                task.cancel()
+        await self.flush()
+        await self.record()
+        if self.dirty:
+            await self.snapshot()
+
+
+class Rooms:
+    def __init__(self):
+        self.rooms = {}  # circuit_id -> Room
+        self.opening = {}  # circuit_id -> future of the Room being loaded
+        self.closing = {}  # circuit_id -> future of the last snapshot
+
+    async def join(self, circuit_id, editor_id, websocket):
+        # The circuit's room with the editor in it; None when there is no such circuit
+        room = self.rooms.get(circuit_id)
+        if room is None:
+            if circuit_id not in self.opening:
+                self.opening[circuit_id] = asyncio.ensure_future(self.open(circuit_id))
+            try:
+                room = await asyncio.shield(self.opening[circuit_id])
+            finally:
+                self.opening.pop(circuit_id, None)
+            if room is None:
+                return None
+        room.editors[editor_id] = websocket
+        metrics.incr("collab.joins")
+        return room
+
+    async def open(self, circuit_id):
+        if circuit_id in self.closing:
+            # A room that just emptied is still saving its edits
+            await asyncio.shield(self.closing[circuit_id])
+        result = await database.fetch_one(circuits.select().where(circuits.c.id == circuit_id))
+        if not result:
+            return None
+        room = Room(circuit_id, result["diagram_data"] or {})
+        self.rooms[circuit_id] = room
+        await versions.start(circuit_id, result["version"], room.document)
+        # Workers already editing this circuit answer with their state
+        await pubsub.publish(CHANNEL, {"circuit": circuit_id, "hello": True})
+        return room
+
+    async def leave(self, room, editor_id):
+        room.editors.pop(editor_id, None)
+        room.acks.pop(editor_id, None)
+        if not room.editors and self.rooms.get(room.circuit_id) is room:
+            del self.rooms[room.circuit_id]
+            self.closing[room.circuit_id] = closing = asyncio.ensure_future(room.close())
+            try:
+                await asyncio.shield(closing)
+            finally:
+                if self.closing.get(room.circuit_id) is closing:
+                    del self.closing[room.circuit_id]
+
+    async def restore(self, circuit_id, target):
+        # Gives the circuit target's values (a versions.rebuild Document) as one
+        # more edit, so open editors see it and the history keeps what it replaced.
+        # False when there is no such circuit.
+        editor_id = f"restore-{uuid.uuid4().hex[:8]}"
+        room = await self.join(circuit_id, editor_id, None)
+        if room is None:
+            return False
+        try:
+            # Unversioned edits come before the restore, so it can be undone too
+            await room.record()
+            room.apply(editor_id, room.document.changes_to(target))
+            await room.record()
+        finally:
+            await self.leave(room, editor_id)
+        return True
+
+    async def close_all(self):
+        # Worker shutdown: save what the open rooms have not saved yet
+        rooms, self.rooms = list(self.rooms.values()), {}
+        for room in rooms:
+            await room.close()
+
+    async def on_notify(self, data):
+        room = self.rooms.get((data or {}).get("circuit"))
+        if room is None:
+            return
+        if data.get("hello"):
+            for chunk in pubsub.chunks(room.document.state()):
+                await pubsub.publish(CHANNEL, {"circuit": room.circuit_id, "ops": chunk})
+        elif isinstance(data.get("ops"), list):
+            room.merge_remote(data["ops"])
+
+
+collab_rooms = Rooms()
+pubsub.subscribe(CHANNEL, collab_rooms.on_notify)
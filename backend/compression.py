@@ -0,0 +1,192 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Brotli/gzip response compression.
+# CompressionMiddleware compresses responses on the fly (streaming included);
+# responses that already carry a Content-Encoding, such as precompressed cache
+# hits from response_cache.py, pass through untouched. A compressed body is a
+# different representation from the identity one, so its ETag gets the encoding
+# as a suffix ("<tag>-br"); revalidating with such a tag also offers the plain
+# tag to the handler, which can then answer 304 as usual.
+
+MINIMUM_SIZE = 1024
+
+# On-the-fly levels favour CPU; precompressed entries are built once, so they
+# can afford the slower, denser settings.
+DYNAMIC_LEVELS = {"br": 4, "gzip": 6}
+STATIC_LEVELS = {"br": 9, "gzip": 9}
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/yaml",
+    "application/javascript",
+    "image/svg+xml",
+)
+# Compressing an event stream would buffer events inside the compressor
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli else ("gzip",)
+
+
+def negotiate(accept_encoding):
+    # Best supported encoding the client accepts, preferring br, else None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token] = quality
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def encoded_etag(etag, encoding):
+    # '"abc"' -> '"abc-br"', 'W/"abc"' -> 'W/"abc-br"'
+    if not etag.endswith('"') or etag.endswith(f'-{encoding}"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match, etag):
+    return etag in (tag.strip() for tag in (if_none_match or "").split(","))
+
+
+def is_compressible(content_type):
+    content_type = (content_type or "").lower()
+    if content_type.startswith(UNCOMPRESSIBLE_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(data, encoding, level=None):
+    level = level if level is not None else STATIC_LEVELS[encoding]
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+class StreamCompressor:
+    def __init__(self, encoding, level=None):
+        level = level if level is not None else DYNAMIC_LEVELS[encoding]
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        # Flushes after every chunk so streamed JSON reaches the client promptly
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = negotiate(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        tags = [tag.strip() for tag in headers.get("if-none-match", "").split(",") if tag.strip()]
+        plain = [tag[:-len(encoding) - 2] + '"' for tag in tags if tag.endswith(f'-{encoding}"')]
+        if plain:
+            # The client holds our compressed body; let the handler match its own tag
+            scope = dict(scope)
+            scope["headers"] = [(k, v) for k, v in scope["headers"] if k != b"if-none-match"] + [
+                (b"if-none-match", ", ".join(tags + plain).encode("latin-1"))
+            ]
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size, bool(plain)))
+
+
+class _CompressingSend:
+    def __init__(self, send, encoding, minimum_size, revalidating=False):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.revalidating = revalidating
+        self.start = None
+        self.passthrough = False
+        self.compressor = None
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if message["status"] == 304 and self.revalidating and "etag" in headers:
+                # Confirms the compressed copy the client revalidated
+                MutableHeaders(raw=message["headers"])["ETag"] = encoded_etag(headers["etag"], self.encoding)
+            self.start = message
+            self.passthrough = "content-encoding" in headers or not is_compressible(headers.get("content-type"))
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            if self.start is not None:
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+            return
+
+        if self.start is not None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            if not more_body:
+                # Whole body in one message
+                if len(body) < self.minimum_size:
+                    await self.send(self.start)
+                    await self.send(message)
+                    self.start = None
+                    return
+                body = compress(body, self.encoding, DYNAMIC_LEVELS[self.encoding])
+                headers["Content-Length"] = str(len(body))
+            else:
+                self.compressor = StreamCompressor(self.encoding)
+                del headers["Content-Length"]
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+            await self.send(self.start)
+            self.start = None
+            if self.compressor is None:
+                await self.send({"type": "http.response.body", "body": body})
+                return
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -31,6 +31,45 @@ circuits = sqlalchemy.Table(
     sqlalchemy.Column("code", sqlalchemy.Text, nullable=True),
     sqlalchemy.Column("bom", sqlalchemy.JSON, nullable=True),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime, default=datetime.utcnow),
+    sqlalchemy.Column("version", sqlalchemy.Integer, nullable=True, default=0), # Head of circuit_versions
+)
+
+# Circuit History (see versions.py): the operation log, one row per version
+# holding only the fields that changed, and periodic full snapshots
+circuit_versions = sqlalchemy.Table(
+    "circuit_versions",
+    metadata,
+    sqlalchemy.Column("circuit_id", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("version", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("ops", sqlalchemy.JSON, nullable=False), # Stamped collab ops
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, default=datetime.utcnow),
+)
+
+circuit_snapshots = sqlalchemy.Table(
+    "circuit_snapshots",
+    metadata,
+    sqlalchemy.Column("circuit_id", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("version", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("state", sqlalchemy.JSON, nullable=False), # collab.Document.dump()
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, default=datetime.utcnow),
+)
+
+# Community Gallery (see gallery.py): one summary per saved circuit, so the
+# feed never reads diagram_data. rank is the log of the decayed trending score.
+gallery = sqlalchemy.Table(
+    "gallery",
+    metadata,
+    sqlalchemy.Column("circuit_id", sqlalchemy.String, sqlalchemy.ForeignKey("circuits.id"), primary_key=True),
+    sqlalchemy.Column("title", sqlalchemy.String, nullable=True), # The circuit's query
+    sqlalchemy.Column("thumbnail", sqlalchemy.Text, nullable=True), # Small SVG
+    sqlalchemy.Column("part_count", sqlalchemy.Integer, nullable=False, default=0),
+    sqlalchemy.Column("connection_count", sqlalchemy.Integer, nullable=False, default=0),
+    sqlalchemy.Column("tags", sqlalchemy.JSON, nullable=True),
+    sqlalchemy.Column("views", sqlalchemy.Integer, nullable=False, default=0),
+    sqlalchemy.Column("likes", sqlalchemy.Integer, nullable=False, default=0),
+    sqlalchemy.Column("rank", sqlalchemy.Float, nullable=False, index=True),
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, nullable=False, index=True),
+    sqlalchemy.Column("updated_at", sqlalchemy.DateTime, default=datetime.utcnow),
 )
 
 # AI Courses Table (for AI Guide/Module)
@@ -45,6 +84,10 @@ ai_courses = sqlalchemy.Table(
     sqlalchemy.Column("image_url", sqlalchemy.JSON, nullable=True),
     sqlalchemy.Column("course_type", sqlalchemy.String, default="python_master"), # 'python_master' or 'ai_kids'
     sqlalchemy.Column("created_at", sqlalchemy.DateTime, default=datetime.utcnow),
+    # Pre-rendered Markdown (see markdown_render.py)
+    sqlalchemy.Column("content_html", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("content_toc", sqlalchemy.JSON, nullable=True),
+    sqlalchemy.Column("content_hash", sqlalchemy.String, nullable=True),
 )
 
 # Components Table (for Study Guide)
@@ -58,4 +101,119 @@ components = sqlalchemy.Table(
     sqlalchemy.Column("wiring_guide", sqlalchemy.Text, nullable=True),
     sqlalchemy.Column("image_url", sqlalchemy.JSON, nullable=True),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime, default=datetime.utcnow),
+    # Pre-rendered Markdown (see markdown_render.py)
+    sqlalchemy.Column("description_html", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("description_toc", sqlalchemy.JSON, nullable=True),
+    sqlalchemy.Column("wiring_guide_html", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("content_hash", sqlalchemy.String, nullable=True),
+    # Electrical profile (see electrical_profiles.py): supply volts, mA, and
+    # for boards and supplies the mA each rail pin can deliver
+    sqlalchemy.Column("supply_voltage", sqlalchemy.Float, nullable=True),
+    sqlalchemy.Column("typical_ma", sqlalchemy.Float, nullable=True),
+    sqlalchemy.Column("max_ma", sqlalchemy.Float, nullable=True),
+    sqlalchemy.Column("rail_limits", sqlalchemy.JSON, nullable=True),
 )
+
+# Parts Price Catalog (for deterministic BOM pricing, see bom_engine.py)
+parts_prices = sqlalchemy.Table(
+    "parts_prices",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("name", sqlalchemy.String, unique=True, nullable=False), # Matches components.name
+    sqlalchemy.Column("aliases", sqlalchemy.JSON, nullable=True), # Other labels for the same part
+    sqlalchemy.Column("unit_price", sqlalchemy.Numeric(10, 2), nullable=False), # USD
+    sqlalchemy.Column("source", sqlalchemy.String, nullable=True),
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, default=datetime.utcnow),
+)
+
+# User Inventory (parts a user owns, see inventory.py)
+inventory = sqlalchemy.Table(
+    "inventory",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("user_id", sqlalchemy.Integer, sqlalchemy.ForeignKey("users.id"), nullable=False, index=True),
+    sqlalchemy.Column("component", sqlalchemy.String, nullable=False), # Part name, ideally a components.name
+    sqlalchemy.Column("quantity", sqlalchemy.Integer, nullable=False, default=1),
+    sqlalchemy.Column("category", sqlalchemy.String, nullable=True), # Defaults to the components category
+    sqlalchemy.Column("updated_at", sqlalchemy.DateTime, default=datetime.utcnow),
+    sqlalchemy.UniqueConstraint("user_id", "component"),
+)
+
+# Idempotency Keys (stored responses for retried requests, see idempotency.py)
+idempotency_keys = sqlalchemy.Table(
+    "idempotency_keys",
+    metadata,
+    sqlalchemy.Column("key", sqlalchemy.String, primary_key=True), # "<scope>:<Idempotency-Key header>"
+    sqlalchemy.Column("fingerprint", sqlalchemy.String, nullable=False), # Hash of the request body
+    sqlalchemy.Column("response", sqlalchemy.JSON(none_as_null=True), nullable=True), # NULL while in flight
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, default=datetime.utcnow),
+    sqlalchemy.Column("expires_at", sqlalchemy.DateTime, nullable=False, index=True),
+)
+
+# PCB export artifacts (see pcb_jobs.py): one row per circuit, format and
+# exporter version, which is the job while it runs and the cached artifact after
+pcb_exports = sqlalchemy.Table(
+    "pcb_exports",
+    metadata,
+    sqlalchemy.Column("circuit_id", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("format", sqlalchemy.String, primary_key=True), # kicad, gerber
+    sqlalchemy.Column("version", sqlalchemy.Integer, primary_key=True), # pcb_export.PCB_VERSION
+    sqlalchemy.Column("status", sqlalchemy.String, nullable=False), # running, done, failed
+    sqlalchemy.Column("body", sqlalchemy.LargeBinary, nullable=True),
+    sqlalchemy.Column("error", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, default=datetime.utcnow),
+    sqlalchemy.Column("finished_at", sqlalchemy.DateTime, nullable=True),
+)
+
+# LLM Rate Budget (token buckets shared by all workers, see llm_budget.py)
+llm_budget = sqlalchemy.Table(
+    "llm_budget",
+    metadata,
+    sqlalchemy.Column("name", sqlalchemy.String, primary_key=True), # "<backend>.requests" or "<backend>.tokens"
+    sqlalchemy.Column("available", sqlalchemy.Float, nullable=False), # May go negative after a large answer
+    sqlalchemy.Column("updated_at", sqlalchemy.DateTime(timezone=True), nullable=False), # Last refill, database clock
+)
+
+# Schema changes that create_all cannot apply to existing tables.
+# Modules append idempotent DDL here; it runs once at startup after create_all.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE ai_courses ADD COLUMN IF NOT EXISTS content_html TEXT",
+    "ALTER TABLE ai_courses ADD COLUMN IF NOT EXISTS content_toc JSON",
+    "ALTER TABLE ai_courses ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+    "ALTER TABLE components ADD COLUMN IF NOT EXISTS description_html TEXT",
+    "ALTER TABLE components ADD COLUMN IF NOT EXISTS description_toc JSON",
+    "ALTER TABLE components ADD COLUMN IF NOT EXISTS wiring_guide_html TEXT",
+    "ALTER TABLE components ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+    "ALTER TABLE components ADD COLUMN IF NOT EXISTS supply_voltage DOUBLE PRECISION",
+    "ALTER TABLE components ADD COLUMN IF NOT EXISTS typical_ma DOUBLE PRECISION",
+    "ALTER TABLE components ADD COLUMN IF NOT EXISTS max_ma DOUBLE PRECISION",
+    "ALTER TABLE components ADD COLUMN IF NOT EXISTS rail_limits JSON",
+    "ALTER TABLE circuits ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 0",
+]
+
+def upgrade_schema(engine):
+    if engine.dialect.name != "postgresql":
+        return
+    for statement in SCHEMA_UPGRADES:
+        try:
+            with engine.begin() as conn:
+                conn.execute(sqlalchemy.text(statement))
+        except Exception as e:
+            print(f"Schema upgrade failed: {e}\n  {statement}")
+
+# pg_advisory_lock key for schema setup
+SCHEMA_LOCK_ID = 7301
+
+def setup_schema(engine):
+    # Every worker runs this at startup; the lock keeps them from racing each
+    # other's CREATE TABLE and ALTER TABLE statements
+    if engine.dialect.name != "postgresql":
+        metadata.create_all(engine)
+        return
+    with engine.connect() as lock:
+        lock.execute(sqlalchemy.text("SELECT pg_advisory_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+        try:
+            metadata.create_all(engine)
+            upgrade_schema(engine)
+        finally:
+            lock.execute(sqlalchemy.text("SELECT pg_advisory_unlock(:id)"), {"id": SCHEMA_LOCK_ID})
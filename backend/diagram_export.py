@@ -0,0 +1,254 @@
+import json
+import zlib
+import hashlib
+from collections import OrderedDict
+from html import escape
+import numpy as np
+from diagram_geometry import layout, WIRE_LABEL_FONT, WIRE_LABEL_CHAR_WIDTH, LABEL_CHAR_WIDTH, PIN_CHAR_WIDTH, HEADER_HEIGHT
+
+# SVG and PDF export of diagrams (ROADMAP: Export to PDF/SVG).
+# Geometry comes from diagram_geometry.layout; this module only draws it. The
+# PDF is written by hand (one page, base-14 fonts, a deflated content stream)
+# so no rendering library is needed. Exports are cached by a hash of the
+# diagram content, so the same diagram is only drawn once however it is
+# reached, and the hash doubles as the ETag.
+
+# Bump when the drawing changes so cached exports are not served stale
+RENDER_VERSION = 2
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+MARGIN = 40
+# PDF pages are limited to 200 inches; bigger diagrams are scaled down
+MAX_PDF_POINTS = 14400
+
+FORMATS = {"svg": "image/svg+xml", "pdf": "application/pdf"}
+
+# Same palette as the editor
+WIRE_COLORS = {
+    "red": "#DC2626", "black": "#1F2937", "blue": "#2563EB", "green": "#16A34A",
+    "yellow": "#CA8A04", "orange": "#EA580C", "purple": "#9333EA", "white": "#9CA3AF",
+}
+DEFAULT_WIRE = "#000000"
+BACKGROUND = "#F9FAFB"
+CONTROLLER_BORDER, CONTROLLER_HEADER = "#3B82F6", "#3B82F6"
+MODULE_BORDER, MODULE_HEADER = "#9CA3AF", "#F3F4F6"
+PIN_COLOR = "#4B5563"
+TEXT_COLOR = "#1F2937"
+ARROW_LENGTH, ARROW_HALF_WIDTH = 8, 4
+
+
+def content_hash(diagram, fmt):
+    canonical = json.dumps(diagram, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{RENDER_VERSION}:{fmt}:{canonical}".encode()).hexdigest()
+
+
+def _arrowheads(geometry):
+    # (W, 3, 2) triangles pointing into the target pin
+    end = geometry.wire_points[:, 5]
+    direction = np.sign(end[:, 0] - geometry.wire_points[:, 4, 0])
+    direction[direction == 0] = 1
+    base_x = end[:, 0] - direction * ARROW_LENGTH
+    return np.stack([
+        end,
+        np.column_stack([base_x, end[:, 1] - ARROW_HALF_WIDTH]),
+        np.column_stack([base_x, end[:, 1] + ARROW_HALF_WIDTH]),
+    ], axis=1)
+
+
+def _frame(geometry):
+    # Offset that moves the bounding box to (MARGIN, MARGIN), and the page size
+    x0, y0, x1, y1 = geometry.bbox
+    offset = np.array([MARGIN - x0, MARGIN - y0])
+    return offset, float(x1 - x0 + 2 * MARGIN), float(y1 - y0 + 2 * MARGIN)
+
+
+def _wire_color(color):
+    return WIRE_COLORS.get(color, DEFAULT_WIRE)
+
+
+def _points(array):
+    return " ".join(f"{x:.1f},{y:.1f}" for x, y in array.tolist())
+
+
+def render_svg(geometry):
+    offset, width, height = _frame(geometry)
+    boxes = (geometry.boxes + np.tile(offset, 2)).tolist()
+    wires = geometry.wire_points + offset
+    arrows = _arrowheads(geometry) + offset
+    pins = (geometry.pin_xy + offset).tolist()
+    labels = (geometry.label_boxes + np.tile(offset, 2)).tolist()
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+        f'viewBox="0 0 {width:.1f} {height:.1f}" font-family="Helvetica, Arial, sans-serif">',
+        f'<rect width="100%" height="100%" fill="{BACKGROUND}"/>',
+        '<g fill="none" stroke-width="2">',
+    ]
+    for points, color in zip(wires, geometry.wire_colors):
+        out.append(f'<polyline points="{_points(points)}" stroke="{_wire_color(color)}"/>')
+    out.append('</g><g stroke="none">')
+    for points, color in zip(arrows, geometry.wire_colors):
+        out.append(f'<polygon points="{_points(points)}" fill="{_wire_color(color)}"/>')
+    out.append("</g>")
+
+    for (x0, y0, x1, y1), label, controller in zip(boxes, geometry.node_labels, geometry.controller.tolist()):
+        border, header = (CONTROLLER_BORDER, CONTROLLER_HEADER) if controller else (MODULE_BORDER, MODULE_HEADER)
+        out.append(
+            f'<rect x="{x0:.1f}" y="{y0:.1f}" width="{x1 - x0:.1f}" height="{y1 - y0:.1f}" rx="8" '
+            f'fill="#FFFFFF" stroke="{border}" stroke-width="2"/>'
+            f'<rect x="{x0 + 1:.1f}" y="{y0 + 1:.1f}" width="{x1 - x0 - 2:.1f}" height="{HEADER_HEIGHT - 2}" rx="7" fill="{header}"/>'
+            f'<text x="{(x0 + x1) / 2:.1f}" y="{y0 + HEADER_HEIGHT / 2 + 5:.1f}" text-anchor="middle" font-size="14" '
+            f'font-weight="bold" fill="{"#FFFFFF" if controller else TEXT_COLOR}">{escape(label)}</text>'
+        )
+
+    out.append(f'<g font-family="Courier, monospace" font-size="12" fill="{TEXT_COLOR}">')
+    for (x, y), name, side in zip(pins, geometry.pin_names, geometry.pin_side.tolist()):
+        anchor, text_x = ("start", x + 12) if side < 0 else ("end", x - 12)
+        out.append(
+            f'<circle cx="{x:.1f}" cy="{y:.1f}" r="5" fill="{PIN_COLOR}" stroke="#FFFFFF" stroke-width="2"/>'
+            f'<text x="{text_x:.1f}" y="{y + 4:.1f}" text-anchor="{anchor}">{escape(name)}</text>'
+        )
+    out.append("</g>")
+
+    out.append(f'<g font-size="{WIRE_LABEL_FONT}" font-weight="600">')
+    for (x0, y0, x1, y1), text, color in zip(labels, geometry.wire_labels, geometry.wire_colors):
+        out.append(
+            f'<rect x="{x0:.1f}" y="{y0:.1f}" width="{x1 - x0:.1f}" height="{y1 - y0:.1f}" fill="#FFFFFF" fill-opacity="0.9"/>'
+            f'<text x="{(x0 + x1) / 2:.1f}" y="{y1 - 3.5:.1f}" text-anchor="middle" fill="{_wire_color(color)}">{escape(text)}</text>'
+        )
+    out.append("</g></svg>")
+    return "\n".join(out).encode()
+
+
+def _pdf_color(color):
+    return " ".join(f"{int(color[i:i + 2], 16) / 255:.3f}" for i in (1, 3, 5)).encode()
+
+
+PDF_COLORS = {
+    color: _pdf_color(color)
+    for color in [*WIRE_COLORS.values(), DEFAULT_WIRE, BACKGROUND, CONTROLLER_BORDER, MODULE_BORDER, MODULE_HEADER, PIN_COLOR, TEXT_COLOR]
+}
+
+
+def _rgb(color):
+    return PDF_COLORS.get(color) or _pdf_color(color)
+
+
+def _pdf_text(text):
+    # Base-14 fonts only cover WinAnsi; the wire label arrow becomes "->"
+    data = text.replace("→", "->").encode("cp1252", "replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _text(font, size, x, y, text):
+    # The page is drawn y-down like SVG, so text is flipped back upright
+    return b"BT /%s %g Tf 1 0 0 -1 %.1f %.1f Tm (%s) Tj ET" % (font, size, x, y, _pdf_text(text))
+
+
+def render_pdf(geometry):
+    offset, width, height = _frame(geometry)
+    scale = min(1.0, MAX_PDF_POINTS / max(width, height))
+    boxes = (geometry.boxes + np.tile(offset, 2)).tolist()
+    wires = geometry.wire_points + offset
+    arrows = _arrowheads(geometry) + offset
+    pins = (geometry.pin_xy + offset).tolist()
+    labels = (geometry.label_boxes + np.tile(offset, 2)).tolist()
+
+    ops = [
+        # Scale, and flip to y-down so coordinates match the SVG
+        b"%.4f 0 0 %.4f 0 %.2f cm" % (scale, -scale, height * scale),
+        b"%s rg 0 0 %.1f %.1f re f" % (_rgb(BACKGROUND), width, height),
+        b"2 w 1 j",
+    ]
+    for points, arrow, color in zip(wires, arrows, geometry.wire_colors):
+        rgb = _rgb(_wire_color(color))
+        (x, y), *rest = points.tolist()
+        path = b" ".join(b"%.1f %.1f l" % (px, py) for px, py in rest)
+        (ax, ay), (bx, by), (cx, cy) = arrow.tolist()
+        ops.append(b"%s RG %s rg %.1f %.1f m %s S %.1f %.1f m %.1f %.1f l %.1f %.1f l f" % (
+            rgb, rgb, x, y, path, ax, ay, bx, by, cx, cy))
+
+    for (x0, y0, x1, y1), label, controller in zip(boxes, geometry.node_labels, geometry.controller.tolist()):
+        border, header = (CONTROLLER_BORDER, CONTROLLER_HEADER) if controller else (MODULE_BORDER, MODULE_HEADER)
+        ops.append(b"1 1 1 rg %s RG %.1f %.1f %.1f %.1f re B" % (_rgb(border), x0, y0, x1 - x0, y1 - y0))
+        ops.append(b"%s rg %.1f %.1f %.1f %.1f re f" % (_rgb(header), x0 + 1, y0 + 1, x1 - x0 - 2, HEADER_HEIGHT - 2))
+        ops.append((b"1 1 1 rg " if controller else b"%s rg " % _rgb(TEXT_COLOR))
+                   + _text(b"F1", 14, (x0 + x1 - len(label) * LABEL_CHAR_WIDTH) / 2, y0 + HEADER_HEIGHT / 2 + 5, label))
+
+    ops.append(b"%s rg" % _rgb(TEXT_COLOR))
+    pin_rgb = _rgb(PIN_COLOR)
+    for (x, y), name, side in zip(pins, geometry.pin_names, geometry.pin_side.tolist()):
+        text_x = x + 12 if side < 0 else x - 12 - len(name) * PIN_CHAR_WIDTH
+        ops.append(b"%s rg %.1f %.1f 8 8 re f %s rg " % (pin_rgb, x - 4, y - 4, _rgb(TEXT_COLOR))
+                   + _text(b"F2", 12, text_x, y + 4, name))
+
+    for (x0, y0, x1, y1), text, color in zip(labels, geometry.wire_labels, geometry.wire_colors):
+        text_x = (x0 + x1 - len(text) * WIRE_LABEL_CHAR_WIDTH) / 2
+        ops.append(b"1 1 1 rg %.1f %.1f %.1f %.1f re f %s rg " % (x0, y0, x1 - x0, y1 - y0, _rgb(_wire_color(color)))
+                   + _text(b"F3", WIRE_LABEL_FONT, text_x, y1 - 3.5, text))
+
+    stream = zlib.compress(b"\n".join(ops), 3)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R /F2 6 0 R /F3 7 0 R >> >> >>" % (width * scale, height * scale),
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream),
+    ] + [
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % font
+        for font in (b"Helvetica-Bold", b"Courier", b"Helvetica")
+    ]
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+RENDERERS = {"svg": render_svg, "pdf": render_pdf}
+
+
+class ExportCache:
+    # LRU of rendered exports by content hash, bounded by total size. Keys
+    # are content addressed, so nothing ever needs invalidating.
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.entries = OrderedDict()
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def get(self, key):
+        body = self.entries.get(key)
+        if body is not None:
+            self.entries.move_to_end(key)
+        return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes or key in self.entries:
+            return
+        self.entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+export_cache = ExportCache()
+
+
+def render(diagram, fmt):
+    # Rendered bytes for `diagram` in `fmt` ("svg" or "pdf"), uncached
+    return RENDERERS[fmt](layout(diagram))
+
+
+def export(diagram, fmt):
+    digest = content_hash(diagram, fmt)
+    body = export_cache.get(digest)
+    if body is None:
+        body = render(diagram, fmt)
+        export_cache.put(digest, body)
+    return body
@@ -0,0 +1,274 @@
+from dataclasses import dataclass
+import numpy as np
+
+# Server-side geometry for saved diagrams, used by the SVG/PDF export.
+# Mirrors the editor (CircuitMaker.jsx): parts at their saved position, the
+# rest with the controller at (300, 200) and peripherals on a half circle to
+# its right, pins in rows under a header
+# (controllers split their pins over a left and a right column), smoothstep
+# wires and "FROM → TO" labels at the middle of each wire. Boxes, pins and wire
+# polylines are NumPy arrays so bounding boxes and collisions are computed in
+# one pass over all elements, and a 1000-wire diagram lays out in milliseconds.
+# When the half circle would put nodes on top of each other, unplaced
+# peripherals are stacked in columns instead.
+
+# Sizes in CSS pixels, matching the node styles in the editor
+HEADER_HEIGHT = 36
+ROW_HEIGHT = 24
+PIN_CHAR_WIDTH = 7.2  # text-xs monospace
+LABEL_CHAR_WIDTH = 8.4  # text-sm bold
+PIN_PADDING = 32  # px-3 plus the gap between handle and name
+HEADER_PADDING = 32
+
+WIRE_STUB = 20  # straight run out of a pin before the wire turns
+WIRE_LABEL_FONT = 10
+WIRE_LABEL_CHAR_WIDTH = 6.0
+WIRE_LABEL_HEIGHT = 14
+
+CONTROLLER_POSITION = (300.0, 200.0)
+ARC_CENTER = (500.0, 300.0)
+ARC_RADIUS = 300.0
+COLUMN_GAP = 160.0
+ROW_GAP = 24.0
+NUDGE_ROUNDS = 6
+
+
+@dataclass
+class Geometry:
+    node_ids: list
+    node_labels: list
+    controller: np.ndarray  # (N,) bool
+    boxes: np.ndarray  # (N, 4) x0, y0, x1, y1
+    pin_names: list
+    pin_node: np.ndarray  # (P,) index into nodes
+    pin_xy: np.ndarray  # (P, 2)
+    pin_side: np.ndarray  # (P,) -1 for a left handle, +1 for a right one
+    wire_ids: list
+    wire_colors: list
+    wire_labels: list
+    wire_points: np.ndarray  # (W, 6, 2) orthogonal polylines
+    label_boxes: np.ndarray  # (W, 4)
+    bbox: np.ndarray  # (4,) over nodes, wires and labels
+
+    def stats(self):
+        return {
+            "nodes": len(self.node_ids),
+            "pins": len(self.pin_names),
+            "wires": len(self.wire_ids),
+            "width": float(self.bbox[2] - self.bbox[0]),
+            "height": float(self.bbox[3] - self.bbox[1]),
+            "node_overlaps": overlap_count(self.boxes),
+            "label_overlaps": overlap_count(self.label_boxes),
+        }
+
+
+def overlaps(a, b):
+    # (len(a), len(b)) bool matrix of boxes whose interiors intersect
+    return (
+        (a[:, None, 0] < b[None, :, 2]) & (b[None, :, 0] < a[:, None, 2])
+        & (a[:, None, 1] < b[None, :, 3]) & (b[None, :, 1] < a[:, None, 3])
+    )
+
+
+def overlap_count(boxes):
+    if len(boxes) < 2:
+        return 0
+    return int(np.triu(overlaps(boxes, boxes), k=1).sum())
+
+
+def bounding_box(*arrays):
+    # Arrays of boxes (n, 4) or points (..., 2)
+    points = [a.reshape(-1, 2) for a in arrays if a.size]
+    if not points:
+        return np.zeros(4)
+    points = np.concatenate(points)
+    return np.concatenate([points.min(axis=0), points.max(axis=0)])
+
+
+def _pin_columns(node):
+    pins = [str(p) for p in node.get("pins") or []]
+    if node.get("type") == "Microcontroller":
+        midpoint = (len(pins) + 1) // 2
+        return pins[:midpoint], pins[midpoint:]
+    return [], pins
+
+
+def _sizes(nodes, columns):
+    widths = np.empty(len(nodes))
+    heights = np.empty(len(nodes))
+    for i, (node, (left, right)) in enumerate(zip(nodes, columns)):
+        column = [max((len(p) for p in pins), default=0) * PIN_CHAR_WIDTH + PIN_PADDING for pins in (left, right) if pins]
+        header = len(str(node.get("label") or "")) * LABEL_CHAR_WIDTH + HEADER_PADDING
+        widths[i] = max(header, sum(column))
+        heights[i] = HEADER_HEIGHT + ROW_HEIGHT * max(len(left), len(right))
+    return widths, heights
+
+
+def _arc_layout(controller, widths, heights):
+    # The editor's layout: top-left corners
+    positions = np.empty((len(widths), 2))
+    peripherals = np.flatnonzero(~controller)
+    positions[controller] = CONTROLLER_POSITION
+    angles = np.arange(len(peripherals)) / max(len(peripherals), 1) * np.pi - np.pi / 2
+    positions[peripherals, 0] = ARC_CENTER[0] + np.cos(angles) * ARC_RADIUS
+    positions[peripherals, 1] = ARC_CENTER[1] + np.sin(angles) * ARC_RADIUS
+    return positions
+
+
+def _column_layout(controller, widths, heights):
+    # Controllers stacked on the left, peripherals in columns to their right
+    positions = np.zeros((len(widths), 2))
+    controllers = np.flatnonzero(controller)
+    peripherals = np.flatnonzero(~controller)
+    if len(controllers):
+        positions[controllers, 1] = np.concatenate([[0], np.cumsum(heights[controllers] + ROW_GAP)[:-1]])
+    left = widths[controllers].max() + COLUMN_GAP if len(controllers) else 0.0
+    if not len(peripherals):
+        return positions
+
+    # Roughly square block of peripherals
+    count = len(peripherals)
+    column_width = widths[peripherals].max() + COLUMN_GAP
+    columns = max(1, int(round(np.sqrt(count * (heights[peripherals].mean() + ROW_GAP) / column_width))))
+    column = np.arange(count) % columns
+    order = np.lexsort((np.arange(count), column))
+    stacked = heights[peripherals][order] + ROW_GAP
+    tops = np.cumsum(stacked) - stacked
+    starts = np.zeros(columns)
+    first = np.flatnonzero(np.r_[True, np.diff(column[order]) != 0])
+    starts[column[order][first]] = tops[first]
+    y = np.empty(count)
+    y[order] = tops - starts[column[order]]
+
+    positions[peripherals, 0] = left + column * column_width
+    positions[peripherals, 1] = y
+    return positions
+
+
+def _saved_positions(nodes):
+    # (N,) bool of nodes with a saved {"x", "y"} top-left corner, and those corners
+    saved = np.zeros(len(nodes), dtype=bool)
+    xy = []
+    for i, node in enumerate(nodes):
+        position = node.get("position")
+        if isinstance(position, dict) and all(isinstance(position.get(k), (int, float)) for k in ("x", "y")):
+            saved[i] = True
+            xy.append((float(position["x"]), float(position["y"])))
+    return saved, np.array(xy, dtype=float).reshape(-1, 2)
+
+
+def layout(diagram):
+    nodes = [n for n in diagram.get("nodes") or [] if isinstance(n, dict) and n.get("id") is not None]
+    columns = [_pin_columns(n) for n in nodes]
+    controller = np.array([n.get("type") == "Microcontroller" for n in nodes], dtype=bool)
+    widths, heights = _sizes(nodes, columns)
+
+    # Parts moved in the editor keep their saved position; the rest are laid out
+    saved, saved_xy = _saved_positions(nodes)
+    positions = _arc_layout(controller, widths, heights)
+    positions[saved] = saved_xy
+    boxes = np.column_stack([positions, positions + np.column_stack([widths, heights])])
+    if not saved.all() and overlap_count(boxes):
+        positions = _column_layout(controller, widths, heights)
+        positions[saved] = saved_xy
+        boxes = np.column_stack([positions, positions + np.column_stack([widths, heights])])
+
+    # Pins: one row per pin, handles on the left edge except a controller's right column
+    pin_names, pin_node, pin_row, pin_side = [], [], [], []
+    index = {}
+    for i, (node, (left, right)) in enumerate(zip(nodes, columns)):
+        side = 1 if controller[i] else -1
+        for side_pins, pin_side_value in ((left, -1), (right, side)):
+            for row, pin in enumerate(side_pins):
+                index.setdefault((str(node["id"]), pin), len(pin_names))
+                pin_names.append(pin)
+                pin_node.append(i)
+                pin_row.append(row)
+                pin_side.append(pin_side_value)
+    pin_node = np.array(pin_node, dtype=np.intp)
+    pin_side = np.array(pin_side, dtype=np.int8)
+    pin_xy = np.column_stack([
+        np.where(pin_side < 0, boxes[pin_node, 0], boxes[pin_node, 2]),
+        boxes[pin_node, 1] + HEADER_HEIGHT + ROW_HEIGHT * (np.array(pin_row, dtype=float) + 0.5),
+    ])
+
+    # Wires between known nodes; a pin the node does not list attaches to its header
+    node_index = {str(n["id"]): i for i, n in enumerate(nodes)}
+    ends, headers, wire_ids, wire_colors, wire_labels = [], [], [], [], []
+    for c in diagram.get("connections") or []:
+        if not isinstance(c, dict):
+            continue
+        source, target = node_index.get(str(c.get("from"))), node_index.get(str(c.get("to")))
+        if source is None or target is None:
+            continue
+        pins = (index.get((str(c.get("from")), str(c.get("fromPin")))), index.get((str(c.get("to")), str(c.get("toPin")))))
+        ends.append([-1 if p is None else p for p in pins])
+        headers.append([source, target])
+        wire_ids.append(str(c.get("id", len(wire_ids))))
+        wire_colors.append(c.get("color"))
+        wire_labels.append(f"{c.get('fromPin')} → {c.get('toPin')}")
+
+    ends = np.array(ends, dtype=np.intp).reshape(-1, 2)
+    headers = np.array(headers, dtype=np.intp).reshape(-1, 2)
+    known = ends >= 0
+    safe = np.where(known, ends, 0)
+    if len(pin_xy):
+        xy = np.where(known[..., None], pin_xy[safe], 0.0)
+        side = np.where(known, pin_side[safe], -1)
+    else:
+        xy = np.zeros(ends.shape + (2,))
+        side = np.full(ends.shape, -1)
+    header_xy = np.stack([boxes[headers, 0], boxes[headers, 1] + HEADER_HEIGHT / 2], axis=-1)
+    xy = np.where(known[..., None], xy, header_xy)
+
+    start, end = xy[:, 0], xy[:, 1]
+    start_stub = start + np.column_stack([side[:, 0] * WIRE_STUB, np.zeros(len(xy))])
+    end_stub = end + np.column_stack([side[:, 1] * WIRE_STUB, np.zeros(len(xy))])
+    middle_x = (start_stub[:, 0] + end_stub[:, 0]) / 2
+    wire_points = np.stack([
+        start, start_stub,
+        np.column_stack([middle_x, start_stub[:, 1]]),
+        np.column_stack([middle_x, end_stub[:, 1]]),
+        end_stub, end,
+    ], axis=1)
+
+    label_boxes = _place_labels(wire_points, wire_labels)
+    return Geometry(
+        node_ids=[str(n["id"]) for n in nodes],
+        node_labels=[str(n.get("label") or n["id"]) for n in nodes],
+        controller=controller,
+        boxes=boxes,
+        pin_names=pin_names,
+        pin_node=pin_node,
+        pin_xy=pin_xy,
+        pin_side=pin_side,
+        wire_ids=wire_ids,
+        wire_colors=wire_colors,
+        wire_labels=wire_labels,
+        wire_points=wire_points,
+        label_boxes=label_boxes,
+        bbox=bounding_box(boxes, wire_points, label_boxes),
+    )
+
+
+def _place_labels(wire_points, texts):
+    # Centered on the vertical run of each wire; a label that lands on an
+    # earlier one slides along its wire
+    widths = np.array([len(t) for t in texts], dtype=float) * WIRE_LABEL_CHAR_WIDTH + 8
+    center = (wire_points[:, 2] + wire_points[:, 3]) / 2
+    boxes = np.column_stack([
+        center[:, 0] - widths / 2, center[:, 1] - WIRE_LABEL_HEIGHT / 2,
+        center[:, 0] + widths / 2, center[:, 1] + WIRE_LABEL_HEIGHT / 2,
+    ])
+    if len(boxes) < 2:
+        return boxes
+    # Labels only move vertically, so the pairs that can collide are fixed by
+    # their x ranges and each round only compares y ranges of those pairs
+    x_overlap = (boxes[:, None, 0] < boxes[None, :, 2]) & (boxes[None, :, 0] < boxes[:, None, 2])
+    later, earlier = np.nonzero(np.tril(x_overlap, k=-1))
+    for _ in range(NUDGE_ROUNDS):
+        hit = (boxes[later, 1] < boxes[earlier, 3]) & (boxes[earlier, 1] < boxes[later, 3])
+        if not hit.any():
+            break
+        boxes[np.unique(later[hit]), 1::2] += WIRE_LABEL_HEIGHT + 2
+    return boxes
@@ -0,0 +1,163 @@
+import copy
+
+# JSON patches for wiring diagrams.
+# A patch only names what changes, so small edits cost a few dozen output
+# tokens instead of a regenerated diagram:
+#   {"remove_nodes": ["s2"], "add_nodes": [...], "update_nodes": [{"id": "mcu", "label": ...}],
+#    "remove_connections": ["c4"], "add_connections": [...], "explanation": "..."}
+# Removing a node also removes every connection attached to it.
+
+
+def compact_diagram(diagram):
+    # Minimal form of a diagram for prompts: drops positions, styling and explanation
+    return {
+        "nodes": [
+            {k: n[k] for k in ("id", "label", "type", "pins") if k in n}
+            for n in diagram.get("nodes", [])
+        ],
+        "connections": [
+            {k: c[k] for k in ("id", "from", "fromPin", "to", "toPin") if k in c}
+            for c in diagram.get("connections", [])
+        ],
+    }
+
+
+def _next_connection_id(taken):
+    number = len(taken) + 1
+    while f"c{number}" in taken:
+        number += 1
+    return f"c{number}"
+
+
+def _next_node_id(taken):
+    number = len(taken) + 1
+    while f"n{number}" in taken:
+        number += 1
+    return f"n{number}"
+
+
+def normalize_patch(diagram, patch):
+    # Copy of the patch whose new connections have ids unused anywhere in the
+    # diagram, and whose new nodes all have an id
+    patch = dict(patch)
+    taken = {n.get("id") for n in diagram.get("nodes", [])}
+    nodes = []
+    for node in patch.get("add_nodes") or []:
+        if not isinstance(node, dict):
+            raise ValueError(f"added node is not an object: {node!r}")
+        node = dict(node)
+        if not node.get("id"):
+            node["id"] = _next_node_id(taken)
+        taken.add(node["id"])
+        nodes.append(node)
+    patch["add_nodes"] = nodes
+    taken = {c.get("id") for c in diagram.get("connections", [])}
+    added = []
+    for connection in patch.get("add_connections") or []:
+        connection = dict(connection)
+        if not connection.get("id") or connection["id"] in taken:
+            connection["id"] = _next_connection_id(taken)
+        taken.add(connection["id"])
+        added.append(connection)
+    patch["add_connections"] = added
+    return patch
+
+
+def apply_patch(diagram, patch):
+    # Returns (new_diagram, affected) where affected lists added/removed/updated node ids
+    patch = normalize_patch(diagram, patch)
+    result = copy.deepcopy(diagram)
+    nodes = result.setdefault("nodes", [])
+    connections = result.setdefault("connections", [])
+    node_ids = {n.get("id") for n in nodes}
+
+    removed_nodes = set(patch.get("remove_nodes") or []) & node_ids
+    removed_connections = set(patch.get("remove_connections") or [])
+    nodes[:] = [n for n in nodes if n.get("id") not in removed_nodes]
+    connections[:] = [
+        c for c in connections
+        if c.get("id") not in removed_connections
+        and c.get("from") not in removed_nodes
+        and c.get("to") not in removed_nodes
+    ]
+
+    updated_nodes = set()
+    by_id = {n.get("id"): n for n in nodes}
+    for update in patch.get("update_nodes") or []:
+        node = by_id.get(update.get("id"))
+        if node is not None:
+            node.update(update)
+            updated_nodes.add(node["id"])
+
+    added_nodes = []
+    for node in patch.get("add_nodes") or []:
+        if node.get("id") in by_id:
+            raise ValueError(f"added node id '{node.get('id')}' already exists")
+        nodes.append(node)
+        by_id[node["id"]] = node
+        added_nodes.append(node["id"])
+
+    for connection in patch["add_connections"]:
+        connections.append(connection)
+        # Rewiring an existing part affects that part's code
+        for end in ("from", "to"):
+            if connection.get(end) in by_id and connection.get(end) not in added_nodes:
+                updated_nodes.add(connection[end])
+
+    if patch.get("explanation"):
+        result["explanation"] = patch["explanation"]
+
+    affected = {
+        "added": added_nodes,
+        "removed": sorted(removed_nodes),
+        "updated": sorted(updated_nodes - set(added_nodes)),
+    }
+    return result, affected
+
+
+def removed_labels(diagram, node_ids):
+    ids = set(node_ids)
+    return [n.get("label", n.get("id")) for n in diagram.get("nodes", []) if n.get("id") in ids]
+
+
+def apply_code_edits(code, edits):
+    # Search/replace edits from the code_edit prompt; any miss invalidates the whole set
+    for edit in edits:
+        find = edit.get("find", "")
+        if not find or find not in code:
+            raise ValueError(f"code edit target not found: {find[:60]!r}")
+        code = code.replace(find, edit.get("replace", ""), 1)
+    return code
+
+
+def code_edit_problems(code, edits):
+    try:
+        apply_code_edits(code, edits)
+    except ValueError as e:
+        return [str(e)]
+    return []
+
+
+def _labels(diagram):
+    return {n.get("id"): n.get("label", n.get("id")) for n in diagram.get("nodes", [])}
+
+
+def relabeled(old, new, node_ids):
+    # Updated nodes that now name a different part
+    old_labels, new_labels = _labels(old), _labels(new)
+    return [i for i in node_ids if old_labels.get(i) != new_labels.get(i)]
+
+
+def describe_change(old, new, affected):
+    # One line per affected part with its current wiring, for the code_edit prompt
+    old_labels, new_labels = _labels(old), _labels(new)
+    lines = [f"removed {old_labels[i]} ({i})" for i in affected["removed"]]
+    for verb, ids in (("added", affected["added"]), ("rewired", affected["updated"])):
+        for node_id in ids:
+            wires = [
+                f"{c.get('from')}.{c.get('fromPin')} -> {c.get('to')}.{c.get('toPin')}"
+                for c in new.get("connections", [])
+                if node_id in (c.get("from"), c.get("to"))
+            ]
+            lines.append(f"{verb} {new_labels[node_id]} ({node_id}) wired " + (", ".join(wires) or "nowhere"))
+    return "\n".join(lines)
@@ -0,0 +1,324 @@
+import pubsub
+from database import database, components
+from netlist import part_key, match_part, pin_nets, is_ground, pin_volts, label_volts, kind_of, two_terminals, supply_pin
+
+# Electrical profiles of parts and the power budget check for diagrams.
+# A profile is the supply voltage a part runs at, its typical and maximum
+# (stall, transmit, all-on) current, and for boards and supplies the current
+# each rail pin can deliver ("rail_limits", e.g. {"5V": 450, "GPIO": 20}).
+# Profiles come from the electrical columns of the components table, over
+# the defaults below, and are indexed by part_key once per worker; labels are
+# then resolved from a memo, so the check stays well under a millisecond.
+#
+# power_budget() walks the diagram once: wires are merged into nets, every
+# part's power pin is traced to the rail or GPIO pin that feeds it, and the
+# typical and maximum draw are summed per rail and compared with its limit.
+#
+# Profile import (extra columns of a components import):
+#   python bulk_io.py import components parts.ndjson
+#   {"name": "SG90 Servo", ..., "supply_voltage": 5, "typical_ma": 220, "max_ma": 650}
+
+CHANNEL = "electrical_profiles"
+MAX_MEMO = 5000
+
+# Rail voltages below/above these fractions of a part's supply voltage are reported
+UNDER_VOLTAGE = 0.7
+OVER_VOLTAGE = 1.25
+
+DEFAULT_PROFILES = [
+    # Boards: own draw, and what their rail pins can supply
+    {"name": "Arduino Uno", "aliases": ["Arduino UNO R3", "Arduino"], "supply_voltage": 5, "typical_ma": 45, "max_ma": 50,
+     "rail_limits": {"5V": 450, "3V3": 50, "GPIO": 20}},
+    {"name": "Arduino Nano", "aliases": ["Nano"], "supply_voltage": 5, "typical_ma": 20, "max_ma": 30,
+     "rail_limits": {"5V": 450, "3V3": 50, "GPIO": 20}},
+    {"name": "Arduino Mega 2560", "aliases": ["Arduino Mega", "Mega 2560"], "supply_voltage": 5, "typical_ma": 70, "max_ma": 80,
+     "rail_limits": {"5V": 450, "3V3": 50, "GPIO": 20}},
+    {"name": "ESP32 DevKit", "aliases": ["ESP32", "ESP32-WROOM-32"], "supply_voltage": 3.3, "typical_ma": 80, "max_ma": 240,
+     "rail_limits": {"3V3": 500, "5V": 450, "GPIO": 20}},
+    {"name": "ESP8266 NodeMCU", "aliases": ["NodeMCU", "ESP8266"], "supply_voltage": 3.3, "typical_ma": 80, "max_ma": 170,
+     "rail_limits": {"3V3": 500, "GPIO": 12}},
+    {"name": "Raspberry Pi 4", "aliases": ["Raspberry Pi", "Pi 4"], "supply_voltage": 5, "typical_ma": 600, "max_ma": 1200,
+     "rail_limits": {"5V": 1000, "3V3": 50, "GPIO": 16}},
+    {"name": "Raspberry Pi Pico", "aliases": ["Pico"], "supply_voltage": 3.3, "typical_ma": 25, "max_ma": 50,
+     "rail_limits": {"3V3": 300, "VBUS": 450, "GPIO": 12}},
+    # Supplies: the positive terminal's limit
+    {"name": "9V Battery", "aliases": ["9V"], "supply_voltage": 9, "typical_ma": 0, "max_ma": 0, "rail_limits": {"+": 300}},
+    {"name": "4xAA Battery Pack", "aliases": ["AA Battery Pack", "Battery Pack"], "supply_voltage": 6, "typical_ma": 0, "max_ma": 0,
+     "rail_limits": {"+": 1000}},
+    {"name": "LiPo Battery 7.4V", "aliases": ["2S LiPo", "18650 Battery Pack"], "supply_voltage": 7.4, "typical_ma": 0, "max_ma": 0,
+     "rail_limits": {"+": 3000}},
+    {"name": "12V Power Supply", "aliases": ["12V Adapter", "Power Supply"], "supply_voltage": 12, "typical_ma": 0, "max_ma": 0,
+     "rail_limits": {"+": 2000}},
+    # Actuators
+    {"name": "SG90 Servo", "aliases": ["Servo", "Micro Servo", "SG90"], "supply_voltage": 5, "typical_ma": 220, "max_ma": 650},
+    {"name": "MG996R Servo", "aliases": ["MG996R"], "supply_voltage": 5, "typical_ma": 500, "max_ma": 2500},
+    {"name": "DC Motor", "aliases": ["TT Motor", "Gear Motor"], "supply_voltage": 6, "typical_ma": 250, "max_ma": 1200},
+    # Drivers: their own draw; the motors on their outputs are added to the same supply
+    {"name": "L298N Motor Driver", "aliases": ["L298N", "Motor Driver"], "supply_voltage": None, "typical_ma": 36, "max_ma": 70},
+    {"name": "L293D Motor Driver", "aliases": ["L293D"], "supply_voltage": None, "typical_ma": 24, "max_ma": 60},
+    {"name": "28BYJ-48 Stepper Motor", "aliases": ["28BYJ-48", "Stepper Motor", "ULN2003"], "supply_voltage": 5, "typical_ma": 240, "max_ma": 320},
+    {"name": "Relay Module", "aliases": ["5V Relay Module", "Relay"], "supply_voltage": 5, "typical_ma": 75, "max_ma": 90},
+    {"name": "Buzzer", "aliases": ["Piezo Buzzer", "Active Buzzer"], "supply_voltage": 5, "typical_ma": 30, "max_ma": 40},
+    {"name": "Water Pump", "aliases": ["Mini Water Pump", "Submersible Pump"], "supply_voltage": 5, "typical_ma": 180, "max_ma": 400},
+    {"name": "WS2812B LED Strip", "aliases": ["NeoPixel", "WS2812B", "LED Strip"], "supply_voltage": 5, "typical_ma": 300, "max_ma": 1800},
+    # Indicators: supply_voltage is the forward voltage
+    {"name": "LED", "aliases": ["Red LED"], "supply_voltage": 2.0, "typical_ma": 15, "max_ma": 20},
+    {"name": "Green LED", "aliases": [], "supply_voltage": 2.2, "typical_ma": 15, "max_ma": 20},
+    {"name": "Yellow LED", "aliases": ["Orange LED"], "supply_voltage": 2.1, "typical_ma": 15, "max_ma": 20},
+    {"name": "Blue LED", "aliases": ["White LED"], "supply_voltage": 3.0, "typical_ma": 15, "max_ma": 20},
+    # Sensors and modules
+    {"name": "HC-SR04", "aliases": ["HC-SR04 Ultrasonic Sensor", "Ultrasonic Sensor"], "supply_voltage": 5, "typical_ma": 15, "max_ma": 15},
+    {"name": "DHT11", "aliases": ["DHT11 Temperature Sensor"], "supply_voltage": 5, "typical_ma": 2.5, "max_ma": 2.5},
+    {"name": "DHT22", "aliases": ["AM2302"], "supply_voltage": 5, "typical_ma": 1.5, "max_ma": 2.5},
+    {"name": "PIR Motion Sensor", "aliases": ["HC-SR501", "PIR"], "supply_voltage": 5, "typical_ma": 0.1, "max_ma": 0.1},
+    {"name": "Soil Moisture Sensor", "aliases": ["Moisture Sensor"], "supply_voltage": 5, "typical_ma": 35, "max_ma": 35},
+    {"name": "16x2 LCD", "aliases": ["LCD", "LCD 1602", "I2C LCD"], "supply_voltage": 5, "typical_ma": 30, "max_ma": 40},
+    {"name": "SSD1306 OLED", "aliases": ["OLED", "OLED Display"], "supply_voltage": 3.3, "typical_ma": 20, "max_ma": 40},
+    {"name": "BMP280", "aliases": ["BMP280 Sensor"], "supply_voltage": 3.3, "typical_ma": 0.7, "max_ma": 1},
+    {"name": "MPU6050", "aliases": ["MPU-6050", "Accelerometer"], "supply_voltage": 3.3, "typical_ma": 3.9, "max_ma": 4},
+    {"name": "HC-05 Bluetooth", "aliases": ["HC-05", "Bluetooth Module"], "supply_voltage": 5, "typical_ma": 30, "max_ma": 40},
+    {"name": "SIM800L", "aliases": ["GSM Module"], "supply_voltage": 4, "typical_ma": 80, "max_ma": 2000},
+    {"name": "RC522 RFID", "aliases": ["RC522", "RFID Reader"], "supply_voltage": 3.3, "typical_ma": 13, "max_ma": 26},
+]
+
+# --- PINS ---
+
+MOTOR_SUPPLY_PINS = {"12V", "VS", "VM", "VMOT"}
+# Board pins that are not rails a part can draw from
+BOARD_INPUT_PINS = {"VIN", "AREF", "RESET", "RST", "EN", "IOREF"}
+# Parts that take no supply current of their own
+PASSIVE_KINDS = ("controller", "supply", "resistor", "button")
+
+
+def power_pin(node, kind):
+    # The pin a part draws its current through
+    pins = [str(p) for p in node.get("pins") or []]
+    if kind in ("led", "buzzer", "motor"):
+        return two_terminals(node)[0]
+    if kind == "driver":
+        return next((p for p in pins if p.upper() in MOTOR_SUPPLY_PINS), None) or supply_pin(pins)
+    return supply_pin(pins)
+
+
+def rail_pins(node, kind):
+    # (pin, limit key) of the pins a board or supply feeds other parts from
+    if kind == "supply":
+        positive = two_terminals(node)[0]
+        return [(positive, "+")] if positive else []
+    return [
+        (str(p), str(p).upper()) for p in node.get("pins") or []
+        if (pin_volts(p) is not None or str(p).upper() == "VBUS") and str(p).upper() not in BOARD_INPUT_PINS
+    ]
+
+
+def describe(node, profile):
+    # Everything power_budget needs from one node that does not depend on the wiring
+    kind = kind_of(node)
+    label = str(node.get("label") or node["id"])
+    part = {"kind": kind, "label": label, "profile": profile, "power": None, "rails": [], "gpio": [], "outputs": []}
+    if kind in ("controller", "supply"):
+        part["rails"] = rail_pins(node, kind)
+    if kind == "controller":
+        taken = {pin for pin, _ in part["rails"]}
+        part["gpio"] = [p for p in node.get("pins") or [] if p not in taken and not is_ground(p) and str(p).upper() not in BOARD_INPUT_PINS]
+    elif kind not in PASSIVE_KINDS:
+        part["power"] = power_pin(node, kind)
+    if kind == "driver":
+        part["outputs"] = [p for p in node.get("pins") or [] if str(p).upper().startswith("OUT")]
+    return part
+
+
+# --- PROFILES ---
+
+def _number(value):
+    return float(value) if value not in (None, "") else None
+
+
+def profile_from_row(row):
+    return {
+        "name": row["name"],
+        "supply_voltage": _number(row["supply_voltage"]),
+        "typical_ma": _number(row["typical_ma"]) or 0.0,
+        "max_ma": _number(row["max_ma"]) or _number(row["typical_ma"]) or 0.0,
+        "rail_limits": dict(row["rail_limits"] or {}),
+    }
+
+
+def _index(profiles):
+    parts = {}
+    for profile in profiles:
+        entry = profile_from_row({"rail_limits": None, **profile})
+        for label in [profile["name"], *(profile.get("aliases") or [])]:
+            parts.setdefault(part_key(label), entry)
+    return parts
+
+
+DEFAULT_INDEX = _index(DEFAULT_PROFILES)
+
+
+class ProfileIndex:
+    def __init__(self):
+        self.parts = None  # part_key -> profile; None until loaded
+        self.memo = {}  # label -> profile or None
+        self.nodes = {}  # (type, label, pins) -> describe()
+
+    async def load(self):
+        # Components with electrical columns override the defaults
+        rows = await database.fetch_all(components.select().where(components.c.typical_ma.isnot(None)))
+        parts = dict(DEFAULT_INDEX)
+        for r in rows:
+            parts[part_key(r["name"])] = profile_from_row(r)
+        self.parts = parts
+        self.memo = {}
+        self.nodes = {}
+
+    async def ensure_loaded(self):
+        if self.parts is None:
+            await self.load()
+
+    def lookup(self, label):
+        # Exact name or alias, then the longest run of label words that names a part
+        profile = self.memo.get(label, False)
+        if profile is False:
+            profile = match_part(DEFAULT_INDEX if self.parts is None else self.parts, label)
+            if len(self.memo) >= MAX_MEMO:
+                self.memo.clear()
+            self.memo[label] = profile
+        return profile
+
+    def describe(self, node):
+        # Generated diagrams reuse a handful of parts, so nodes are described once
+        key = (node.get("type"), node.get("label"), tuple(node.get("pins") or ()))
+        part = self.nodes.get(key)
+        if part is None:
+            part = describe(node, self.lookup(str(node.get("label") or "")))
+            if len(self.nodes) >= MAX_MEMO:
+                self.nodes.clear()
+            self.nodes[key] = part
+        return part
+
+    def drop(self):
+        self.parts = None
+        self.memo = {}
+        self.nodes = {}
+
+    async def invalidate(self):
+        # After a component write: reload here and in every other worker
+        self.drop()
+        await pubsub.publish(CHANNEL, {})
+
+    def on_notify(self, data):
+        self.drop()
+
+
+electrical_profiles = ProfileIndex()
+pubsub.subscribe(CHANNEL, electrical_profiles.on_notify)
+
+
+# --- POWER BUDGET ---
+
+def _warning(severity, code, node_id, pin, message):
+    return {"severity": severity, "code": code, "node": node_id, "pin": pin, "message": message}
+
+
+def _ma(value):
+    return f"{value:.0f} mA" if value >= 10 else f"{value:.1f} mA"
+
+
+def power_budget(diagram, profiles=electrical_profiles):
+    # {"rails": [per-rail draw and limit], "warnings": [...], "unprofiled": [labels]};
+    # parts without a profile are left out of the sums rather than guessed
+    nodes = [n for n in diagram.get("nodes") or [] if isinstance(n, dict) and n.get("id")]
+    parts, tied = {}, []
+    for node in nodes:
+        parts[node["id"]] = profiles.describe(node)
+        pins = node.get("pins") or []
+        if len(set(pins)) < len(pins):
+            # Same-name pins (a board's GND, 5V) are one net
+            same = {}
+            for pin in pins:
+                same.setdefault(pin, []).append((node["id"], pin))
+            tied.extend(group for group in same.values() if len(group) > 1)
+    # Only wired pins get a net; a pin missing from `nets` is unconnected
+    nets, _ = pin_nets({"connections": diagram.get("connections")}, tied)
+
+    # Rails and GPIO pins of boards and supplies, and driver outputs, by net
+    rails, gpio, behind = {}, {}, {}
+    for node_id, part in parts.items():
+        limits = (part["profile"] or {}).get("rail_limits") or {}
+        for pin, limit_key in part["rails"]:
+            net = nets.get((node_id, pin))
+            if net is None or net in rails:
+                continue
+            if part["kind"] == "controller":
+                volts = pin_volts(pin)
+            else:
+                volts = (part["profile"] or {}).get("supply_voltage") or label_volts(part["label"], None)
+            rails[net] = {"node": node_id, "pin": pin, "voltage": volts, "limit_ma": limits.get(limit_key),
+                          "typical_ma": 0.0, "max_ma": 0.0, "loads": []}
+        for pin in part["gpio"]:
+            net = nets.get((node_id, pin))
+            if net is not None:
+                gpio.setdefault(net, (node_id, pin, limits.get("GPIO")))
+        supply = nets.get((node_id, part["power"])) if part["outputs"] else None
+        for pin in part["outputs"]:
+            net = nets.get((node_id, pin))
+            if net is not None and supply is not None:
+                behind[net] = supply
+
+    warnings, unprofiled = [], []
+    for node_id, part in parts.items():
+        profile, pin, label = part["profile"], part["power"], part["label"]
+        if part["kind"] in PASSIVE_KINDS:
+            continue
+        if profile is None:
+            unprofiled.append(label)
+            continue
+        net = nets.get((node_id, pin)) if pin is not None else None
+        driven = net in behind
+        if driven:
+            # A motor on a driver output draws from the driver's motor supply;
+            # its voltage there depends on the PWM duty, so it is not compared
+            net = behind[net]
+        if net in rails:
+            rail = rails[net]
+            rail["typical_ma"] += profile["typical_ma"]
+            rail["max_ma"] += profile["max_ma"]
+            rail["loads"].append(node_id)
+            nominal = profile["supply_voltage"]
+            if rail["voltage"] and nominal and not driven and part["kind"] != "led":
+                where = f"{parts[rail['node']]['label']} {rail['pin']}"
+                if rail["voltage"] > nominal * OVER_VOLTAGE:
+                    warnings.append(_warning("error", "over_voltage", node_id, pin,
+                                             f"{label} is rated {nominal:g}V but {pin} is on {where} ({rail['voltage']:g}V)"))
+                elif rail["voltage"] < nominal * UNDER_VOLTAGE:
+                    warnings.append(_warning("warning", "under_voltage", node_id, pin,
+                                             f"{label} needs {nominal:g}V but {pin} is on {where} ({rail['voltage']:g}V)"))
+        elif net in gpio:
+            board, board_pin, limit = gpio[net]
+            if limit is not None and profile["max_ma"] > limit:
+                warnings.append(_warning("error" if profile["typical_ma"] > limit else "warning", "gpio_overload", node_id, pin,
+                                         f"{label} draws up to {_ma(profile['max_ma'])} from {parts[board]['label']} {board_pin}; "
+                                         f"a GPIO pin supplies about {_ma(limit)}"))
+        elif pin is not None and net is None and part["kind"] not in ("led", "buzzer", "motor"):
+            warnings.append(_warning("warning", "unpowered", node_id, pin, f"{label} {pin} is not connected to a supply"))
+
+    report = []
+    for rail in rails.values():
+        limit, name = rail["limit_ma"], f"{parts[rail['node']]['label']} {rail['pin']}"
+        if limit is not None and rail["loads"]:
+            loads = ", ".join(parts[n]["label"] for n in rail["loads"])
+            if rail["typical_ma"] > limit:
+                warnings.append(_warning("error", "rail_overload", rail["node"], rail["pin"],
+                                         f"{name} supplies about {_ma(limit)} but {loads} draw {_ma(rail['typical_ma'])}; "
+                                         f"use a separate supply"))
+            elif rail["max_ma"] > limit:
+                warnings.append(_warning("warning", "rail_peak", rail["node"], rail["pin"],
+                                         f"{name} supplies about {_ma(limit)}; {loads} can peak at {_ma(rail['max_ma'])} "
+                                         f"(stalled motors, transmit bursts), which may reset the board"))
+        report.append(rail)
+    return {"rails": report, "warnings": warnings, "unprofiled": unprofiled}
+
+
+def power_warnings(diagram):
+    return power_budget(diagram)["warnings"]
@@ -0,0 +1,62 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from fastapi import FastAPI, Request
+from bench_codegen import CASES
+
+# OpenAI-compatible stand-in for load tests.
+# Answers every chat completion after a fixed delay with one canned JSON object
+# that satisfies all routes at once (a diagram, code, glue and a BOM), so the
+# backend does its full per-request work without an API key or a bill.
+#
+# Usage: python fake_llm.py [--port 8100] [--latency-ms 300]
+# then run the backend with OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+
+_, DIAGRAM, GLUE = CASES["obstacle robot (uno)"]
+ANSWER = json.dumps({
+    **DIAGRAM,
+    **GLUE,
+    "code": "void setup() {}\nvoid loop() {}",
+    "items": [{"component": "Arduino UNO", "quantity": 1, "estimated_price": "$24.95"}],
+    "total_estimated_cost": "$24.95",
+})
+
+app = FastAPI()
+app.state.latency = 0.3
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(app.state.latency)
+    prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+    completion_tokens = len(ANSWER) // 4
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": ANSWER},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    args = parser.parse_args(sys.argv[1:])
+    app.state.latency = args.latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,254 @@
+import re
+import ast
+import textwrap
+from string import Template
+from dataclasses import dataclass, field
+import metrics
+from netlist import part_key, match_part
+from firmware_snippets import SNIPPETS
+from prompts import get_prompt
+from model_router import complete_json
+
+# Compositional firmware generation.
+# Modules with a snippet in firmware_snippets.py get their driver code from the
+# library, bound to the controller pins their diagram connections use; the LLM
+# only writes the glue logic (globals/setup/loop) against the drivers' API.
+# Diagrams without a recognised controller or any known module return None so
+# the caller can fall back to full generation.
+
+# Controller label words -> target, checked in order (a Pico runs MicroPython,
+# which the library does not cover)
+CONTROLLERS = (
+    ("pico", None),
+    ("raspberry pi", "python"),
+    ("arduino", "arduino"),
+    ("esp32", "arduino"),
+    ("esp8266", "arduino"),
+    ("nodemcu", "arduino"),
+    ("uno", "arduino"),
+    ("nano", "arduino"),
+    ("mega", "arduino"),
+)
+
+TARGET_NAMES = {
+    "arduino": "Arduino C++ (Serial is started at 9600 baud; use delay(ms))",
+    "python": "Raspberry Pi Python 3 (gpiozero; sleep(seconds) is imported)",
+}
+
+
+def find_controller(diagram):
+    # (node, target) for the main controller; target is None when unsupported
+    nodes = diagram.get("nodes") or []
+    for node in nodes:
+        label = f" {part_key(node.get('label', ''))} "
+        for word, target in CONTROLLERS:
+            if f" {word} " in label:
+                return node, target
+    for node in nodes:
+        if str(node.get("type", "")).lower() == "microcontroller":
+            return node, "arduino"
+    return None, None
+
+
+def pin_literal(pin, target):
+    # Controller pin name -> what the target's APIs take; None for power, ground and unknown pins
+    name = re.sub(r"\(.*?\)", "", str(pin or "")).upper().replace(" ", "").rstrip("~")
+    if target == "arduino":
+        if re.fullmatch(r"A\d+", name):
+            return name
+        match = re.fullmatch(r"(?:D|GPIO|IO|PIN)?(\d+)", name)
+    else:
+        # Only BCM numbers; a bare number could be a physical header pin
+        match = re.fullmatch(r"(?:GPIO|BCM)(\d+)", name)
+    return match.group(1) if match else None
+
+
+def instance_name(node_id):
+    name = re.sub(r"\W", "_", str(node_id)).strip("_").lower() or "part"
+    return name if not name[0].isdigit() else f"p{name}"
+
+
+def wiring(diagram, controller_id, node_id, target):
+    # Module pin (upper case) -> controller pin literal, for direct connections
+    wires = {}
+    for c in diagram.get("connections") or []:
+        if c.get("from") == controller_id and c.get("to") == node_id:
+            module_pin, controller_pin = c.get("toPin"), c.get("fromPin")
+        elif c.get("to") == controller_id and c.get("from") == node_id:
+            module_pin, controller_pin = c.get("fromPin"), c.get("toPin")
+        else:
+            continue
+        literal = pin_literal(controller_pin, target)
+        if literal is not None:
+            wires[str(module_pin).upper().strip()] = literal
+    return wires
+
+
+def bind(snippet, node, wires):
+    # Template values for one module, or None when a required pin is not wired
+    name = instance_name(node["id"])
+    values = {"id": name, "ID": name.upper()}
+    for placeholder, module_pins in snippet.pins.items():
+        pin = next((wires[p] for p in module_pins if p in wires), snippet.optional.get(placeholder))
+        if pin is None:
+            return None
+        values[placeholder] = pin
+    return values
+
+
+@dataclass
+class Composition:
+    target: str
+    includes: list = field(default_factory=list)
+    globals: list = field(default_factory=list)
+    setup: list = field(default_factory=list)
+    helpers: list = field(default_factory=list)
+    api: list = field(default_factory=list)
+    # Wired parts without a usable snippet, described for the glue prompt
+    others: list = field(default_factory=list)
+
+    def add(self, snippet, values):
+        def render(template):
+            return Template(template).substitute(values)
+
+        for include in snippet.includes:
+            if include not in self.includes:
+                self.includes.append(include)
+        for section, template in (
+            (self.globals, snippet.globals), (self.setup, snippet.setup),
+            (self.helpers, snippet.helpers), (self.api, snippet.api),
+        ):
+            if template:
+                section.append(render(template))
+
+    def code(self, glue):
+        glue_globals = textwrap.dedent(glue.get("globals") or "").strip()
+        glue_setup = textwrap.dedent(glue.get("setup") or "").strip()
+        glue_loop = textwrap.dedent(glue.get("loop") or "").strip()
+        if self.target == "python":
+            sections = [
+                "\n".join(self.includes + ["from time import sleep"]),
+                "\n".join(self.globals),
+                glue_globals,
+                "\n\n".join(self.helpers),
+                glue_setup,
+                "while True:\n" + textwrap.indent(glue_loop or "pass", "    "),
+            ]
+        else:
+            setup = "\n".join(["Serial.begin(9600);"] + self.setup + [glue_setup])
+            sections = [
+                "\n".join(self.includes),
+                "\n".join(self.globals),
+                glue_globals,
+                "\n\n".join(self.helpers),
+                "void setup() {\n" + textwrap.indent(setup.strip(), "  ") + "\n}",
+                "void loop() {\n" + textwrap.indent(glue_loop, "  ") + "\n}",
+            ]
+        return "\n\n".join(s for s in sections if s) + "\n"
+
+
+def plan(diagram):
+    # Composition with every module the library can drive, or None
+    controller, target = find_controller(diagram)
+    if target is None:
+        return None
+    library = SNIPPETS.get(target, {})
+    composition = Composition(target)
+    matched = 0
+    for node in diagram.get("nodes") or []:
+        if node is controller or not node.get("id"):
+            continue
+        wires = wiring(diagram, controller.get("id"), node["id"], target)
+        snippet = match_part(library, node.get("label", ""))
+        values = bind(snippet, node, wires) if snippet else None
+        if values is None:
+            if wires:
+                described = ", ".join(f"{pin} -> controller pin {literal}" for pin, literal in wires.items())
+                composition.others.append(f"{node.get('label')} ({node['id']}): {described}")
+            continue
+        composition.add(snippet, values)
+        matched += 1
+    return composition if matched else None
+
+
+# --- SYNTAX CHECK ---
+
+_CLOSING = {")": "(", "]": "[", "}": "{"}
+
+
+def _cpp_problems(code):
+    # Balanced brackets and terminated literals/comments; no compiler needed
+    problems = []
+    stack = []
+    line = 1
+    i = 0
+    while i < len(code):
+        ch = code[i]
+        if ch == "\n":
+            line += 1
+        elif code.startswith("//", i):
+            i = code.find("\n", i)
+            if i == -1:
+                break
+            continue
+        elif code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            if end == -1:
+                problems.append(f"line {line}: unterminated comment")
+                break
+            line += code.count("\n", i, end)
+            i = end + 2
+            continue
+        elif ch in "\"'":
+            j = i + 1
+            while j < len(code) and code[j] not in (ch, "\n"):
+                j += 2 if code[j] == "\\" else 1
+            if j >= len(code) or code[j] == "\n":
+                problems.append(f"line {line}: unterminated literal")
+                i = j
+                continue
+            i = j
+        elif ch in "([{":
+            stack.append((ch, line))
+        elif ch in ")]}":
+            if not stack or stack[-1][0] != _CLOSING[ch]:
+                problems.append(f"line {line}: unexpected '{ch}'")
+            else:
+                stack.pop()
+        i += 1
+    problems.extend(f"line {opened}: unclosed '{ch}'" for ch, opened in stack)
+    return problems
+
+
+def syntax_problems(code, target):
+    if target == "python":
+        try:
+            ast.parse(code)
+        except SyntaxError as e:
+            return [f"line {e.lineno}: {e.msg}"]
+        return []
+    return _cpp_problems(code)
+
+
+async def compose(query, diagram):
+    # {"code", "explanation"}, or None when the library has nothing to offer
+    composition = plan(diagram)
+    if composition is None:
+        metrics.incr("firmware.not_composable")
+        return None
+    messages = get_prompt("code_glue").messages(
+        query=query,
+        target=TARGET_NAMES[composition.target],
+        api="\n".join(composition.api) or "(none)",
+        other="\n".join(composition.others) or "(none)",
+    )
+    target = composition.target
+    glue = await complete_json(
+        "code_glue", messages,
+        check=lambda g: syntax_problems(composition.code(g), target),
+    )
+    code = composition.code(glue)
+    metrics.incr("firmware.composed")
+    if syntax_problems(code, target):
+        metrics.incr("firmware.syntax_problems")
+    return {"code": code, "explanation": glue.get("explanation") or ""}
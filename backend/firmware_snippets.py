@@ -0,0 +1,270 @@
+from dataclasses import dataclass, field
+from netlist import part_key
+
+# Firmware snippet library.
+# Tested driver code for recurring modules, per target: "arduino" (Arduino/ESP
+# C++) and "python" (Raspberry Pi, gpiozero). Templates use string.Template
+# placeholders: $id / $ID is the node id as a lower/upper case identifier and
+# every key of `pins` is the controller pin wired to that module pin.
+# firmware_composer.py stitches the fragments together.
+
+
+@dataclass(frozen=True)
+class Snippet:
+    part: str
+    target: str
+    # Placeholder -> module pin names it may be wired through
+    pins: dict
+    includes: tuple = ()
+    globals: str = ""
+    setup: str = ""
+    helpers: str = ""
+    # What the glue logic may call, shown to the LLM
+    api: str = ""
+    # Placeholder -> value used when that pin is not wired (e.g. jumpered enable pins)
+    optional: dict = field(default_factory=dict)
+    aliases: tuple = ()
+
+
+SNIPPETS = {}
+
+
+def register(snippet):
+    index = SNIPPETS.setdefault(snippet.target, {})
+    for name in (snippet.part, *snippet.aliases):
+        index[part_key(name)] = snippet
+    return snippet
+
+
+# --- ARDUINO (C++) ---
+
+register(Snippet(
+    "HC-SR04", "arduino",
+    pins={"TRIG": ("TRIG", "TRIGGER"), "ECHO": ("ECHO",)},
+    globals="const int ${ID}_TRIG = $TRIG;\nconst int ${ID}_ECHO = $ECHO;",
+    setup="pinMode(${ID}_TRIG, OUTPUT);\npinMode(${ID}_ECHO, INPUT);",
+    helpers="""float ${id}_distance_cm() {
+  digitalWrite(${ID}_TRIG, LOW);
+  delayMicroseconds(2);
+  digitalWrite(${ID}_TRIG, HIGH);
+  delayMicroseconds(10);
+  digitalWrite(${ID}_TRIG, LOW);
+  long duration = pulseIn(${ID}_ECHO, HIGH, 30000);
+  return duration * 0.0343 / 2;
+}""",
+    api="float ${id}_distance_cm();  // distance in cm, 0 when nothing echoes back",
+    aliases=("Ultrasonic Sensor", "HC-SR04P"),
+))
+
+register(Snippet(
+    "SG90 Servo", "arduino",
+    pins={"SIG": ("SIG", "SIGNAL", "PWM", "S", "PULSE", "DATA", "IN")},
+    includes=("#include <Servo.h>",),
+    globals="Servo ${id}_servo;",
+    setup="${id}_servo.attach($SIG);",
+    api="${id}_servo.write(angle);  // angle 0-180",
+    aliases=("SG90", "Servo", "Micro Servo", "MG90S"),
+))
+
+register(Snippet(
+    "L298N", "arduino",
+    pins={
+        "IN1": ("IN1",), "IN2": ("IN2",), "IN3": ("IN3",), "IN4": ("IN4",),
+        "ENA": ("ENA", "EN A"), "ENB": ("ENB", "EN B"),
+    },
+    optional={"ENA": "-1", "ENB": "-1"},
+    globals=(
+        "const int ${ID}_IN1 = $IN1;\nconst int ${ID}_IN2 = $IN2;\n"
+        "const int ${ID}_IN3 = $IN3;\nconst int ${ID}_IN4 = $IN4;\n"
+        "const int ${ID}_ENA = $ENA;\nconst int ${ID}_ENB = $ENB;"
+    ),
+    setup="""pinMode(${ID}_IN1, OUTPUT);
+pinMode(${ID}_IN2, OUTPUT);
+pinMode(${ID}_IN3, OUTPUT);
+pinMode(${ID}_IN4, OUTPUT);
+if (${ID}_ENA >= 0) pinMode(${ID}_ENA, OUTPUT);
+if (${ID}_ENB >= 0) pinMode(${ID}_ENB, OUTPUT);""",
+    helpers="""void ${id}_motor(int in1, int in2, int en, int speed) {
+  digitalWrite(in1, speed > 0 ? HIGH : LOW);
+  digitalWrite(in2, speed < 0 ? HIGH : LOW);
+  if (en >= 0) analogWrite(en, constrain(abs(speed), 0, 255));
+}
+
+void ${id}_drive(int left, int right) {
+  ${id}_motor(${ID}_IN1, ${ID}_IN2, ${ID}_ENA, left);
+  ${id}_motor(${ID}_IN3, ${ID}_IN4, ${ID}_ENB, right);
+}""",
+    api="void ${id}_drive(int left, int right);  // motor A / motor B speed, -255 (reverse) to 255",
+    aliases=("L298N Motor Driver", "L298"),
+))
+
+register(Snippet(
+    "DHT11", "arduino",
+    pins={"DATA": ("DATA", "OUT", "SIG", "S", "DAT")},
+    includes=("#include <DHT.h>",),
+    globals="DHT ${id}_dht($DATA, DHT11);",
+    setup="${id}_dht.begin();",
+    api="${id}_dht.readTemperature();  // deg C, NaN on a failed read\n${id}_dht.readHumidity();  // %, NaN on a failed read",
+    aliases=("DHT11 Temperature Humidity Sensor",),
+))
+
+register(Snippet(
+    "DHT22", "arduino",
+    pins={"DATA": ("DATA", "OUT", "SIG", "S", "DAT")},
+    includes=("#include <DHT.h>",),
+    globals="DHT ${id}_dht($DATA, DHT22);",
+    setup="${id}_dht.begin();",
+    api="${id}_dht.readTemperature();  // deg C, NaN on a failed read\n${id}_dht.readHumidity();  // %, NaN on a failed read",
+    aliases=("AM2302", "DHT22 Temperature Humidity Sensor"),
+))
+
+register(Snippet(
+    "LED", "arduino",
+    pins={"PIN": ("+", "ANODE", "A", "IN", "SIG", "LONG LEG")},
+    globals="const int ${ID}_PIN = $PIN;",
+    setup="pinMode(${ID}_PIN, OUTPUT);",
+    api="digitalWrite(${ID}_PIN, HIGH);  // LED on (LOW = off)",
+    aliases=("5mm LED", "Red LED", "Green LED"),
+))
+
+register(Snippet(
+    "Piezo Buzzer", "arduino",
+    pins={"PIN": ("+", "SIG", "IN", "I/O", "POSITIVE")},
+    globals="const int ${ID}_PIN = $PIN;",
+    setup="pinMode(${ID}_PIN, OUTPUT);",
+    api="tone(${ID}_PIN, frequency_hz, duration_ms);\nnoTone(${ID}_PIN);",
+    aliases=("Buzzer", "Active Buzzer", "Passive Buzzer"),
+))
+
+register(Snippet(
+    "Push Button", "arduino",
+    pins={"PIN": ("SIG", "OUT", "1", "IN", "PIN")},
+    globals="const int ${ID}_PIN = $PIN;",
+    setup="pinMode(${ID}_PIN, INPUT_PULLUP);",
+    helpers="bool ${id}_pressed() {\n  return digitalRead(${ID}_PIN) == LOW;\n}",
+    api="bool ${id}_pressed();  // wired to GND, uses the internal pull-up",
+    aliases=("Button", "Tactile Switch", "Tactile Button"),
+))
+
+register(Snippet(
+    "PIR Motion Sensor", "arduino",
+    pins={"OUT": ("OUT", "SIG", "DATA", "S")},
+    globals="const int ${ID}_OUT = $OUT;",
+    setup="pinMode(${ID}_OUT, INPUT);",
+    helpers="bool ${id}_motion() {\n  return digitalRead(${ID}_OUT) == HIGH;\n}",
+    api="bool ${id}_motion();",
+    aliases=("HC-SR501", "PIR"),
+))
+
+register(Snippet(
+    "Relay Module", "arduino",
+    pins={"IN": ("IN", "SIG", "S", "IN1")},
+    globals="const int ${ID}_IN = $IN;",
+    setup="pinMode(${ID}_IN, OUTPUT);",
+    api="digitalWrite(${ID}_IN, HIGH);  // energize the relay (LOW = release)",
+    aliases=("Relay", "5V Relay"),
+))
+
+register(Snippet(
+    "LDR", "arduino",
+    pins={"PIN": ("OUT", "SIG", "AO", "A0", "S")},
+    globals="const int ${ID}_PIN = $PIN;",
+    api="analogRead(${ID}_PIN);  // 0 (dark) - 1023 (bright)",
+    aliases=("Photoresistor", "Light Sensor", "Light Dependent Resistor"),
+))
+
+# --- RASPBERRY PI (Python, gpiozero) ---
+
+register(Snippet(
+    "HC-SR04", "python",
+    pins={"TRIG": ("TRIG", "TRIGGER"), "ECHO": ("ECHO",)},
+    includes=("from gpiozero import DistanceSensor",),
+    globals="$id = DistanceSensor(echo=$ECHO, trigger=$TRIG, max_distance=4)",
+    api="$id.distance * 100  # distance in cm",
+    aliases=("Ultrasonic Sensor", "HC-SR04P"),
+))
+
+register(Snippet(
+    "SG90 Servo", "python",
+    pins={"SIG": ("SIG", "SIGNAL", "PWM", "S", "PULSE", "DATA", "IN")},
+    includes=("from gpiozero import AngularServo",),
+    globals="$id = AngularServo($SIG, min_angle=0, max_angle=180)",
+    api="$id.angle = 90  # 0-180",
+    aliases=("SG90", "Servo", "Micro Servo", "MG90S"),
+))
+
+register(Snippet(
+    "L298N", "python",
+    pins={
+        "IN1": ("IN1",), "IN2": ("IN2",), "IN3": ("IN3",), "IN4": ("IN4",),
+        "ENA": ("ENA", "EN A"), "ENB": ("ENB", "EN B"),
+    },
+    optional={"ENA": "None", "ENB": "None"},
+    includes=("from gpiozero import Motor",),
+    globals="${id}_a = Motor(forward=$IN1, backward=$IN2, enable=$ENA)\n${id}_b = Motor(forward=$IN3, backward=$IN4, enable=$ENB)",
+    api="${id}_a.forward(speed)  # speed 0-1; also .backward(speed), .stop(); same for ${id}_b",
+    aliases=("L298N Motor Driver", "L298"),
+))
+
+register(Snippet(
+    "DHT11", "python",
+    pins={"DATA": ("DATA", "OUT", "SIG", "S", "DAT")},
+    includes=("import board", "import adafruit_dht"),
+    globals="$id = adafruit_dht.DHT11(board.D$DATA)",
+    api="$id.temperature, $id.humidity  # deg C and %; reads can raise RuntimeError, retry",
+    aliases=("DHT11 Temperature Humidity Sensor",),
+))
+
+register(Snippet(
+    "DHT22", "python",
+    pins={"DATA": ("DATA", "OUT", "SIG", "S", "DAT")},
+    includes=("import board", "import adafruit_dht"),
+    globals="$id = adafruit_dht.DHT22(board.D$DATA)",
+    api="$id.temperature, $id.humidity  # deg C and %; reads can raise RuntimeError, retry",
+    aliases=("AM2302", "DHT22 Temperature Humidity Sensor"),
+))
+
+register(Snippet(
+    "LED", "python",
+    pins={"PIN": ("+", "ANODE", "A", "IN", "SIG", "LONG LEG")},
+    includes=("from gpiozero import LED",),
+    globals="$id = LED($PIN)",
+    api="$id.on(); $id.off(); $id.blink()",
+    aliases=("5mm LED", "Red LED", "Green LED"),
+))
+
+register(Snippet(
+    "Piezo Buzzer", "python",
+    pins={"PIN": ("+", "SIG", "IN", "I/O", "POSITIVE")},
+    includes=("from gpiozero import Buzzer",),
+    globals="$id = Buzzer($PIN)",
+    api="$id.on(); $id.off(); $id.beep()",
+    aliases=("Buzzer", "Active Buzzer"),
+))
+
+register(Snippet(
+    "Push Button", "python",
+    pins={"PIN": ("SIG", "OUT", "1", "IN", "PIN")},
+    includes=("from gpiozero import Button",),
+    globals="$id = Button($PIN)",
+    api="$id.is_pressed  # wired to GND, uses the internal pull-up",
+    aliases=("Button", "Tactile Switch", "Tactile Button"),
+))
+
+register(Snippet(
+    "PIR Motion Sensor", "python",
+    pins={"OUT": ("OUT", "SIG", "DATA", "S")},
+    includes=("from gpiozero import MotionSensor",),
+    globals="$id = MotionSensor($OUT)",
+    api="$id.motion_detected",
+    aliases=("HC-SR501", "PIR"),
+))
+
+register(Snippet(
+    "Relay Module", "python",
+    pins={"IN": ("IN", "SIG", "S", "IN1")},
+    includes=("from gpiozero import OutputDevice",),
+    globals="$id = OutputDevice($IN)",
+    api="$id.on(); $id.off()  # energize / release the relay",
+    aliases=("Relay", "5V Relay"),
+))
@@ -0,0 +1,424 @@
+import math
+import time
+import asyncio
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+import sqlalchemy
+import pubsub
+import metrics
+from database import database, circuits, gallery
+from netlist import part_key
+from response_cache import CachedBody
+from responses import dumps
+
+# Community gallery of saved circuits.
+# Each circuit has a summary row in the gallery table (title, part and wire
+# counts, tags and a small SVG thumbnail taken from diagram_data), written when
+# it is saved or its collaborative snapshot changes, so the feed never reads
+# diagrams.
+#
+# Trending is an exponentially decaying score. Views and likes are counted in
+# memory and written every FLUSH_SECONDS in one transaction. A circuit's rank
+# is log(sum of weight * e^(DECAY * seconds since EPOCH)) over its events, so
+# one event is one logaddexp and the order never has to be recomputed as time
+# passes. New ranks fan out to the other workers over pubsub.
+#
+# Every worker keeps the best GALLERY_SIZE circuits by rank and the newest
+# GALLERY_SIZE in memory, sorts them at most every RERANK_SECONDS, and keeps
+# rendered pages until the next sort. Pages are keyset-paginated
+# (?cursor=<next of the previous page>); pages past the window come from the DB.
+
+CHANNEL = "gallery"
+GALLERY_SIZE = 2000
+PAGE_MAX = 50
+MAX_PAGES = 512  # Rendered pages kept per worker
+MAX_TAGS = 8
+FLUSH_SECONDS = 5
+RERANK_SECONDS = 2
+BACKFILL_BATCH = 500
+
+EPOCH = datetime(2026, 1, 1)
+HALF_LIFE_HOURS = 24
+DECAY = math.log(2) / (HALF_LIFE_HOURS * 3600)
+NEW_WEIGHT = 10  # A new circuit starts as if liked once
+WEIGHTS = {"view": 1, "like": 10}
+SORTS = ("trending", "new")
+
+THUMB_WIDTH, THUMB_HEIGHT, THUMB_MARGIN = 160, 100, 8
+MAX_THUMB_PARTS = 40
+
+
+def _seconds(at):
+    return (at - EPOCH).total_seconds()
+
+
+def bump(rank, weight, at):
+    # rank after an event of this weight at datetime at (logaddexp)
+    x = math.log(weight) + DECAY * _seconds(at)
+    if rank is None:
+        return x
+    high, low = max(rank, x), min(rank, x)
+    return high + math.log1p(math.exp(low - high))
+
+
+def tags(diagram):
+    # Part types ("sensor", "actuator") and the controller's name
+    found = []
+    for node in diagram.get("nodes") or []:
+        if not isinstance(node, dict):
+            continue
+        for text in (node.get("type"), node.get("label") if node.get("type") == "Microcontroller" else None):
+            tag = part_key(text) if text else ""
+            if tag and tag not in found:
+                found.append(tag)
+    return found[:MAX_TAGS]
+
+
+def thumbnail(diagram):
+    # Parts as boxes and wires as lines, laid out like the editor does when
+    # parts have not been moved: the controller left, the rest on a half circle
+    nodes = [n for n in diagram.get("nodes") or [] if isinstance(n, dict) and n.get("id")][:MAX_THUMB_PARTS]
+    controller = next((n for n in nodes if n.get("type") == "Microcontroller"), None)
+    others = [n for n in nodes if n is not controller]
+    points = {}
+    if controller:
+        points[controller["id"]] = (300.0, 200.0)
+    for index, node in enumerate(others):
+        angle = index / len(others) * math.pi - math.pi / 2
+        points[node["id"]] = (500 + math.cos(angle) * 300, 300 + math.sin(angle) * 300)
+    for node in nodes:
+        position = node.get("position")
+        if isinstance(position, dict) and isinstance(position.get("x"), (int, float)) and isinstance(position.get("y"), (int, float)):
+            points[node["id"]] = (float(position["x"]), float(position["y"]))
+    if not points:
+        return f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {THUMB_WIDTH} {THUMB_HEIGHT}"/>'
+
+    xs, ys = [p[0] for p in points.values()], [p[1] for p in points.values()]
+    span = max(max(xs) - min(xs), max(ys) - min(ys), 1)
+    scale = min((THUMB_WIDTH - 2 * THUMB_MARGIN) / span, (THUMB_HEIGHT - 2 * THUMB_MARGIN) / span)
+
+    def at(node_id):
+        x, y = points[node_id]
+        return round(THUMB_MARGIN + (x - min(xs)) * scale), round(THUMB_MARGIN + (y - min(ys)) * scale)
+
+    wires = []
+    for connection in diagram.get("connections") or []:
+        if isinstance(connection, dict) and connection.get("from") in points and connection.get("to") in points:
+            (x1, y1), (x2, y2) = at(connection["from"]), at(connection["to"])
+            wires.append(f"M{x1} {y1}L{x2} {y2}")
+    parts = []
+    for node_id in points:
+        x, y = at(node_id)
+        fill = "#3B82F6" if controller and node_id == controller["id"] else "#4B5563"
+        parts.append(f'<rect x="{x - 6}" y="{y - 4}" width="12" height="8" rx="2" fill="{fill}"/>')
+    # Parallel wires between two parts are one line at this size
+    path = f'<path d="{"".join(dict.fromkeys(wires))}" stroke="#9CA3AF" fill="none"/>' if wires else ""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {THUMB_WIDTH} {THUMB_HEIGHT}">'
+        f'<rect width="{THUMB_WIDTH}" height="{THUMB_HEIGHT}" fill="#F9FAFB"/>{path}{"".join(parts)}</svg>'
+    )
+
+
+def summarize(circuit_id, query, diagram, created_at):
+    # A new gallery row
+    diagram = diagram or {}
+    return {
+        "circuit_id": circuit_id,
+        "title": (query or "")[:200],
+        "thumbnail": thumbnail(diagram),
+        "part_count": len(diagram.get("nodes") or []),
+        "connection_count": len(diagram.get("connections") or []),
+        "tags": tags(diagram),
+        "views": 0,
+        "likes": 0,
+        "rank": bump(None, NEW_WEIGHT, created_at),
+        "created_at": created_at,
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def public(row):
+    return {
+        "id": row["circuit_id"],
+        "title": row["title"],
+        "thumbnail": f"/api/gallery/{row['circuit_id']}/thumbnail.svg",
+        "parts": row["part_count"],
+        "connections": row["connection_count"],
+        "tags": row["tags"] or [],
+        "views": row["views"],
+        "likes": row["likes"],
+        "created_at": row["created_at"],
+    }
+
+
+def sort_key(sort, row):
+    # Best first, ties by id
+    if sort == "trending":
+        return (-row["rank"], row["circuit_id"])
+    return (-_seconds(row["created_at"]), row["circuit_id"])
+
+
+def cursor_of(sort, row):
+    return f"{row['rank']!r}~{row['circuit_id']}" if sort == "trending" else f"{row['created_at'].isoformat()}~{row['circuit_id']}"
+
+
+def parse_cursor(sort, cursor):
+    # The sort key a page starts after; ValueError for a bad cursor
+    value, _, circuit_id = cursor.partition("~")
+    if not circuit_id:
+        raise ValueError("bad cursor")
+    if sort == "trending":
+        return (-float(value), circuit_id)
+    return (-_seconds(datetime.fromisoformat(value)), circuit_id)
+
+
+class Gallery:
+    def __init__(self, size=GALLERY_SIZE):
+        self.size = size
+        self.items = {}  # circuit id -> gallery row
+        # True while items hold every row, so no page needs the DB
+        self.complete = False
+        # sort -> key of the last row up to which items hold every row in that
+        # order; rows past it are only in memory because the other sort wants them
+        self.bounds = {sort: None for sort in SORTS}
+        self.order = {sort: ([], []) for sort in SORTS}  # sort -> (keys, rows), best first
+        self.sorted_at = 0
+        self.stale = True
+        self.pages = OrderedDict()  # (sort, limit, cursor, tag) -> CachedBody
+        self.events = defaultdict(lambda: [0, 0])  # circuit id -> [views, likes] not yet written
+        self.task = None
+
+    async def backfill(self):
+        # Summaries for circuits saved before the gallery existed
+        while True:
+            rows = await database.fetch_all(
+                sqlalchemy.select(circuits.c.id, circuits.c.query, circuits.c.diagram_data, circuits.c.created_at)
+                .select_from(circuits.outerjoin(gallery, gallery.c.circuit_id == circuits.c.id))
+                .where(gallery.c.circuit_id.is_(None))
+                .limit(BACKFILL_BATCH)
+            )
+            if not rows:
+                return
+            values = [summarize(r["id"], r["query"], r["diagram_data"], r["created_at"] or datetime.utcnow()) for r in rows]
+            try:
+                await database.execute_many(gallery.insert(), values)
+            except Exception as e:
+                # Another worker is backfilling the same rows
+                print(f"Gallery backfill stopped: {e}")
+                return
+
+    async def load(self):
+        await self.backfill()
+        best = await database.fetch_all(
+            gallery.select().order_by(sqlalchemy.desc(gallery.c.rank), gallery.c.circuit_id).limit(self.size)
+        )
+        newest = await database.fetch_all(
+            gallery.select().order_by(sqlalchemy.desc(gallery.c.created_at), gallery.c.circuit_id).limit(self.size)
+        )
+        self.items = {r["circuit_id"]: dict(r) for r in [*best, *newest]}
+        self.complete = len(best) < self.size
+        for sort, rows in (("trending", best), ("new", newest)):
+            self.bounds[sort] = sort_key(sort, rows[-1]) if rows else None
+        self.stale = True
+
+    def start(self):
+        self.task = asyncio.create_task(self.flusher())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+
+    # --- FEED ---
+
+    def rerank(self):
+        if not self.stale or time.monotonic() - self.sorted_at < RERANK_SECONDS:
+            return
+        rows = list(self.items.values())
+        for sort in SORTS:
+            rows.sort(key=lambda row: sort_key(sort, row))
+            self.order[sort] = ([sort_key(sort, row) for row in rows], rows[:])
+        if len(rows) > 2 * self.size:
+            # Saves and rising circuits grow the window; keep it bounded
+            keep = {r["circuit_id"] for sort in SORTS for r in self.order[sort][1][:self.size]}
+            self.items = {k: v for k, v in self.items.items() if k in keep}
+            for sort in SORTS:
+                last = self.order[sort][0][self.size - 1]
+                bound = self.bounds[sort]
+                self.bounds[sort] = last if self.complete or bound is None else min(bound, last)
+            self.complete = False
+            self.stale = True
+            self.sorted_at = 0
+            return self.rerank()
+        self.pages.clear()
+        self.stale = False
+        self.sorted_at = time.monotonic()
+        metrics.incr("gallery.reranks")
+
+    def page(self, sort, limit, cursor=None, tag=None):
+        # Rendered page; None when it runs past the window and the DB must answer
+        self.rerank()
+        key = (sort, limit, cursor, tag)
+        entry = self.pages.get(key)
+        if entry is not None:
+            self.pages.move_to_end(key)
+            metrics.incr("gallery.page_hits")
+            return entry
+        keys, rows = self.order[sort]
+        start = bisect_right(keys, parse_cursor(sort, cursor)) if cursor else 0
+        # Past the bound, rows missing from memory would be skipped silently
+        bound = self.bounds[sort]
+        end = len(rows) if self.complete or bound is None else bisect_right(keys, bound)
+        items = []
+        for row in rows[start:end]:
+            if tag is None or tag in (row["tags"] or []):
+                items.append(row)
+                if len(items) == limit:
+                    break
+        if len(items) < limit and not self.complete:
+            return None
+        return self.cache(key, sort, limit, items)
+
+    def cache(self, key, sort, limit, rows):
+        entry = CachedBody(dumps({
+            "items": [public(row) for row in rows],
+            "next": cursor_of(sort, rows[-1]) if len(rows) == limit else None,
+        }))
+        self.pages[key] = entry
+        while len(self.pages) > MAX_PAGES:
+            self.pages.popitem(last=False)
+        metrics.incr("gallery.page_renders")
+        return entry
+
+    async def fetch_page(self, sort, limit, cursor=None, tag=None):
+        # Keyset query for pages past the window; cached like the others
+        query = gallery.select()
+        if sort == "trending":
+            if cursor:
+                rank, circuit_id = parse_cursor(sort, cursor)
+                rank = -rank
+                query = query.where(sqlalchemy.or_(
+                    gallery.c.rank < rank, sqlalchemy.and_(gallery.c.rank == rank, gallery.c.circuit_id > circuit_id)
+                ))
+            query = query.order_by(sqlalchemy.desc(gallery.c.rank), gallery.c.circuit_id)
+        else:
+            if cursor:
+                value, _, circuit_id = cursor.partition("~")
+                created_at = datetime.fromisoformat(value)
+                query = query.where(sqlalchemy.or_(
+                    gallery.c.created_at < created_at,
+                    sqlalchemy.and_(gallery.c.created_at == created_at, gallery.c.circuit_id > circuit_id),
+                ))
+            query = query.order_by(sqlalchemy.desc(gallery.c.created_at), gallery.c.circuit_id)
+        if tag is not None:
+            # tags is a JSON list of strings
+            query = query.where(sqlalchemy.cast(gallery.c.tags, sqlalchemy.String).like(f'%"{tag}"%'))
+        rows = [dict(r) for r in await database.fetch_all(query.limit(limit))]
+        metrics.incr("gallery.db_pages")
+        return self.cache((sort, limit, cursor, tag), sort, limit, rows)
+
+    def thumbnail(self, circuit_id):
+        row = self.items.get(circuit_id)
+        return None if row is None else row["thumbnail"]
+
+    # --- SAVES ---
+
+    def add(self, row):
+        self.items[row["circuit_id"]] = row
+        self.stale = True
+
+    async def fetch(self, circuit_ids):
+        rows = await database.fetch_all(gallery.select().where(gallery.c.circuit_id.in_(list(circuit_ids))))
+        for row in rows:
+            self.add(dict(row))
+
+    async def added(self, circuit_id, query, diagram, created_at):
+        # A new save
+        row = summarize(circuit_id, query, diagram, created_at)
+        await database.execute(gallery.insert().values(**row))
+        self.add(row)
+        await pubsub.publish(CHANNEL, {"saved": [circuit_id]})
+
+    async def changed(self, circuit_id, diagram):
+        # The circuit's diagram was edited (collab snapshot)
+        values = summarize(circuit_id, None, diagram, datetime.utcnow())
+        values = {k: values[k] for k in ("thumbnail", "part_count", "connection_count", "tags", "updated_at")}
+        await database.execute(gallery.update().where(gallery.c.circuit_id == circuit_id).values(**values))
+        if circuit_id in self.items:
+            self.add({**self.items[circuit_id], **values})
+        await pubsub.publish(CHANNEL, {"saved": [circuit_id]})
+
+    # --- TRENDING ---
+
+    def record(self, circuit_id, kind):
+        # Counted in memory; flush() writes them
+        self.events[circuit_id][0 if kind == "view" else 1] += 1
+
+    async def flusher(self):
+        while True:
+            await asyncio.sleep(FLUSH_SECONDS)
+            await self.flush()
+
+    async def flush(self):
+        events, self.events = self.events, defaultdict(lambda: [0, 0])
+        if not events:
+            return
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        updates = []
+        try:
+            async with database.transaction():
+                rows = await database.fetch_all(
+                    sqlalchemy.select(gallery.c.circuit_id, gallery.c.rank, gallery.c.views, gallery.c.likes)
+                    .where(gallery.c.circuit_id.in_(list(events)))
+                    .with_for_update()
+                )
+                for row in rows:
+                    views, likes = events[row["circuit_id"]]
+                    rank = bump(row["rank"], views * WEIGHTS["view"] + likes * WEIGHTS["like"], now)
+                    update = [row["circuit_id"], rank, row["views"] + views, row["likes"] + likes]
+                    await database.execute(
+                        gallery.update().where(gallery.c.circuit_id == update[0]).values(rank=rank, views=update[2], likes=update[3])
+                    )
+                    updates.append(update)
+        except Exception as e:
+            # Keep the counts for the next flush
+            for circuit_id, (views, likes) in events.items():
+                self.events[circuit_id][0] += views
+                self.events[circuit_id][1] += likes
+            print(f"Gallery flush failed: {e}")
+            return
+        await self.ranked(updates)
+        for chunk in pubsub.chunks(updates):
+            await pubsub.publish(CHANNEL, {"ranks": chunk})
+        metrics.observe("gallery.flush_ms", (time.perf_counter() - started) * 1000)
+
+    async def ranked(self, updates):
+        # New [id, rank, views, likes] from a flush on any worker
+        missing = []
+        for circuit_id, rank, views, likes in updates:
+            row = self.items.get(circuit_id)
+            if row is not None:
+                self.add({**row, "rank": rank, "views": views, "likes": likes})
+            else:
+                missing.append(circuit_id)
+        if missing and not self.complete:
+            # Circuits outside the window that rose above the trending bound
+            bound = self.bounds["trending"]
+            rising = [u[0] for u in updates if u[0] in missing and (bound is None or (-u[1], u[0]) <= bound)]
+            if rising:
+                await self.fetch(rising)
+
+    async def on_notify(self, data):
+        if not data:
+            return
+        if data.get("saved"):
+            await self.fetch(data["saved"])
+        elif data.get("ranks"):
+            await self.ranked(data["ranks"])
+
+
+gallery_feed = Gallery()
+pubsub.subscribe(CHANNEL, gallery_feed.on_notify)
@@ -0,0 +1,40 @@
+import os
+import multiprocessing
+
+# Production server profile: gunicorn managing uvicorn workers.
+# One worker per CPU unless WEB_CONCURRENCY says otherwise. `kill -HUP` on the
+# master reloads gracefully: new workers start on the new code while the old
+# ones finish their in-flight requests (up to graceful_timeout) and exit.
+#
+# Workers share nothing in memory. Cache invalidation, the recent feed, the
+# price catalog and idempotency keys are synced over Postgres LISTEN/NOTIFY
+# (pubsub.py) and the LLM rate budget lives in Postgres (llm_budget.py).
+#
+# Usage: gunicorn main:app -c gunicorn.conf.py
+
+
+def _cpus():
+    # CPUs this process may run on, which can be fewer than the host has
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", _cpus()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Not preloaded: each worker must import the app itself, so it gets its own
+# database pool, pubsub listener and WORKER_ID (a forked WORKER_ID would make
+# workers drop each other's notifications as their own)
+preload_app = False
+
+# Generation requests wait on the LLM for up to a minute or so
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "90"))
+timeout = 120
+keepalive = 5
+
+# Railway terminates TLS in front of the app
+forwarded_allow_ips = "*"
+accesslog = "-"
@@ -0,0 +1,220 @@
+import os
+import time
+import json
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from fastapi import HTTPException
+import pubsub
+import metrics
+from database import database, idempotency_keys
+from responses import ORJSONResponse
+
+# Idempotency-Key support for endpoints that cost money or write rows.
+# The first request with a key claims it and runs; its response is stored for
+# IDEMPOTENCY_TTL_HOURS and replayed to any retry with the same key and body.
+# Retries that arrive while the first request is still running wait for it
+# instead of starting over: in this worker they await the same task, in other
+# workers they wait for the stored response (woken over pubsub, polling as a
+# fallback). The work runs in its own task, so a client that disconnects
+# mid-request does not throw it away before the retry arrives.
+#
+# Failed requests are not stored: the key is released and the next retry runs
+# again. Without Postgres, keys are kept in process memory.
+
+CHANNEL = "idempotency"
+TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+# A claim older than this without a response belongs to a dead worker
+PENDING_TIMEOUT = timedelta(minutes=5)
+WAIT_TIMEOUT_SECONDS = 300
+POLL_SECONDS = 0.5
+PURGE_INTERVAL_SECONDS = 600
+# Insert-or-read rounds before giving up on a key that keeps being released
+CLAIM_ATTEMPTS = 5
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class PostgresStore:
+    def __init__(self):
+        self.last_purge = 0.0
+
+    async def claim(self, key, digest):
+        # None when this request now owns the key, else the existing row
+        await self.purge()
+        now = datetime.utcnow()
+        table = idempotency_keys
+        stmt = pg_insert(table).values(key=key, fingerprint=digest, response=None, created_at=now, expires_at=now + TTL)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={"fingerprint": digest, "response": None, "created_at": now, "expires_at": now + TTL},
+            # Expired keys and claims abandoned by a dead worker can be taken over
+            where=sqlalchemy.or_(
+                table.c.expires_at < now,
+                sqlalchemy.and_(table.c.response.is_(None), table.c.created_at < now - PENDING_TIMEOUT),
+            ),
+        ).returning(table.c.key)
+        # A conflicting row can be released between the insert and the read;
+        # then the key is free again and the insert is retried
+        for _ in range(CLAIM_ATTEMPTS):
+            if await database.fetch_one(stmt):
+                return None
+            row = await self.get(key)
+            if row is not None:
+                return row
+        raise RuntimeError(f"Could not claim idempotency key {key!r}")
+
+    async def get(self, key):
+        row = await database.fetch_one(idempotency_keys.select().where(idempotency_keys.c.key == key))
+        return dict(row) if row else None
+
+    async def complete(self, key, response):
+        await database.execute(
+            idempotency_keys.update()
+            .where(idempotency_keys.c.key == key)
+            .values(response=response, expires_at=datetime.utcnow() + TTL)
+        )
+
+    async def release(self, key):
+        await database.execute(
+            idempotency_keys.delete()
+            .where(idempotency_keys.c.key == key)
+            .where(idempotency_keys.c.response.is_(None))
+        )
+
+    async def purge(self):
+        if time.monotonic() - self.last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self.last_purge = time.monotonic()
+        await database.execute(idempotency_keys.delete().where(idempotency_keys.c.expires_at < datetime.utcnow()))
+
+
+class MemoryStore:
+    def __init__(self):
+        self.rows = {}
+
+    async def claim(self, key, digest):
+        now = datetime.utcnow()
+        row = self.rows.get(key)
+        if row is None or row["expires_at"] < now:
+            self.rows[key] = {"key": key, "fingerprint": digest, "response": None, "created_at": now, "expires_at": now + TTL}
+            return None
+        return row
+
+    async def get(self, key):
+        return self.rows.get(key)
+
+    async def complete(self, key, response):
+        if key in self.rows:
+            self.rows[key].update(response=response, expires_at=datetime.utcnow() + TTL)
+
+    async def release(self, key):
+        if key in self.rows and self.rows[key]["response"] is None:
+            del self.rows[key]
+
+
+_store = None
+_inflight = {}  # key -> (fingerprint, task) for requests running in this worker
+_wakeups = {}  # key -> asyncio.Event for requests waiting on another worker
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = PostgresStore() if pubsub.is_postgres() else MemoryStore()
+    return _store
+
+
+def on_notify(data):
+    event = _wakeups.get(data.get("key"))
+    if event is not None:
+        event.set()
+
+
+pubsub.subscribe(CHANNEL, on_notify)
+
+
+def _consume_exception(task):
+    if not task.cancelled():
+        task.exception()
+
+
+def _forget(key, task):
+    if key in _inflight and _inflight[key][1] is task:
+        del _inflight[key]
+
+
+def _replay(content):
+    return ORJSONResponse(content, headers={"Idempotent-Replayed": "true"})
+
+
+async def _wait(key):
+    # Wakes when another worker publishes the key's response, or polls
+    event = _wakeups.setdefault(key, asyncio.Event())
+    try:
+        await asyncio.wait_for(event.wait(), POLL_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        _wakeups.pop(key, None)
+
+
+async def _execute(key, scope, digest, run):
+    # (content, replayed): run here, or the response another request stored
+    store = get_store()
+    deadline = time.monotonic() + WAIT_TIMEOUT_SECONDS
+    while True:
+        row = await store.claim(key, digest)
+        if row is None:
+            break
+        if row["fingerprint"] != digest:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if row["response"] is not None:
+            metrics.incr(f"idempotency.{scope}.replayed")
+            return row["response"], True
+        # In flight on another worker
+        if time.monotonic() > deadline:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+        metrics.incr(f"idempotency.{scope}.waits")
+        await _wait(key)
+
+    try:
+        content = await run()
+    except BaseException:
+        await store.release(key)
+        raise
+    await store.complete(key, content)
+    await pubsub.publish(CHANNEL, {"key": key})
+    return content, False
+
+
+async def idempotent(key, scope, payload, run):
+    # Runs `run` (a zero-argument coroutine function returning JSON content)
+    # at most once per key; retries get the same content back
+    if not key:
+        return await run()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters")
+    key = f"{scope}:{key}"
+    digest = fingerprint(payload)
+
+    running = _inflight.get(key)
+    if running is not None:
+        if running[0] != digest:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        metrics.incr(f"idempotency.{scope}.attached")
+        content, _ = await asyncio.shield(running[1])
+        return _replay(content)
+
+    task = asyncio.create_task(_execute(key, scope, digest, run))
+    task.add_done_callback(_consume_exception)
+    task.add_done_callback(lambda done: _forget(key, done))
+    _inflight[key] = (digest, task)
+    # shield: a disconnecting client must not cancel work a retry can attach to
+    content, replayed = await asyncio.shield(task)
+    return _replay(content) if replayed else content
@@ -0,0 +1,120 @@
+import sqlalchemy
+import pubsub
+from database import database, components, inventory
+from netlist import part_key, match_part
+
+# Parts a user owns (the inventory table), for inventory-aware generation.
+# Each user's parts are loaded on their first request and kept as a dict keyed
+# by part_key(name), so matching a diagram label costs one dict lookup however
+# large the inventory is. The diagram prompt lists the owned parts and the BOM
+# prices them at $0. Only the exact name, or another name of the same price
+# catalog part, counts as owned: an owned "LED" does not cover an "RGB LED".
+# Such near matches, and owned parts of the same components category, are
+# suggested as substitutes instead.
+#
+# Inventory writes reload that user here and in every other worker; component
+# writes reload the categories.
+
+CHANNEL = "inventory"
+MAX_USERS = 5000
+# Owned parts named in the diagram prompt, most stock first
+MAX_PROMPT_PARTS = 40
+
+
+class OwnedParts:
+    def __init__(self, rows, categories):
+        self.categories = categories  # part_key(component name) -> category
+        self.parts = {}  # part_key(name) -> {"name", "quantity", "category"}
+        self.by_category = {}  # category -> [parts], most stock first
+        self.aliased = (None, {})  # (catalog, catalog part name -> part)
+        for r in sorted(rows, key=lambda r: (-r["quantity"], r["component"])):
+            category = r["category"] or match_part(categories, r["component"])
+            part = {"name": r["component"], "quantity": r["quantity"], "category": category}
+            self.parts.setdefault(part_key(r["component"]), part)
+            if category:
+                self.by_category.setdefault(part_key(category), []).append(part)
+
+    def __bool__(self):
+        return bool(self.parts)
+
+    def items(self):
+        parts = sorted(self.parts.values(), key=lambda p: p["name"].lower())
+        return [{"component": p["name"], "quantity": p["quantity"], "category": p["category"]} for p in parts]
+
+    def lookup(self, label, catalog=None):
+        # The owned part with exactly this name. With a catalog (part_key of a
+        # name or alias -> {"name", ...}), also one owned under another name of
+        # the same catalog part ("SG90" for "Servo Motor (SG90)")
+        key = part_key(label)
+        part = self.parts.get(key)
+        if part is not None or not catalog or key not in catalog:
+            return part
+        if self.aliased[0] is not catalog:
+            names = {}
+            for owned_key, owned in self.parts.items():
+                if owned_key in catalog:
+                    names.setdefault(catalog[owned_key]["name"], owned)
+            self.aliased = (catalog, names)
+        return self.aliased[1].get(catalog[key]["name"])
+
+    def substitute(self, label, spare):
+        # Owned part with stock left, as judged by spare(part): one in the
+        # label's category, else one whose name is part of the label ("LED"
+        # for "RGB LED"); None when nothing fits
+        category = match_part(self.categories, label)
+        for part in self.by_category.get(part_key(category), ()) if category else ():
+            if spare(part) > 0:
+                return part
+        near = match_part(self.parts, label)
+        return near if near is not None and spare(near) > 0 else None
+
+    def prompt(self):
+        # Appended to the diagram request; empty without an inventory
+        if not self.parts:
+            return ""
+        listed = sorted(self.parts.values(), key=lambda p: -p["quantity"])[:MAX_PROMPT_PARTS]
+        return "\nParts I own: " + "; ".join(f"{p['quantity']} x {p['name']}" for p in listed)
+
+
+class InventoryIndex:
+    def __init__(self):
+        self.categories = None  # part_key(component name) -> category; None until loaded
+        self.users = {}  # user_id -> OwnedParts
+
+    async def load_categories(self):
+        rows = await database.fetch_all(sqlalchemy.select(components.c.name, components.c.category))
+        self.categories = {part_key(r["name"]): r["category"] for r in rows if r["category"]}
+
+    async def owned(self, user_id):
+        # The user's OwnedParts; None for requests without a user
+        if user_id is None:
+            return None
+        if self.categories is None:
+            await self.load_categories()
+        parts = self.users.get(user_id)
+        if parts is None:
+            rows = await database.fetch_all(inventory.select().where(inventory.c.user_id == user_id))
+            parts = OwnedParts(rows, self.categories)
+            if len(self.users) >= MAX_USERS:
+                self.users.clear()
+            self.users[user_id] = parts
+        return parts
+
+    def drop(self, user_id=None):
+        # One user after an inventory write, everything after a component write
+        if user_id is None:
+            self.categories = None
+            self.users = {}
+        else:
+            self.users.pop(user_id, None)
+
+    async def invalidate(self, user_id=None):
+        self.drop(user_id)
+        await pubsub.publish(CHANNEL, {"user_id": user_id})
+
+    def on_notify(self, data):
+        self.drop(data.get("user_id"))
+
+
+user_inventory = InventoryIndex()
+pubsub.subscribe(CHANNEL, user_inventory.on_notify)
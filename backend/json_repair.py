@@ -0,0 +1,104 @@
+import re
+import json
+
+# Tolerant JSON recovery for model output.
+# Handles Markdown code fences, prose around the object, trailing commas and,
+# above all, output cut off by a token limit: the text is scanned once,
+# recording every point where the value so far is complete (before a comma,
+# after a closing bracket), and the longest prefix that parses once its open
+# brackets are closed wins. Only the top-level object and arrays may be left
+# partial, never an entry: a diagram truncated inside its 14th connection
+# comes back with the first 13 connections intact and no half connection.
+
+# Cut points tried, latest first, before giving up
+MAX_ATTEMPTS = 64
+CLOSERS = {"{": "}", "[": "]"}
+
+_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?|\n?\s*```\s*$")
+_decoder = json.JSONDecoder(strict=False)
+
+
+def _start(text):
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("no JSON object in model output")
+    return min(starts)
+
+
+def _cut(cuts, length, stack):
+    # stack[0] closes the top-level value; anything nested that is still open
+    # must be an array, or an entry would be cut in half
+    if all(closer == "]" for closer in stack[1:]):
+        cuts.append((length, "".join(reversed(stack))))
+
+
+def _scan(text, start):
+    # Returns (cleaned text, cut points); a cut point is (length of cleaned
+    # text, closers needed at that point). Trailing commas are dropped.
+    out = []
+    cuts = []
+    stack = []
+    in_string = False
+    escaped = False
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(CLOSERS[ch])
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack and stack[-1] == ch:
+                stack.pop()
+            out.append(ch)
+            _cut(cuts, len(out), stack)
+            if not stack:
+                break  # anything after the top-level value is noise
+            continue
+        elif ch == "," and stack:
+            _cut(cuts, len(out), stack)
+        out.append(ch)
+
+    cleaned = "".join(out)
+    tail = cleaned.rstrip()
+    if not in_string and stack and tail and tail[-1] in '"}]el':
+        # Cut off right after a complete string, container or true/false/null
+        _cut(cuts, len(tail), stack)
+    return cleaned, cuts
+
+
+def repair(text):
+    # Returns (value, truncated); raises ValueError when nothing can be salvaged
+    text = _FENCE.sub("", text or "")
+    start = _start(text)
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+        return value, False
+    except ValueError:
+        pass
+
+    cleaned, cuts = _scan(text, start)
+    if cuts and not cuts[-1][1]:
+        # Complete once trailing commas are gone
+        try:
+            return json.loads(cleaned[:cuts[-1][0]], strict=False), False
+        except ValueError:
+            pass
+    for length, closers in sorted(cuts, reverse=True)[:MAX_ATTEMPTS]:
+        candidate = cleaned[:length].rstrip().rstrip(",") + closers
+        try:
+            return json.loads(candidate, strict=False), True
+        except ValueError:
+            continue
+    raise ValueError("model output is not recoverable JSON")
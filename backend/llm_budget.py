@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import metrics
+
+# LLM rate budget shared by every worker.
+# Each backend ("openai", "local") can have a requests-per-minute and a
+# tokens-per-minute limit, LLM_RPM_<BACKEND> and LLM_TPM_<BACKEND>; unset
+# means unlimited and costs nothing. The limits are token buckets that hold up
+# to one minute of budget. With Postgres a bucket is a row in llm_budget,
+# refilled and debited in a single UPDATE on the database clock, so all
+# workers in all containers draw from the same budget instead of each one
+# assuming it has the whole account limit to itself.
+#
+# Token usage is only known after a call: a call waits while the token bucket
+# is in debt, and the actual usage is debited when the answer arrives.
+
+# Longest single sleep while waiting for budget; the bucket is checked again
+MAX_WAIT_SECONDS = 2.0
+MIN_WAIT_SECONDS = 0.05
+
+_REFILLED = (
+    "LEAST(CAST(:capacity AS float8), "
+    "available + CAST(:rate AS float8) * EXTRACT(EPOCH FROM (now() - updated_at)))"
+)
+
+
+def limits(backend):
+    # {"requests": per minute, "tokens": per minute} for the configured limits
+    configured = {}
+    for kind, prefix in (("requests", "LLM_RPM_"), ("tokens", "LLM_TPM_")):
+        value = os.getenv(f"{prefix}{backend.upper()}")
+        if value and float(value) > 0:
+            configured[kind] = float(value)
+    return configured
+
+
+class PostgresBuckets:
+    def __init__(self):
+        from database import database
+
+        self.database = database
+        self.created = set()
+
+    async def _create(self, name, capacity):
+        if name in self.created:
+            return
+        await self.database.execute(
+            query="INSERT INTO llm_budget (name, available, updated_at) VALUES (:name, CAST(:capacity AS float8), now()) "
+                  "ON CONFLICT (name) DO NOTHING",
+            values={"name": name, "capacity": capacity},
+        )
+        self.created.add(name)
+
+    async def take(self, name, per_minute, need, amount):
+        # Seconds to wait before trying again, or 0 when `amount` was taken
+        values = {"name": name, "capacity": per_minute, "rate": per_minute / 60}
+        await self._create(name, per_minute)
+        row = await self.database.fetch_one(
+            query=f"UPDATE llm_budget SET available = {_REFILLED} - CAST(:amount AS float8), updated_at = now() "
+                  f"WHERE name = :name AND {_REFILLED} >= CAST(:need AS float8) RETURNING available",
+            values={**values, "need": need, "amount": amount},
+        )
+        if row is not None:
+            return 0
+        row = await self.database.fetch_one(
+            query=f"SELECT {_REFILLED} AS available FROM llm_budget WHERE name = :name", values=values,
+        )
+        return (need - row["available"]) / values["rate"]
+
+    async def spend(self, name, amount):
+        await self.database.execute(
+            query="UPDATE llm_budget SET available = available - CAST(:amount AS float8) WHERE name = :name",
+            values={"name": name, "amount": amount},
+        )
+
+
+class MemoryBuckets:
+    def __init__(self):
+        self.buckets = {}  # name -> [available, updated]
+
+    def _refill(self, name, per_minute):
+        now = time.monotonic()
+        bucket = self.buckets.setdefault(name, [per_minute, now])
+        bucket[0] = min(per_minute, bucket[0] + (now - bucket[1]) * per_minute / 60)
+        bucket[1] = now
+        return bucket
+
+    async def take(self, name, per_minute, need, amount):
+        bucket = self._refill(name, per_minute)
+        if bucket[0] >= need:
+            bucket[0] -= amount
+            return 0
+        return (need - bucket[0]) / (per_minute / 60)
+
+    async def spend(self, name, amount):
+        if name in self.buckets:
+            self.buckets[name][0] -= amount
+
+
+_buckets = None
+
+
+def get_buckets():
+    # database is imported on first use: model_router, and with it this module,
+    # is also loaded by offline tools that have no DATABASE_URL
+    global _buckets
+    if _buckets is None:
+        import pubsub
+
+        _buckets = PostgresBuckets() if pubsub.is_postgres() else MemoryBuckets()
+    return _buckets
+
+
+async def acquire(backend):
+    # Waits until `backend` has budget for one more call
+    configured = limits(backend)
+    if not configured:
+        return
+    started = time.perf_counter()
+    waited = False
+    # One request, and a token bucket that is not in debt
+    for kind, need, amount in (("requests", 1, 1), ("tokens", 0, 0)):
+        if kind not in configured:
+            continue
+        while True:
+            try:
+                wait = await get_buckets().take(f"{backend}.{kind}", configured[kind], need, amount)
+            except Exception as e:
+                # A budget we cannot read must not stop generation
+                print(f"llm_budget: {backend}.{kind} unavailable: {e}")
+                break
+            if wait <= 0:
+                break
+            waited = True
+            await asyncio.sleep(min(max(wait, MIN_WAIT_SECONDS), MAX_WAIT_SECONDS))
+    if waited:
+        metrics.incr(f"llm_budget.{backend}.waits")
+        metrics.observe(f"llm_budget.{backend}.wait_ms", (time.perf_counter() - started) * 1000)
+
+
+async def charge(backend, usage):
+    if usage is None or "tokens" not in limits(backend):
+        return
+    try:
+        await get_buckets().spend(f"{backend}.tokens", usage.total_tokens)
+    except Exception as e:
+        print(f"llm_budget: could not charge {backend}.tokens: {e}")
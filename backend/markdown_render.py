@@ -0,0 +1,129 @@
+import sys
+import asyncio
+import hashlib
+import markdown
+import nh3
+import sqlalchemy
+from database import database, components, ai_courses
+
+# Markdown -> sanitized HTML, rendered once at write time and stored next to the
+# source so clients can skip client-side Markdown parsing.
+#
+# Backfill existing rows:  python markdown_render.py backfill
+
+BACKFILL_BATCH = 500
+
+_markdown = markdown.Markdown(extensions=["toc", "fenced_code", "tables", "sane_lists"])
+
+# nh3 defaults plus heading ids (TOC anchors) and code language classes
+_ALLOWED_ATTRIBUTES = {
+    **nh3.ALLOWED_ATTRIBUTES,
+    **{f"h{level}": {"id"} for level in range(1, 7)},
+    "code": {"class"},
+}
+
+
+def content_hash(*sources):
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update((source or "").encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _flatten_toc(tokens):
+    toc = []
+    for token in tokens:
+        toc.append({"level": token["level"], "id": token["id"], "title": token["name"]})
+        toc.extend(_flatten_toc(token["children"]))
+    return toc
+
+
+def render(source):
+    # Returns (html, toc); both are None for empty sources
+    if not source:
+        return None, None
+    _markdown.reset()
+    html = _markdown.convert(source)
+    toc = _flatten_toc(_markdown.toc_tokens)
+    return nh3.clean(html, attributes=_ALLOWED_ATTRIBUTES), toc
+
+
+def render_component(description, wiring_guide):
+    description_html, description_toc = render(description)
+    wiring_guide_html, _ = render(wiring_guide)
+    return {
+        "description_html": description_html,
+        "description_toc": description_toc,
+        "wiring_guide_html": wiring_guide_html,
+        "content_hash": content_hash(description, wiring_guide),
+    }
+
+
+def render_course(content):
+    content_html, content_toc = render(content)
+    return {
+        "content_html": content_html,
+        "content_toc": content_toc,
+        "content_hash": content_hash(content),
+    }
+
+
+# --- BACKFILL ---
+
+_BACKFILL = {
+    "components": (components, ("description", "wiring_guide"), render_component),
+    "courses": (ai_courses, ("content",), render_course),
+}
+
+
+async def backfill(kind):
+    # Re-renders rows whose stored hash no longer matches their source, one
+    # UPDATE ... FROM (VALUES ...) statement per batch.
+    table, sources, renderer = _BACKFILL[kind]
+    query = sqlalchemy.select(table.c.id, table.c.content_hash, *[table.c[s] for s in sources]).order_by(table.c.id)
+    pending = []
+    updated = 0
+    async for r in database.iterate(query):
+        values = [r[s] for s in sources]
+        if r["content_hash"] == content_hash(*values):
+            continue
+        pending.append({"id": r["id"], **renderer(*values)})
+        if len(pending) >= BACKFILL_BATCH:
+            updated += await _write_rendered(table, pending)
+            pending = []
+    if pending:
+        updated += await _write_rendered(table, pending)
+    return updated
+
+
+async def _write_rendered(table, rows):
+    columns = list(rows[0].keys())
+    rendered = sqlalchemy.values(*[sqlalchemy.column(c, table.c[c].type) for c in columns], name="rendered").data(
+        [tuple(row[c] for c in columns) for row in rows]
+    )
+    query = (
+        table.update()
+        .where(table.c.id == rendered.c.id)
+        .values({c: rendered.c[c] for c in columns if c != "id"})
+    )
+    await database.execute(query)
+    return len(rows)
+
+
+async def _main(argv):
+    if argv[:1] != ["backfill"]:
+        print("Usage: python markdown_render.py backfill [components|courses]")
+        return 1
+    await database.connect()
+    try:
+        for kind in argv[1:] or list(_BACKFILL):
+            count = await backfill(kind)
+            print(f"Rendered {count} {kind}")
+    finally:
+        await database.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,44 @@
+from collections import defaultdict, deque
+
+# In-process counters and timings, exposed by GET /api/metrics.
+# Values are per worker; names are dotted, e.g. "llm.diagram.calls".
+
+TIMING_SAMPLES = 1000
+
+_counters = defaultdict(float)
+_timings = defaultdict(lambda: deque(maxlen=TIMING_SAMPLES))
+
+
+def incr(name, value=1):
+    _counters[name] += value
+
+
+def observe(name, milliseconds):
+    _timings[name].append(milliseconds)
+
+
+def counter(name):
+    return _counters.get(name, 0)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def timing(name):
+    samples = sorted(_timings.get(name, ()))
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "avg_ms": round(sum(samples) / len(samples), 2),
+        "p50_ms": round(_percentile(samples, 0.5), 2),
+        "p95_ms": round(_percentile(samples, 0.95), 2),
+    }
+
+
+def snapshot():
+    return {
+        "counters": dict(_counters),
+        "timings": {name: timing(name) for name in _timings},
+    }
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import asyncio
+import contextvars
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Optional
+from pydantic import ValidationError
+import metrics
+import json_repair
+import llm_budget
+from netlist import diagram_problems
+from services import get_llm_client, model_name, fast_model_name
+from schemas import CircuitResponse, CodeResponse, BOMResponse, ComponentGenResponse, DiagramPatch, CodeEdits, CodeGlue
+
+# Per-route model selection with a fast-model-first cascade.
+# Each route tries its models in order; an answer that fails the route's
+# response model or netlist rules escalates to the next (larger) model. The
+# last model's answer is accepted as long as it matches the response model.
+#
+# Cascades are configured per route with LLM_CASCADE_<ROUTE>, a comma separated
+# list of models, e.g. LLM_CASCADE_BOM="gpt-4o-mini" or
+# LLM_CASCADE_DIAGRAM="local:qwen2.5-7b-instruct,gpt-4o". A "local:" prefix
+# sends the call to the OpenAI-compatible server at LOCAL_LLM_BASE_URL.
+
+# USD per 1M tokens (input, output); unknown and local models count as free
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+
+def _normalize_diagram(data):
+    data.setdefault("nodes", [])
+    data.setdefault("connections", [])
+    data.setdefault("explanation", "")
+    return data
+
+
+@dataclass
+class Route:
+    name: str
+    response_model: type
+    normalize: Optional[Callable] = None
+    # Returns a list of problems with an otherwise well-formed answer
+    check: Optional[Callable] = None
+
+
+ROUTES = {
+    "diagram": Route("diagram", CircuitResponse, _normalize_diagram, diagram_problems),
+    "code": Route("code", CodeResponse),
+    "bom": Route("bom", BOMResponse),
+    "component_details": Route("component_details", ComponentGenResponse),
+    # Patches are checked against the diagram they apply to, see complete_json(check=...)
+    "diagram_edit": Route("diagram_edit", DiagramPatch),
+    "code_edit": Route("code_edit", CodeEdits),
+    # Syntax is checked on the composed program, see firmware_composer.py
+    "code_glue": Route("code_glue", CodeGlue),
+}
+
+
+def cascade(route):
+    configured = os.getenv(f"LLM_CASCADE_{route.upper()}")
+    if configured:
+        return [m.strip() for m in configured.split(",") if m.strip()]
+    models = [fast_model_name(), model_name()]
+    return list(dict.fromkeys(models))  # same model twice is pointless
+
+
+def resolve(spec):
+    # "local:<model>" -> ("local", "<model>"); anything else is an OpenAI model
+    if spec.startswith("local:"):
+        return "local", spec[len("local:"):]
+    return "openai", spec
+
+
+def cost_usd(model, usage):
+    if usage is None or model not in MODEL_PRICES:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[model]
+    return (usage.prompt_tokens * input_price + usage.completion_tokens * output_price) / 1_000_000
+
+
+def _record_usage(route, model, usage):
+    if usage is None:
+        return
+    metrics.incr(f"llm.{route}.answers")
+    metrics.incr(f"llm.{route}.prompt_tokens", usage.prompt_tokens)
+    metrics.incr(f"llm.{route}.completion_tokens", usage.completion_tokens)
+    metrics.incr(f"llm.{route}.cost_usd", cost_usd(model, usage))
+
+
+# Set by callers that may cancel mid-generation (the WebSocket channel). Calls
+# made in that context stream their answer, so cancelling the task closes the
+# upstream request and the model stops producing tokens nobody will read.
+streaming = contextvars.ContextVar("streaming", default=False)
+
+# Completion size assumed for a cancelled call on a route with no history yet
+DEFAULT_COMPLETION_TOKENS = 600
+
+
+def expected_completion_tokens(route):
+    calls = metrics.counter(f"llm.{route}.answers")
+    if not calls:
+        return DEFAULT_COMPLETION_TOKENS
+    return metrics.counter(f"llm.{route}.completion_tokens") / calls
+
+
+async def _stream(backend, client, route_name, model, messages, **options):
+    # Same shape as a non-streamed completion; counts what cancellation saved
+    received = 0
+    stream = None
+    try:
+        if backend == "openai":
+            options["stream_options"] = {"include_usage": True}
+        stream = await client.chat.completions.create(model=model, messages=messages, stream=True, **options)
+        parts = []
+        finish_reason = None
+        usage = None
+        async for chunk in stream:
+            usage = chunk.usage or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                received += 1  # one content chunk per token
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+    except asyncio.CancelledError:
+        if stream is not None:
+            await stream.close()
+        metrics.incr(f"llm.{route_name}.cancelled")
+        metrics.incr(f"llm.{route_name}.tokens_saved", max(0, round(expected_completion_tokens(route_name)) - received))
+        raise
+    message = SimpleNamespace(content="".join(parts))
+    return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+
+async def _create(backend, client, route_name, model, messages, **options):
+    # Every call draws from the rate budget shared by all workers
+    await llm_budget.acquire(backend)
+    if streaming.get():
+        completion = await _stream(backend, client, route_name, model, messages, **options)
+    else:
+        completion = await client.chat.completions.create(model=model, messages=messages, **options)
+    await llm_budget.charge(backend, completion.usage)
+    return completion
+
+
+# Follow-up calls for the missing tail when the answer hits the token limit
+MAX_CONTINUATIONS = 2
+CONTINUE_PROMPT = "Your reply was cut off. Continue exactly where it stopped: output only the remaining JSON text, without repeating anything."
+
+
+async def _read_json(backend, client, route_name, model, messages, completion, options):
+    # Parsed answer and whether it needed repair or continuation to parse
+    choice = completion.choices[0]
+    text = choice.message.content or ""
+    continued = 0
+    while choice.finish_reason == "length" and continued < MAX_CONTINUATIONS:
+        # No json_object response format here: the tail alone is not an object
+        completion = await _create(
+            backend,
+            client,
+            route_name,
+            model,
+            messages + [
+                {"role": "assistant", "content": text},
+                {"role": "user", "content": CONTINUE_PROMPT},
+            ],
+            **options,
+        )
+        _record_usage(route_name, model, completion.usage)
+        choice = completion.choices[0]
+        text += choice.message.content or ""
+        continued += 1
+        metrics.incr(f"llm.{route_name}.continuations")
+    try:
+        return json.loads(text), continued > 0
+    except ValueError:
+        pass
+    data, truncated = json_repair.repair(text)
+    metrics.incr(f"llm.{route_name}.json_salvaged" if truncated else f"llm.{route_name}.json_repaired")
+    return data, True
+
+
+def _accept(route, data, final, check=None):
+    if route.normalize:
+        data = route.normalize(data)
+    route.response_model.model_validate(data)
+    check = check or route.check
+    if check:
+        problems = check(data)
+        if problems and not final:
+            raise ValueError("; ".join(problems[:5]))
+        if problems:
+            metrics.incr(f"llm.{route.name}.accepted_with_problems")
+    return data
+
+
+async def complete_json(route_name, messages, check=None, **options):
+    # check overrides the route's check for answers that need request context
+    route = ROUTES[route_name]
+    models = cascade(route_name)
+    started = time.perf_counter()
+    metrics.incr(f"llm.{route_name}.calls")
+    errors = []
+    for attempt, spec in enumerate(models):
+        backend, model = resolve(spec)
+        client = get_llm_client(backend)
+        final = attempt == len(models) - 1
+        attempt_started = time.perf_counter()
+        try:
+            completion = await _create(
+                backend,
+                client,
+                route_name,
+                model,
+                messages,
+                response_format={"type": "json_object"},
+                **options,
+            )
+            _record_usage(route_name, model, completion.usage)
+            data, recovered = await _read_json(backend, client, route_name, model, messages, completion, options)
+            data = _accept(route, data, final, check)
+        except (ValueError, ValidationError) as e:  # JSONDecodeError is a ValueError
+            errors.append(f"{spec}: {e}")
+            metrics.incr(f"llm.{route_name}.rejected.{spec}")
+            continue
+        except Exception as e:
+            # Backend down or rate limited: fall through to the next model
+            if final:
+                raise
+            errors.append(f"{spec}: {e}")
+            metrics.incr(f"llm.{route_name}.backend_errors.{spec}")
+            continue
+        finally:
+            metrics.observe(f"llm.{route_name}.attempt_ms.{spec}", (time.perf_counter() - attempt_started) * 1000)
+
+        metrics.incr(f"llm.{route_name}.served_by.{spec}")
+        if recovered:
+            # Strict parsing would have thrown this answer away and retried
+            metrics.incr(f"llm.{route_name}.retries_saved")
+        if attempt > 0:
+            metrics.incr(f"llm.{route_name}.escalations")
+        metrics.observe(f"llm.{route_name}.latency_ms", (time.perf_counter() - started) * 1000)
+        return data
+
+    metrics.incr(f"llm.{route_name}.failures")
+    raise ValueError(f"No model produced a valid {route_name} response: " + " | ".join(errors))
+
+
+def report():
+    # Per-route latency, cost and escalation rate for this worker
+    routes = {}
+    for name in ROUTES:
+        calls = metrics.counter(f"llm.{name}.calls")
+        routes[name] = {
+            "cascade": cascade(name),
+            "calls": int(calls),
+            "escalation_rate": round(metrics.counter(f"llm.{name}.escalations") / calls, 3) if calls else 0.0,
+            "failures": int(metrics.counter(f"llm.{name}.failures")),
+            "latency": metrics.timing(f"llm.{name}.latency_ms"),
+            "cost_usd": round(metrics.counter(f"llm.{name}.cost_usd"), 6),
+            "prompt_tokens": int(metrics.counter(f"llm.{name}.prompt_tokens")),
+            "completion_tokens": int(metrics.counter(f"llm.{name}.completion_tokens")),
+            "json_repaired": int(metrics.counter(f"llm.{name}.json_repaired")),
+            "json_salvaged": int(metrics.counter(f"llm.{name}.json_salvaged")),
+            "continuations": int(metrics.counter(f"llm.{name}.continuations")),
+            "retries_saved": int(metrics.counter(f"llm.{name}.retries_saved")),
+            "cancelled": int(metrics.counter(f"llm.{name}.cancelled")),
+            "tokens_saved_by_cancel": int(metrics.counter(f"llm.{name}.tokens_saved")),
+        }
+    return routes
@@ -0,0 +1,170 @@
+import re
+
+# Structural rules for generated wiring diagrams ({"nodes": [...], "connections": [...]}).
+
+# Longest run of label words tried against known part names
+MAX_NAME_WORDS = 8
+
+
+def part_key(text):
+    # "HC-SR04 Ultrasonic Sensor" -> "hc sr04 ultrasonic sensor"
+    return " ".join(re.findall(r"[a-z0-9]+", str(text).lower()))
+
+
+def match_part(index, label):
+    # index maps part_key(name or alias) -> value. Exact match first, then the
+    # longest run of words in the label that names a part
+    # ("HC-SR04 Ultrasonic Sensor" -> "HC-SR04")
+    key = part_key(label)
+    if key in index:
+        return index[key]
+    words = key.split()
+    for size in range(min(len(words), MAX_NAME_WORDS), 0, -1):
+        for start in range(len(words) - size + 1):
+            value = index.get(" ".join(words[start:start + size]))
+            if value is not None:
+                return value
+    return None
+
+
+def diagram_problems(diagram):
+    # Returns a list of human-readable problems; empty means the netlist is usable
+    problems = []
+    nodes = diagram.get("nodes") or []
+    connections = diagram.get("connections") or []
+    if not nodes:
+        problems.append("diagram has no nodes")
+
+    pins = {}
+    for node in nodes:
+        node_id = node.get("id") if isinstance(node, dict) else None
+        if not node_id:
+            problems.append("node without an id")
+            continue
+        if node_id in pins:
+            problems.append(f"duplicate node id '{node_id}'")
+        pins[node_id] = set(node.get("pins") or [])
+
+    connection_ids = set()
+    for connection in connections:
+        if not isinstance(connection, dict):
+            problems.append("connection is not an object")
+            continue
+        connection_id = connection.get("id")
+        if connection_id in connection_ids:
+            problems.append(f"duplicate connection id '{connection_id}'")
+        connection_ids.add(connection_id)
+        for end, pin_key in (("from", "fromPin"), ("to", "toPin")):
+            node_id = connection.get(end)
+            if node_id not in pins:
+                problems.append(f"connection '{connection_id}' references unknown node '{node_id}'")
+            elif pins[node_id] and connection.get(pin_key) not in pins[node_id]:
+                problems.append(f"connection '{connection_id}' uses pin '{connection.get(pin_key)}' missing on '{node_id}'")
+    return problems
+
+
+def _find(parent, item):
+    while parent[item] != item:
+        parent[item] = parent[parent[item]]  # path halving
+        item = parent[item]
+    return item
+
+
+def pin_nets(diagram, tied=()):
+    # Groups pins joined by wires into nets. Returns ({(node_id, pin): net},
+    # net count); nets are numbered 0..count-1 in order of first appearance.
+    # `tied` lists extra groups of pins that are connected without a wire
+    # (e.g. a board's GND pins).
+    parent = {}
+    for node in diagram.get("nodes") or []:
+        if isinstance(node, dict) and node.get("id"):
+            for pin in node.get("pins") or []:
+                key = (node["id"], pin)
+                parent.setdefault(key, key)
+
+    def union(a, b):
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        root_a, root_b = _find(parent, a), _find(parent, b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    for c in diagram.get("connections") or []:
+        if isinstance(c, dict):
+            union((c.get("from"), c.get("fromPin")), (c.get("to"), c.get("toPin")))
+    for group in tied:
+        group = list(group)
+        for other in group[1:]:
+            union(group[0], other)
+
+    numbers = {}
+    nets = {}
+    for key in parent:
+        nets[key] = numbers.setdefault(_find(parent, key), len(numbers))
+    return nets, len(numbers)
+
+
+# Pin names shared by the simulation and the power budget
+NEGATIVE_PINS = {"-", "gnd", "v-", "vss", "k", "cathode", "negative", "short"}
+POSITIVE_PINS = {"+", "v+", "vcc", "vin", "vdd", "a", "anode", "positive", "long", "sig", "in"}
+SUPPLY_PINS = {"vcc", "vin", "v+", "vdd", "vs", "vm", "vbat", "+", "vout", "positive"}
+
+
+def is_ground(pin):
+    return str(pin).lower().startswith("gnd") or str(pin).lower() in ("vss", "0v")
+
+
+def pin_volts(pin):
+    # "5V" -> 5.0, "3V3" / "3.3V" -> 3.3, "12V" -> 12.0, anything else None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)V(\d)?", str(pin).strip(), re.IGNORECASE)
+    if not match:
+        return None
+    return float(match.group(1)) + (float(match.group(2)) / 10 if match.group(2) else 0.0)
+
+
+def label_volts(label, default):
+    match = re.search(r"(\d+(?:\.\d+)?)\s*V\b", str(label))
+    return float(match.group(1)) if match else default
+
+
+def kind_of(node):
+    label = part_key(node.get("label") or "")
+    words = set(label.split())
+    pins = [str(p).lower() for p in node.get("pins") or []]
+    if node.get("type") == "Microcontroller":
+        return "controller"
+    if words & {"battery", "psu", "adapter"} or "power supply" in label:
+        return "supply"
+    if words & {"driver", "l298n", "l293d", "tb6612", "drv8833"}:
+        return "driver"
+    if "relay" in words:
+        return "relay"
+    if words & {"servo", "sg90", "mg996r"}:
+        return "servo"
+    if "motor" in words and len(pins) <= 2:
+        return "motor"
+    if "led" in words and not words & {"strip", "matrix", "rgb", "ring"} and len(pins) <= 2:
+        return "led"
+    if words & {"resistor", "ohm"}:
+        return "resistor"
+    if words & {"buzzer", "piezo"} and len(pins) <= 2:
+        return "buzzer"
+    if words & {"button", "switch", "tactile", "pushbutton"} and len(pins) <= 2:
+        return "button"
+    return "module"
+
+
+def two_terminals(node):
+    # (positive pin, negative pin) of a two-pin part
+    pins = [str(p) for p in node.get("pins") or []]
+    negative = next((p for p in pins if p.lower() in NEGATIVE_PINS or is_ground(p)), None)
+    positive = next((p for p in pins if p != negative and p.lower() in POSITIVE_PINS), None)
+    rest = [p for p in pins if p not in (negative, positive)]
+    positive = positive or (rest.pop(0) if rest else None)
+    negative = negative or (rest.pop(0) if rest else None)
+    return positive, negative
+
+
+def supply_pin(pins):
+    # The first power input of a module: VCC, VIN, 5V, 12V...
+    return next((p for p in pins if str(p).lower() in SUPPLY_PINS or pin_volts(p)), None)
@@ -0,0 +1,567 @@
+import io
+import re
+import math
+import uuid
+import zipfile
+from dataclasses import dataclass
+from netlist import pin_nets, is_ground, pin_volts, kind_of
+
+# PCB export of saved diagrams (ROADMAP: PCB Design).
+# A diagram becomes a carrier board: boards and modules plug into pin headers,
+# discrete parts (resistors, LEDs, buttons, buzzers) get their own through-hole
+# footprints. Two artifacts are built from the same board:
+#   kicad   a KiCad netlist (.net, s-expression format "E"), ready for Pcbnew's
+#           "Update PCB from netlist" with the footprints named below
+#   gerber  a zip of Gerber X2 layers (copper, mask, silkscreen outlines, board
+#           edge), an Excellon drill file, a placement file and the netlist.
+#           Parts are auto-placed but not routed: copper has pads only, so the
+#           Gerbers are a starting point for routing, not a fab-ready board
+#
+# Placement is greedy and cluster-grown: the most connected part goes first,
+# then each part goes to the free spot nearest the parts it shares nets with,
+# then a few passes move parts to better free spots. Everything here is plain
+# Python on picklable inputs so it runs in the export process pool (pcb_jobs.py).
+#
+# As in the simulation, every GND pin is one ground net: generated diagrams
+# rarely draw every return wire, and a board with floating module grounds is
+# never what was meant.
+
+# Bump when the output changes so cached artifacts are rebuilt
+PCB_VERSION = 1
+
+FORMATS = {
+    "kicad": ("text/plain; charset=utf-8", "net"),
+    "gerber": ("application/zip", "zip"),
+}
+
+# Millimetres
+PITCH = 2.54
+HEADER_PAD, HEADER_DRILL = 1.7, 1.0
+SMALL_PAD, SMALL_DRILL = 1.6, 0.8
+COURTYARD = 1.27  # clearance around a footprint's pads
+EDGE_MARGIN = 3.0
+SILK_WIDTH = 0.15
+EDGE_WIDTH = 0.1
+SEARCH_STEP = 2.54
+MAX_RINGS = 400
+# Placed parts whose edges are tried as spots for the next one
+NEAREST = 12
+COMPACTNESS = 0.05
+REFINE_PASSES = 2
+# Nets joining more parts than this (power, ground) do not pull parts together
+MAX_PLACEMENT_NET = 6
+BUCKET = 10.0  # spatial hash cell for overlap tests
+
+REFERENCE_PREFIX = {
+    "controller": "U", "driver": "U", "supply": "BT", "resistor": "R", "led": "D",
+    "button": "SW", "buzzer": "BZ", "motor": "M", "relay": "K", "servo": "J", "module": "J",
+}
+
+# Through-hole footprints of discrete parts: (KiCad footprint, pad spacing)
+DISCRETE_FOOTPRINTS = {
+    "resistor": ("Resistor_THT:R_Axial_DIN0207_L6.3mm_D2.5mm_P10.16mm_Horizontal", 10.16),
+    "led": ("LED_THT:LED_D5.0mm", 2.54),
+    "button": ("Button_Switch_THT:SW_PUSH_6mm", 6.5),
+    "buzzer": ("Buzzer_Beeper:Buzzer_12x9.5RM7.6", 7.6),
+}
+
+
+@dataclass
+class Pad:
+    number: str
+    name: str
+    x: float  # relative to the footprint origin (pad 1)
+    y: float
+    size: float
+    drill: float
+
+
+@dataclass
+class Part:
+    ref: str
+    node_id: str
+    label: str
+    kind: str
+    footprint: str
+    pads: list
+    width: float  # courtyard, origin at its top left
+    height: float
+    x: float = 0.0  # courtyard position on the board
+    y: float = 0.0
+
+    def center(self):
+        return self.x + self.width / 2, self.y + self.height / 2
+
+
+@dataclass
+class Board:
+    parts: list
+    nets: list  # [(code, name, [(part index, pad index)])]
+    width: float = 0.0
+    height: float = 0.0
+    wire_length: float = 0.0  # placement cost: sum of net bounding box half-perimeters
+
+
+# --- FOOTPRINTS ---
+
+def footprint(node, kind):
+    # (KiCad footprint name, pads, courtyard width, courtyard height)
+    pins = [str(p) for p in node.get("pins") or []] or ["1"]
+    if kind in DISCRETE_FOOTPRINTS and len(pins) <= 2:
+        name, spacing = DISCRETE_FOOTPRINTS[kind]
+        pads = [Pad(str(i + 1), pin, i * spacing, 0.0, SMALL_PAD, SMALL_DRILL) for i, pin in enumerate(pins)]
+    elif kind in ("controller", "driver") and len(pins) > 8:
+        # Dual row socket, pin 1 top left, odd pins on the left
+        rows = math.ceil(len(pins) / 2)
+        name = f"Connector_PinSocket_2.54mm:PinSocket_2x{rows:02d}_P2.54mm_Vertical"
+        pads = [Pad(str(i + 1), pin, (i % 2) * PITCH, (i // 2) * PITCH, HEADER_PAD, HEADER_DRILL) for i, pin in enumerate(pins)]
+    else:
+        name = f"Connector_PinHeader_2.54mm:PinHeader_1x{len(pins):02d}_P2.54mm_Vertical"
+        pads = [Pad(str(i + 1), pin, 0.0, i * PITCH, HEADER_PAD, HEADER_DRILL) for i, pin in enumerate(pins)]
+    width = max(p.x for p in pads) + pads[0].size + 2 * COURTYARD
+    height = max(p.y for p in pads) + pads[0].size + 2 * COURTYARD
+    # Pad coordinates become relative to the courtyard's top left
+    offset = pads[0].size / 2 + COURTYARD
+    for pad in pads:
+        pad.x += offset
+        pad.y += offset
+    return name, pads, width, height
+
+
+def _parts(nodes):
+    counters = {}
+    parts = []
+    for node in nodes:
+        kind = kind_of(node)
+        prefix = REFERENCE_PREFIX.get(kind, "J")
+        counters[prefix] = counters.get(prefix, 0) + 1
+        name, pads, width, height = footprint(node, kind)
+        parts.append(Part(f"{prefix}{counters[prefix]}", node["id"], str(node.get("label") or node["id"]), kind, name, pads, width, height))
+    return parts
+
+
+# --- NETS ---
+
+def _net_name(parts, members, code, used):
+    if any(is_ground(parts[i].pads[p].name) for i, p in members):
+        name = "GND"
+    else:
+        rail = next((parts[i].pads[p].name for i, p in members
+                     if parts[i].kind in ("controller", "supply") and pin_volts(parts[i].pads[p].name)), None)
+        if rail is not None:
+            # KiCad names: +5V, +3V3
+            volts = pin_volts(rail)
+            name = f"+{int(volts)}V{round(volts % 1 * 10)}" if volts % 1 else f"+{volts:g}V"
+        else:
+            i, p = next(((i, p) for i, p in members if parts[i].kind == "controller"), members[0])
+            name = f"Net-({parts[i].ref}-{parts[i].pads[p].name})"
+    if name in used:
+        name = f"{name}_{code}"
+    used.add(name)
+    return name
+
+
+def _nets(nodes, connections, parts):
+    grounds = [(node["id"], pin) for node in nodes for pin in node.get("pins") or [] if is_ground(pin)]
+    same_name = {}
+    for node in nodes:
+        for pin in node.get("pins") or []:
+            same_name.setdefault((node["id"], pin), []).append((node["id"], pin))
+    nets, count = pin_nets({"nodes": nodes, "connections": connections},
+                           tied=[grounds] + [g for g in same_name.values() if len(g) > 1])
+    members = [[] for _ in range(count)]
+    for i, part in enumerate(parts):
+        node_id = part.node_id
+        for p, pad in enumerate(part.pads):
+            net = nets.get((node_id, pad.name))
+            if net is not None:
+                members[net].append((i, p))
+    result, used = [], set()
+    # Single-pin nets are unconnected pads; KiCad lists them too
+    for pins in sorted((m for m in members if m), key=lambda m: m[0]):
+        code = len(result) + 1
+        if len(pins) == 1:
+            i, p = pins[0]
+            name = f"unconnected-({parts[i].ref}-{parts[i].pads[p].name}-Pad{parts[i].pads[p].number})"
+        else:
+            name = _net_name(parts, pins, code, used)
+        result.append((code, name, pins))
+    return result
+
+
+# --- PLACEMENT ---
+
+class Occupancy:
+    # Placed courtyards, bucketed so an overlap test only looks at neighbours
+    def __init__(self):
+        self.buckets = {}
+
+    def _cells(self, x0, y0, x1, y1):
+        for bx in range(math.floor(x0 / BUCKET), math.floor(x1 / BUCKET) + 1):
+            for by in range(math.floor(y0 / BUCKET), math.floor(y1 / BUCKET) + 1):
+                yield bx, by
+
+    def add(self, i, rect):
+        for cell in self._cells(*rect):
+            self.buckets.setdefault(cell, {})[i] = rect
+
+    def remove(self, i, rect):
+        for cell in self._cells(*rect):
+            self.buckets.get(cell, {}).pop(i, None)
+
+    def free(self, rect):
+        x0, y0, x1, y1 = rect
+        for cell in self._cells(*rect):
+            for a0, b0, a1, b1 in self.buckets.get(cell, {}).values():
+                if x0 < a1 and a0 < x1 and y0 < b1 and b0 < y1:
+                    return False
+        return True
+
+
+def _weights(parts, nets):
+    # Clique model: a net of k parts pulls each pair together by 1/(k-1)
+    weights = [dict() for _ in parts]
+    for _, _, pins in nets:
+        members = sorted({i for i, _ in pins})
+        if len(members) < 2 or len(members) > MAX_PLACEMENT_NET:
+            continue
+        w = 1.0 / (len(members) - 1)
+        for a in members:
+            for b in members:
+                if a != b:
+                    weights[a][b] = weights[a].get(b, 0.0) + w
+    return weights
+
+
+def _cost(parts, weights, i, cx, cy, placed):
+    return sum(w * (abs(cx - parts[j].center()[0]) + abs(cy - parts[j].center()[1]))
+               for j, w in weights[i].items() if placed[j])
+
+
+def _rect(part, x, y):
+    # Courtyard plus half the clearance on every side
+    return (x - COURTYARD / 2, y - COURTYARD / 2, x + part.width + COURTYARD / 2, y + part.height + COURTYARD / 2)
+
+
+def _contacts(part, target, rects, nearest):
+    # Spots touching the placed courtyards nearest the target: left, right,
+    # above and below each, aligned with its edges or with the target
+    w, h, gap = part.width, part.height, COURTYARD / 2
+    tx, ty = target[0] - w / 2, target[1] - h / 2
+    yield tx, ty
+    near = sorted((r for r in rects if r), key=lambda r: abs(r[0] + r[2] - 2 * target[0]) + abs(r[1] + r[3] - 2 * target[1]))
+    for x0, y0, x1, y1 in near[:nearest]:
+        for y in (y0 + gap, y1 - gap - h, ty):
+            yield x1 + gap, y
+            yield x0 - w - gap, y
+        for x in (x0 + gap, x1 - gap - w, tx):
+            yield x, y1 + gap
+            yield x, y0 - h - gap
+
+
+def _rings(part, target):
+    # Fallback: spots on square rings of growing radius around the target
+    tx, ty = target[0] - part.width / 2, target[1] - part.height / 2
+    yield tx, ty
+    for ring in range(1, MAX_RINGS):
+        for d in range(-ring, ring + 1):
+            yield tx + d * SEARCH_STEP, ty - ring * SEARCH_STEP
+            yield tx + d * SEARCH_STEP, ty + ring * SEARCH_STEP
+        for d in range(-ring + 1, ring):
+            yield tx - ring * SEARCH_STEP, ty + d * SEARCH_STEP
+            yield tx + ring * SEARCH_STEP, ty + d * SEARCH_STEP
+
+
+def _best_spot(parts, weights, occupancy, placed, rects, i, target):
+    # Cheapest free spot for part i: wire length to its placed neighbours,
+    # plus a little distance from the target to keep the board compact. Spots
+    # next to the nearest parts first; inside a packed cluster, next to more
+    # of them; rings around the target as the last resort
+    part = parts[i]
+    stages = [(_contacts(part, target, rects, n), False) for n in (NEAREST, 4 * NEAREST, len(rects))]
+    for candidates, first_free in stages + [(_rings(part, target), True)]:
+        best = None
+        for x, y in candidates:
+            rect = _rect(part, x, y)
+            if not occupancy.free(rect):
+                continue
+            cx, cy = x + part.width / 2, y + part.height / 2
+            cost = _cost(parts, weights, i, cx, cy, placed) + COMPACTNESS * (abs(cx - target[0]) + abs(cy - target[1]))
+            if best is None or cost < best[0]:
+                best = (cost, x, y, rect)
+            if first_free:
+                break
+        if best is not None:
+            return best
+    return None
+
+
+def _target(parts, weights, placed, i, fallback):
+    total = sum(w for j, w in weights[i].items() if placed[j])
+    if not total:
+        return fallback
+    return (sum(w * parts[j].center()[0] for j, w in weights[i].items() if placed[j]) / total,
+            sum(w * parts[j].center()[1] for j, w in weights[i].items() if placed[j]) / total)
+
+
+def place(parts, nets):
+    weights = _weights(parts, nets)
+    placed = [False] * len(parts)
+    rects = [None] * len(parts)
+    occupancy = Occupancy()
+
+    # Most connected part first (usually the controller), then always the part
+    # most strongly tied to what is already placed
+    pull = [0.0] * len(parts)
+    order = []
+    remaining = set(range(len(parts)))
+    while remaining:
+        if not order or max(pull[j] for j in remaining) == 0:
+            start = max(remaining, key=lambda j: (parts[j].kind == "controller", sum(weights[j].values()), -j))
+        else:
+            start = max(remaining, key=lambda j: (pull[j], -j))
+        remaining.discard(start)
+        order.append(start)
+        for j, w in weights[start].items():
+            pull[j] += w
+
+    def put(i, spot):
+        _, parts[i].x, parts[i].y, rects[i] = spot
+        occupancy.add(i, rects[i])
+        placed[i] = True
+
+    # Parts that share no net with anything placed start a new cluster to the
+    # right of the current shelf, or on a new shelf below once it is wide enough
+    shelf_width = max(math.sqrt(sum(p.width * p.height for p in parts)) * 1.5, max(p.width for p in parts))
+    shelf = []
+    for i in order:
+        part = parts[i]
+        target = _target(parts, weights, placed, i, None)
+        if target is None and not shelf:
+            target = (part.width / 2, part.height / 2)
+        elif target is None:
+            left, top = min(rects[j][0] for j in shelf), min(rects[j][1] for j in shelf)
+            right, bottom = max(rects[j][2] for j in shelf), max(rects[j][3] for j in shelf)
+            if right - left > shelf_width:
+                target = (left + part.width / 2, bottom + COURTYARD + part.height / 2)
+                shelf = []
+            else:
+                target = (right + COURTYARD + part.width / 2, top + part.height / 2)
+        put(i, _best_spot(parts, weights, occupancy, placed, rects, i, target))
+        shelf.append(i)
+
+    for _ in range(REFINE_PASSES):
+        moved = False
+        for i in order:
+            if not weights[i]:
+                continue
+            occupancy.remove(i, rects[i])
+            placed[i] = False
+            cx, cy = parts[i].center()
+            target = _target(parts, weights, placed, i, (cx, cy))
+            here = _cost(parts, weights, i, cx, cy, placed) + COMPACTNESS * (abs(cx - target[0]) + abs(cy - target[1]))
+            spot = _best_spot(parts, weights, occupancy, placed, rects, i, target)
+            if spot is not None and spot[0] < here - 1e-6:
+                put(i, spot)
+                moved = True
+            else:
+                occupancy.add(i, rects[i])
+                placed[i] = True
+        if not moved:
+            break
+
+
+def board(diagram):
+    nodes = [n for n in diagram.get("nodes") or [] if isinstance(n, dict) and n.get("id")]
+    connections = [c for c in diagram.get("connections") or [] if isinstance(c, dict)]
+    parts = _parts(nodes)
+    nets = _nets(nodes, connections, parts)
+    result = Board(parts, nets)
+    if not parts:
+        return result
+    place(parts, nets)
+    # Move the placement to (EDGE_MARGIN, EDGE_MARGIN) and size the board around it
+    x0 = min(p.x for p in parts) - EDGE_MARGIN
+    y0 = min(p.y for p in parts) - EDGE_MARGIN
+    for part in parts:
+        part.x -= x0
+        part.y -= y0
+    result.width = max(p.x + p.width for p in parts) + EDGE_MARGIN
+    result.height = max(p.y + p.height for p in parts) + EDGE_MARGIN
+    for _, _, pins in nets:
+        if len(pins) > 1:
+            xs = [parts[i].x + parts[i].pads[p].x for i, p in pins]
+            ys = [parts[i].y + parts[i].pads[p].y for i, p in pins]
+            result.wire_length += max(xs) - min(xs) + max(ys) - min(ys)
+    return result
+
+
+# --- KICAD NETLIST ---
+
+def _quote(text):
+    return '"' + str(text).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _tstamp(node_id):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"techwatt:{node_id}"))
+
+
+def kicad_netlist(pcb, source="techwatt-circuit"):
+    out = ["(export (version \"E\")",
+           f"  (design (source {_quote(source)}) (tool \"TechWatt Circuit AI\"))",
+           "  (components"]
+    for part in pcb.parts:
+        out.append(f"    (comp (ref {_quote(part.ref)})")
+        out.append(f"      (value {_quote(part.label)})")
+        out.append(f"      (footprint {_quote(part.footprint)})")
+        out.append(f"      (libsource (lib \"techwatt\") (part {_quote(part.label)}) (description \"\"))")
+        out.append("      (sheetpath (names \"/\") (tstamps \"/\"))")
+        out.append(f"      (tstamps {_quote(_tstamp(part.node_id))}))")
+    out.append("  )")
+    out.append("  (libparts")
+    seen = set()
+    for part in pcb.parts:
+        if part.label in seen:
+            continue
+        seen.add(part.label)
+        pins = " ".join(f"(pin (num {_quote(p.number)}) (name {_quote(p.name)}) (type \"passive\"))" for p in part.pads)
+        out.append(f"    (libpart (lib \"techwatt\") (part {_quote(part.label)}) (footprints (fp {_quote(part.footprint)})) (pins {pins}))")
+    out.append("  )")
+    out.append("  (nets")
+    for code, name, pins in pcb.nets:
+        nodes = " ".join(
+            f"(node (ref {_quote(pcb.parts[i].ref)}) (pin {_quote(pcb.parts[i].pads[p].number)}) "
+            f"(pinfunction {_quote(pcb.parts[i].pads[p].name)}) (pintype \"passive\"))"
+            for i, p in pins
+        )
+        out.append(f"    (net (code {_quote(code)}) (name {_quote(name)}) {nodes})")
+    out.append("  )")
+    out.append(")")
+    return "\n".join(out) + "\n"
+
+
+# --- GERBER ---
+
+def _coord(value):
+    # Format 4.6, millimetres
+    return str(int(round(value * 1e6)))
+
+
+def _gerber(pcb, function, body, apertures):
+    # apertures: [(code, definition)], e.g. (10, "C,1.700000")
+    lines = [
+        "%TF.GenerationSoftware,TechWatt,Circuit AI,1*%",
+        f"%TF.FileFunction,{function}*%",
+        "%TF.FilePolarity,Positive*%",
+        "%FSLAX46Y46*%",
+        "%MOMM*%",
+        "%LPD*%",
+    ]
+    lines += [f"%ADD{code}{definition}*%" for code, definition in apertures]
+    lines.append("G01*")
+    lines += body
+    lines.append("M02*")
+    return "\n".join(lines) + "\n"
+
+
+def _flip(pcb, y):
+    # Board coordinates grow downwards like the editor; Gerber Y grows upwards
+    return pcb.height - y
+
+
+def _pad_layer(pcb, function, grow=0.0):
+    sizes = sorted({pad.size for part in pcb.parts for pad in part.pads})
+    codes = {size: 10 + 2 * n for n, size in enumerate(sizes)}
+    apertures = []
+    for size, code in codes.items():
+        apertures.append((code, f"C,{size + grow:.6f}"))  # round pads
+        apertures.append((code + 1, f"R,{size + grow:.6f}X{size + grow:.6f}"))  # square pad 1
+    body = []
+    current = None
+    for part in pcb.parts:
+        for pad in part.pads:
+            code = codes[pad.size] + (1 if pad.number == "1" else 0)
+            if code != current:
+                body.append(f"D{code}*")
+                current = code
+            body.append(f"X{_coord(part.x + pad.x)}Y{_coord(_flip(pcb, part.y + pad.y))}D03*")
+    return _gerber(pcb, function, body, apertures)
+
+
+def _outline(pcb, rect):
+    x0, y0, x1, y1 = rect
+    corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]
+    body = [f"X{_coord(corners[0][0])}Y{_coord(_flip(pcb, corners[0][1]))}D02*"]
+    body += [f"X{_coord(x)}Y{_coord(_flip(pcb, y))}D01*" for x, y in corners[1:]]
+    return body
+
+
+def _silkscreen(pcb):
+    body = ["D10*"]
+    for part in pcb.parts:
+        inset = COURTYARD / 2
+        body += _outline(pcb, (part.x + inset, part.y + inset, part.x + part.width - inset, part.y + part.height - inset))
+    return _gerber(pcb, "Legend,Top", body, [(10, f"C,{SILK_WIDTH:.6f}")])
+
+
+def _edge_cuts(pcb):
+    body = ["D10*"] + _outline(pcb, (0.0, 0.0, pcb.width, pcb.height))
+    return _gerber(pcb, "Profile,NP", body, [(10, f"C,{EDGE_WIDTH:.6f}")])
+
+
+def _drill(pcb):
+    drills = sorted({pad.drill for part in pcb.parts for pad in part.pads})
+    lines = ["M48", "; TechWatt Circuit AI", "FMAT,2", "METRIC,TZ"]
+    lines += [f"T{n + 1}C{size:.3f}" for n, size in enumerate(drills)]
+    lines += ["%", "G90", "G05"]
+    for n, size in enumerate(drills):
+        lines.append(f"T{n + 1}")
+        for part in pcb.parts:
+            for pad in part.pads:
+                if pad.drill == size:
+                    lines.append(f"X{part.x + pad.x:.3f}Y{_flip(pcb, part.y + pad.y):.3f}")
+    lines.append("M30")
+    return "\n".join(lines) + "\n"
+
+
+def _positions(pcb):
+    lines = ["Ref,Val,Package,PosX,PosY,Rot,Side"]
+    for part in pcb.parts:
+        label = part.label.replace('"', "'")
+        # Footprint origin is pad 1
+        x, y = part.x + part.pads[0].x, _flip(pcb, part.y + part.pads[0].y)
+        lines.append(f'{part.ref},"{label}",{part.footprint},{x:.4f},{y:.4f},0,top')
+    return "\n".join(lines) + "\n"
+
+
+def gerber_zip(pcb, source="techwatt-circuit"):
+    name = re.sub(r"[^A-Za-z0-9_-]+", "-", source)
+    files = {
+        f"{name}-F_Cu.gbr": _pad_layer(pcb, "Copper,L1,Top"),
+        f"{name}-B_Cu.gbr": _pad_layer(pcb, "Copper,L2,Bot"),
+        f"{name}-F_Mask.gbr": _pad_layer(pcb, "Soldermask,Top", grow=0.1),
+        f"{name}-B_Mask.gbr": _pad_layer(pcb, "Soldermask,Bot", grow=0.1),
+        f"{name}-F_Silkscreen.gbr": _silkscreen(pcb),
+        f"{name}-Edge_Cuts.gbr": _edge_cuts(pcb),
+        f"{name}.drl": _drill(pcb),
+        f"{name}-pos.csv": _positions(pcb),
+        f"{name}.net": kicad_netlist(pcb, source),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for filename, text in files.items():
+            # Fixed timestamps: the same board always zips to the same bytes
+            info = zipfile.ZipInfo(filename, date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, text)
+    return buffer.getvalue()
+
+
+def build(diagram, fmt, source="techwatt-circuit"):
+    # Artifact bytes for `diagram`; the entry point of the export processes
+    pcb = board(diagram)
+    if fmt == "kicad":
+        return kicad_netlist(pcb, source).encode()
+    if fmt == "gerber":
+        return gerber_zip(pcb, source)
+    raise ValueError(f"Unknown PCB format '{fmt}'")
@@ -0,0 +1,211 @@
+import os
+import time
+import asyncio
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import pubsub
+import metrics
+import pcb_export
+from database import database, pcb_exports
+
+# Background PCB exports (pcb_export.py) for saved circuits.
+# Placement is CPU-bound for hundreds of milliseconds on large diagrams, so it
+# runs in a pool of export processes instead of the event loop or its thread
+# pool (where it would hold the GIL against request handling). A job is a row
+# in pcb_exports keyed by circuit, format and exporter version: the first
+# request claims the row and submits the job, later requests from any worker
+# see its status, and the finished row is the cached artifact. Saved circuits
+# change only through collaborative editing (collab.py), which forgets their
+# artifacts; otherwise an artifact stays valid until PCB_VERSION is bumped.
+#
+# A failed job, or one left running by a worker that died, is claimed again by
+# the next request. Each claim is identified by the row's created_at, and a job
+# finishes only the row it claimed: a job that outlived its claim (reclaimed as
+# stale, or forgotten after an edit) must not overwrite the newer export.
+# Without Postgres, jobs are kept in process memory.
+
+# Export processes per API worker; the pool starts with the first job
+PROCESSES = int(os.getenv("PCB_PROCESSES", "1"))
+JOB_TIMEOUT_SECONDS = 120
+# A running job older than this belongs to a dead worker
+STALE_AFTER = timedelta(seconds=JOB_TIMEOUT_SECONDS + 30)
+
+_pool = None
+_running = {}  # (circuit_id, format) -> task, for jobs running in this worker
+
+
+def get_pool():
+    # Shut down with the interpreter (concurrent.futures joins its processes at exit)
+    global _pool
+    if _pool is None:
+        # spawn: the children import pcb_export only, not a copy of the server
+        _pool = ProcessPoolExecutor(max_workers=PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+class PostgresStore:
+    async def claim(self, circuit_id, fmt):
+        # (token, None) when this request now owns the job, else (None, existing row)
+        now = datetime.utcnow()
+        table = pcb_exports
+        values = {"status": "running", "body": None, "error": None, "created_at": now, "finished_at": None}
+        stmt = pg_insert(table).values(circuit_id=circuit_id, format=fmt, version=pcb_export.PCB_VERSION, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["circuit_id", "format", "version"],
+            set_=values,
+            where=sqlalchemy.or_(
+                table.c.status == "failed",
+                sqlalchemy.and_(table.c.status == "running", table.c.created_at < now - STALE_AFTER),
+            ),
+        ).returning(table.c.created_at)
+        claimed = await database.fetch_one(stmt)
+        if claimed:
+            return claimed["created_at"], None
+        return None, await self.get(circuit_id, fmt)
+
+    async def get(self, circuit_id, fmt, body=False):
+        table = pcb_exports
+        columns = [c for c in table.c if body or c.name != "body"]
+        row = await database.fetch_one(
+            sqlalchemy.select(*columns)
+            .where(table.c.circuit_id == circuit_id)
+            .where(table.c.format == fmt)
+            .where(table.c.version == pcb_export.PCB_VERSION)
+        )
+        return dict(row) if row else None
+
+    async def finish(self, circuit_id, fmt, token, body=None, error=None):
+        await database.execute(
+            pcb_exports.update()
+            .where(pcb_exports.c.circuit_id == circuit_id)
+            .where(pcb_exports.c.format == fmt)
+            .where(pcb_exports.c.version == pcb_export.PCB_VERSION)
+            .where(pcb_exports.c.created_at == token)
+            .values(status="failed" if error else "done", body=body, error=error, finished_at=datetime.utcnow())
+        )
+
+    async def forget(self, circuit_id):
+        await database.execute(pcb_exports.delete().where(pcb_exports.c.circuit_id == circuit_id))
+
+
+class MemoryStore:
+    def __init__(self):
+        self.rows = {}
+
+    async def claim(self, circuit_id, fmt):
+        row = self.rows.get((circuit_id, fmt))
+        if row is None or row["status"] == "failed":
+            now = datetime.utcnow()
+            self.rows[(circuit_id, fmt)] = {
+                "circuit_id": circuit_id, "format": fmt, "version": pcb_export.PCB_VERSION, "status": "running",
+                "body": None, "error": None, "created_at": now, "finished_at": None,
+            }
+            return now, None
+        return None, row
+
+    async def get(self, circuit_id, fmt, body=False):
+        row = self.rows.get((circuit_id, fmt))
+        if row is None or body:
+            return row
+        return {k: v for k, v in row.items() if k != "body"}
+
+    async def finish(self, circuit_id, fmt, token, body=None, error=None):
+        row = self.rows.get((circuit_id, fmt))
+        if row is not None and row["created_at"] == token:
+            row.update(status="failed" if error else "done", body=body, error=error, finished_at=datetime.utcnow())
+
+    async def forget(self, circuit_id):
+        for key in [k for k in self.rows if k[0] == circuit_id]:
+            del self.rows[key]
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = PostgresStore() if pubsub.is_postgres() else MemoryStore()
+    return _store
+
+
+def reset_pool():
+    # Stops the export processes; the next job starts a new pool. Other jobs
+    # still in the old pool fail with BrokenProcessPool and are claimed again
+    # by their next request.
+    global _pool
+    pool, _pool = _pool, None
+    if pool is None:
+        return
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def build(diagram, fmt, source):
+    # Artifact bytes, built in an export process
+    global _pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(get_pool(), pcb_export.build, diagram, fmt, source), JOB_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        # wait_for only stops waiting; the runaway export would keep its
+        # process and every later job would queue behind it
+        metrics.incr("pcb_export.timeouts")
+        reset_pool()
+        raise
+    except BrokenProcessPool:
+        # A child died (out of memory, killed); the next job gets a new pool
+        _pool = None
+        raise
+
+
+async def _run(circuit_id, fmt, token, diagram):
+    started = time.perf_counter()
+    try:
+        body = await build(diagram, fmt, f"circuit-{circuit_id}")
+    except Exception as e:
+        print(f"PCB export failed for {circuit_id} ({fmt}): {e!r}")
+        metrics.incr("pcb_export.failed")
+        await get_store().finish(circuit_id, fmt, token, error=str(e) or type(e).__name__)
+        return
+    metrics.observe(f"pcb_export.{fmt}.latency_ms", (time.perf_counter() - started) * 1000)
+    await get_store().finish(circuit_id, fmt, token, body=body)
+
+
+def _consume_exception(task):
+    if not task.cancelled():
+        task.exception()
+
+
+async def submit(circuit_id, fmt, diagram):
+    # Status row of the circuit's export, starting the job unless it is done or
+    # already running somewhere
+    token, row = await get_store().claim(circuit_id, fmt)
+    if row is not None:
+        metrics.incr(f"pcb_export.{row['status']}_hits")
+        return row
+    task = asyncio.create_task(_run(circuit_id, fmt, token, diagram))
+    task.add_done_callback(_consume_exception)
+    task.add_done_callback(lambda _: _running.pop((circuit_id, fmt), None))
+    _running[(circuit_id, fmt)] = task
+    return await get_store().get(circuit_id, fmt)
+
+
+async def status(circuit_id, fmt):
+    return await get_store().get(circuit_id, fmt)
+
+
+async def artifact(circuit_id, fmt):
+    return await get_store().get(circuit_id, fmt, body=True)
+
+
+async def forget(circuit_id):
+    # After the circuit's diagram changed; the next request exports it again
+    await get_store().forget(circuit_id)
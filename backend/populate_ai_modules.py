@@ -1,6 +1,6 @@
 import asyncio
-from database import database, ai_courses
-from datetime import datetime
+from database import database
+from bulk_io import import_records
 
 async def populate_ai_modules():
     await database.connect()
@@ -151,16 +151,8 @@ Learners who complete all 8 modules and submit their final AI project will recei
 
     print(f"Adding {len(modules)} modules...")
     
-    for mod in modules:
-        query = ai_courses.insert().values(
-            week=mod["week"],
-            title=mod["title"],
-            description=mod["description"],
-            content=mod["content"],
-            created_at=datetime.utcnow()
-        )
-        await database.execute(query)
-        print(f"Added Week {mod['week']}: {mod['title']}")
+    summary = await import_records("courses", [{**mod, "course_type": "kids"} for mod in modules])
+    print(f"{summary['inserted']} added, {summary['updated']} updated, {summary['unchanged']} unchanged")
 
     await database.disconnect()
     print("Done!")
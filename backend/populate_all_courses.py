@@ -1,7 +1,6 @@
 import asyncio
 from database import database, ai_courses
-from datetime import datetime
-import sqlalchemy
+from bulk_io import import_records
 
 async def populate_all_courses():
     await database.connect()
@@ -163,17 +162,8 @@ Learners who complete all 8 modules and submit their final AI project will recei
         }
     ]
 
-    for mod in kids_modules:
-        query = ai_courses.insert().values(
-            week=mod["week"],
-            title=mod["title"],
-            description=mod["description"],
-            content=mod["content"],
-            course_type="kids",
-            created_at=datetime.utcnow()
-        )
-        await database.execute(query)
-        print(f"Added Kids Module: Week {mod['week']}")
+    summary = await import_records("courses", [{**mod, "course_type": "kids"} for mod in kids_modules])
+    print(f"Kids Modules: {summary['inserted']} added, {summary['updated']} updated")
 
 
     # 2. TechWatt Python & AI Master Course
@@ -267,17 +257,8 @@ By the end of this course, you will master:
         }
     ]
 
-    for mod in master_modules:
-        query = ai_courses.insert().values(
-            week=mod["week"],
-            title=mod["title"],
-            description=mod["description"],
-            content=mod["content"],
-            course_type="python_master",
-            created_at=datetime.utcnow()
-        )
-        await database.execute(query)
-        print(f"Added Master Module: Week {mod['week']}")
+    summary = await import_records("courses", [{**mod, "course_type": "python_master"} for mod in master_modules])
+    print(f"Master Modules: {summary['inserted']} added, {summary['updated']} updated")
 
 
     # 3. TechWatt Drone Building Course
@@ -438,17 +419,8 @@ When the computer takes the sticks.
         }
     ]
 
-    for mod in drone_modules:
-        query = ai_courses.insert().values(
-            week=mod["week"],
-            title=mod["title"],
-            description=mod["description"],
-            content=mod["content"],
-            course_type="drone_building",
-            created_at=datetime.utcnow()
-        )
-        await database.execute(query)
-        print(f"Added Drone Module: Week {mod['week']}")
+    summary = await import_records("courses", [{**mod, "course_type": "drone_building"} for mod in drone_modules])
+    print(f"Drone Modules: {summary['inserted']} added, {summary['updated']} updated")
 
 
     # 4. TechWatt Data Analytics Course
@@ -605,17 +577,8 @@ Showcasing your skills to get hired.
         }
     ]
 
-    for mod in data_analytics_modules:
-        query = ai_courses.insert().values(
-            week=mod["week"],
-            title=mod["title"],
-            description=mod["description"],
-            content=mod["content"],
-            course_type="data_analytics",
-            created_at=datetime.utcnow()
-        )
-        await database.execute(query)
-        print(f"Added Data Analytics Module: Week {mod['week']}")
+    summary = await import_records("courses", [{**mod, "course_type": "data_analytics"} for mod in data_analytics_modules])
+    print(f"Data Analytics Modules: {summary['inserted']} added, {summary['updated']} updated")
 
     await database.disconnect()
     print("Done! All four courses populated.")
@@ -1,6 +1,6 @@
 import asyncio
 from database import database, ai_courses
-from datetime import datetime
+from bulk_io import import_records
 
 async def populate_python_course():
     await database.connect()
@@ -100,16 +100,8 @@ By the end of this course, you will master:
 
     print(f"Adding {len(modules)} modules for TechWatt Python & AI Master Course...")
     
-    for mod in modules:
-        query = ai_courses.insert().values(
-            week=mod["week"],
-            title=mod["title"],
-            description=mod["description"],
-            content=mod["content"],
-            created_at=datetime.utcnow()
-        )
-        await database.execute(query)
-        print(f"Added Week {mod['week']}: {mod['title']}")
+    summary = await import_records("courses", [{**mod, "course_type": "python_master"} for mod in modules])
+    print(f"{summary['inserted']} added, {summary['updated']} updated, {summary['unchanged']} unchanged")
 
     await database.disconnect()
     print("Done!")
@@ -0,0 +1,92 @@
+import time
+import uuid
+import asyncio
+import metrics
+
+# Speculative generation sessions.
+# /api/generate starts code and BOM generation in the background the moment a
+# diagram request arrives and parks the tasks under a generation id. The
+# follow-up /api/generate-code and /api/generate-bom calls attach to those
+# tasks instead of starting new LLM calls, so the UI is complete after roughly
+# the slowest of the three calls rather than diagram + max(code, BOM).
+#
+# Sessions live in the worker that served /api/generate; a follow-up that lands
+# on another worker simply generates from scratch.
+
+SESSION_TTL_SECONDS = 300
+
+
+def _consume_exception(task):
+    # Unclaimed sessions may fail with nobody awaiting them
+    if not task.cancelled():
+        task.exception()
+
+
+class GenerationSession:
+    def __init__(self, query):
+        self.query = query
+        self.created = time.monotonic()
+        self.tasks = {}
+
+    def expired(self, now):
+        return now - self.created > SESSION_TTL_SECONDS
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+
+class GenerationSessions:
+    def __init__(self):
+        self.sessions = {}
+
+    def start(self, query, jobs):
+        # jobs maps a part name ("code", "bom") to a zero-argument coroutine function
+        self.purge()
+        generation_id = uuid.uuid4().hex
+        session = GenerationSession(query)
+        for part, job in jobs.items():
+            task = asyncio.create_task(job())
+            task.add_done_callback(_consume_exception)
+            session.tasks[part] = task
+        self.sessions[generation_id] = session
+        return generation_id
+
+    def claim(self, generation_id, part, query):
+        # The in-flight or finished task for this part, if the session still exists
+        session = self.sessions.get(generation_id) if generation_id else None
+        if session is None or session.query != query or session.expired(time.monotonic()):
+            return None
+        return session.tasks.get(part)
+
+    def cancel(self, generation_id):
+        session = self.sessions.pop(generation_id, None)
+        if session is not None:
+            session.cancel()
+
+    def purge(self):
+        now = time.monotonic()
+        for generation_id in [g for g, s in self.sessions.items() if s.expired(now)]:
+            self.sessions.pop(generation_id).cancel()
+
+
+generation_sessions = GenerationSessions()
+
+
+async def attach(generation_id, part, query):
+    # Result of the speculative task, or None when the caller must generate itself
+    task = generation_sessions.claim(generation_id, part, query)
+    if task is None:
+        if generation_id:
+            metrics.incr(f"prefetch.{part}.misses")
+        return None
+    metrics.incr(f"prefetch.{part}.hits")
+    try:
+        # shield: a client disconnecting must not cancel the shared task
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if task.cancelled():
+            return None
+        raise
+    except Exception:
+        return None
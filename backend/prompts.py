@@ -0,0 +1,279 @@
+import sys
+from dataclasses import dataclass, field
+
+# Prompt registry.
+# Every prompt is versioned and split into a static system message and a small
+# user template. The static part always comes first and is byte-identical
+# between calls, which is what provider-side prefix caching keys on; only the
+# user message varies per request.
+#
+# Token report:  python prompts.py report [model]
+
+SYSTEM_PROMPT_DIAGRAM = """
+You are an expert Electronics Engineer creating WIRING DIAGRAMS for TechWatt.ai.
+STRUCTURE: One MAIN controller in center, Peripherals around it.
+OUTPUT JSON ONLY:
+{
+    "nodes": [
+        {"id": "mcu", "label": "Arduino UNO", "type": "Microcontroller", "pins": ["5V", "GND", "D2", "A0", ...]},
+        {"id": "s1", "label": "HC-SR04", "type": "Sensor", "pins": ["VCC", "TRIG", "ECHO", "GND"]}
+    ],
+    "connections": [
+        {"id": "c1", "from": "mcu", "fromPin": "5V", "to": "s1", "toPin": "VCC", "color": "red"}
+    ],
+    "explanation": "Brief description."
+}
+RULES: 
+- Wire colors: red (power), black (ground), blue/green/yellow (data).
+- Pins: Use standard pin names.
+- If the user lists parts they own, build with those parts where they fit and keep their names exactly; add other parts only when needed.
+"""
+
+SYSTEM_PROMPT_CODE = """
+You are an expert Firmware Engineer. Write PRODUCTION-READY code for the described circuit.
+If an Arduino/ESP is used, write C++ (Arduino). If Raspberry Pi, write Python.
+Include specific pin definitions based on the user's wiring request.
+OUTPUT JSON ONLY:
+{
+    "code": "#include ... void setup() { ... }",
+    "explanation": "Key logic summary."
+}
+"""
+
+SYSTEM_PROMPT_BOM = """
+You are a Sourcing Engineer. Create a detailed Bill of Materials (BOM).
+Your goal is to estimate the CURRENT ONLINE MARKET PRICE for each component.
+- Check major distributors like DigiKey, Mouser, Adafruit, and Amazon in your internal knowledge base.
+- Provide a realistic estimated price range or average.
+- If a specific part number is common (e.g., "Arduino Uno R3", "HC-SR04"), use that pricing.
+
+OUTPUT JSON ONLY:
+{
+    "items": [
+        {"component": "Arduino UNO R3", "quantity": 1, "estimated_price": "$24.95", "source": "Average Online"},
+        {"component": "HC-SR04 Ultrasonic Sensor", "quantity": 1, "estimated_price": "$3.50", "source": "Common Retailer"}
+    ],
+    "total_estimated_cost": "$28.45",
+    "notes": "Prices are estimated based on average online listings."
+}
+"""
+
+SYSTEM_PROMPT_COMPONENT_DETAILS = """
+You are an expert robotics teacher for kids and beginners.
+Write a COMPREHENSIVE and DETAILED guide for the robotics component named by the user.
+
+Output JSON format only:
+{
+    "description": "A detailed explanation in MARKDOWN format. Include:\\n\\n# 🤖 What is it?\\n(Fun analogy and simple explanation)\\n\\n# ⚙️ How it Works\\n(Technical details made simple)\\n\\n# ✨ Key Features\\n- Feature 1\\n- Feature 2\\n\\n# 🚀 Common Uses\\n- Project idea 1\\n- Project idea 2\\n\\n# ⚠️ Troubleshooting\\n- Common issue and fix",
+    "wiring_guide": "Step-by-step wiring instructions for Arduino/Microcontroller:\\n1. Connect VCC to 5V...\\n2. Connect GND to GND..."
+}
+"""
+
+SYSTEM_PROMPT_DIAGRAM_EDIT = """
+You are an expert Electronics Engineer editing an existing WIRING DIAGRAM for TechWatt.ai.
+You receive the current diagram and a requested change. Return ONLY what changes, never the whole diagram.
+OUTPUT JSON ONLY:
+{
+    "remove_nodes": ["s2"],
+    "add_nodes": [{"id": "bz1", "label": "Piezo Buzzer", "type": "Output", "pins": ["+", "-"]}],
+    "update_nodes": [{"id": "s1", "label": "HC-SR04P"}],
+    "remove_connections": ["c4"],
+    "add_connections": [{"id": "c9", "from": "mcu", "fromPin": "D8", "to": "bz1", "toPin": "+", "color": "yellow"}],
+    "explanation": "Updated description of the whole circuit."
+}
+RULES:
+- Omit keys with nothing to change. Removing a node removes its connections.
+- New ids must not clash with existing node or connection ids.
+- Only use pins that exist on the nodes. Wire colors: red (power), black (ground), blue/green/yellow (data).
+"""
+
+SYSTEM_PROMPT_CODE_EDIT = """
+You are an expert Firmware Engineer updating existing firmware after a wiring change.
+Return the smallest set of search/replace edits that adapts the code to the change.
+Each "find" must be an exact, unique snippet of the current code.
+OUTPUT JSON ONLY:
+{
+    "edits": [{"find": "const int TRIG = 9;", "replace": "const int TRIG = 9;\\nconst int BUZZER = 8;"}],
+    "explanation": "Key logic summary."
+}
+"""
+
+SYSTEM_PROMPT_CODE_GLUE = """
+You are an expert Firmware Engineer. The drivers for this circuit are already written; write ONLY the application logic that uses them.
+You get the target, the driver API of each wired part, and the wiring of any part without a driver.
+- Call the driver API instead of touching those pins directly.
+- Parts without a driver need their own minimal code in "globals" and "setup".
+OUTPUT JSON ONLY:
+{
+    "globals": "Extra global variables and constants (optional).",
+    "setup": "Statements run once at startup (optional).",
+    "loop": "Statements repeated forever: the body of loop() in C++, or of `while True:` in Python.",
+    "explanation": "Key logic summary."
+}
+"""
+
+
+@dataclass(frozen=True)
+class Prompt:
+    name: str
+    version: int
+    system: str
+    user_template: str
+    # Example user input, used by the token report
+    sample: dict = field(default_factory=dict)
+
+    @property
+    def id(self):
+        return f"{self.name}@v{self.version}"
+
+    def messages(self, **values):
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user_template.format(**values)},
+        ]
+
+
+PROMPTS = {}
+
+
+def register(prompt):
+    PROMPTS[prompt.name] = prompt
+    return prompt
+
+
+def get_prompt(name):
+    return PROMPTS[name]
+
+
+# v2: the user's inventory (inventory.py) follows the query when they have one
+register(Prompt(
+    "diagram", 2, SYSTEM_PROMPT_DIAGRAM, "Create wiring diagram for: {query}{owned}",
+    sample={"query": "obstacle avoiding robot with HC-SR04 and two DC motors", "owned": "\nParts I own: 1 x Arduino Uno; 2 x DC Motor"},
+))
+register(Prompt(
+    "code", 1, SYSTEM_PROMPT_CODE, "Write code for: {query}",
+    sample={"query": "obstacle avoiding robot with HC-SR04 and two DC motors"},
+))
+register(Prompt(
+    "bom", 1, SYSTEM_PROMPT_BOM, "Create BOM for: {query}",
+    sample={"query": "obstacle avoiding robot with HC-SR04 and two DC motors"},
+))
+# v2: the instructions moved into the system message; v1 interpolated the
+# component name into the middle of a single user prompt, so no two calls
+# shared a prefix.
+register(Prompt(
+    "component_details", 2, SYSTEM_PROMPT_COMPONENT_DETAILS, "Component Name: {name}\nCategory: {category}",
+    sample={"name": "HC-SR04 Ultrasonic Sensor", "category": "Sensor"},
+))
+register(Prompt(
+    "diagram_edit", 1, SYSTEM_PROMPT_DIAGRAM_EDIT, "Current diagram:\n{diagram}\n\nChange: {instruction}",
+    sample={
+        "diagram": '{"nodes":[{"id":"mcu","label":"Arduino UNO","type":"Microcontroller","pins":["5V","GND","D8","D9","D10"]},'
+                   '{"id":"s1","label":"HC-SR04","type":"Sensor","pins":["VCC","TRIG","ECHO","GND"]}],'
+                   '"connections":[{"id":"c1","from":"mcu","fromPin":"5V","to":"s1","toPin":"VCC"},'
+                   '{"id":"c2","from":"mcu","fromPin":"D9","to":"s1","toPin":"TRIG"}]}',
+        "instruction": "add a buzzer on D8",
+    },
+))
+register(Prompt(
+    "code_edit", 1, SYSTEM_PROMPT_CODE_EDIT, "Circuit: {query}\nChange: {change}\n\nCurrent code:\n{code}",
+    sample={
+        "query": "obstacle avoiding robot with HC-SR04",
+        "change": "added Piezo Buzzer (bz1) wired mcu.D8 -> bz1.+",
+        "code": "const int TRIG = 9;\nconst int ECHO = 10;\nvoid setup() { pinMode(TRIG, OUTPUT); }\nvoid loop() {}",
+    },
+))
+register(Prompt(
+    "code_glue", 1, SYSTEM_PROMPT_CODE_GLUE,
+    "Circuit: {query}\nTarget: {target}\n\nDriver API:\n{api}\n\nParts without a driver:\n{other}",
+    sample={
+        "query": "obstacle avoiding robot with HC-SR04 and two DC motors",
+        "target": "Arduino C++ (Serial is started at 9600 baud; use delay(ms))",
+        "api": "float s1_distance_cm();  // distance in cm, 0 when nothing echoes back\n"
+               "void drv_drive(int left, int right);  // motor A / motor B speed, -255 (reverse) to 255",
+        "other": "(none)",
+    },
+))
+
+# Which prompt each endpoint sends
+ENDPOINT_PROMPTS = {
+    "/api/generate": "diagram",
+    "/api/generate-code": "code",
+    "/api/generate-code (composed)": "code_glue",
+    "/api/generate-bom": "bom",
+    "/api/generate-component-details": "component_details",
+    "/api/circuit/{id}/edit": "diagram_edit",
+    "/api/circuit/{id}/edit (code)": "code_edit",
+}
+
+
+# --- TOKEN COUNTING ---
+
+# Per-message framing tokens added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+# OpenAI caches prompt prefixes of at least 1024 tokens, in 128-token steps
+PROVIDER_CACHE_MIN_TOKENS = 1024
+PROVIDER_CACHE_STEP_TOKENS = 128
+
+_encodings = {}
+
+
+def _encoding(model):
+    if model not in _encodings:
+        try:
+            import tiktoken
+
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # tiktoken missing, or its BPE file cannot be downloaded
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text, model="gpt-4o"):
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)  # rough English average
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages, model="gpt-4o"):
+    return sum(count_tokens(m["content"], model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def prefix_stats(prompt, model="gpt-4o", **values):
+    values = values or prompt.sample
+    messages = prompt.messages(**values)
+    total = count_message_tokens(messages, model)
+    static = count_message_tokens(messages[:1], model)
+    # Only a shared prefix of at least the minimum is cached, however long the prompt
+    if static >= PROVIDER_CACHE_MIN_TOKENS:
+        cacheable = static // PROVIDER_CACHE_STEP_TOKENS * PROVIDER_CACHE_STEP_TOKENS
+    else:
+        cacheable = 0
+    return {"total": total, "static": static, "cacheable": cacheable}
+
+
+def report(model="gpt-4o"):
+    exact = _encoding(model) is not None
+    print(f"Prompt tokens for {model} ({'tiktoken' if exact else 'approximate, tiktoken unavailable'})")
+    print(f"{'endpoint':34} {'prompt':22} {'total':>6} {'static':>7} {'prefix%':>8} {'cacheable':>10}")
+    for endpoint, name in ENDPOINT_PROMPTS.items():
+        prompt = PROMPTS[name]
+        stats = prefix_stats(prompt, model)
+        ratio = stats["static"] / stats["total"] * 100
+        print(
+            f"{endpoint:34} {prompt.id:22} {stats['total']:6} {stats['static']:7} "
+            f"{ratio:7.1f}% {stats['cacheable']:10}"
+        )
+    print(f"(provider caching needs a static prefix of {PROVIDER_CACHE_MIN_TOKENS} tokens)")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["report"]:
+        print("Usage: python prompts.py report [model]")
+        sys.exit(1)
+    report(*sys.argv[2:3])
@@ -0,0 +1,100 @@
+import json
+import uuid
+import asyncio
+import inspect
+from database import database, DATABASE_URL
+
+# Cross-worker messaging over Postgres LISTEN/NOTIFY.
+# Every worker publishes through the shared pool and listens on one dedicated
+# asyncpg connection. Messages carry the sending worker's id so a worker never
+# re-applies its own events.
+
+WORKER_ID = uuid.uuid4().hex[:12]
+
+# NOTIFY payloads are capped at 8000 bytes by Postgres
+MAX_PAYLOAD_BYTES = 7900
+
+_handlers = {}
+_listener = None
+
+
+def is_postgres():
+    return database.url.dialect == "postgresql"
+
+
+def subscribe(channel, handler):
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def chunks(items, limit=MAX_PAYLOAD_BYTES - 200):
+    # Groups a list into lists whose JSON fits one payload, with room for the envelope
+    chunk, size = [], 0
+    for item in items:
+        length = len(json.dumps(item, default=str)) + 1
+        if chunk and size + length > limit:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(item)
+        size += length
+    if chunk:
+        yield chunk
+
+
+async def publish(channel, payload):
+    if not is_postgres():
+        return
+    message = json.dumps({"origin": WORKER_ID, "data": payload}, default=str)
+    if len(message.encode()) > MAX_PAYLOAD_BYTES:
+        print(f"pubsub: dropping oversized message on '{channel}'")
+        return
+    try:
+        await database.execute(
+            query="SELECT pg_notify(:channel, :payload)",
+            values={"channel": channel, "payload": message},
+        )
+    except Exception as e:
+        print(f"pubsub: publish on '{channel}' failed: {e}")
+
+
+def _asyncpg_dsn():
+    # databases accepts "postgresql+asyncpg://", asyncpg itself does not
+    return DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def _dispatch(connection, pid, channel, payload):
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        return
+    if message.get("origin") == WORKER_ID:
+        return
+    for handler in _handlers.get(channel, []):
+        try:
+            result = handler(message.get("data"))
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result)
+        except Exception as e:
+            print(f"pubsub: handler for '{channel}' failed: {e}")
+
+
+async def start():
+    global _listener
+    if not is_postgres() or not _handlers or _listener is not None:
+        return
+    import asyncpg
+
+    try:
+        _listener = await asyncpg.connect(_asyncpg_dsn())
+        for channel in _handlers:
+            await _listener.add_listener(channel, _dispatch)
+    except Exception as e:
+        # Workers still serve requests, they just miss other workers' events
+        print(f"pubsub: could not start listener: {e}")
+        _listener = None
+
+
+async def stop():
+    global _listener
+    if _listener is not None:
+        await _listener.close()
+        _listener = None
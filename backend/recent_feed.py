@@ -0,0 +1,120 @@
+import os
+import asyncio
+from collections import deque
+from datetime import datetime
+from itertools import islice
+import sqlalchemy
+import pubsub
+from database import database, circuits
+
+# In-memory ring buffer of the newest circuit summaries (id, query, created_at).
+# It is loaded once at startup, updated by the save path and kept in sync
+# across workers through pubsub, so the History panel never touches the DB.
+
+RECENT_FEED_SIZE = int(os.getenv("RECENT_FEED_SIZE", "500"))
+RECENT_MAX_LIMIT = 50
+CHANNEL = "recent_circuits"
+
+# Long queries are clipped in the feed so a summary always fits a NOTIFY payload
+MAX_QUERY_CHARS = 1000
+
+
+def summarize(circuit_id, query, created_at):
+    return {
+        "id": circuit_id,
+        "query": (query or "")[:MAX_QUERY_CHARS],
+        "created_at": created_at,
+    }
+
+
+class RecentFeed:
+    def __init__(self, size=RECENT_FEED_SIZE):
+        self.items = deque(maxlen=size)  # newest first
+        self.ids = set()
+        # True while the buffer holds every circuit in the table
+        self.complete = False
+        self.subscribers = set()
+
+    async def load(self):
+        query = (
+            sqlalchemy.select(circuits.c.id, circuits.c.query, circuits.c.created_at)
+            .order_by(sqlalchemy.desc(circuits.c.created_at))
+            .limit(self.items.maxlen)
+        )
+        rows = await database.fetch_all(query)
+        self.items.clear()
+        self.ids.clear()
+        for r in rows:
+            self.items.append(summarize(r["id"], r["query"], r["created_at"]))
+            self.ids.add(r["id"])
+        self.complete = len(rows) < self.items.maxlen
+
+    def add(self, item):
+        if item["id"] in self.ids:
+            return False
+        # Saves arrive almost in order, so the insert point is nearly always 0
+        position = 0
+        for existing in self.items:
+            if existing["created_at"] <= item["created_at"]:
+                break
+            position += 1
+        full = len(self.items) == self.items.maxlen
+        if position == len(self.items) and (full or not self.complete):
+            # Older than anything we keep and no room for it; leave it to the DB
+            self.complete = False
+            return False
+        if full:
+            evicted = self.items.pop()
+            self.ids.discard(evicted["id"])
+            self.complete = False
+        self.items.insert(position, item)
+        self.ids.add(item["id"])
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                pass  # slow client, it will catch up on the next page load
+        return True
+
+    async def publish(self, item):
+        self.add(item)
+        await pubsub.publish(CHANNEL, item)
+
+    def on_notify(self, data):
+        if not data:
+            return
+        created_at = data.get("created_at")
+        if isinstance(created_at, str):
+            data["created_at"] = datetime.fromisoformat(created_at)
+        self.add(data)
+
+    def page(self, limit, before=None):
+        # Returns None when the buffer cannot answer and the caller must hit the DB
+        if before is None:
+            items = list(islice(self.items, limit))
+        else:
+            items = list(islice((i for i in self.items if i["created_at"] < before), limit))
+        if len(items) < limit and not self.complete:
+            return None
+        return items
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=100)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+
+async def fetch_page(limit, before=None):
+    query = sqlalchemy.select(circuits.c.id, circuits.c.query, circuits.c.created_at)
+    if before is not None:
+        query = query.where(circuits.c.created_at < before)
+    query = query.order_by(sqlalchemy.desc(circuits.c.created_at)).limit(limit)
+    results = await database.fetch_all(query)
+    return [summarize(r["id"], r["query"], r["created_at"]) for r in results]
+
+
+recent_feed = RecentFeed()
+pubsub.subscribe(CHANNEL, recent_feed.on_notify)
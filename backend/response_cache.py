@@ -0,0 +1,84 @@
+import hashlib
+from collections import OrderedDict
+from fastapi import Response
+import pubsub
+from compression import negotiate, compress, encoded_etag, etag_matches
+from responses import dumps
+
+# Rendered-response cache for catalog lists and saved circuits.
+# Each entry keeps the encoded JSON body plus its compressed forms, built the
+# first time a client asks for that encoding, so compression runs once per
+# write instead of once per read. Writers call invalidate(); other workers are
+# told over pubsub.
+
+MAX_ENTRIES = 512
+# Bigger lists are streamed uncached (see responses.stream_rows)
+MAX_CACHED_ROWS = 2000
+CHANNEL = "response_cache"
+
+
+class CachedBody:
+    def __init__(self, body):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.encoded = {}
+
+    def etag_for(self, encoding):
+        # Each encoding is a different representation, so it gets its own tag
+        return self.etag if encoding is None else encoded_etag(self.etag, encoding)
+
+    def encode(self, encoding):
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compress(self.body, encoding)
+        return self.encoded[encoding]
+
+
+class ResponseCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        # Bumped on every invalidation; a load that raced a write is not stored
+        self.generation = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, content, generation):
+        entry = CachedBody(dumps(content))
+        if generation != self.generation:
+            return entry
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def drop(self, prefix):
+        self.generation += 1
+        for key in [k for k in self.entries if k.startswith(prefix)]:
+            del self.entries[key]
+
+    async def invalidate(self, prefix):
+        self.drop(prefix)
+        await pubsub.publish(CHANNEL, {"prefix": prefix})
+
+    def on_notify(self, data):
+        if data and "prefix" in data:
+            self.drop(data["prefix"])
+
+    def respond(self, request, entry):
+        encoding = negotiate(request.headers.get("accept-encoding", ""))
+        headers = {"ETag": entry.etag_for(encoding), "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if encoding is None:
+            return Response(entry.body, media_type="application/json", headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(entry.encode(encoding), media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache()
+pubsub.subscribe(CHANNEL, response_cache.on_notify)
@@ -0,0 +1,58 @@
+from decimal import Decimal
+import orjson
+from fastapi.responses import Response, StreamingResponse
+
+# orjson-backed responses.
+# Handlers that return trusted DB rows wrap them in ORJSONResponse (or stream
+# them with stream_rows) so FastAPI skips response_model validation and the
+# stdlib encoder; response_model stays on the route for the OpenAPI schema.
+
+STREAM_CHUNK_ROWS = 100
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+def dumps(content):
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
+
+
+async def _aiter(rows):
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            yield row
+    else:
+        for row in rows:
+            yield row
+
+
+async def _encode_rows(rows):
+    # Encodes a JSON array incrementally, STREAM_CHUNK_ROWS rows per chunk;
+    # rows may be a list or an async iterator such as database.iterate()
+    yield b"["
+    chunk = []
+    separator = b""
+    async for row in _aiter(rows):
+        chunk.append(dict(row))
+        if len(chunk) >= STREAM_CHUNK_ROWS:
+            # Encode the chunk as one array and strip its brackets
+            yield separator + dumps(chunk)[1:-1]
+            separator = b","
+            chunk = []
+    if chunk:
+        yield separator + dumps(chunk)[1:-1]
+    yield b"]"
+
+
+def stream_rows(rows):
+    return StreamingResponse(_encode_rows(rows), media_type="application/json")
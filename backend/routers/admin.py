@@ -0,0 +1,52 @@
+import io
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, UploadFile, File
+from fastapi.responses import StreamingResponse
+from schemas import PasswordVerifyRequest
+from bulk_io import KINDS, FORMATS, format_for, read_records, import_records, export_records
+
+router = APIRouter()
+
+@router.post("/api/verify-password")
+async def verify_password(request: PasswordVerifyRequest):
+    expected_password = os.getenv("ADMIN_PASSWORD", "techwatt123")
+    if request.password == expected_password:
+        return {"valid": True}
+    else:
+        raise HTTPException(status_code=401, detail="Invalid password")
+
+def require_admin(x_admin_password: Optional[str] = Header(None)):
+    if x_admin_password != os.getenv("ADMIN_PASSWORD", "techwatt123"):
+        raise HTTPException(status_code=401, detail="Invalid password")
+
+# --- BULK IMPORT / EXPORT ---
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "yaml": "application/yaml"}
+
+@router.post("/api/admin/import/{kind}", dependencies=[Depends(require_admin)])
+async def bulk_import(kind: str, file: UploadFile = File(...), format: Optional[str] = None, dry_run: bool = False):
+    if kind not in KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown kind '{kind}'")
+    fmt = format or format_for(file.filename)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return await import_records(kind, read_records(stream, fmt), dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/admin/export/{kind}", dependencies=[Depends(require_admin)])
+async def bulk_export(kind: str, format: str = "ndjson"):
+    if kind not in KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown kind '{kind}'")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    return StreamingResponse(
+        export_records(kind, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'},
+    )
@@ -0,0 +1,232 @@
+import json
+import uuid
+import asyncio
+import sqlalchemy
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from database import database, circuits
+from schemas import SaveRequest, ExportRequest
+from responses import ORJSONResponse
+from response_cache import response_cache
+from compression import etag_matches
+from idempotency import idempotent
+from recent_feed import recent_feed, fetch_page, summarize, RECENT_MAX_LIMIT
+from collab import collab_rooms
+from gallery import gallery_feed
+import versions
+
+router = APIRouter()
+
+@router.post("/api/save")
+async def save_circuit(request: SaveRequest, idempotency_key: Optional[str] = Header(None)):
+    # PUBLIC SAVE - a retried save with the same Idempotency-Key returns the first id
+    return await idempotent(idempotency_key, "save", request.model_dump(), lambda: insert_circuit(request))
+
+async def insert_circuit(request):
+    try:
+        circuit_id = str(uuid.uuid4())[:8]
+        created_at = datetime.utcnow()
+        query = circuits.insert().values(
+            id=circuit_id,
+            user_id=None, # Anonymous
+            query=request.query,
+            diagram_data=request.diagram_data,
+            code=request.code,
+            bom=request.bom,
+            created_at=created_at
+        )
+        await database.execute(query)
+    except Exception as e:
+        print(f"Save error: {e}")
+        raise HTTPException(status_code=500, detail="Database error")
+
+    await recent_feed.publish(summarize(circuit_id, request.query, created_at))
+    try:
+        await gallery_feed.added(circuit_id, request.query, request.diagram_data, created_at)
+    except Exception as e:
+        # The circuit is saved; the next worker start backfills its summary
+        print(f"Gallery save error: {e}")
+    return {"id": circuit_id, "message": "Saved successfully"}
+
+@router.get("/api/recent")
+async def get_recent_circuits(limit: int = Query(10, ge=1), before: Optional[datetime] = None):
+    # PUBLIC HISTORY - Global recent, served from the in-memory feed.
+    # Page into older history with ?before=<created_at of the last item>.
+    limit = min(limit, RECENT_MAX_LIMIT)
+    if before is not None and before.tzinfo is not None:
+        # created_at is stored as naive UTC
+        before = before.astimezone(timezone.utc).replace(tzinfo=None)
+    items = recent_feed.page(limit, before)
+    if items is not None:
+        return items
+    try:
+        return await fetch_page(limit, before)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/recent/stream")
+async def stream_recent_circuits(request: Request):
+    # Server-Sent Events feed of newly saved circuits (community gallery)
+    queue = recent_feed.subscribe()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(item, default=str)}\n\n"
+        finally:
+            recent_feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/api/circuit/{circuit_id}")
+async def load_circuit(circuit_id: str, request: Request):
+    # The rendered body is cached precompressed; saved circuits only change
+    # through collaborative snapshots (collab.py), which drop the entry
+    cache_key = f"circuit:{circuit_id}"
+    entry = response_cache.get(cache_key)
+    if entry is None:
+        generation = response_cache.generation
+        query = circuits.select().where(circuits.c.id == circuit_id)
+        result = await database.fetch_one(query)
+        if not result:
+            raise HTTPException(status_code=404, detail="Circuit not found")
+
+        entry = response_cache.put(cache_key, {
+            "id": result["id"],
+            "query": result["query"],
+            "diagram_data": result["diagram_data"],
+            "code": result["code"],
+            "bom": result["bom"],
+            "created_at": result["created_at"]
+        }, generation)
+    gallery_feed.record(circuit_id, "view")
+    return response_cache.respond(request, entry)
+
+@router.get("/api/circuit/{circuit_id}/versions")
+async def list_versions(circuit_id: str, limit: int = Query(20, ge=1), before: Optional[int] = None):
+    # Edit history, newest first; page back with ?before=<version of the last item>
+    limit = min(limit, versions.MAX_PAGE)
+    try:
+        row = await database.fetch_one(
+            sqlalchemy.select(circuits.c.version, circuits.c.created_at).where(circuits.c.id == circuit_id)
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Circuit not found")
+        items = await versions.page(circuit_id, limit, before)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if len(items) < limit and (before is None or before > 0):
+        items.append(versions.summarize(0, row["created_at"], []))
+    return {"id": circuit_id, "head": row["version"] or 0, "versions": items}
+
+@router.get("/api/circuit/{circuit_id}/versions/{version}")
+async def load_version(circuit_id: str, version: int, request: Request):
+    # Old versions never change, so they are cached like saved circuits
+    cache_key = f"version:{circuit_id}:{version}"
+    entry = response_cache.get(cache_key)
+    if entry is None:
+        generation = response_cache.generation
+        document = await versions.rebuild(circuit_id, version)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Version not found")
+        entry = response_cache.put(cache_key, {"id": circuit_id, "version": version, "diagram_data": document.diagram()}, generation)
+    return response_cache.respond(request, entry)
+
+@router.post("/api/circuit/{circuit_id}/versions/{version}/restore")
+async def restore_version(circuit_id: str, version: int):
+    # Undo/redo: the circuit goes back to a version through a new version,
+    # applied live to everyone editing it
+    document = await versions.rebuild(circuit_id, version)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    try:
+        await collab_rooms.restore(circuit_id, document)
+        head = await versions.head(circuit_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"id": circuit_id, "restored": version, "head": head}
+
+async def export_response(request, diagram, fmt, filename):
+    # NumPy is loaded by the first export, not at startup
+    import diagram_export
+
+    digest = diagram_export.content_hash(diagram, fmt)
+    headers = {"ETag": f'"{digest}"', "Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    body = diagram_export.export_cache.get(digest)
+    if body is None:
+        # Large diagrams take tens of milliseconds; keep them off the event loop
+        body = await run_in_threadpool(diagram_export.render, diagram, fmt)
+        diagram_export.export_cache.put(digest, body)
+    return Response(body, media_type=diagram_export.FORMATS[fmt], headers=headers)
+
+@router.get("/api/circuit/{circuit_id}/export")
+async def export_circuit(circuit_id: str, request: Request, format: str = Query("svg", pattern="^(svg|pdf)$")):
+    # SVG/PDF of a saved diagram, cached by content hash
+    result = await database.fetch_one(circuits.select().where(circuits.c.id == circuit_id))
+    if not result:
+        raise HTTPException(status_code=404, detail="Circuit not found")
+    return await export_response(request, result["diagram_data"] or {}, format, f"circuit-{circuit_id}")
+
+@router.post("/api/export")
+async def export_diagram(body: ExportRequest, request: Request, format: str = Query("svg", pattern="^(svg|pdf)$")):
+    # Same export for an unsaved diagram in the editor
+    return await export_response(request, body.diagram_data, format, "techwatt-circuit")
+
+def pcb_status(row):
+    status = {k: row[k] for k in ("circuit_id", "format", "status", "error", "created_at", "finished_at")}
+    if row["status"] == "done":
+        status["url"] = f"/api/circuit/{row['circuit_id']}/pcb/download?format={row['format']}"
+    return status
+
+@router.post("/api/circuit/{circuit_id}/pcb")
+async def export_pcb(circuit_id: str, format: str = Query("gerber", pattern="^(kicad|gerber)$")):
+    # Starts a background PCB export (KiCad netlist or Gerber zip); 202 while
+    # it runs, 200 with a download url once the artifact exists
+    import pcb_jobs  # the export pool and its modules load with the first export
+
+    result = await database.fetch_one(circuits.select().where(circuits.c.id == circuit_id))
+    if not result:
+        raise HTTPException(status_code=404, detail="Circuit not found")
+    try:
+        row = await pcb_jobs.submit(circuit_id, format, result["diagram_data"] or {})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return ORJSONResponse(pcb_status(row), status_code=200 if row["status"] == "done" else 202)
+
+@router.get("/api/circuit/{circuit_id}/pcb")
+async def pcb_export_status(circuit_id: str, format: str = Query("gerber", pattern="^(kicad|gerber)$")):
+    import pcb_jobs
+
+    row = await pcb_jobs.status(circuit_id, format)
+    if not row:
+        raise HTTPException(status_code=404, detail="No PCB export for this circuit")
+    return pcb_status(row)
+
+@router.get("/api/circuit/{circuit_id}/pcb/download")
+async def download_pcb(circuit_id: str, format: str = Query("gerber", pattern="^(kicad|gerber)$")):
+    import pcb_jobs
+
+    row = await pcb_jobs.artifact(circuit_id, format)
+    if not row:
+        raise HTTPException(status_code=404, detail="No PCB export for this circuit")
+    if row["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"PCB export is {row['status']}")
+    media_type, extension = pcb_jobs.pcb_export.FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="circuit-{circuit_id}-pcb.{extension}"'}
+    return Response(row["body"], media_type=media_type, headers=headers)
@@ -0,0 +1,51 @@
+import json
+import uuid
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import metrics
+from collab import collab_rooms, valid_op, MAX_OPS
+
+router = APIRouter()
+
+async def send_event(websocket, message):
+    await websocket.send_text(json.dumps(message, separators=(",", ":")))
+
+@router.websocket("/api/ws/circuit/{circuit_id}")
+async def collab_socket(websocket: WebSocket, circuit_id: str):
+    # Server messages:
+    #   {"type": "state", "diagram": {...}, "editor": "<id>", "editors": 3}  once, on connect
+    #   {"type": "ops", "ops": [...], "ack": 12}  batched changes from other editors
+    # Client messages:
+    #   {"type": "ops", "seq": 12, "ops": [{"kind": "node", "id": "s1", "field": "position", "value": {"x": 10, "y": 20}}]}
+    # Fields: node data, position, deleted; connection data, deleted.
+    await websocket.accept()
+    editor_id = uuid.uuid4().hex[:12]
+    room = await collab_rooms.join(circuit_id, editor_id, websocket)
+    if room is None:
+        await send_event(websocket, {"type": "error", "detail": "Circuit not found"})
+        await websocket.close()
+        return
+    try:
+        await send_event(websocket, {
+            "type": "state", "diagram": room.document.diagram(), "editor": editor_id, "editors": len(room.editors),
+        })
+        while True:
+            text = await websocket.receive_text()
+            metrics.incr("collab.bytes_in", len(text))
+            try:
+                message = json.loads(text)
+                kind, ops = message.get("type"), message.get("ops")
+            except (ValueError, AttributeError):
+                await send_event(websocket, {"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            if kind != "ops" or not isinstance(ops, list) or len(ops) > MAX_OPS:
+                await send_event(websocket, {"type": "error", "detail": f"Expected an ops message with up to {MAX_OPS} ops"})
+                continue
+            problem = next((p for p in map(valid_op, ops) if p), None)
+            if problem:
+                await send_event(websocket, {"type": "error", "seq": message.get("seq"), "detail": problem})
+                continue
+            room.apply(editor_id, ops, message.get("seq"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await collab_rooms.leave(room, editor_id)
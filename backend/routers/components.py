@@ -0,0 +1,96 @@
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Request
+from database import database, components
+from schemas import ComponentRequest, ComponentResponse
+from responses import ORJSONResponse, stream_rows
+from response_cache import response_cache, MAX_CACHED_ROWS
+from markdown_render import render_component
+from electrical_profiles import electrical_profiles
+from inventory import user_inventory
+
+router = APIRouter()
+
+@router.get("/api/components", response_model=list[ComponentResponse])
+async def get_components(request: Request):
+    entry = response_cache.get("components")
+    if entry is None:
+        generation = response_cache.generation
+        query = components.select().order_by(components.c.name)
+        results = await database.fetch_all(query)
+        if len(results) > MAX_CACHED_ROWS:
+            return stream_rows(results)
+        entry = response_cache.put("components", [dict(r) for r in results], generation)
+    return response_cache.respond(request, entry)
+
+@router.post("/api/components", response_model=ComponentResponse)
+async def create_component(request: ComponentRequest):
+    try:
+        rendered = render_component(request.description, request.wiring_guide)
+        query = components.insert().values(
+            name=request.name,
+            description=request.description,
+            category=request.category,
+            wiring_guide=request.wiring_guide,
+            image_url=request.image_url,
+            supply_voltage=request.supply_voltage,
+            typical_ma=request.typical_ma,
+            max_ma=request.max_ma,
+            rail_limits=request.rail_limits,
+            created_at=datetime.utcnow(),
+            **rendered
+        )
+        last_record_id = await database.execute(query)
+        await response_cache.invalidate("components")
+        await electrical_profiles.invalidate()
+        await user_inventory.invalidate()
+        return {
+            **request.dict(),
+            **rendered,
+            "id": last_record_id,
+            "created_at": datetime.utcnow()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/components/{component_id}", response_model=ComponentResponse)
+async def get_component(component_id: int):
+    query = components.select().where(components.c.id == component_id)
+    result = await database.fetch_one(query)
+    if not result:
+        raise HTTPException(status_code=404, detail="Component not found")
+    return ORJSONResponse(dict(result))
+
+@router.put("/api/components/{component_id}", response_model=ComponentResponse)
+async def update_component(component_id: int, request: ComponentRequest):
+    query = components.update().where(components.c.id == component_id).values(
+        name=request.name,
+        description=request.description,
+        category=request.category,
+        wiring_guide=request.wiring_guide,
+        image_url=request.image_url,
+        supply_voltage=request.supply_voltage,
+        typical_ma=request.typical_ma,
+        max_ma=request.max_ma,
+        rail_limits=request.rail_limits,
+        **render_component(request.description, request.wiring_guide)
+    )
+    await database.execute(query)
+    await response_cache.invalidate("components")
+    await electrical_profiles.invalidate()
+    await user_inventory.invalidate()
+    
+    # Fetch updated record
+    fetch_query = components.select().where(components.c.id == component_id)
+    result = await database.fetch_one(fetch_query)
+    if not result:
+         raise HTTPException(status_code=404, detail="Component not found")
+    return ORJSONResponse(dict(result))
+
+@router.delete("/api/components/{component_id}")
+async def delete_component(component_id: int):
+    query = components.delete().where(components.c.id == component_id)
+    await database.execute(query)
+    await response_cache.invalidate("components")
+    await electrical_profiles.invalidate()
+    await user_inventory.invalidate()
+    return {"message": "Component deleted successfully"}
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from database import database, ai_courses
+from schemas import AICourseRequest, AICourseResponse
+from responses import ORJSONResponse, stream_rows
+from response_cache import response_cache, MAX_CACHED_ROWS
+from markdown_render import render_course
+
+router = APIRouter()
+
+def is_duplicate_week(e):
+    # Unique (course_type, week) index: asyncpg's UniqueViolationError, or SQLite in development
+    return getattr(e, "sqlstate", None) == "23505" or "UNIQUE constraint failed" in str(e)
+
+def duplicate_week(request):
+    return HTTPException(status_code=409, detail=f"Week {request.week} of {request.course_type} already exists")
+
+@router.get("/api/ai-courses", response_model=list[AICourseResponse])
+async def get_ai_courses(request: Request, type: Optional[str] = None):
+    cache_key = f"ai_courses:{type or ''}"
+    entry = response_cache.get(cache_key)
+    if entry is None:
+        generation = response_cache.generation
+        query = ai_courses.select().order_by(ai_courses.c.week)
+        if type:
+            query = query.where(ai_courses.c.course_type == type)
+        results = await database.fetch_all(query)
+        if len(results) > MAX_CACHED_ROWS:
+            return stream_rows(results)
+        entry = response_cache.put(cache_key, [dict(r) for r in results], generation)
+    return response_cache.respond(request, entry)
+
+@router.post("/api/ai-courses", response_model=AICourseResponse)
+async def create_ai_course(request: AICourseRequest):
+    try:
+        rendered = render_course(request.content)
+        query = ai_courses.insert().values(
+            title=request.title,
+            description=request.description,
+            week=request.week,
+            content=request.content,
+            image_url=request.image_url,
+            course_type=request.course_type,
+            created_at=datetime.utcnow(),
+            **rendered
+        )
+        last_record_id = await database.execute(query)
+        await response_cache.invalidate("ai_courses")
+        return {
+            **request.dict(),
+            **rendered,
+            "id": last_record_id,
+            "created_at": datetime.utcnow()
+        }
+    except Exception as e:
+        if is_duplicate_week(e):
+            raise duplicate_week(request)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/api/ai-courses/{course_id}", response_model=AICourseResponse)
+async def update_ai_course(course_id: int, request: AICourseRequest):
+    try:
+        query = ai_courses.update().where(ai_courses.c.id == course_id).values(
+            title=request.title,
+            description=request.description,
+            week=request.week,
+            content=request.content,
+            image_url=request.image_url,
+            course_type=request.course_type,
+            **render_course(request.content)
+        )
+        await database.execute(query)
+        await response_cache.invalidate("ai_courses")
+        
+        fetch_query = ai_courses.select().where(ai_courses.c.id == course_id)
+        result = await database.fetch_one(fetch_query)
+        if not result:
+             raise HTTPException(status_code=404, detail="Course module not found")
+        return ORJSONResponse(dict(result))
+    except HTTPException:
+        raise
+    except Exception as e:
+        if is_duplicate_week(e):
+            raise duplicate_week(request)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/api/ai-courses/{course_id}")
+async def delete_ai_course(course_id: int):
+    query = ai_courses.delete().where(ai_courses.c.id == course_id)
+    await database.execute(query)
+    await response_cache.invalidate("ai_courses")
+    return {"message": "Course module deleted successfully"}
@@ -0,0 +1,59 @@
+import time
+import hashlib
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+import sqlalchemy
+import metrics
+from database import database, gallery
+from netlist import part_key
+from response_cache import response_cache
+from compression import etag_matches
+from gallery import gallery_feed, PAGE_MAX
+
+router = APIRouter()
+
+@router.get("/api/gallery")
+async def get_gallery(
+    request: Request,
+    sort: str = Query("trending", pattern="^(trending|new)$"),
+    limit: int = Query(20, ge=1),
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+):
+    # PUBLIC GALLERY - ranked pages from memory; ?cursor=<next> for the next page
+    started = time.perf_counter()
+    limit = min(limit, PAGE_MAX)
+    tag = part_key(tag or "") or None
+    try:
+        entry = gallery_feed.page(sort, limit, cursor, tag)
+        if entry is None:
+            entry = await gallery_feed.fetch_page(sort, limit, cursor, tag)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    metrics.observe("gallery.page_ms", (time.perf_counter() - started) * 1000)
+    return response_cache.respond(request, entry)
+
+@router.get("/api/gallery/{circuit_id}/thumbnail.svg")
+async def get_thumbnail(circuit_id: str, request: Request):
+    svg = gallery_feed.thumbnail(circuit_id)
+    if svg is None:
+        row = await database.fetch_one(sqlalchemy.select(gallery.c.thumbnail).where(gallery.c.circuit_id == circuit_id))
+        if not row:
+            raise HTTPException(status_code=404, detail="Circuit not found")
+        svg = row["thumbnail"] or ""
+    headers = {"ETag": '"' + hashlib.sha1(svg.encode()).hexdigest() + '"', "Cache-Control": "public, max-age=300"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(svg, media_type="image/svg+xml", headers=headers)
+
+@router.post("/api/gallery/{circuit_id}/like")
+async def like_circuit(circuit_id: str):
+    # Counted in memory and written with the next trending flush
+    if circuit_id not in gallery_feed.items:
+        row = await database.fetch_one(sqlalchemy.select(gallery.c.circuit_id).where(gallery.c.circuit_id == circuit_id))
+        if not row:
+            raise HTTPException(status_code=404, detail="Circuit not found")
+    gallery_feed.record(circuit_id, "like")
+    return {"id": circuit_id, "message": "Liked"}
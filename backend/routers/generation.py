@@ -0,0 +1,269 @@
+import json
+import time
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, WebSocket, WebSocketDisconnect
+import metrics
+from database import database, circuits
+from prompts import get_prompt
+from model_router import complete_json, streaming
+from netlist import diagram_problems
+from electrical_profiles import electrical_profiles, power_warnings
+from inventory import user_inventory
+from prefetch import generation_sessions, attach
+from idempotency import idempotent
+from bom_engine import build_bom, merge, price_catalog
+from firmware_composer import compose, plan
+from diagram_patch import (
+    compact_diagram, normalize_patch, apply_patch, apply_code_edits, code_edit_problems,
+    describe_change, relabeled, removed_labels,
+)
+from schemas import (
+    CircuitRequest, CircuitResponse, CodeResponse, BOMResponse,
+    CircuitEditRequest, CircuitEditResponse,
+    ComponentGenRequest, ComponentGenResponse,
+)
+
+router = APIRouter()
+
+async def guarded(awaitable):
+    # Generation failures become 500s; HTTP errors (503 without a key) pass through
+    try:
+        return await awaitable
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def generate(route, messages, **options):
+    return await guarded(complete_json(route, messages, **options))
+
+@router.post("/api/generate-component-details", response_model=ComponentGenResponse)
+async def generate_component_details(request: ComponentGenRequest):
+    messages = get_prompt("component_details").messages(name=request.name, category=request.category)
+    return await generate("component_details", messages)
+
+async def generate_diagram(query, owned=None):
+    # The power budget runs on every diagram; it is pure Python over one pass of the wiring
+    messages = get_prompt("diagram").messages(query=query, owned=owned.prompt() if owned else "")
+    data = await generate("diagram", messages)
+    # The diagram is already paid for, so a failing check never costs the client it
+    try:
+        await electrical_profiles.ensure_loaded()
+    except Exception as e:
+        # Lookups fall back to the built-in profiles until a load succeeds
+        print(f"Electrical profile load failed: {e}")
+    started = time.perf_counter()
+    try:
+        warnings = power_warnings(data)
+    except Exception as e:
+        print(f"Power budget check failed: {e}")
+        metrics.incr("power_budget.errors")
+        return {**data, "warnings": []}
+    metrics.observe("power_budget.latency_ms", (time.perf_counter() - started) * 1000)
+    return {**data, "warnings": warnings}
+
+async def write_code(query, diagram):
+    # Library drivers plus LLM glue when the parts are known, full generation otherwise
+    composed = await compose(query, diagram)
+    if composed is not None:
+        return composed
+    return await complete_json("code", get_prompt("code").messages(query=query))
+
+async def code_for_diagram(query, diagram):
+    # Full generation only needs the query, so it starts alongside the diagram
+    # and is cancelled once the diagram turns out to be composable; either way
+    # the code is never a whole LLM round trip behind the diagram.
+    # shield: cancelling the code must not cancel the diagram
+    fallback = asyncio.create_task(complete_json("code", get_prompt("code").messages(query=query)))
+    fallback.add_done_callback(lambda task: task.cancelled() or task.exception())
+    try:
+        data = await asyncio.shield(diagram)
+        if plan(data) is None:
+            metrics.incr("firmware.not_composable")
+            return await fallback
+        fallback.cancel()
+        metrics.incr("firmware.fallback_cancelled")
+        return await compose(query, data)
+    finally:
+        fallback.cancel()
+
+async def bom_for_diagram(query, diagram, owned=None):
+    data = await asyncio.shield(diagram)
+    return await build_bom(query, data["nodes"], owned)
+
+@router.post("/api/generate", response_model=CircuitResponse)
+async def generate_circuit(request: CircuitRequest, idempotency_key: Optional[str] = Header(None)):
+    # A retried request with the same Idempotency-Key gets the first diagram back
+    return await idempotent(idempotency_key, "generate", request.model_dump(), lambda: start_generation(request.query, request.user_id))
+
+async def start_generation(query, user_id=None):
+    # Code and BOM are built from the diagram as soon as it arrives, before the
+    # client asks for them
+    owned = await user_inventory.owned(user_id)
+    diagram = asyncio.create_task(generate_diagram(query, owned))
+    generation_id = generation_sessions.start(query, {
+        "code": lambda: code_for_diagram(query, diagram),
+        "bom": lambda: bom_for_diagram(query, diagram, owned),
+    })
+    try:
+        data = await diagram
+    except Exception:
+        generation_sessions.cancel(generation_id)
+        raise
+    return {**data, "generation_id": generation_id}
+
+async def stream_generation(websocket, request_id, query, user_id=None):
+    # Sends diagram, code and BOM as each one is ready; cancelling this task
+    # cancels all three and with them the upstream LLM streams
+    owned = await user_inventory.owned(user_id)
+    diagram = asyncio.create_task(generate_diagram(query, owned))
+    parts = {
+        diagram: "diagram",
+        asyncio.create_task(code_for_diagram(query, diagram)): "code",
+        asyncio.create_task(bom_for_diagram(query, diagram, owned)): "bom",
+    }
+    pending = set(parts)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    data = task.result()
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    await send_event(websocket, {"type": "error", "id": request_id, "part": parts[task], "detail": detail})
+                    if task is diagram:
+                        return  # code and BOM need the diagram
+                    continue
+                await send_event(websocket, {"type": parts[task], "id": request_id, "data": data})
+        await send_event(websocket, {"type": "done", "id": request_id})
+    finally:
+        for task in parts:
+            task.cancel()
+
+async def send_event(websocket, message):
+    await websocket.send_text(json.dumps(message, default=str))
+
+@router.websocket("/api/ws/generate")
+async def generation_socket(websocket: WebSocket):
+    # Client messages:
+    #   {"type": "generate", "id": "<client request id>", "query": "...", "user_id": 1}
+    #   {"type": "cancel", "id": "<client request id>"}
+    # A new query cancels the one still running, and so does disconnecting.
+    await websocket.accept()
+    streaming.set(True)
+    running = {}
+
+    async def cancel(request_id):
+        task = running.pop(request_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+            metrics.incr("generation_socket.cancelled")
+            await send_event(websocket, {"type": "cancelled", "id": request_id})
+
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                kind, request_id = message.get("type"), message.get("id")
+            except (ValueError, AttributeError):
+                await send_event(websocket, {"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            if kind == "generate" and str(message.get("query") or "").strip():
+                for previous in list(running):
+                    await cancel(previous)
+                metrics.incr("generation_socket.requests")
+                user_id = message.get("user_id") if isinstance(message.get("user_id"), int) else None
+                running[request_id] = asyncio.create_task(stream_generation(websocket, request_id, message["query"], user_id))
+            elif kind == "cancel":
+                await cancel(request_id)
+            else:
+                await send_event(websocket, {"type": "error", "id": request_id, "detail": "Expected a generate or cancel message"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in running.values():
+            if not task.done():
+                task.cancel()
+                metrics.incr("generation_socket.cancelled")
+
+@router.post("/api/generate-code", response_model=CodeResponse)
+async def generate_code(request: CircuitRequest):
+    prefetched = await attach(request.generation_id, "code", request.query)
+    if prefetched is not None:
+        return prefetched
+    if request.nodes and request.connections:
+        diagram = {"nodes": request.nodes, "connections": request.connections}
+        return await guarded(write_code(request.query, diagram))
+    return await generate("code", get_prompt("code").messages(query=request.query))
+
+@router.post("/api/generate-bom", response_model=BOMResponse)
+async def generate_bom(request: CircuitRequest):
+    prefetched = await attach(request.generation_id, "bom", request.query)
+    if prefetched is not None:
+        return prefetched
+    if request.nodes:
+        return await build_bom(request.query, request.nodes, await user_inventory.owned(request.user_id))
+    return await generate("bom", get_prompt("bom").messages(query=request.query))
+
+async def edit_code(query, instruction, code, old, new, affected):
+    # Search/replace edits for the affected parts; full regeneration if they don't apply
+    if not code or not any(affected.values()):
+        return code
+    messages = get_prompt("code_edit").messages(query=query, change=describe_change(old, new, affected), code=code)
+    try:
+        data = await complete_json("code_edit", messages, check=lambda d: code_edit_problems(code, d["edits"]))
+        return apply_code_edits(code, data["edits"])
+    except ValueError as e:
+        print(f"Code edit fell back to regeneration: {e}")
+    data = await guarded(write_code(f"{query}; {instruction}", new))
+    return data["code"]
+
+async def edit_bom(query, items, old, new, affected):
+    # Only parts that were added or swapped are priced again
+    changed = relabeled(old, new, affected["updated"])
+    added_ids = set(affected["added"] + changed)
+    removed = removed_labels(old, affected["removed"] + changed)
+    added = []
+    if added_ids:
+        nodes = [n for n in new["nodes"] if n.get("id") in added_ids]
+        added = (await build_bom(query, nodes))["items"]
+    await price_catalog.ensure_loaded()
+    return merge(items, removed, added)
+
+@router.post("/api/circuit/{circuit_id}/edit", response_model=CircuitEditResponse)
+async def edit_circuit(circuit_id: str, request: CircuitEditRequest):
+    # The model returns a patch instead of a whole new diagram
+    result = await database.fetch_one(circuits.select().where(circuits.c.id == circuit_id))
+    if not result:
+        raise HTTPException(status_code=404, detail="Circuit not found")
+    diagram = request.diagram_data or result["diagram_data"]
+
+    messages = get_prompt("diagram_edit").messages(
+        diagram=json.dumps(compact_diagram(diagram), separators=(",", ":")),
+        instruction=request.instruction,
+    )
+    patch = await generate(
+        "diagram_edit", messages,
+        check=lambda p: diagram_problems(apply_patch(diagram, p)[0]),
+    )
+    try:
+        patch = normalize_patch(diagram, patch)
+        new_diagram, affected = apply_patch(diagram, patch)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    code, (bom, total) = await asyncio.gather(
+        edit_code(result["query"], request.instruction, result["code"] or "", diagram, new_diagram, affected),
+        edit_bom(result["query"], result["bom"] or [], diagram, new_diagram, affected),
+    )
+    return {
+        "query": f"{result['query']}; {request.instruction}",
+        "diagram_data": new_diagram,
+        "patch": patch,
+        "affected": affected,
+        "code": code,
+        "bom": bom,
+        "total_estimated_cost": total,
+    }
@@ -0,0 +1,47 @@
+from datetime import datetime
+from fastapi import APIRouter, HTTPException
+from database import database, users, inventory
+from schemas import InventoryRequest, InventoryResponse
+from inventory import user_inventory
+
+router = APIRouter()
+
+@router.post("/api/users", status_code=201)
+async def create_user():
+    # Anonymous user until sign-in exists; the frontend keeps the id and sends
+    # it with generation requests
+    user_id = await database.execute(users.insert().values(created_at=datetime.utcnow()))
+    return {"id": user_id}
+
+async def require_user(user_id):
+    if not await database.fetch_one(users.select().where(users.c.id == user_id)):
+        raise HTTPException(status_code=404, detail="User not found")
+
+@router.get("/api/users/{user_id}/inventory", response_model=InventoryResponse)
+async def get_inventory(user_id: int):
+    await require_user(user_id)
+    owned = await user_inventory.owned(user_id)
+    return {"items": owned.items()}
+
+@router.put("/api/users/{user_id}/inventory", response_model=InventoryResponse)
+async def replace_inventory(user_id: int, request: InventoryRequest):
+    # The whole inventory at once; repeated names add up, zero quantities are dropped
+    await require_user(user_id)
+    rows = {}
+    for item in request.items:
+        name = item.component.strip()
+        if not name or item.quantity <= 0:
+            continue
+        row = rows.setdefault(name, {"user_id": user_id, "component": name, "quantity": 0, "category": None})
+        row["quantity"] += item.quantity
+        row["category"] = item.category or row["category"]
+    now = datetime.utcnow()
+    try:
+        async with database.transaction():
+            await database.execute(inventory.delete().where(inventory.c.user_id == user_id))
+            if rows:
+                await database.execute_many(inventory.insert(), [{**row, "updated_at": now} for row in rows.values()])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    await user_inventory.invalidate(user_id)
+    return await get_inventory(user_id)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+import metrics
+import model_router
+from routers.admin import require_admin
+
+router = APIRouter()
+
+@router.get("/api/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics():
+    # Per-worker numbers; each uvicorn worker reports its own
+    return {"llm_routes": model_router.report(), **metrics.snapshot()}
@@ -0,0 +1,22 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from search_index import search, SEARCH_TYPES, SEARCH_MAX_LIMIT, SEARCH_MAX_OFFSET
+
+router = APIRouter()
+
+@router.get("/api/search")
+async def search_catalog(
+    q: str = Query(..., min_length=2),
+    type: Optional[str] = None,
+    limit: int = Query(20, ge=1),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+):
+    # Ranked full-text + fuzzy search over circuits, components and courses
+    if type and type not in SEARCH_TYPES:
+        raise HTTPException(status_code=400, detail=f"type must be one of {', '.join(SEARCH_TYPES)}")
+    limit = min(limit, SEARCH_MAX_LIMIT)
+    try:
+        results = await search(q, (type,) if type else SEARCH_TYPES, limit, offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"query": q, "limit": limit, "offset": offset, "results": results}
@@ -0,0 +1,110 @@
+import json
+import asyncio
+import time
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+import metrics
+from database import database, circuits
+
+router = APIRouter()
+
+# Frames are coalesced: inputs arriving faster than this are merged and solved once
+MIN_FRAME_SECONDS = 1 / 60
+
+async def send_event(websocket, message):
+    await websocket.send_text(json.dumps(message))
+
+def merge_inputs(inputs, message):
+    # {"pins": {"mcu": {"D9": 1}}, "switches": {"btn": true}, "sensors": {"pir": true}}
+    for node_id, levels in (message.get("pins") or {}).items():
+        if isinstance(levels, dict):
+            inputs["pins"].setdefault(node_id, {}).update(levels)
+    for key in ("switches", "sensors"):
+        if isinstance(message.get(key), dict):
+            inputs[key].update(message[key])
+
+def snapshot(inputs):
+    # The solve runs in a thread while new inputs keep arriving
+    return {"pins": {k: dict(v) for k, v in inputs["pins"].items()}, "switches": dict(inputs["switches"]), "sensors": dict(inputs["sensors"])}
+
+async def load_diagram(message):
+    if message.get("circuit_id"):
+        result = await database.fetch_one(circuits.select().where(circuits.c.id == message["circuit_id"]))
+        if not result:
+            raise ValueError("Circuit not found")
+        return result["diagram_data"] or {}
+    if isinstance(message.get("diagram"), dict):
+        return message["diagram"]
+    raise ValueError("Expected a circuit_id or a diagram")
+
+@router.websocket("/api/ws/simulate")
+async def simulation_socket(websocket: WebSocket):
+    # The client loads a diagram, then sends input changes (pin levels, button
+    # presses, sensor triggers); each frame sends only the elements, pins and
+    # rails whose state changed
+    import simulation  # SciPy is loaded by the first simulation, not at startup
+
+    await websocket.accept()
+    metrics.incr("simulation_socket.sessions")
+    circuit, inputs, previous = None, None, None
+    changed = asyncio.Event()
+
+    async def frames():
+        # One solve per burst of inputs, at most one frame per MIN_FRAME_SECONDS
+        nonlocal previous
+        frame = 0
+        while True:
+            await changed.wait()
+            changed.clear()
+            started = time.monotonic()
+            try:
+                state = await run_in_threadpool(circuit.solve, snapshot(inputs))
+            except Exception as e:
+                # Without a sender the session would go quiet; end it instead
+                metrics.incr("simulation_socket.solver_errors")
+                await send_event(websocket, {"type": "error", "detail": f"Simulation failed: {e}"})
+                await websocket.close(code=1011)
+                return
+            metrics.observe("simulation.frame", state["solve_ms"])
+            diff = simulation.changes(previous, state)
+            previous = state
+            frame += 1
+            await send_event(websocket, {"type": "update", "frame": frame, **diff})
+            await asyncio.sleep(max(0.0, MIN_FRAME_SECONDS - (time.monotonic() - started)))
+
+    sender = None
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                kind = message.get("type")
+            except (ValueError, AttributeError):
+                await send_event(websocket, {"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            if kind == "load":
+                if sender is not None:
+                    sender.cancel()
+                    sender = None
+                try:
+                    diagram = await load_diagram(message)
+                    circuit = await run_in_threadpool(simulation.Circuit, diagram)
+                    changed.clear()
+                    inputs = {"pins": {}, "switches": {}, "sensors": {}}
+                    merge_inputs(inputs, message)
+                    previous = await run_in_threadpool(circuit.solve, snapshot(inputs))
+                except Exception as e:
+                    circuit = None
+                    await send_event(websocket, {"type": "error", "detail": str(e)})
+                    continue
+                await send_event(websocket, {"type": "state", "frame": 0, **previous})
+                sender = asyncio.create_task(frames())
+            elif kind == "input" and circuit is not None:
+                merge_inputs(inputs, message)
+                changed.set()
+            else:
+                await send_event(websocket, {"type": "error", "detail": "Expected a load message, then input messages"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if sender is not None:
+            sender.cancel()
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from services import get_storage
+
+router = APIRouter()
+
+@router.post("/api/upload")
+async def upload_image(file: UploadFile = File(...)):
+    try:
+        # Upload the file to Cloudinary
+        result = get_storage().upload(file.file, folder="robotics_components")
+        return {"url": result.get("secure_url")}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image upload failed: {str(e)}")
@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import Optional, List, Union
+from pydantic import BaseModel
+
+class ComponentRequest(BaseModel):
+    name: str
+    description: str
+    category: str
+    wiring_guide: Optional[str] = None
+    image_url: Optional[Union[str, List[str]]] = None
+    supply_voltage: Optional[float] = None
+    typical_ma: Optional[float] = None
+    max_ma: Optional[float] = None
+    rail_limits: Optional[dict] = None
+
+class ComponentResponse(BaseModel):
+    id: int
+    name: str
+    description: str
+    category: str
+    wiring_guide: Optional[str] = None
+    image_url: Optional[Union[str, List[str]]] = None
+    created_at: datetime
+    description_html: Optional[str] = None
+    description_toc: Optional[list] = None
+    wiring_guide_html: Optional[str] = None
+    content_hash: Optional[str] = None
+    supply_voltage: Optional[float] = None
+    typical_ma: Optional[float] = None
+    max_ma: Optional[float] = None
+    rail_limits: Optional[dict] = None
+
+class AICourseRequest(BaseModel):
+    title: str
+    description: Optional[str] = None
+    week: Optional[int] = None
+    content: Optional[str] = None
+    image_url: Optional[Union[str, List[str]]] = None
+    course_type: Optional[str] = "python_master"
+
+class AICourseResponse(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    week: Optional[int] = None
+    content: Optional[str] = None
+    image_url: Optional[Union[str, List[str]]] = None
+    course_type: Optional[str] = "python_master"
+    created_at: datetime
+    content_html: Optional[str] = None
+    content_toc: Optional[list] = None
+    content_hash: Optional[str] = None
+
+class CircuitRequest(BaseModel):
+    query: str
+    # Set on code/BOM requests to reuse work started by /api/generate
+    generation_id: Optional[str] = None
+    # Diagram nodes and connections; BOM quantities and catalog prices are
+    # resolved from the nodes, firmware pin assignments from the connections
+    nodes: Optional[list] = None
+    connections: Optional[list] = None
+    # Generation prefers the parts this user owns, and the BOM prices them at $0
+    user_id: Optional[int] = None
+
+class SaveRequest(BaseModel):
+    query: str
+    diagram_data: dict
+    code: str = ""
+    bom: list = []
+
+class CircuitResponse(BaseModel):
+    nodes: list
+    connections: list
+    explanation: str
+    generation_id: Optional[str] = None
+    # Power budget problems (electrical_profiles.power_budget)
+    warnings: list = []
+
+class CodeResponse(BaseModel):
+    code: str
+    explanation: str
+
+class BOMResponse(BaseModel):
+    items: list
+    total_estimated_cost: str
+    # Exact decimal total in USD, e.g. "28.45"
+    total_cost: Optional[str] = None
+    notes: Optional[str] = None
+    # Owned parts of the same category that could replace parts to buy
+    substitutions: list = []
+
+class DiagramPatch(BaseModel):
+    remove_nodes: List[str] = []
+    add_nodes: List[dict] = []
+    update_nodes: List[dict] = []
+    remove_connections: List[str] = []
+    add_connections: List[dict] = []
+    explanation: Optional[str] = None
+
+class CodeEdits(BaseModel):
+    edits: List[dict]
+    explanation: Optional[str] = None
+
+class CodeGlue(BaseModel):
+    globals: str = ""
+    setup: str = ""
+    loop: str
+    explanation: Optional[str] = None
+
+class ExportRequest(BaseModel):
+    diagram_data: dict
+
+class CircuitEditRequest(BaseModel):
+    instruction: str
+    # Unsaved diagram from the editor; defaults to the saved one
+    diagram_data: Optional[dict] = None
+
+class CircuitEditResponse(BaseModel):
+    query: str
+    diagram_data: dict
+    patch: DiagramPatch
+    affected: dict
+    code: str
+    bom: list
+    total_estimated_cost: Optional[str] = None
+
+class ComponentGenRequest(BaseModel):
+    name: str
+    category: str
+
+class ComponentGenResponse(BaseModel):
+    description: str
+    wiring_guide: str
+
+class InventoryItem(BaseModel):
+    component: str
+    quantity: int = 1
+    category: Optional[str] = None
+
+class InventoryRequest(BaseModel):
+    items: List[InventoryItem]
+
+class InventoryResponse(BaseModel):
+    items: List[InventoryItem]
+
+class PasswordVerifyRequest(BaseModel):
+    password: str
@@ -0,0 +1,118 @@
+import html
+from database import database, SCHEMA_UPGRADES
+
+# Full-text (tsvector + GIN) and fuzzy (pg_trgm) search over saved circuits,
+# components and course modules. The tsvector columns are generated by Postgres,
+# so every write path keeps them current without application code.
+
+SEARCH_TYPES = ("circuits", "components", "courses")
+SEARCH_MAX_LIMIT = 50
+# Deepest result reachable by paging; each type ranks offset + limit rows
+SEARCH_MAX_OFFSET = 500
+
+# ts_headline does not escape HTML, so we mark hits with private characters,
+# escape the snippet ourselves and only then turn the markers into <mark> tags.
+_START, _STOP = "⟦", "⟧"
+_HEADLINE_OPTIONS = f"StartSel={_START}, StopSel={_STOP}, MaxWords=30, MinWords=10, MaxFragments=2"
+
+SCHEMA_UPGRADES.extend([
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # circuits
+    """ALTER TABLE circuits ADD COLUMN IF NOT EXISTS search_vector tsvector
+       GENERATED ALWAYS AS (to_tsvector('english', coalesce(query, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS circuits_search_idx ON circuits USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS circuits_query_trgm_idx ON circuits USING GIN (query gin_trgm_ops)",
+    # components
+    """ALTER TABLE components ADD COLUMN IF NOT EXISTS search_vector tsvector
+       GENERATED ALWAYS AS (
+           setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(description, '')), 'B')
+       ) STORED""",
+    "CREATE INDEX IF NOT EXISTS components_search_idx ON components USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS components_name_trgm_idx ON components USING GIN (name gin_trgm_ops)",
+    # ai_courses
+    """ALTER TABLE ai_courses ADD COLUMN IF NOT EXISTS search_vector tsvector
+       GENERATED ALWAYS AS (
+           setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+           setweight(to_tsvector('english', coalesce(content, '')), 'C')
+       ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ai_courses_search_idx ON ai_courses USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ai_courses_title_trgm_idx ON ai_courses USING GIN (title gin_trgm_ops)",
+])
+
+# The inner query ranks and pages using only the indexed columns; ts_headline is
+# expensive, so it runs in the outer query over the page rows alone.
+_QUERIES = {
+    "circuits": f"""
+        WITH hits AS (
+            SELECT c.id, c.query, c.created_at,
+                   ts_rank(c.search_vector, q) + similarity(c.query, :term) AS rank
+            FROM circuits c, websearch_to_tsquery('english', :term) q
+            WHERE c.search_vector @@ q OR c.query % :term
+            ORDER BY rank DESC, c.created_at DESC
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT 'circuits' AS type, id::text AS id, query AS title, created_at, rank,
+               ts_headline('english', query, websearch_to_tsquery('english', :term), '{_HEADLINE_OPTIONS}') AS snippet
+        FROM hits ORDER BY rank DESC, created_at DESC
+    """,
+    "components": f"""
+        WITH hits AS (
+            SELECT c.id, c.name, c.description, c.created_at,
+                   ts_rank(c.search_vector, q) + similarity(c.name, :term) AS rank
+            FROM components c, websearch_to_tsquery('english', :term) q
+            WHERE c.search_vector @@ q OR c.name % :term
+            ORDER BY rank DESC, c.name
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT 'components' AS type, id::text AS id, name AS title, created_at, rank,
+               ts_headline('english', description, websearch_to_tsquery('english', :term), '{_HEADLINE_OPTIONS}') AS snippet
+        FROM hits ORDER BY rank DESC, title
+    """,
+    "courses": f"""
+        WITH hits AS (
+            SELECT c.id, c.title, c.description, c.content, c.created_at,
+                   ts_rank(c.search_vector, q) + similarity(c.title, :term) AS rank
+            FROM ai_courses c, websearch_to_tsquery('english', :term) q
+            WHERE c.search_vector @@ q OR c.title % :term
+            ORDER BY rank DESC, c.week
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT 'courses' AS type, id::text AS id, title, created_at, rank,
+               ts_headline('english', coalesce(description, '') || ' ' || coalesce(content, ''),
+                           websearch_to_tsquery('english', :term), '{_HEADLINE_OPTIONS}') AS snippet
+        FROM hits ORDER BY rank DESC, title
+    """,
+}
+
+
+def _highlight(snippet):
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+async def search(term, types=SEARCH_TYPES, limit=20, offset=0):
+    # Each type returns its own top (offset + limit); merging those and slicing
+    # gives the same page as a single ranked query over all three tables.
+    window = offset + limit if len(types) > 1 else limit
+    start = offset if len(types) > 1 else 0
+    results = []
+    for search_type in types:
+        rows = await database.fetch_all(
+            query=_QUERIES[search_type],
+            values={"term": term, "limit": window, "offset": offset - start},
+        )
+        results.extend(
+            {
+                "type": r["type"],
+                "id": r["id"],
+                "title": r["title"],
+                "snippet": _highlight(r["snippet"]),
+                "rank": float(r["rank"]),
+                "created_at": r["created_at"],
+            }
+            for r in rows
+        )
+    results.sort(key=lambda r: r["rank"], reverse=True)
+    return results[start:start + limit]
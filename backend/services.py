@@ -0,0 +1,68 @@
+import os
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+# Lazily initialized service clients.
+# The OpenAI and Cloudinary SDKs are only imported the first time a route needs
+# them, so workers start fast and routes that don't generate anything keep
+# working without LLM or storage credentials.
+
+load_dotenv()
+
+_llm_clients = {}
+_storage = None
+_engine = None
+
+
+def model_name():
+    return os.getenv("OPENAI_MODEL", "gpt-4o")
+
+
+def fast_model_name():
+    return os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini")
+
+
+def get_llm_client(backend="openai"):
+    # "openai" is the OpenAI API; "local" is any OpenAI-compatible server
+    # (vLLM, Ollama, llama.cpp) at LOCAL_LLM_BASE_URL.
+    if backend not in _llm_clients:
+        from openai import AsyncOpenAI
+
+        if backend == "local":
+            base_url = os.getenv("LOCAL_LLM_BASE_URL")
+            if not base_url:
+                raise HTTPException(status_code=503, detail="Local model requested but LOCAL_LLM_BASE_URL is not set")
+            _llm_clients[backend] = AsyncOpenAI(base_url=base_url, api_key=os.getenv("LOCAL_LLM_API_KEY", "local"))
+        else:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise HTTPException(status_code=503, detail="Generation is unavailable: no OPENAI_API_KEY configured")
+            _llm_clients[backend] = AsyncOpenAI(api_key=api_key, base_url=os.getenv("OPENAI_BASE_URL") or None)
+    return _llm_clients[backend]
+
+
+def get_storage():
+    # Returns the configured cloudinary.uploader module
+    global _storage
+    if _storage is None:
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+        )
+        _storage = cloudinary.uploader
+    return _storage
+
+
+def get_engine():
+    # Synchronous engine for DDL (create_all, schema upgrades)
+    global _engine
+    if _engine is None:
+        import sqlalchemy
+        from database import database
+
+        _engine = sqlalchemy.create_engine(str(database.url))
+    return _engine
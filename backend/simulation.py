@@ -0,0 +1,555 @@
+import re
+import time
+import numpy as np
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import spsolve
+from netlist import part_key, pin_nets, is_ground, pin_volts, label_volts, kind_of, two_terminals, supply_pin
+
+# Steady-state DC simulation of a saved diagram ({"nodes", "connections"}).
+# Wires are merged into nets (netlist.pin_nets) and every part becomes a few
+# linear elements between nets: rail pins and batteries are voltage sources,
+# GPIO outputs are sources behind their output resistance, modules are loads
+# between VCC and ground, LEDs are piecewise-linear diodes. Modified nodal
+# analysis turns that into one sparse system whose unknowns are the net
+# voltages plus the current of each voltage source, i.e. the draw per rail.
+# LEDs, driver outputs and relays depend on the solution, so the system is
+# solved again until their states settle (a handful of sparse solves).
+#
+# The firmware is not executed: the caller says which controller pins drive
+# HIGH or LOW, which buttons are pressed and which sensors are triggered, and
+# gets back logic levels, rail currents and LED/motor states for that input.
+#
+# Assumptions, as generated diagrams rarely draw every return wire: all pins
+# named GND (and battery negatives) share one ground, and the negative pin of
+# an LED, buzzer or motor left unwired goes to ground.
+
+GMIN = 1e-9  # leak from every net to ground, keeps floating nets solvable
+GPIO_OHMS = 25.0
+PULLUP_OHMS = 35e3
+INPUT_OHMS = 100e3  # logic inputs of modules
+SENSOR_OUTPUT_OHMS = 1e3
+DRIVER_OHMS = 1.5
+SWITCH_OHMS = 0.05
+LED_ON_OHMS = 10.0
+LED_OFF_SIEMENS = 1e-9
+MOTOR_OHMS = 10.0
+BUZZER_OHMS = 170.0
+RELAY_COIL_MA = 70.0
+DEFAULT_RESISTOR_OHMS = 220.0
+DEFAULT_SUPPLY_VOLTS = 9.0
+DEFAULT_MODULE_MA = 10.0
+LOGIC_HIGH_VOLTS = 2.0  # TTL-style input threshold of drivers and relays
+LED_FULL_MA = 20.0
+RUNNING_MA = 20.0
+MAX_ITERATIONS = 12
+
+# Idle draw of common modules at their supply voltage
+MODULE_MA = {
+    "hc sr04": 15.0,
+    "dht11": 2.5,
+    "dht22": 2.5,
+    "pir": 0.1,
+    "sg90": 10.0,
+    "servo": 10.0,
+    "l298n": 36.0,
+    "l293d": 24.0,
+    "oled": 20.0,
+    "lcd": 3.0,
+    "bmp280": 0.7,
+    "mpu6050": 3.9,
+    "relay": 5.0,
+}
+
+LED_VOLTS = {"red": 2.0, "yellow": 2.1, "orange": 2.1, "green": 2.2, "blue": 3.0, "white": 3.0}
+DEFAULT_LED_VOLTS = 2.0
+LOW_VOLTAGE_BOARDS = ("esp32", "esp8266", "raspberry", "pi", "pico", "stm32", "nodemcu", "3 3v", "3v3")
+
+SIGNAL_PINS = {"SIG", "PWM", "S", "IN"}
+OUTPUT_PINS = {"out", "echo", "data", "do", "ao", "dout", "int", "irq"}
+
+
+def resistor_ohms(label):
+    # "220Ω Resistor", "10k resistor", "4.7 kOhm" -> ohms
+    for match in re.finditer(r"(\d+(?:\.\d+)?)\s*([kKM])?\s*(Ω|ohms?|R\b)?", str(label)):
+        if match.group(2) or match.group(3):
+            return float(match.group(1)) * {"k": 1e3, "K": 1e3, "M": 1e6}.get(match.group(2), 1.0)
+    return DEFAULT_RESISTOR_OHMS
+
+
+def logic_volts(node):
+    label = part_key(node.get("label") or "")
+    return 3.3 if any(re.search(rf"\b{b}\b", label) for b in LOW_VOLTAGE_BOARDS) else 5.0
+
+
+def module_ma(node):
+    key = part_key(node.get("label") or "")
+    return next((ma for name, ma in MODULE_MA.items() if re.search(rf"\b{name}\b", key)), DEFAULT_MODULE_MA)
+
+
+class Circuit:
+    # A diagram compiled for repeated solves; solve(inputs) is one frame
+
+    def __init__(self, diagram):
+        self.nodes = [n for n in diagram.get("nodes") or [] if isinstance(n, dict) and n.get("id")]
+        self.kinds = {n["id"]: kind_of(n) for n in self.nodes}
+        self.assumptions = []
+        self.problems = []
+
+        self.wired = wired = set()
+        for c in diagram.get("connections") or []:
+            if isinstance(c, dict):
+                wired.add((c.get("from"), c.get("fromPin")))
+                wired.add((c.get("to"), c.get("toPin")))
+
+        # Everything that sits on the common ground
+        ground_pins = []
+        for node in self.nodes:
+            kind = self.kinds[node["id"]]
+            for pin in node.get("pins") or []:
+                if is_ground(pin):
+                    ground_pins.append((node["id"], pin))
+            if kind == "supply":
+                negative = two_terminals(node)[1]
+                if negative is not None:
+                    ground_pins.append((node["id"], negative))
+            elif kind in ("led", "buzzer", "motor"):
+                negative = two_terminals(node)[1]
+                if negative is not None and (node["id"], negative) not in wired and not is_ground(negative):
+                    ground_pins.append((node["id"], negative))
+                    self.assumptions.append(f"{node.get('label') or node['id']} {negative} is not wired; assumed to go to ground")
+
+        # Pins of one board with the same name are the same net (two GND or 5V pins)
+        same_name = {}
+        for node in self.nodes:
+            for pin in node.get("pins") or []:
+                same_name.setdefault((node["id"], str(pin).upper()), []).append((node["id"], pin))
+        self.nets, count = pin_nets(diagram, tied=[ground_pins] + list(same_name.values()))
+
+        # Unknowns are the non-ground nets (ground maps to -1); without any
+        # ground pin the reference is an extra net nothing connects to
+        if ground_pins:
+            self.ground = self.nets[ground_pins[0]]
+        else:
+            self.ground, count = count, count + 1
+        order = np.full(count, -1, dtype=np.intp)
+        others = [net for net in range(count) if net != self.ground]
+        order[others] = np.arange(len(others))
+        self.unknown = order
+        self.size = len(others)
+
+        self.edges = []  # static conductances (a, b, siemens)
+        self.sources = []  # ideal voltage sources (net, volts, node id, pin)
+        self.gpio = []  # (node id, pin, net, logic volts)
+        self.leds = []  # (node id, anode net, cathode net, forward volts)
+        self.loads = []  # (node id, kind, a net, b net, ohms): motors, buzzers, resistors
+        self.buttons = []  # (node id, a net, b net)
+        self.sensors = []  # (node id, output net, supply net)
+        self.drivers = []  # (node id, [(output pin, output net, input net, enable net or None)], supply net)
+        self.relays = []  # (node id, input net, coil net, com, no, nc)
+        self.modules = []  # (node id, kind, (supply net, nominal volts) or None, input nets)
+        self.controllers = []  # (node id, logic volts)
+        self.attached = np.zeros(count, dtype=np.intp)  # element terminals per net, to spot floating inputs
+        self.switched = {}  # net -> buttons on it, which only attach it while pressed
+
+        for node in self.nodes:
+            getattr(self, f"_add_{self.kinds[node['id']]}", self._add_module)(node)
+
+        self.sources = self._check_sources(self.sources)
+        for source in self.sources:
+            self.attached[source[0]] += 1
+        self._vectorize()
+        self.attached = self.attached.tolist()
+
+    def net(self, node_id, pin):
+        return self.nets.get((node_id, pin))
+
+    def _edge(self, a, b, siemens):
+        self.edges.append((a, b, siemens))
+        self.attached[[a, b]] += 1
+
+    def _add_controller(self, node):
+        volts = logic_volts(node)
+        self.controllers.append((node["id"], volts))
+        for pin in node.get("pins") or []:
+            net = self.net(node["id"], pin)
+            rail = pin_volts(pin)
+            if is_ground(pin) or str(pin).upper() in ("VIN", "AREF", "RESET", "RST", "EN"):
+                continue
+            if rail is not None:
+                self.sources.append((net, rail, node["id"], pin))
+            else:
+                self.gpio.append((node["id"], pin, net, volts))
+
+    def _add_supply(self, node):
+        positive, _ = two_terminals(node)
+        if positive is not None:
+            self.sources.append((self.net(node["id"], positive), label_volts(node.get("label"), DEFAULT_SUPPLY_VOLTS), node["id"], positive))
+
+    def _add_led(self, node):
+        anode, cathode = two_terminals(node)
+        key = part_key(node.get("label") or "")
+        volts = next((v for color, v in LED_VOLTS.items() if color in key.split()), DEFAULT_LED_VOLTS)
+        a, b = self.net(node["id"], anode), self.net(node["id"], cathode)
+        if a is not None and b is not None:
+            self.leds.append((node["id"], a, b, volts))
+            self.attached[[a, b]] += 1
+
+    def _add_resistor(self, node):
+        self._add_load(node, resistor_ohms(node.get("label")))
+
+    def _add_motor(self, node):
+        self._add_load(node, MOTOR_OHMS)
+
+    def _add_buzzer(self, node):
+        self._add_load(node, BUZZER_OHMS)
+
+    def _add_load(self, node, ohms):
+        positive, negative = two_terminals(node)
+        a, b = self.net(node["id"], positive), self.net(node["id"], negative)
+        if a is not None and b is not None:
+            self.loads.append((node["id"], self.kinds[node["id"]], a, b, ohms))
+            self._edge(a, b, 1.0 / ohms)
+
+    def _add_button(self, node):
+        a, b = (self.net(node["id"], p) for p in two_terminals(node))
+        if a is not None and b is not None:
+            self.buttons.append((node["id"], a, b))
+            for net in (a, b):
+                self.switched.setdefault(net, []).append(node["id"])
+
+    def _module_supply(self, node, pins):
+        # Idle load from the power pin to ground; (supply net, nominal volts) or None without a power pin
+        power = supply_pin(pins)
+        if power is None:
+            return None
+        volts = pin_volts(power) or label_volts(node.get("label"), 5.0)
+        net = self.net(node["id"], power)
+        self._edge(net, self.ground, module_ma(node) / 1000.0 / volts)
+        return net, volts
+
+    def _inputs(self, node, pins):
+        nets = {}
+        for pin in pins:
+            net = self.net(node["id"], pin)
+            self._edge(net, self.ground, 1.0 / INPUT_OHMS)
+            nets[pin] = net
+        return nets
+
+    def _add_driver(self, node):
+        pins = [str(p) for p in node.get("pins") or []]
+        upper = {p.upper(): p for p in pins}
+        # Motor supply: 12V/VS/VM before a logic VCC
+        motor = next((p for p in pins if p.upper() in ("12V", "VS", "VM", "VMOT")), None) or supply_pin(pins)
+        supply = self._module_supply(node, [motor] if motor else pins)
+        inputs = self._inputs(node, [p for p in pins if re.fullmatch(r"(IN|EN)[A-Z0-9]*", p.upper())])
+        # An enable pin left unwired keeps its jumper, i.e. the channel is on
+        enables = {
+            "1": next((upper[p] for p in ("ENA", "EN1", "EN12") if p in upper and (node["id"], upper[p]) in self.wired), None),
+            "3": next((upper[p] for p in ("ENB", "EN2", "EN34") if p in upper and (node["id"], upper[p]) in self.wired), None),
+        }
+        enables["2"], enables["4"] = enables["1"], enables["3"]
+        channels = []
+        for n in "1234":
+            if f"IN{n}" in upper:
+                # Outputs may be drawn or not; a driver without them still reports levels
+                output = upper.get(f"OUT{n}")
+                output_net = self.net(node["id"], output) if output else None
+                if output_net is not None:
+                    self.attached[output_net] += 1
+                enable = enables[n]
+                channels.append((f"OUT{n}", output_net, inputs[upper[f"IN{n}"]], inputs.get(enable) if enable else None))
+        self.drivers.append((node["id"], channels, supply[0] if supply else None))
+        self.modules.append((node["id"], "driver", supply, inputs))
+
+    def _add_relay(self, node):
+        pins = [str(p) for p in node.get("pins") or []]
+        upper = {p.upper(): p for p in pins}
+        supply = self._module_supply(node, pins)
+        control = upper.get("IN") or upper.get("SIG") or upper.get("S")
+        inputs = self._inputs(node, [control] if control else [])
+        contacts = [self.net(node["id"], upper[c]) if c in upper else None for c in ("COM", "NO", "NC")]
+        self.relays.append((node["id"], inputs.get(control), supply[0] if supply else None, *contacts))
+        self.modules.append((node["id"], "relay", supply, inputs))
+
+    def _add_module(self, node):
+        pins = [str(p) for p in node.get("pins") or []]
+        power = supply_pin(pins)
+        supply = self._module_supply(node, pins)
+        outputs = [p for p in pins if p.lower() in OUTPUT_PINS]
+        inputs = self._inputs(node, [p for p in pins if p not in outputs and p != power and not is_ground(p)])
+        for pin in outputs:
+            net = self.net(node["id"], pin)
+            self.sensors.append((node["id"], net, supply[0] if supply else None))
+            self.attached[net] += 1
+        self.modules.append((node["id"], self.kinds[node["id"]], supply, inputs))
+
+    _add_servo = _add_module
+
+    def _check_sources(self, sources):
+        # Two ideal sources on one net (or one shorted to ground) make the
+        # system singular; keep the first and report the rest
+        kept, seen = [], {}
+        for net, volts, node_id, pin in sources:
+            if net is None:
+                continue
+            if self.unknown[net] < 0:
+                self.problems.append(f"{node_id} {pin} is shorted to ground")
+            elif net in seen:
+                self.problems.append(f"{node_id} {pin} is tied to {seen[net]}")
+            else:
+                seen[net] = f"{node_id} {pin}"
+                kept.append((net, volts, node_id, pin))
+        return kept
+
+    def _vectorize(self):
+        # Element tables as index arrays, so each iteration stamps them in bulk
+        self._static = self._stamp_edges(*columns(self.edges, 3))
+        self.led_a, self.led_b, self.led_volts = columns([(a, b, v) for _, a, b, v in self.leds], 3)
+        self.channel_out, self.channel_in, self.channel_enable, self.channel_supply = columns([
+            (output_net, input_net, -1 if enable_net is None else enable_net, supply)
+            for _, channels, supply in self.drivers if supply is not None
+            for _, output_net, input_net, enable_net in channels if output_net is not None
+        ], 4)
+        self.relay_in, self.relay_coil, self.relay_com, self.relay_no, self.relay_nc = columns([
+            tuple(-1 if net is None else net for net in relay[1:]) for relay in self.relays
+        ], 5)
+        logic_nets = {input_net for _, channels, _ in self.drivers for _, _, input_net, _ in channels}
+        logic_nets |= {enable_net for _, channels, _ in self.drivers for _, _, _, enable_net in channels}
+        logic_nets |= {relay[1] for relay in self.relays}
+        self.logic_nets = np.array(sorted(net for net in logic_nets if net is not None), dtype=np.intp)
+        at = self.unknown[np.array([net for net, _, _, _ in self.sources], dtype=np.intp)]
+        k = self.size + np.arange(len(self.sources))
+        self._sources = (np.concatenate([at, k]), np.concatenate([k, at]), np.ones(2 * len(at)))
+        self._source_volts = np.array([volts for _, volts, _, _ in self.sources], dtype=float)
+        self._gmin = (np.arange(self.size), np.arange(self.size), np.full(self.size, GMIN))
+        # Diode and logic states of the last frame: the next one usually keeps most of them
+        self._settled = (np.ones(len(self.leds), dtype=bool), np.zeros(len(self.unknown), dtype=bool))
+
+    def _stamp_edges(self, a, b, g):
+        # Conductance stamps as COO triplets over unknown indices
+        a, b = self.unknown[a], self.unknown[b]
+        rows = np.concatenate([a, b, a, b])
+        cols = np.concatenate([a, b, b, a])
+        vals = np.concatenate([g, g, -g, -g])
+        keep = (rows >= 0) & (cols >= 0)
+        return rows[keep], cols[keep], vals[keep]
+
+    def _solve_once(self, a, b, g, injected):
+        # a, b, g: dynamic edges; injected: amps into each net
+        n, m = self.size, len(self.sources)
+        if not n + m:
+            return np.zeros(len(self.unknown)), np.zeros(0)
+        rows, cols, vals = (np.concatenate(parts) for parts in zip(self._static, self._stamp_edges(a, b, g), self._gmin, self._sources))
+        matrix = csc_matrix((vals, (rows, cols)), shape=(n + m, n + m))
+        rhs = np.zeros(n + m)
+        known = self.unknown >= 0
+        rhs[self.unknown[known]] = injected[known]
+        rhs[n:] = self._source_volts
+        # Minimum degree on A + A^T suits the structurally symmetric MNA matrix
+        solution = np.atleast_1d(spsolve(matrix, rhs, permc_spec="MMD_AT_PLUS_A"))
+        volts = np.zeros(len(self.unknown))
+        volts[known] = solution[self.unknown[known]]
+        return volts, solution[n:]
+
+    def solve(self, inputs=None):
+        inputs = inputs or {}
+        started = time.perf_counter()
+        levels = inputs.get("pins") or {}
+        pressed = inputs.get("switches") or {}
+        triggered = inputs.get("sensors") or {}
+        ground = self.ground
+        problems = list(self.problems)
+
+        # Edges and injected currents set by the inputs alone
+        edges, injected = [], []
+        driven = set()
+        for node_id, pin, net, volts in self.gpio:
+            level = (levels.get(node_id) or {}).get(pin)
+            if level in (0, 1, True, False):
+                # Thevenin source behind the output resistance, as a Norton pair
+                edges.append((net, ground, 1.0 / GPIO_OHMS))
+                injected.append((net, volts * bool(level) / GPIO_OHMS))
+                driven.add((node_id, pin))
+            elif level == "pullup":
+                edges.append((net, ground, 1.0 / PULLUP_OHMS))
+                injected.append((net, volts / PULLUP_OHMS))
+        for node_id, a, b in self.buttons:
+            if pressed.get(node_id):
+                edges.append((a, b, 1.0 / SWITCH_OHMS))
+        for node_id, output, supply in self.sensors:
+            if supply is not None:
+                edges.append((output, supply if triggered.get(node_id) else ground, 1.0 / SENSOR_OUTPUT_OHMS))
+        base_a, base_b, base_g = columns(edges, 3)
+        base_rhs = np.zeros(len(self.unknown))
+        nets, amps = columns(injected, 2)
+        np.add.at(base_rhs, nets.astype(np.intp), amps)
+
+        led_on, high = self._settled
+        iterations = 0
+        for iterations in range(1, MAX_ITERATIONS + 1):
+            # LEDs: a conductance plus a forward-voltage source when on
+            led_g = np.where(led_on, 1.0 / LED_ON_OHMS, LED_OFF_SIEMENS)
+            rhs = base_rhs.copy()
+            np.add.at(rhs, self.led_a, led_on * self.led_volts / LED_ON_OHMS)
+            np.subtract.at(rhs, self.led_b, led_on * self.led_volts / LED_ON_OHMS)
+            # Driver outputs follow their input, to the motor supply or ground
+            enabled = (self.channel_enable < 0) | high[self.channel_enable]
+            target = np.where(high[self.channel_in], self.channel_supply, ground)
+            # Relays: coil load and COM switched between NC and NO
+            energized = (self.relay_in >= 0) & (self.relay_coil >= 0) & high[self.relay_in]
+            contact = np.where(energized, self.relay_no, self.relay_nc)
+            closed = (self.relay_com >= 0) & (contact >= 0)
+
+            a = np.concatenate([base_a, self.led_a, self.channel_out[enabled], self.relay_coil[energized], self.relay_com[closed]])
+            b = np.concatenate([base_b, self.led_b, target[enabled], np.full(energized.sum(), ground), contact[closed]])
+            g = np.concatenate([
+                base_g, led_g, np.full(enabled.sum(), 1.0 / DRIVER_OHMS),
+                np.full(energized.sum(), RELAY_COIL_MA / 1000.0 / 5.0), np.full(closed.sum(), 1.0 / SWITCH_OHMS),
+            ])
+            volts, source_amps = self._solve_once(a.astype(np.intp), b.astype(np.intp), g, rhs)
+
+            new_on = volts[self.led_a] - volts[self.led_b] > self.led_volts
+            new_high = volts >= LOGIC_HIGH_VOLTS
+            if np.array_equal(new_on, led_on) and np.array_equal(new_high[self.logic_nets], high[self.logic_nets]):
+                break
+            led_on, high = new_on, new_high
+        else:
+            problems.append(f"simulation did not settle in {MAX_ITERATIONS} iterations")
+        self._settled = (led_on, high)
+
+        # Plain floats and bools from here: the state is compared and sent as JSON
+        state = self._report(volts.tolist(), source_amps.tolist(), led_on.tolist(), high.tolist(), levels, driven, pressed, triggered, problems)
+        state["iterations"] = iterations
+        state["solve_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return state
+
+    def _report(self, volts, source_amps, led_on, high, levels, driven, pressed, triggered, problems):
+        def ma(amps):
+            return round(float(amps) * 1000, 2)
+
+        rails = [{
+            "node": node_id,
+            "pin": pin,
+            "voltage": volts_set,
+            # MNA source current flows into the + terminal; the draw is its negative
+            "current_ma": ma(-amps),
+        } for (net, volts_set, node_id, pin), amps in zip(self.sources, source_amps)]
+
+        # GPIO current comes from the board's logic supply
+        gpio_ma, pins = {}, {}
+        for node_id, pin, net, board_volts in self.gpio:
+            level = (levels.get(node_id) or {}).get(pin)
+            if (node_id, pin) in driven:
+                gpio_ma[node_id] = gpio_ma.get(node_id, 0.0) + max(0.0, board_volts * bool(level) - volts[net]) / GPIO_OHMS
+                level = "HIGH" if level else "LOW"
+            elif not self.attached[net] and level != "pullup" and not any(pressed.get(b) for b in self.switched.get(net, ())):
+                level = "FLOAT"
+            elif volts[net] >= 0.6 * board_volts:
+                level = "HIGH"
+            elif volts[net] <= 0.3 * board_volts:
+                level = "LOW"
+            else:
+                level = "UNDEFINED"
+            pins.setdefault(node_id, {})[pin] = level
+
+        elements = {}
+        for on, (node_id, a, b, forward) in zip(led_on, self.leds):
+            current = (volts[a] - volts[b] - forward) / LED_ON_OHMS if on else 0.0
+            elements[node_id] = {
+                "kind": "led",
+                "on": bool(on and current > 0),
+                "current_ma": ma(max(current, 0.0)),
+                "brightness": round(min(1.0, max(current, 0.0) * 1000 / LED_FULL_MA), 2),
+            }
+        for node_id, kind, a, b, ohms in self.loads:
+            current = (volts[a] - volts[b]) / ohms
+            state = {"kind": kind, "current_ma": ma(current)}
+            if kind == "motor":
+                state["running"] = abs(current) * 1000 >= RUNNING_MA
+                state["direction"] = "forward" if current > 0 else "reverse" if current < 0 else None
+                if not state["running"]:
+                    state["direction"] = None
+            elif kind == "buzzer":
+                state["on"] = current * 1000 >= RUNNING_MA / 4
+            elements[node_id] = state
+        for node_id, a, b in self.buttons:
+            elements[node_id] = {"kind": "button", "pressed": bool(pressed.get(node_id))}
+
+        for node_id, kind, supply, inputs in self.modules:
+            supply_volts = float(volts[supply[0]]) if supply else 0.0
+            state = {
+                "kind": kind,
+                "supply_voltage": round(supply_volts, 2),
+                "powered": bool(supply) and supply_volts >= 0.75 * supply[1],
+            }
+            if kind == "servo":
+                signal = next((n for p, n in inputs.items() if p.upper() in SIGNAL_PINS), None)
+                state["signal"] = signal is not None and volts[signal] >= LOGIC_HIGH_VOLTS
+            elements[node_id] = state
+        for node_id, output, supply in self.sensors:
+            elements[node_id]["triggered"] = bool(triggered.get(node_id))
+        for node_id, channels, supply in self.drivers:
+            outputs = {}
+            for output, output_net, input_net, enable_net in channels:
+                enabled = enable_net is None or high[enable_net]
+                outputs[output] = ("HIGH" if high[input_net] else "LOW") if enabled and elements[node_id]["powered"] else "OFF"
+            elements[node_id]["outputs"] = outputs
+            # Channel A is OUT1/OUT2, B is OUT3/OUT4, as on an L298N
+            elements[node_id]["motors"] = {
+                name: motor_state(outputs.get(first), outputs.get(second))
+                for name, first, second in (("A", "OUT1", "OUT2"), ("B", "OUT3", "OUT4"))
+                if first in outputs and second in outputs
+            }
+        for node_id, input_net, coil, com, no, nc in self.relays:
+            elements[node_id]["closed"] = bool(input_net is not None and coil is not None and high[input_net]
+                                               and elements[node_id]["powered"])
+
+        for node_id, board_volts in self.controllers:
+            total = ma(gpio_ma.get(node_id, 0.0))
+            rail = next((r for r in rails if r["node"] == node_id and abs(r["voltage"] - board_volts) < 0.05), None)
+            if rail is not None:
+                rail["current_ma"] = round(rail["current_ma"] + total, 2)
+            elements[node_id] = {"kind": "controller", "gpio_ma": total}
+
+        return {
+            "ok": not problems,
+            "rails": rails,
+            "pins": pins,
+            "elements": elements,
+            "problems": problems,
+            "assumptions": list(self.assumptions),
+        }
+
+
+def columns(rows, width):
+    # [(a, b, ...), ...] -> one array per column, also for no rows
+    if not rows:
+        return tuple(np.empty(0, dtype=np.intp) for _ in range(width))
+    return tuple(np.array(column) for column in zip(*rows))
+
+
+def motor_state(first, second):
+    if "OFF" in (first, second):
+        return "coast"
+    if first == second:
+        return "brake"
+    return "forward" if first == "HIGH" else "reverse"
+
+
+def changes(previous, current):
+    # Elements and pins whose state differs between two frames
+    if previous is None:
+        return current
+    diff = {key: current[key] for key in ("rails", "problems") if current[key] != previous.get(key)}
+    elements = {k: v for k, v in current["elements"].items() if previous["elements"].get(k) != v}
+    pins = {}
+    for node_id, node_pins in current["pins"].items():
+        changed = {p: level for p, level in node_pins.items() if previous["pins"].get(node_id, {}).get(p) != level}
+        if changed:
+            pins[node_id] = changed
+    if elements:
+        diff["elements"] = elements
+    if pins:
+        diff["pins"] = pins
+    diff["solve_ms"] = current["solve_ms"]
+    return diff
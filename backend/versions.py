@@ -0,0 +1,127 @@
+import time
+from datetime import datetime
+import sqlalchemy
+import metrics
+from database import database, circuits, circuit_versions, circuit_snapshots
+
+# Version history of saved circuits (undo/redo).
+# Edits made in collaborative rooms (collab.py) are appended to an operation
+# log: one row per version with only the fields that changed (the latest
+# write per field, at most collab.VERSION_SECONDS of editing), so the log
+# grows with the size of the edits and not of the diagram. Appending bumps
+# circuits.version and inserts one row. Every SNAPSHOT_EVERY versions the full
+# document is stored as well, and any version is rebuilt from the nearest
+# snapshot at or below it plus fewer than SNAPSHOT_EVERY logged rows.
+# Version 0 is the circuit as it was before its first collaborative edit.
+
+SNAPSHOT_EVERY = 50
+MAX_PAGE = 100
+SITE = "history"  # Document site for rebuilt versions; they are never edited
+
+
+def _stored(op):
+    return {"kind": op["kind"], "id": op["id"], "field": op["field"], "value": op["value"], "stamp": list(op["stamp"])}
+
+
+async def head(circuit_id):
+    # Newest version, or None when there is no such circuit
+    row = await database.fetch_one(sqlalchemy.select(circuits.c.version).where(circuits.c.id == circuit_id))
+    return None if row is None else row["version"] or 0
+
+
+async def start(circuit_id, version, document):
+    # Called when a room opens: keeps version 0 before anything is appended
+    if version:
+        return
+    exists = await database.fetch_one(
+        sqlalchemy.select(circuit_snapshots.c.version)
+        .where(circuit_snapshots.c.circuit_id == circuit_id, circuit_snapshots.c.version == 0)
+    )
+    if exists:
+        return
+    try:
+        await database.execute(circuit_snapshots.insert().values(
+            circuit_id=circuit_id, version=0, state=document.dump(), created_at=datetime.utcnow(),
+        ))
+    except Exception as e:
+        # Another worker opened the same circuit first
+        print(f"Version 0 of {circuit_id} not stored: {e}")
+
+
+async def append(circuit_id, ops):
+    # Logs ops as the next version; returns its number
+    started = time.perf_counter()
+    async with database.transaction():
+        version = await database.fetch_val(
+            circuits.update()
+            .where(circuits.c.id == circuit_id)
+            .values(version=sqlalchemy.func.coalesce(circuits.c.version, 0) + 1)
+            .returning(circuits.c.version)
+        )
+        if version is None:
+            return None
+        await database.execute(circuit_versions.insert().values(
+            circuit_id=circuit_id, version=version, ops=[_stored(op) for op in ops], created_at=datetime.utcnow(),
+        ))
+    metrics.observe("versions.append_ms", (time.perf_counter() - started) * 1000)
+    if version % SNAPSHOT_EVERY == 0:
+        # Built from the log, not the live room, which may hold other workers' unlogged edits
+        document = await rebuild(circuit_id, version)
+        if document is not None:
+            await database.execute(circuit_snapshots.insert().values(
+                circuit_id=circuit_id, version=version, state=document.dump(), created_at=datetime.utcnow(),
+            ))
+    return version
+
+
+async def rebuild(circuit_id, version):
+    # The collab.Document at a version; None when the circuit has no such version
+    from collab import Document
+
+    snapshot = await database.fetch_one(
+        circuit_snapshots.select()
+        .where(circuit_snapshots.c.circuit_id == circuit_id, circuit_snapshots.c.version <= version)
+        .order_by(sqlalchemy.desc(circuit_snapshots.c.version))
+        .limit(1)
+    )
+    if snapshot is None:
+        # Never edited collaboratively: version 0 is the saved diagram
+        row = await database.fetch_one(circuits.select().where(circuits.c.id == circuit_id))
+        if row is None or version != 0 or row["version"]:
+            return None
+        return Document(row["diagram_data"] or {}, SITE)
+    rows = await database.fetch_all(
+        sqlalchemy.select(circuit_versions.c.version, circuit_versions.c.ops)
+        .where(
+            circuit_versions.c.circuit_id == circuit_id,
+            circuit_versions.c.version > snapshot["version"],
+            circuit_versions.c.version <= version,
+        )
+        .order_by(circuit_versions.c.version)
+    )
+    if (rows[-1]["version"] if rows else snapshot["version"]) != version:
+        return None
+    document = Document.load(snapshot["state"], SITE)
+    for row in rows:
+        for op in row["ops"]:
+            document.merge(op)
+    metrics.incr("versions.replayed", len(rows))
+    return document
+
+
+def summarize(version, created_at, ops):
+    return {
+        "version": version,
+        "created_at": created_at,
+        "changes": len(ops),
+        "elements": sorted({op["id"] for op in ops}),
+    }
+
+
+async def page(circuit_id, limit, before=None):
+    # Newest first; page back with before=<version of the last item>
+    query = sqlalchemy.select(circuit_versions).where(circuit_versions.c.circuit_id == circuit_id)
+    if before is not None:
+        query = query.where(circuit_versions.c.version < before)
+    rows = await database.fetch_all(query.order_by(sqlalchemy.desc(circuit_versions.c.version)).limit(limit))
+    return [summarize(r["version"], r["created_at"], r["ops"]) for r in rows]
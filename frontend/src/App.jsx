@@ -3,6 +3,7 @@ import { BrowserRouter as Router, Routes, Route } from 'react-router-dom';
 import Home from './Home';
 import CircuitMaker from './CircuitMaker';
 import StudyGuide from './StudyGuide';
+import Gallery from './Gallery';
 import AdminDashboard from './AdminDashboard';
 import UpdateSuccess from './UpdateSuccess';
 
@@ -13,6 +14,7 @@ function App() {
         <Route path="/" element={<Home />} />
         <Route path="/app" element={<CircuitMaker />} />
         <Route path="/study" element={<StudyGuide />} />
+        <Route path="/gallery" element={<Gallery />} />
         <Route path="/admin" element={<AdminDashboard />} />
         <Route path="/success" element={<UpdateSuccess />} />
       </Routes>
@@ -14,7 +14,7 @@ import ReactFlow, {
 import 'reactflow/dist/style.css';
 import axios from 'axios';
 import { 
-  Download, Cpu, Loader2, Zap, Save, Check, Clock, X, Code, FileText, LayoutTemplate, Copy, Book
+  Download, Cpu, Loader2, Zap, Save, Check, Clock, X, Code, FileText, LayoutTemplate, Copy, Book, CircuitBoard, Undo2, Redo2, LayoutGrid
 } from 'lucide-react';
 import * as htmlToImage from 'html-to-image';
 
@@ -23,6 +23,72 @@ const API_BASE_URL = import.meta.env.VITE_API_URL
   ? `${import.meta.env.VITE_API_URL}/api`
   : '/api';
 
+const newId = () => window.crypto?.randomUUID
+  ? window.crypto.randomUUID()
+  : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+// POST that retries after network failures. The Idempotency-Key makes a retry
+// return the first attempt's result instead of paying for the work again.
+const postIdempotent = async (url, body, attempts = 3) => {
+  const key = newId();
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await axios.post(url, body, { headers: { 'Idempotency-Key': key } });
+    } catch (error) {
+      if (error.response || attempt >= attempts) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+    }
+  }
+};
+
+// Generation channel: diagram, code and BOM arrive over one WebSocket, and a
+// new query or leaving the page cancels the old one on the server
+const socketUrl = (path) => {
+  const url = new URL(`${API_BASE_URL}${path}`, window.location.href);
+  url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+  return url.toString();
+};
+
+// Saved wires as React Flow edges
+const toEdge = (conn) => ({
+  id: conn.id,
+  source: conn.from,
+  sourceHandle: conn.fromPin,
+  target: conn.to,
+  targetHandle: conn.toPin,
+  type: 'smoothstep',
+  label: `${conn.fromPin} → ${conn.toPin}`,
+  labelStyle: { fontSize: 10, fontWeight: 600, fill: WIRE_COLORS[conn.color] || '#000' },
+  labelBgStyle: { fill: 'white', fillOpacity: 0.9 },
+  style: { stroke: WIRE_COLORS[conn.color] || '#000', strokeWidth: 2 },
+  markerEnd: { type: MarkerType.ArrowClosed, color: WIRE_COLORS[conn.color] || '#000' }
+});
+
+// Simulation updates carry only the elements, pins and rails that changed
+const mergeSimulation = (current, update) => {
+  const pins = { ...current.pins };
+  Object.entries(update.pins || {}).forEach(([id, levels]) => { pins[id] = { ...pins[id], ...levels }; });
+  return {
+    ...current,
+    rails: update.rails || current.rails,
+    problems: update.problems || current.problems,
+    elements: { ...current.elements, ...update.elements },
+    pins,
+  };
+};
+
+const simulationBadge = (sim) => {
+  if (!sim) return null;
+  if (sim.kind === 'led') return sim.on ? `${sim.current_ma} mA` : 'off';
+  if (sim.kind === 'motor') return sim.running ? `↻ ${sim.direction}` : 'stopped';
+  if (sim.kind === 'button') return sim.pressed ? 'pressed' : 'released';
+  if (sim.motors) return Object.entries(sim.motors).map(([name, state]) => `${name}: ${state}`).join(' · ');
+  if ('triggered' in sim) return sim.triggered ? 'triggered' : 'idle';
+  if ('powered' in sim && !sim.powered) return 'unpowered';
+  if (sim.kind === 'relay') return sim.closed ? 'closed' : 'open';
+  return null;
+};
+
 // Wire color mapping
 const WIRE_COLORS = {
   red: '#DC2626',
@@ -44,11 +110,32 @@ const WiringNode = ({ data }) => {
   const midpoint = Math.ceil(pins.length / 2);
   const leftPins = isController ? pins.slice(0, midpoint) : [];
   const rightPins = isController ? pins.slice(midpoint) : pins;
+  const sim = data.sim;
+  const lit = sim && ((sim.kind === 'led' && sim.on) || sim.running || sim.pressed || sim.triggered || sim.closed);
+  const badge = simulationBadge(sim);
+
+  // While simulating, controller pins toggle HIGH/LOW and buttons/sensors toggle on click
+  const pinProps = (pin, className) => {
+    const level = data.levels?.[pin];
+    if (!level) return { className };
+    return {
+      onClick: () => data.onPinClick(pin),
+      title: level,
+      className: `${className} nodrag cursor-pointer ${level === 'HIGH' ? 'text-green-600 font-bold' : level === 'FLOAT' ? 'text-gray-300' : 'text-gray-500'}`,
+    };
+  };
 
   return (
-    <div className={`bg-white rounded-lg shadow-xl border-2 ${isController ? 'border-blue-500' : 'border-gray-400'}`}>
-      <div className={`px-4 py-2 rounded-t-md font-bold text-sm text-center ${isController ? 'bg-blue-500 text-white' : 'bg-gray-100 text-gray-800'}`}>
+    <div
+      className={`bg-white rounded-lg shadow-xl border-2 ${isController ? 'border-blue-500' : lit ? 'border-yellow-400' : 'border-gray-400'}`}
+      style={lit ? { boxShadow: `0 0 ${8 + 16 * (sim.brightness ?? 1)}px rgba(250, 204, 21, 0.9)` } : undefined}
+    >
+      <div
+        onClick={data.onToggle}
+        className={`px-4 py-2 rounded-t-md font-bold text-sm text-center ${isController ? 'bg-blue-500 text-white' : lit ? 'bg-yellow-300 text-gray-900' : 'bg-gray-100 text-gray-800'} ${data.onToggle ? 'nodrag cursor-pointer' : ''}`}
+      >
         {data.label}
+        {badge && <div className="text-[10px] font-normal">{badge}</div>}
       </div>
       <div className="flex">
         {isController && leftPins.length > 0 && (
@@ -57,7 +144,7 @@ const WiringNode = ({ data }) => {
               <div key={`l-${idx}`} className="relative flex items-center px-3 py-1 text-xs font-mono">
                 <Handle type="source" position={Position.Left} id={pin} className="!w-2.5 !h-2.5 !bg-gray-600 !border-2 !border-white !-left-1.5" />
                 <Handle type="target" position={Position.Left} id={`${pin}-in`} className="!w-2.5 !h-2.5 !bg-gray-600 !border-2 !border-white !-left-1.5" />
-                <span className="ml-2">{pin}</span>
+                <span {...pinProps(pin, 'ml-2')}>{pin}</span>
               </div>
             ))}
           </div>
@@ -71,7 +158,7 @@ const WiringNode = ({ data }) => {
                   <Handle type="source" position={Position.Left} id={`${pin}-out`} className="!w-2.5 !h-2.5 !bg-gray-600 !border-2 !border-white !-left-1.5" />
                 </>
               )}
-              <span className={isController ? 'mr-2' : 'ml-2'}>{pin}</span>
+              <span {...pinProps(pin, isController ? 'mr-2' : 'ml-2')}>{pin}</span>
               {isController && (
                 <>
                   <Handle type="source" position={Position.Right} id={pin} className="!w-2.5 !h-2.5 !bg-gray-600 !border-2 !border-white !-right-1.5" />
@@ -102,14 +189,65 @@ const CircuitMaker = () => {
   const [loading, setLoading] = useState(false);
   const [saving, setSaving] = useState(false);
   const [shareUrl, setShareUrl] = useState('');
+  const [circuitId, setCircuitId] = useState(null);
+  const [pcbStatus, setPcbStatus] = useState(null);
   
   // Data States
   const [codeData, setCodeData] = useState(null);
   const [bomData, setBomData] = useState(null);
   const [explanation, setExplanation] = useState('');
+  const [powerWarnings, setPowerWarnings] = useState([]);
+  
+  const [simulation, setSimulation] = useState(null);
+  // Anonymous user that owns the inventory; generation prefers those parts
+  const [userId, setUserId] = useState(() => Number(localStorage.getItem('techwattUserId')) || null);
+  const [inventoryText, setInventoryText] = useState('');
+  const [inventorySaving, setInventorySaving] = useState(false);
   
   const canvasRef = useRef(null);
+  const socketRef = useRef(null);
+  const requestRef = useRef(null);
+  const simulationRef = useRef(null);
+  // Live editing of the saved circuit: { socket, seq, pending: field key -> seq of our last unacked write }
+  const collabRef = useRef(null);
+  // Undo/redo walks the server's version history: version is the one shown, top the newest reachable
+  const historyRef = useRef({ version: null, top: null });
+
+  // Closing the socket cancels any generation still running
+  useEffect(() => () => {
+    socketRef.current?.close();
+    simulationRef.current?.close();
+  }, []);
   
+  useEffect(() => {
+    if (!userId) return;
+    axios.get(`${API_BASE_URL}/users/${userId}/inventory`)
+      .then((res) => setInventoryText(res.data.items.map((item) => `${item.quantity} x ${item.component}`).join('\n')))
+      .catch(() => {});
+  }, [userId]);
+
+  // One part per line: "2 x Arduino Uno", or just "Arduino Uno" for one
+  const handleSaveInventory = async () => {
+    setInventorySaving(true);
+    try {
+      let id = userId;
+      if (!id) {
+        id = (await axios.post(`${API_BASE_URL}/users`)).data.id;
+        localStorage.setItem('techwattUserId', id);
+        setUserId(id);
+      }
+      const items = inventoryText.split('\n').map((line) => line.trim()).filter(Boolean).map((line) => {
+        const match = line.match(/^(\d+)\s*x\s+(.+)$/i);
+        return match ? { component: match[2], quantity: Number(match[1]) } : { component: line, quantity: 1 };
+      });
+      await axios.put(`${API_BASE_URL}/users/${id}/inventory`, { items });
+    } catch (e) {
+      alert('Failed to save your parts');
+    } finally {
+      setInventorySaving(false);
+    }
+  };
+
   // Check URL on mount
   useEffect(() => {
     const params = new URLSearchParams(window.location.search);
@@ -119,13 +257,22 @@ const CircuitMaker = () => {
     }
   }, []);
 
+  const cancelGeneration = () => {
+      if (requestRef.current && socketRef.current) {
+          socketRef.current.send(JSON.stringify({ type: 'cancel', id: requestRef.current }));
+      }
+      requestRef.current = null;
+  };
+
   const loadSharedCircuit = async (id) => {
+      cancelGeneration();
       setLoading(true);
       try {
           const res = await axios.get(`${API_BASE_URL}/circuit/${id}`);
           const { query, diagram_data, code, bom } = res.data;
           
           setQuery(query);
+          setCircuitId(id);
           if (diagram_data) renderDiagram(diagram_data);
           if (code) setCodeData({ code: code, explanation: "Loaded from save" });
           if (bom) setBomData({ items: bom, total_estimated_cost: "Unknown" });
@@ -154,10 +301,100 @@ const CircuitMaker = () => {
       window.history.pushState({}, '', `?id=${id}`);
   };
 
+  // Everyone with a saved circuit open edits the same copy: field-level ops go
+  // out as they happen, other editors' ops come back batched
+  useEffect(() => {
+    if (!circuitId) return;
+    const collab = { socket: new WebSocket(socketUrl(`/ws/circuit/${circuitId}`)), seq: 0, pending: new Map() };
+    collabRef.current = collab;
+    historyRef.current = { version: null, top: null };
+    collab.socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'state') {
+        renderDiagram(message.diagram);
+      } else if (message.type === 'ops') {
+        // The ack comes first: fields it covers take other editors' writes again
+        if (message.ack !== undefined) {
+          collab.pending.forEach((seq, key) => { if (seq <= message.ack) collab.pending.delete(key); });
+        }
+        message.ops.filter((op) => !collab.pending.has(`${op.kind}:${op.id}:${op.field}`)).forEach(applyRemoteOp);
+      } else if (message.type === 'error') {
+        console.warn('Edit refused', message.detail);
+      }
+    };
+    return () => {
+      if (collabRef.current === collab) collabRef.current = null;
+      collab.socket.close();
+    };
+  }, [circuitId]);
+
+  const sendOps = (ops) => {
+    const collab = collabRef.current;
+    if (!ops.length || collab?.socket.readyState !== WebSocket.OPEN) return;
+    collab.seq += 1;
+    historyRef.current = { version: null, top: null };  // A new edit drops the redo steps
+    ops.forEach((op) => collab.pending.set(`${op.kind}:${op.id}:${op.field}`, collab.seq));
+    collab.socket.send(JSON.stringify({ type: 'ops', seq: collab.seq, ops }));
+  };
+
+  // Restoring a version is itself an edit; everyone editing sees it over the collab socket
+  const stepHistory = async (step) => {
+    if (!circuitId) return;
+    const history = historyRef.current;
+    try {
+      if (history.version === null) {
+        const { data } = await axios.get(`${API_BASE_URL}/circuit/${circuitId}/versions?limit=1`);
+        history.version = history.top = data.head;
+      }
+      const version = history.version + step;
+      if (version < 0 || version > history.top) return;
+      await axios.post(`${API_BASE_URL}/circuit/${circuitId}/versions/${version}/restore`);
+      history.version = version;
+    } catch (e) {
+      console.error('Undo/redo failed', e);
+    }
+  };
+
+  const applyRemoteOp = ({ kind, id, field, value }) => {
+    if (kind === 'node') {
+      if (field === 'deleted') {
+        if (value) setNodes((nds) => nds.filter((n) => n.id !== id));
+        return;
+      }
+      if (field === 'position' && !value) return;  // Back to the automatic layout; it stays where it is
+      setNodes((nds) => {
+        const node = nds.find((n) => n.id === id)
+          || { id, type: 'wiring', position: { x: 300, y: 200 }, data: {} };
+        const changed = field === 'position'
+          ? { ...node, position: value }
+          : { ...node, data: { label: value.label, type: value.type, pins: value.pins } };
+        return nds.some((n) => n.id === id) ? nds.map((n) => (n.id === id ? changed : n)) : [...nds, changed];
+      });
+    } else if (field === 'deleted') {
+      if (value) setEdges((eds) => eds.filter((e) => e.id !== id));
+    } else {
+      setEdges((eds) => [...eds.filter((e) => e.id !== id), toEdge({ id, ...value })]);
+    }
+  };
+
   // React Flow Callbacks
-  const onNodesChange = useCallback((changes) => setNodes((nds) => applyNodeChanges(changes, nds)), []);
-  const onEdgesChange = useCallback((changes) => setEdges((eds) => applyEdgeChanges(changes, eds)), []);
-  const onConnect = useCallback((params) => setEdges((eds) => addEdge(params, eds)), []);
+  const onNodesChange = useCallback((changes) => {
+    setNodes((nds) => applyNodeChanges(changes, nds));
+    sendOps(changes.flatMap((change) => {
+      if (change.type === 'position' && change.position) return [{ kind: 'node', id: change.id, field: 'position', value: change.position }];
+      if (change.type === 'remove') return [{ kind: 'node', id: change.id, field: 'deleted', value: true }];
+      return [];
+    }));
+  }, []);
+  const onEdgesChange = useCallback((changes) => {
+    setEdges((eds) => applyEdgeChanges(changes, eds));
+    sendOps(changes.filter((change) => change.type === 'remove').map((change) => ({ kind: 'connection', id: change.id, field: 'deleted', value: true })));
+  }, []);
+  const onConnect = useCallback((params) => {
+    const conn = { id: `w${newId()}`, from: params.source, fromPin: params.sourceHandle, to: params.target, toPin: params.targetHandle };
+    setEdges((eds) => addEdge(toEdge(conn), eds));
+    sendOps([{ kind: 'connection', id: conn.id, field: 'data', value: { from: conn.from, fromPin: conn.fromPin, to: conn.to, toPin: conn.toPin } }]);
+  }, []);
 
   const renderDiagram = (data) => {
       if (!data) return;
@@ -188,37 +425,134 @@ const CircuitMaker = () => {
         });
       });
 
-      const newEdges = data.connections.map((conn) => ({
-        id: conn.id,
-        source: conn.from,
-        sourceHandle: conn.fromPin,
-        target: conn.to,
-        targetHandle: conn.toPin,
-        type: 'smoothstep',
-        label: `${conn.fromPin} → ${conn.toPin}`,
-        labelStyle: { fontSize: 10, fontWeight: 600, fill: WIRE_COLORS[conn.color] || '#000' },
-        labelBgStyle: { fill: 'white', fillOpacity: 0.9 },
-        style: { stroke: WIRE_COLORS[conn.color] || '#000', strokeWidth: 2 },
-        markerEnd: { type: MarkerType.ArrowClosed, color: WIRE_COLORS[conn.color] || '#000' }
-      }));
+      // Parts moved by hand keep their place
+      newNodes = newNodes.map((node) => {
+        const saved = data.nodes.find((n) => n.id === node.id);
+        return saved?.position ? { ...node, position: saved.position } : node;
+      });
+      const newEdges = data.connections.map(toEdge);
 
+      stopSimulation();
       setNodes(newNodes);
       setEdges(newEdges);
       setExplanation(data.explanation || '');
+      setPowerWarnings(data.warnings || []);
       window.lastDiagramData = data; 
   };
 
+  // DC simulation on the server: load the diagram once, then send clicks
+  const stopSimulation = () => {
+      const socket = simulationRef.current;
+      simulationRef.current = null;
+      socket?.close();
+      setSimulation(null);
+  };
+
+  const startSimulation = () => {
+      if (!window.lastDiagramData) return;
+      const socket = new WebSocket(socketUrl('/ws/simulate'));
+      simulationRef.current = socket;
+      socket.onopen = () => socket.send(JSON.stringify({ type: 'load', diagram: window.lastDiagramData }));
+      socket.onmessage = (event) => {
+          const message = JSON.parse(event.data);
+          if (message.type === 'state') setSimulation(message);
+          else if (message.type === 'update') setSimulation((current) => current && mergeSimulation(current, message));
+          else if (message.type === 'error') console.error('Simulation error:', message.detail);
+      };
+      socket.onclose = () => {
+          if (simulationRef.current !== socket) return;
+          simulationRef.current = null;
+          setSimulation(null);
+      };
+  };
+
+  const sendSimulationInput = (input) => {
+      const socket = simulationRef.current;
+      if (socket && socket.readyState === WebSocket.OPEN) {
+          socket.send(JSON.stringify({ type: 'input', ...input }));
+      }
+  };
+
+  const simulatedNodes = simulation ? nodes.map((node) => {
+      const sim = simulation.elements[node.id];
+      const levels = simulation.pins[node.id];
+      let onToggle;
+      if (sim?.kind === 'button') onToggle = () => sendSimulationInput({ switches: { [node.id]: !sim.pressed } });
+      else if (sim && 'triggered' in sim) onToggle = () => sendSimulationInput({ sensors: { [node.id]: !sim.triggered } });
+      return {
+          ...node,
+          data: {
+              ...node.data,
+              sim,
+              levels,
+              onToggle,
+              onPinClick: (pin) => sendSimulationInput({ pins: { [node.id]: { [pin]: levels[pin] === 'HIGH' ? 0 : 1 } } }),
+          },
+      };
+  }) : nodes;
+
+  const handleSocketMessage = (message) => {
+      if (message.id !== requestRef.current) return;
+      if (message.type === 'diagram') {
+          renderDiagram(message.data);
+          setLoading(false);
+      } else if (message.type === 'code') {
+          setCodeData(message.data);
+      } else if (message.type === 'bom') {
+          setBomData(message.data);
+      } else if (message.type === 'error') {
+          console.error(`Generation of ${message.part} failed:`, message.detail);
+          if (message.part === 'diagram') {
+              setLoading(false);
+              alert('Failed to generate. Please check backend.');
+          }
+      } else if (message.type === 'done') {
+          requestRef.current = null;
+      }
+  };
+
+  const openGenerationSocket = () => new Promise((resolve, reject) => {
+      const current = socketRef.current;
+      if (current && current.readyState === WebSocket.OPEN) return resolve(current);
+      const socket = new WebSocket(socketUrl('/ws/generate'));
+      socket.onopen = () => {
+          socketRef.current = socket;
+          resolve(socket);
+      };
+      socket.onerror = () => reject(new Error('Generation socket unavailable'));
+      socket.onmessage = (event) => handleSocketMessage(JSON.parse(event.data));
+      socket.onclose = () => {
+          if (socketRef.current !== socket) return;
+          socketRef.current = null;
+          if (requestRef.current) {
+              requestRef.current = null;
+              setLoading(false);
+          }
+      };
+  });
+
   const handleGenerate = async () => {
     if (!query.trim()) return;
     setLoading(true);
     setCodeData(null);
     setBomData(null);
     setShareUrl('');
+    setCircuitId(null);
+
+    try {
+      // The server cancels the previous query when a new one arrives
+      const socket = await openGenerationSocket();
+      requestRef.current = newId();
+      socket.send(JSON.stringify({ type: 'generate', id: requestRef.current, query, user_id: userId }));
+      return;
+    } catch (e) {
+      console.warn('Falling back to HTTP generation', e);
+    }
     
     try {
-      const res = await axios.post(`${API_BASE_URL}/generate`, { query });
+      const res = await postIdempotent(`${API_BASE_URL}/generate`, { query, user_id: userId });
       renderDiagram(res.data);
-      generateCodeAndBom();
+      generateCodeAndBom(res.data.generation_id, res.data.nodes, res.data.connections);
     } catch (error) {
       console.error('Error:', error);
       alert('Failed to generate. Please check backend.');
@@ -227,11 +561,13 @@ const CircuitMaker = () => {
     }
   };
 
-  const generateCodeAndBom = async () => {
+  // generation_id lets the backend hand over the code/BOM it started with the diagram;
+  // nodes/connections let it rebuild them from the diagram if it has to start over
+  const generateCodeAndBom = async (generation_id, nodes, connections) => {
       try {
           const [codeRes, bomRes] = await Promise.all([
-             axios.post(`${API_BASE_URL}/generate-code`, { query }),
-             axios.post(`${API_BASE_URL}/generate-bom`, { query })
+             axios.post(`${API_BASE_URL}/generate-code`, { query, generation_id, nodes, connections }),
+             axios.post(`${API_BASE_URL}/generate-bom`, { query, generation_id, nodes, user_id: userId })
           ]);
           setCodeData(codeRes.data);
           setBomData(bomRes.data);
@@ -245,7 +581,7 @@ const CircuitMaker = () => {
       setSaving(true);
       try {
           // No Auth Header needed
-          const res = await axios.post(`${API_BASE_URL}/save`, { 
+          const res = await postIdempotent(`${API_BASE_URL}/save`, { 
               query,
               diagram_data: window.lastDiagramData,
               code: codeData ? codeData.code : "",
@@ -254,6 +590,7 @@ const CircuitMaker = () => {
           
           const url = `${window.location.origin}?id=${res.data.id}`;
           setShareUrl(url);
+          setCircuitId(res.data.id);
       } catch (e) {
           alert("Failed to save");
       } finally {
@@ -277,6 +614,49 @@ const CircuitMaker = () => {
       });
   };
 
+  // SVG/PDF are drawn by the backend from the diagram data, so they stay sharp at any size
+  const handleVectorExport = async (format) => {
+    if (!window.lastDiagramData) return;
+    try {
+      const res = await axios.post(
+        `${API_BASE_URL}/export?format=${format}`,
+        { diagram_data: window.lastDiagramData },
+        { responseType: 'blob' }
+      );
+      const link = document.createElement('a');
+      link.download = `techwatt-circuit.${format}`;
+      link.href = URL.createObjectURL(res.data);
+      link.click();
+      setTimeout(() => URL.revokeObjectURL(link.href), 1000);
+    } catch (e) {
+      alert(`Failed to export ${format.toUpperCase()}`);
+    }
+  };
+
+  // PCB files are built in the background for saved circuits: start the job, poll, download
+  const handlePcbExport = async (format = 'gerber') => {
+    if (!circuitId || pcbStatus === 'running') return;
+    setPcbStatus('running');
+    try {
+      let { data } = await axios.post(`${API_BASE_URL}/circuit/${circuitId}/pcb?format=${format}`);
+      while (data.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        ({ data } = await axios.get(`${API_BASE_URL}/circuit/${circuitId}/pcb?format=${format}`));
+      }
+      if (data.status !== 'done') throw new Error(data.error || 'PCB export failed');
+      const res = await axios.get(`${API_BASE_URL}/circuit/${circuitId}/pcb/download?format=${format}`, { responseType: 'blob' });
+      const link = document.createElement('a');
+      link.download = `circuit-${circuitId}-pcb.${format === 'gerber' ? 'zip' : 'net'}`;
+      link.href = URL.createObjectURL(res.data);
+      link.click();
+      setTimeout(() => URL.revokeObjectURL(link.href), 1000);
+    } catch (e) {
+      alert('Failed to export PCB files');
+    } finally {
+      setPcbStatus(null);
+    }
+  };
+
   // Resizable Sidebar Logic
   const [sidebarWidth, setSidebarWidth] = useState(384); 
   const [isMobile, setIsMobile] = useState(window.innerWidth < 768);
@@ -361,6 +741,9 @@ const CircuitMaker = () => {
             <Link to="/study" className="flex items-center gap-2 px-3 py-2 text-gray-700 hover:bg-gray-100 rounded-lg text-sm font-medium transition-colors border border-gray-200 lg:mr-2">
                 <Book size={16} /> <span className="hidden sm:inline">Guide</span>
             </Link>
+            <Link to="/gallery" className="flex items-center gap-2 px-3 py-2 text-gray-700 hover:bg-gray-100 rounded-lg text-sm font-medium transition-colors border border-gray-200 lg:mr-2">
+                <LayoutGrid size={16} /> <span className="hidden sm:inline">Gallery</span>
+            </Link>
             
             {shareUrl && (
                 <div className="flex items-center gap-2 bg-green-50 text-green-700 px-3 py-1 rounded text-sm border border-green-200">
@@ -374,6 +757,23 @@ const CircuitMaker = () => {
             <button onClick={handleExport} disabled={nodes.length === 0} className="flex items-center gap-2 px-3 md:px-4 py-2 bg-gray-900 text-white hover:bg-gray-800 rounded-lg text-sm font-medium transition-colors shadow-lg shadow-gray-900/20 whitespace-nowrap">
                 <Download size={16} /> <span className="hidden sm:inline">Export</span>
             </button>
+            <button onClick={simulation ? stopSimulation : startSimulation} disabled={nodes.length === 0} className={`flex items-center gap-2 px-3 py-2 border rounded-lg text-sm font-medium transition-colors whitespace-nowrap ${simulation ? 'bg-yellow-100 border-yellow-300 text-yellow-800' : 'bg-white border-gray-200 text-gray-700 hover:bg-gray-50'}`}>
+                <Zap size={16} /> <span className="hidden sm:inline">{simulation ? 'Stop' : 'Simulate'}</span>
+            </button>
+            {['svg', 'pdf'].map((format) => (
+              <button key={format} onClick={() => handleVectorExport(format)} disabled={nodes.length === 0} className="hidden sm:flex items-center gap-1 px-3 py-2 bg-white border border-gray-200 text-gray-700 hover:bg-gray-50 rounded-lg text-sm font-medium transition-colors whitespace-nowrap">
+                <FileText size={16} /> {format.toUpperCase()}
+              </button>
+            ))}
+            <button onClick={() => stepHistory(-1)} disabled={!circuitId} title={circuitId ? 'Undo' : 'Save the circuit to keep its history'} className="hidden sm:flex items-center px-2 py-2 bg-white border border-gray-200 text-gray-700 hover:bg-gray-50 rounded-lg transition-colors disabled:opacity-50">
+                <Undo2 size={16} />
+            </button>
+            <button onClick={() => stepHistory(1)} disabled={!circuitId} title="Redo" className="hidden sm:flex items-center px-2 py-2 bg-white border border-gray-200 text-gray-700 hover:bg-gray-50 rounded-lg transition-colors disabled:opacity-50">
+                <Redo2 size={16} />
+            </button>
+            <button onClick={() => handlePcbExport('gerber')} disabled={!circuitId || pcbStatus === 'running'} title={circuitId ? 'Gerber files and KiCad netlist' : 'Save the circuit to export a PCB'} className="hidden sm:flex items-center gap-1 px-3 py-2 bg-white border border-gray-200 text-gray-700 hover:bg-gray-50 rounded-lg text-sm font-medium transition-colors whitespace-nowrap disabled:opacity-50">
+                {pcbStatus === 'running' ? <Loader2 size={16} className="animate-spin" /> : <CircuitBoard size={16} />} PCB
+            </button>
         </div>
       </header>
 
@@ -381,7 +781,7 @@ const CircuitMaker = () => {
         {/* Canvas Area - Order 1 on Mobile (Top) */}
         <main className="relative bg-gray-100 order-1 md:order-2 h-[45vh] md:h-auto md:flex-1 w-full" ref={canvasRef}>
           <ReactFlow
-            nodes={nodes}
+            nodes={simulatedNodes}
             edges={edges}
             onNodesChange={onNodesChange}
             onEdgesChange={onEdgesChange}
@@ -394,6 +794,18 @@ const CircuitMaker = () => {
             <Controls className="bg-white border shadow-lg rounded-lg" />
             <MiniMap className="border shadow-lg rounded-lg" />
           </ReactFlow>
+
+          {simulation && (
+            <div className="absolute top-3 right-3 bg-white/90 backdrop-blur-sm border rounded-lg shadow-lg p-3 text-xs font-mono space-y-1 max-w-xs">
+              <div className="font-sans font-bold text-gray-700">Rails <span className="font-normal text-gray-400">(click pins to toggle)</span></div>
+              {simulation.rails.map((rail) => (
+                <div key={`${rail.node}-${rail.pin}`}>{rail.node} {rail.pin}: {rail.current_ma} mA</div>
+              ))}
+              {[...(simulation.problems || []), ...(simulation.assumptions || [])].map((note) => (
+                <div key={note} className="font-sans text-amber-700">{note}</div>
+              ))}
+            </div>
+          )}
           
            {nodes.length === 0 && !loading && (
             <div className="absolute inset-0 flex items-center justify-center pointer-events-none p-4">
@@ -465,6 +877,19 @@ const CircuitMaker = () => {
                         ) : (
                             <p className="text-gray-500 text-sm text-center mt-10">Generate a circuit to see analysis.</p>
                         )}
+
+                        {powerWarnings.length > 0 && (
+                            <div className="bg-amber-50 rounded-lg p-4 border border-amber-200">
+                                <h3 className="text-sm font-bold text-amber-900 mb-2">Power Budget</h3>
+                                <ul className="space-y-1.5">
+                                    {powerWarnings.map((w, i) => (
+                                        <li key={i} className={`text-xs leading-relaxed ${w.severity === 'error' ? 'text-red-700 font-medium' : 'text-amber-800'}`}>
+                                            {w.message}
+                                        </li>
+                                    ))}
+                                </ul>
+                            </div>
+                        )}
                         
                         <div className="bg-white rounded-lg p-4 border shadow-sm">
                             <h3 className="text-xs font-bold text-gray-500 uppercase tracking-wider mb-3">Wire Legend</h3>
@@ -551,6 +976,24 @@ const CircuitMaker = () => {
                                 )}
                             </div>
                         )}
+
+                        <div className="mt-6 bg-white rounded-lg p-4 border shadow-sm">
+                            <h3 className="text-xs font-bold text-gray-500 uppercase tracking-wider mb-2">My Parts</h3>
+                            <p className="text-xs text-gray-400 mb-2">New circuits use parts you own where they fit, at no cost.</p>
+                            <textarea
+                                className="w-full h-24 p-2 border border-gray-300 rounded-md text-xs font-mono resize-none focus:ring-2 focus:ring-blue-500 outline-none"
+                                placeholder={"1 x Arduino Uno\n2 x SG90 Servo"}
+                                value={inventoryText}
+                                onChange={(e) => setInventoryText(e.target.value)}
+                            />
+                            <button
+                                onClick={handleSaveInventory}
+                                disabled={inventorySaving}
+                                className="mt-2 w-full py-1.5 text-xs font-medium bg-gray-800 hover:bg-gray-900 disabled:bg-gray-300 text-white rounded-md"
+                            >
+                                {inventorySaving ? 'Saving...' : 'Save parts'}
+                            </button>
+                        </div>
                     </div>
                 )}
             </div>
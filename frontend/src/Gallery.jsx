@@ -0,0 +1,105 @@
+import React, { useState, useEffect } from 'react';
+import { Link } from 'react-router-dom';
+import axios from 'axios';
+import { ArrowLeft, Heart, Eye, Loader2, Flame, Clock, Search } from 'lucide-react';
+
+const API_URL = import.meta.env.VITE_API_URL || '';
+
+// Community gallery: ranked pages from /api/gallery, "Load more" follows the cursor
+const Gallery = () => {
+  const [sort, setSort] = useState('trending');
+  const [tag, setTag] = useState('');
+  const [items, setItems] = useState([]);
+  const [next, setNext] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [liked, setLiked] = useState({});
+
+  const fetchPage = async (cursor) => {
+    setLoading(true);
+    try {
+      const params = { sort, limit: 24 };
+      if (cursor) params.cursor = cursor;
+      if (tag.trim()) params.tag = tag.trim();
+      const res = await axios.get(`${API_URL}/api/gallery`, { params });
+      setItems((current) => (cursor ? [...current, ...res.data.items] : res.data.items));
+      setNext(res.data.next);
+    } catch (e) {
+      console.error('Failed to load the gallery', e);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  useEffect(() => { fetchPage(null); }, [sort]);
+
+  const like = async (id) => {
+    if (liked[id]) return;
+    setLiked((current) => ({ ...current, [id]: true }));
+    try {
+      await axios.post(`${API_URL}/api/gallery/${id}/like`);
+    } catch (e) {
+      setLiked((current) => ({ ...current, [id]: false }));
+    }
+  };
+
+  return (
+    <div className="min-h-screen bg-gray-50">
+      <header className="bg-white border-b px-4 md:px-8 py-4 flex flex-wrap items-center gap-3">
+        <Link to="/app" className="flex items-center gap-2 text-gray-600 hover:text-blue-600 font-medium">
+          <ArrowLeft size={18} /> Back to editor
+        </Link>
+        <h1 className="text-xl font-bold text-gray-800 mr-auto">Community Gallery</h1>
+        <div className="flex rounded-lg border border-gray-200 overflow-hidden">
+          {[['trending', Flame, 'Trending'], ['new', Clock, 'New']].map(([value, Icon, label]) => (
+            <button key={value} onClick={() => setSort(value)} className={`flex items-center gap-1 px-3 py-2 text-sm font-medium ${sort === value ? 'bg-blue-600 text-white' : 'bg-white text-gray-700 hover:bg-gray-50'}`}>
+              <Icon size={16} /> {label}
+            </button>
+          ))}
+        </div>
+        <form onSubmit={(e) => { e.preventDefault(); fetchPage(null); }} className="flex items-center gap-2 border border-gray-200 rounded-lg px-3 py-2 bg-white">
+          <Search size={16} className="text-gray-400" />
+          <input value={tag} onChange={(e) => setTag(e.target.value)} placeholder="Tag, e.g. sensor" className="outline-none text-sm w-40" />
+        </form>
+      </header>
+
+      <main className="p-4 md:p-8 grid gap-4 grid-cols-1 sm:grid-cols-2 lg:grid-cols-4">
+        {items.map((item) => (
+          <div key={item.id} className="bg-white rounded-xl border shadow-sm overflow-hidden flex flex-col">
+            <Link to={`/app?id=${item.id}`}>
+              <img src={`${API_URL}${item.thumbnail}`} alt={item.title} className="w-full aspect-[8/5] bg-gray-50" loading="lazy" />
+            </Link>
+            <div className="p-3 flex flex-col gap-2 flex-1">
+              <Link to={`/app?id=${item.id}`} className="font-semibold text-gray-800 hover:text-blue-600 line-clamp-2">{item.title || 'Untitled circuit'}</Link>
+              <div className="flex flex-wrap gap-1">
+                {item.tags.map((t) => (
+                  <span key={t} className="text-xs bg-gray-100 text-gray-600 rounded px-2 py-0.5">{t}</span>
+                ))}
+              </div>
+              <div className="mt-auto flex items-center gap-3 text-xs text-gray-500">
+                <span>{item.parts} parts · {item.connections} wires</span>
+                <span className="flex items-center gap-1 ml-auto"><Eye size={14} /> {item.views}</span>
+                <button onClick={() => like(item.id)} className={`flex items-center gap-1 ${liked[item.id] ? 'text-red-500' : 'hover:text-red-500'}`}>
+                  <Heart size={14} fill={liked[item.id] ? 'currentColor' : 'none'} /> {item.likes + (liked[item.id] ? 1 : 0)}
+                </button>
+              </div>
+            </div>
+          </div>
+        ))}
+      </main>
+
+      <div className="flex justify-center pb-8">
+        {loading ? (
+          <Loader2 className="animate-spin text-blue-600" />
+        ) : next ? (
+          <button onClick={() => fetchPage(next)} className="px-5 py-2 bg-white border border-gray-200 rounded-lg text-sm font-medium text-gray-700 hover:bg-gray-50">
+            Load more
+          </button>
+        ) : items.length === 0 ? (
+          <p className="text-gray-500 text-sm">No circuits yet.</p>
+        ) : null}
+      </div>
+    </div>
+  );
+};
+
+export default Gallery;
@@ -37,6 +37,7 @@ const Home = () => {
             <div className="hidden md:flex items-center space-x-8">
               <a href="#features" className="text-slate-400 hover:text-blue-400 transition-colors font-medium">Features</a>
               <Link to="/study" className="text-slate-400 hover:text-blue-400 transition-colors font-medium">Study Guide</Link>
+              <Link to="/gallery" className="text-slate-400 hover:text-blue-400 transition-colors font-medium">Gallery</Link>
               <Link to="/app" className="px-5 py-2 bg-blue-600 text-white rounded-lg font-bold hover:bg-blue-500 transition-all shadow-lg shadow-blue-600/20 active:scale-95">
                 Design Circuit
               </Link>